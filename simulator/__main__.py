@@ -0,0 +1,76 @@
+"""
+시뮬레이터 / 파이프라인 도구 통합 실행기.
+
+실행: python -m simulator <명령> [옵션...]   (저장소 루트에서)
+  python -m simulator                  명령 목록
+  python -m simulator main --seed 42   = python simulator/main.py --seed 42
+  python -m simulator bridge --help
+
+명령에 해당하는 모듈만 그때 불러옵니다. (목록 / --help에는 numpy, paho, kafka를 불러오지 않음)
+각 모듈은 지금처럼 python simulator/<모듈>.py로 직접 실행해도 됩니다.
+"""
+import importlib
+import os
+import sys
+
+# 명령 → (모듈, 설명)
+COMMANDS = {
+    "main":                ("main", "센서 시뮬레이터 (MQTT 발행 / JSON Lines 백필)"),
+    "fleet":               ("fleet_publisher", "멀티 프로세스 설비군 발행기"),
+    "subscriber":          ("subscriber", "MQTT 수신 확인"),
+    "bridge":              ("bridge", "MQTT → Kafka 브릿지"),
+    "async-bridge":        ("async_bridge", "asyncio 기반 MQTT → Kafka 브릿지"),
+    "shared-bridge":       ("shared_bridge", "수평 확장 브릿지 (MQTT v5 공유 구독, 인스턴스 여러 개)"),
+    "aggregator":          ("aggregator", "sensor-raw 스트리밍 윈도우 집계기"),
+    "detector":            ("detector", "온라인 통계 기반 이상 탐지기"),
+    "alerts":              ("alerts", "경고 에피소드 엔진 (OPEN / UPDATE / CLOSE)"),
+    "pg-sink":             ("pg_sink", "Kafka → PostgreSQL 적재기"),
+    "history":             ("history", "최근 센서 이력 캐시 (hot / cold)"),
+    "archive":             ("archive", "sensor-raw → Parquet 아카이브 / 구간 조회"),
+    "replay":              ("replay", "sensor-raw / 아카이브 재생기 (백테스트, N배속)"),
+    "consumer-group":      ("consumer_group", "sensor-raw 컨슈머 그룹 워커"),
+    "topics":              ("topics", "Kafka 토픽 생성 / 파티션 확인"),
+    "visualize":           ("visualize", "실시간 센서 대시보드"),
+    "test":                ("test", "Kafka 연결 테스트"),
+    "bench":               ("bench", "파이프라인 부하 테스트 / 벤치마크"),
+    "bench-wire":          ("bench_wire", "JSON vs 바이너리 전송 포맷 벤치마크"),
+    "bench-deadband":      ("bench_deadband", "변화 보고(deadband) 모드 효과 측정"),
+    "bench-waveform":      ("bench_waveform", "진동 파형: 원시 발행 vs 엣지 특징 발행"),
+    "bench-pg-sink":       ("bench_pg_sink", "PostgreSQL 적재 처리량 벤치마크"),
+    "bench-pg-queries":    ("bench_pg_queries", "PostgreSQL 조회 벤치마크"),
+    "bench-history":       ("bench_history", "이력 캐시 적재 / 조회 벤치마크"),
+    "bench-archive":       ("bench_archive", "Parquet 아카이브 vs Kafka 구간 읽기"),
+    "bench-batch":         ("bench_batch", "dict 레코드 vs ReadingBatch 메모리 / 할당"),
+    "bench-startup":       ("bench_startup", "명령별 시작 시간 측정"),
+    "bench-shared-bridge": ("bench_shared_bridge", "공유 구독 브릿지 인스턴스 수별 처리량"),
+}
+
+
+def usage() -> str:
+    lines = ["사용법: python -m simulator <명령> [옵션...]", "", "명령:"]
+    lines += [f"  {name:<21}{description}" for name, (_, description) in COMMANDS.items()]
+    lines += ["", "명령별 옵션: python -m simulator <명령> --help"]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return
+    command, rest = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"알 수 없는 명령: {command}\n\n{usage()}", file=sys.stderr)
+        sys.exit(2)
+
+    # 모듈들은 simulator/를 기준으로 import (from config import ...)
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in sys.path:
+        sys.path.insert(0, here)
+    module, _ = COMMANDS[command]
+    sys.argv = [f"simulator {command}"] + rest    # argparse의 사용법 / 오류 메시지에 표시할 이름
+    importlib.import_module(module).main(rest)
+
+
+if __name__ == "__main__":
+    main()
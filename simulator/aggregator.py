@@ -0,0 +1,372 @@
+"""
+sensor-raw 스트리밍 윈도우 집계기.
+
+설비/센서별로 count, min, max, mean, variance, last, alert_ratio(alert 기준 초과 비율)를
+증분 계산해 1초/1분/1시간 rollup 토픽으로 내보냅니다.
+
+  - 시간 기준은 수신 시각이 아니라 데이터의 timestamp (event time)
+  - watermark = 지금까지 본 가장 늦은 timestamp - allowed_lateness
+    → watermark를 넘긴 윈도우만 닫아서 내보내므로 조금 늦거나 순서가 뒤바뀐 데이터도 반영됨
+    → 이미 닫힌 윈도우에 들어올 데이터는 버리고 late_dropped로 집계
+  - 윈도우는 hop 길이의 pane으로 나눠 관리: tumbling은 pane 1개, sliding은 size/hop개를 합쳐서 계산
+    → 키당 메모리는 윈도우 설정에 따라 고정 (데이터 양과 무관)
+  - 입력은 ReadingBatch(batch.py)로 받음 → 레코드 dict / timestamp 문자열을 만들지 않고 센서값 배열을 바로 반영
+  - 윈도우 상태와 Kafka 오프셋을 주기적으로 체크포인트 파일에 저장
+    → 재시작하면 체크포인트 위치부터 이어서 읽음 (토픽 전체를 다시 읽지 않음)
+  - 풀 수 없는 메시지(스키마에 없는 설비 등)는 dead-letter 토픽으로 보내고 건너뜀 (topics.DeadLetters)
+    발행기를 --copies로 띄웠으면 집계기도 같은 --copies로 (스키마 = 복제한 설비 구성)
+
+실행: python simulator/aggregator.py
+"""
+import argparse
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG, AGGREGATOR_CONFIG
+from wire import WireSchema
+from batch import ReadingBatch
+from metrics import StageMetrics, start_metrics
+from topics import DeadLetters
+
+
+def alert_thresholds(machines: dict = None) -> dict:
+    """(machine_type, sensor) → alert 기준값. 기준이 없는(-1) 센서는 제외."""
+    machines = MACHINES if machines is None else machines
+    return {(config["type"], name): sensor["alert"]
+            for config in machines.values()
+            for name, sensor in config["sensors"].items()
+            if sensor["alert"] > 0}
+
+
+class WindowStats:
+    """Welford 방식의 증분 통계 (O(1) 메모리)."""
+
+    __slots__ = ("count", "min", "max", "mean", "m2", "last", "last_ts", "over")
+
+    def __init__(self):
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last = None
+        self.last_ts = float("-inf")
+        self.over = 0
+
+    def add(self, value: float, ts: float, over: bool):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if ts >= self.last_ts:          # 순서가 뒤바뀌어 들어와도 last는 가장 늦은 timestamp 값
+            self.last, self.last_ts = value, ts
+        if over:
+            self.over += 1
+
+    def merge(self, other: "WindowStats"):
+        """다른 pane의 통계를 합칩니다. (Chan et al. 병렬 분산 공식)"""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if other.last_ts >= self.last_ts:
+            self.last, self.last_ts = other.last, other.last_ts
+        self.over += other.over
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": round(self.mean, 4),
+            "variance": round(self.m2 / self.count, 4) if self.count else 0.0,
+            "last": self.last,
+            "alert_ratio": round(self.over / self.count, 4) if self.count else 0.0,
+        }
+
+    def to_state(self) -> list:
+        return [self.count, self.min, self.max, self.mean, self.m2, self.last, self.last_ts, self.over]
+
+    @classmethod
+    def from_state(cls, state: list) -> "WindowStats":
+        stats = cls()
+        (stats.count, stats.min, stats.max, stats.mean,
+         stats.m2, stats.last, stats.last_ts, stats.over) = state
+        return stats
+
+
+class Window:
+    """윈도우 설정 하나 (tumbling 또는 sliding)의 pane 상태."""
+
+    def __init__(self, name: str, size: int, hop: int):
+        if size % hop:
+            raise ValueError(f"{name}: size는 hop의 배수여야 합니다.")
+        self.name = name
+        self.size = size
+        self.hop = hop
+        self.panes = {}         # pane 시작 시각 → {(machine_id, sensor): WindowStats}
+        self.history = {}       # (machine_id, sensor) → 최근에 닫힌 pane들 (sliding용)
+        self._keep = size // hop - 1
+
+    def add(self, key: tuple, value: float, ts: float, over: bool):
+        pane_start = ts - ts % self.hop
+        pane = self.panes.get(pane_start)
+        if pane is None:
+            pane = self.panes[pane_start] = {}
+        stats = pane.get(key)
+        if stats is None:
+            stats = pane[key] = WindowStats()
+        stats.add(value, ts, over)
+
+    def is_closed(self, ts: float, watermark: float) -> bool:
+        return ts - ts % self.hop + self.hop <= watermark
+
+    def close(self, watermark: float):
+        """watermark를 넘긴 pane을 닫고 (윈도우 끝 시각, 키, 통계)를 돌려줍니다."""
+        for pane_start in sorted(s for s in self.panes if s + self.hop <= watermark):
+            pane = self.panes.pop(pane_start)
+            window_end = pane_start + self.hop
+            for key, stats in pane.items():
+                if self._keep == 0:
+                    yield window_end, key, stats
+                    continue
+                recent = self.history.get(key)
+                if recent is None:
+                    recent = self.history[key] = deque(maxlen=self._keep)
+                merged = WindowStats()
+                for start, old in recent:
+                    if start >= window_end - self.size:
+                        merged.merge(old)
+                merged.merge(stats)
+                recent.append((pane_start, stats))
+                yield window_end, key, merged
+
+    def to_state(self) -> dict:
+        return {
+            "panes": [[start, [[list(k), s.to_state()] for k, s in pane.items()]]
+                      for start, pane in self.panes.items()],
+            "history": [[list(k), [[start, s.to_state()] for start, s in recent]]
+                        for k, recent in self.history.items()],
+        }
+
+    def load_state(self, state: dict):
+        self.panes = {start: {tuple(k): WindowStats.from_state(s) for k, s in items}
+                      for start, items in state["panes"]}
+        self.history = {tuple(k): deque(((start, WindowStats.from_state(s)) for start, s in items),
+                                        maxlen=self._keep)
+                        for k, items in state["history"]}
+
+
+class Aggregator:
+    """레코드를 윈도우에 반영하고, 닫힌 윈도우의 집계 결과를 돌려줍니다."""
+
+    def __init__(self, windows: list = None, allowed_lateness: float = None, machines: dict = None):
+        specs = AGGREGATOR_CONFIG["windows"] if windows is None else windows
+        self.windows = [Window(w["name"], w["size"], w["hop"]) for w in specs]
+        self.allowed_lateness = (AGGREGATOR_CONFIG["allowed_lateness"]
+                                 if allowed_lateness is None else allowed_lateness)
+        self.thresholds = alert_thresholds(machines)
+        self._schema, self._schema_thresholds = None, None     # ReadingBatch 평탄 센서 키 → 기준값 (없으면 NaN)
+        self.max_ts = float("-inf")
+        self.late_dropped = 0
+
+    @property
+    def watermark(self) -> float:
+        return self.max_ts - self.allowed_lateness
+
+    def add(self, record: dict):
+        ts = datetime.fromisoformat(record["timestamp"]).timestamp()
+        machine_id = record["machine_id"]
+        machine_type = record["machine_type"]
+        watermark = self.watermark
+        for sensor, value in record["sensors"].items():
+            key = (machine_id, sensor)
+            threshold = self.thresholds.get((machine_type, sensor))
+            over = threshold is not None and value > threshold
+            for window in self.windows:
+                if window.is_closed(ts, watermark):
+                    self.late_dropped += 1
+                    continue
+                window.add(key, value, ts, over)
+        if ts > self.max_ts:
+            self.max_ts = ts
+
+    def add_batch(self, batch):
+        """ReadingBatch를 반영합니다. 행마다 add를 부른 것과 같은 결과 (dict와 timestamp 문자열을 만들지 않음)."""
+        if not len(batch):
+            return
+        schema = batch.schema
+        if schema is not self._schema:
+            types = [schema.types[t] for t in schema.machine_type.tolist()]
+            self._schema = schema
+            self._schema_thresholds = np.array(
+                [self.thresholds.get((types[schema.machine_index[machine_id]], sensor), np.nan)
+                 for machine_id, sensor in schema.sensor_keys])
+        ts = batch.ts / 1000
+        # 행마다 그 행 이전까지의 max_ts로 watermark를 정함 (add와 같은 순서)
+        watermarks = (np.maximum.accumulate(np.r_[self.max_ts, ts])[:-1] - self.allowed_lateness).tolist()
+        rows, keys, values = batch.readings()
+        over = (values > self._schema_thresholds[keys]).tolist()    # 기준 없음(NaN)은 False
+        ts = ts.tolist()
+        names = schema.sensor_keys
+        for row, key, value, is_over in zip(rows.tolist(), keys.tolist(), values.tolist(), over):
+            t, watermark = ts[row], watermarks[row]
+            key = names[key]
+            for window in self.windows:
+                if window.is_closed(t, watermark):
+                    self.late_dropped += 1
+                    continue
+                window.add(key, value, t, is_over)
+        self.max_ts = max(self.max_ts, max(ts))
+
+    def emit(self):
+        """watermark를 넘긴 윈도우의 rollup 레코드를 (윈도우 이름, 레코드)로 돌려줍니다."""
+        watermark = self.watermark
+        for window in self.windows:
+            for window_end, (machine_id, sensor), stats in window.close(watermark):
+                yield window.name, {
+                    "window": window.name,
+                    "start": _iso(window_end - window.size),
+                    "end": _iso(window_end),
+                    "machine_id": machine_id,
+                    "sensor": sensor,
+                    **stats.to_dict(),
+                }
+
+    def to_state(self) -> dict:
+        return {
+            "max_ts": self.max_ts,
+            "late_dropped": self.late_dropped,
+            "windows": {w.name: w.to_state() for w in self.windows},
+        }
+
+    def load_state(self, state: dict):
+        self.max_ts = state["max_ts"]
+        self.late_dropped = state["late_dropped"]
+        for window in self.windows:
+            if window.name in state["windows"]:
+                window.load_state(state["windows"][window.name])
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def save_checkpoint(path: str, aggregator: Aggregator, offsets: dict):
+    """윈도우 상태와 다음에 읽을 오프셋을 원자적으로 저장합니다. (임시 파일 → rename)"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offsets": offsets, "state": aggregator.to_state()}, f)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw 윈도우 집계기")
+    parser.add_argument("--checkpoint", default=AGGREGATOR_CONFIG["checkpoint_path"])
+    parser.add_argument("--from", dest="start_from", choices=("earliest", "latest"),
+                        default=AGGREGATOR_CONFIG["start_from"])
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="풀 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    args = parser.parse_args(argv)
+
+    from kafka import KafkaConsumer, KafkaProducer, TopicPartition
+    from fleet import expand_machines
+
+    topic = KAFKA_CONFIG["raw_topic"]
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        enable_auto_commit=False,
+    )
+    producer = KafkaProducer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        value_serializer=lambda x: json.dumps(x, ensure_ascii=False).encode("utf-8"),
+        key_serializer=lambda x: x.encode("utf-8"),
+        linger_ms=50,
+    )
+
+    # 파티션을 직접 할당하고 체크포인트 위치로 이동
+    partitions = [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or [])]
+    consumer.assign(partitions)
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    dead_letters = DeadLetters("aggregator", args.dead_letter_topic)
+    aggregator = Aggregator()
+    checkpoint = load_checkpoint(args.checkpoint)
+    if checkpoint:
+        aggregator.load_state(checkpoint["state"])
+        for tp in partitions:
+            offset = checkpoint["offsets"].get(str(tp.partition))
+            if offset is not None:
+                consumer.seek(tp, offset)
+        print(f"체크포인트에서 복구: {checkpoint['offsets']}")
+    elif args.start_from == "earliest":
+        consumer.seek_to_beginning(*partitions)
+    else:
+        consumer.seek_to_end(*partitions)
+
+    prefix = AGGREGATOR_CONFIG["topic_prefix"]
+    metrics = start_metrics("aggregator")
+    stage = StageMetrics(metrics, "aggregator")
+    metrics.gauge("aggregator", lambda: {"late_dropped": aggregator.late_dropped,
+                                         "watermark": aggregator.watermark})
+    print(f"윈도우 집계기 시작! windows={[w.name for w in aggregator.windows]}")
+    last_checkpoint = time.monotonic()
+    emitted = 0
+    try:
+        while True:
+            for messages in consumer.poll(timeout_ms=200).values():
+                for msg in messages:
+                    try:
+                        batch = ReadingBatch.from_payload(msg.value, schema)
+                    except ValueError as e:     # WireFormatError, 깨진 JSON
+                        dead_letters.add(msg.value, e, msg.key)
+                        continue
+                    stage.observe_kafka(msg, len(batch))
+                    stage.observe_batch(batch)
+                    aggregator.add_batch(batch)
+            for name, rollup in aggregator.emit():
+                producer.send(prefix + name, key=rollup["machine_id"], value=rollup)
+                emitted += 1
+
+            if time.monotonic() - last_checkpoint >= AGGREGATOR_CONFIG["checkpoint_interval"]:
+                producer.flush()    # 내보낸 결과(와 dead-letter)가 Kafka에 들어간 뒤에 체크포인트
+                dead_letters.flush()
+                offsets = {str(tp.partition): consumer.position(tp) for tp in partitions}
+                save_checkpoint(args.checkpoint, aggregator, offsets)
+                last_checkpoint = time.monotonic()
+                print(f"[집계] rollup {emitted:,}건 | late_dropped={aggregator.late_dropped} | "
+                      f"watermark={_iso(aggregator.watermark) if emitted else '-'} | "
+                      f"dead-letter {dead_letters.count:,}건")
+    except KeyboardInterrupt:
+        producer.flush()
+        dead_letters.flush()
+        offsets = {str(tp.partition): consumer.position(tp) for tp in partitions}
+        save_checkpoint(args.checkpoint, aggregator, offsets)
+        print("\n⏹ 집계기 종료 (체크포인트 저장 완료)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+경고 에피소드 엔진.
+
+sensor-alert는 WARNING/ANOMALY 레코드를 틱마다 그대로 다시 보내므로, 이상 하나(10~60초)가
+거의 같은 메시지 수십 건이 되고 소비하는 쪽마다 중복을 걸러야 합니다.
+여기서는 설비/센서별로 alert 기준(config.MACHINES)을 넘는 구간을 에피소드 하나로 묶어
+OPEN / UPDATE / CLOSE 이벤트만 내보냅니다.
+
+  - 히스테리시스: alert 초과로 시작, 해제 기준(alert - clear_ratio × (alert - base)) 아래로 내려가야 끝
+    → 기준선 근처에서 오르내리는 값이 열고 닫기를 반복하지 않음
+    alert가 base보다 낮은 센서(냉매 잔량, 역률)는 하한 기준으로 보고 방향을 뒤집어 판정
+    (fleet.py의 status는 방향 없이 alert 초과로만 보므로 이 센서들은 늘 WARNING)
+  - 최소 지속 시간: min_duration 동안 해제 기준 위에 머물러야 OPEN (짧은 튐은 이벤트 없이 버림)
+    해제도 min_clear 동안 아래에 머물러야 CLOSE
+  - UPDATE: 심각도(minor / major / critical)가 올라가거나 update_interval마다
+  - 이벤트에는 시작 시각, 지속 시간, peak 값, 심각도를 담음
+  - 값이 stale_timeout 동안 안 오면(event time 기준) 열린 에피소드를 닫음
+에피소드 상태는 센서별 NumPy 배열(상태, 시작 시각, peak, ...)로 들고 있고,
+진행 중인 에피소드만 Kafka 오프셋과 함께 체크포인트 파일에 저장합니다. (aggregator.py와 같은 방식)
+입력은 ReadingBatch(batch.py)로 받아 dict 레코드를 만들지 않습니다. (flatten_batch)
+풀 수 없는 메시지(스키마에 없는 설비 등)는 dead-letter 토픽으로 보내고 건너뜁니다. (topics.DeadLetters)
+발행기를 --copies로 띄웠으면 엔진도 같은 --copies로 띄우세요.
+
+실행: python simulator/alerts.py
+오프라인 비교 (sensor-alert 메시지 수 vs 이벤트 수): python simulator/alerts.py --offline 3600 --copies 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG, ALERT_CONFIG
+from detector import KeyIndex
+from wire import WireSchema
+from batch import ReadingBatch
+from metrics import StageMetrics, start_metrics
+from topics import DeadLetters
+
+IDLE, PENDING, OPEN = 0, 1, 2
+
+# 센서별 상태 배열 (이름 → dtype)
+FIELDS = {
+    "state": "uint8",
+    "sign": "int8",             # 1: 상한 기준, -1: 하한 기준 (아래 값들은 모두 sign을 곱해서 저장)
+    "alert": "float64",         # 시작 기준 (alert)
+    "clear": "float64",         # 해제 기준
+    "span": "float64",          # |alert - base| (심각도 계산용)
+    "start_ts": "float64",
+    "peak": "float64",
+    "peak_ts": "float64",
+    "below_ts": "float64",      # 해제 기준 아래로 내려간 시각 (위에 있으면 NaN)
+    "last_ts": "float64",       # 마지막으로 값을 받은 시각
+    "emit_ts": "float64",       # 마지막 이벤트 시각
+    "level": "int8",            # 마지막 이벤트의 심각도 단계
+    "samples": "int32",
+}
+
+
+def alert_levels(machines: dict = None, clear_ratio: float = None) -> dict:
+    """(machine_type, sensor) → (방향, alert, 해제 기준, |alert - base|). 기준이 없는(-1) 센서는 제외.
+    방향과 기준값은 sign을 곱한 값이라 하한 기준도 상한 기준처럼 비교할 수 있습니다."""
+    machines = MACHINES if machines is None else machines
+    clear_ratio = ALERT_CONFIG["clear_ratio"] if clear_ratio is None else clear_ratio
+    levels = {}
+    for config in machines.values():
+        for name, sensor in config["sensors"].items():
+            if sensor["alert"] > 0:
+                span = sensor["alert"] - sensor["base"]
+                sign = 1 if span >= 0 else -1
+                levels[(config["type"], name)] = (sign, sign * sensor["alert"],
+                                                  sign * (sensor["alert"] - clear_ratio * span), abs(span))
+    return levels
+
+
+class EpisodeTracker:
+    """설비/센서별 경고 에피소드 상태를 배열로 들고 있는 상태 머신."""
+
+    def __init__(self, machines: dict = None, clear_ratio: float = None, min_duration: float = None,
+                 min_clear: float = None, update_interval: float = None, severity_levels: list = None,
+                 stale_timeout: float = None):
+        cfg = ALERT_CONFIG
+        self.min_duration = cfg["min_duration"] if min_duration is None else min_duration
+        self.min_clear = cfg["min_clear"] if min_clear is None else min_clear
+        self.update_interval = cfg["update_interval"] if update_interval is None else update_interval
+        self.stale_timeout = cfg["stale_timeout"] if stale_timeout is None else stale_timeout
+        levels = cfg["severity_levels"] if severity_levels is None else severity_levels
+        self.severity_bounds = np.array([bound for bound, _ in levels])
+        self.severity_names = [name for _, name in levels]
+        self.levels = alert_levels(machines, clear_ratio)
+
+        self.index = KeyIndex()
+        self._schema, self._schema_keys = None, None    # ReadingBatch 평탄 센서 키 → 상태 인덱스 (기준 없으면 -1)
+        self._capacity = 0
+        for name, dtype in FIELDS.items():
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self.max_ts = float("-inf")
+        self.counts = {"OPEN": 0, "UPDATE": 0, "CLOSE": 0, "suppressed": 0}
+        self._stamp, self._stamp_ts = None, 0.0
+
+    def _grow(self, size: int):
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2, 64)
+        for name in FIELDS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def _register(self, machine_id: str, sensor: str, level: tuple) -> int:
+        n = len(self.index)
+        i = self.index.get(machine_id, sensor)
+        if i == n:
+            self._grow(n + 1)
+            self.sign[i], self.alert[i], self.clear[i], self.span[i] = level
+        return i
+
+    @property
+    def open_count(self) -> int:
+        return int(np.count_nonzero(self.state[:len(self.index)] == OPEN))
+
+    def _parse_ts(self, stamp: str) -> float:
+        # 한 틱의 레코드는 timestamp가 같으므로 직전 값을 재사용
+        if stamp != self._stamp:
+            self._stamp, self._stamp_ts = stamp, datetime.fromisoformat(stamp).timestamp()
+        return self._stamp_ts
+
+    def flatten(self, records: list):
+        """레코드 목록 → (센서 인덱스, 값, 시각) 배열. alert 기준이 없는 센서는 뺍니다."""
+        keys, values, times = [], [], []
+        levels, register = self.levels, self._register
+        for record in records:
+            machine_id, machine_type = record["machine_id"], record["machine_type"]
+            ts = self._parse_ts(record["timestamp"])
+            for sensor, value in record["sensors"].items():
+                level = levels.get((machine_type, sensor))
+                if level is None:
+                    continue
+                keys.append(register(machine_id, sensor, level))
+                values.append(value)
+                times.append(ts)
+        return (np.array(keys, dtype=np.intp), np.array(values, dtype=np.float64),
+                np.array(times, dtype=np.float64))
+
+    def flatten_batch(self, batch):
+        """ReadingBatch → (센서 인덱스, 값, 시각) 배열. flatten과 같은 결과 (dict를 거치지 않음)."""
+        schema = batch.schema
+        if schema is not self._schema:
+            # 스키마의 alert 기준이 있는 센서를 한 번에 등록
+            keys = np.full(len(schema.sensor_keys), -1, dtype=np.intp)
+            types = [schema.types[t] for t in schema.machine_type.tolist()]
+            for flat, (machine_id, sensor) in enumerate(schema.sensor_keys):
+                level = self.levels.get((types[schema.machine_index[machine_id]], sensor))
+                if level is not None:
+                    keys[flat] = self._register(machine_id, sensor, level)
+            self._schema, self._schema_keys = schema, keys
+        rows, keys, values = batch.readings()
+        keys = self._schema_keys[keys]
+        keep = keys >= 0
+        rows = rows[keep]
+        return keys[keep], values[keep], batch.ts[rows] / 1000
+
+    def process(self, keys: np.ndarray, values: np.ndarray, times: np.ndarray) -> list:
+        """값 배열로 에피소드 상태를 갱신합니다. 반환: 이벤트 목록 (센서별로 시간 순서)."""
+        events = []
+        if len(keys) == 0:
+            return events
+        # 같은 센서의 n번째 등장끼리 묶어서 라운드별로 처리 (detector.py와 같은 방식)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        rank = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+        for r in range(int(rank.max()) + 1):
+            pos = order[rank == r]
+            events.extend(self._update(keys[pos], values[pos], times[pos]))
+        self.max_ts = max(self.max_ts, float(times.max()))
+        return events
+
+    def _severity(self, k: np.ndarray) -> np.ndarray:
+        excess = (self.peak[k] - self.alert[k]) / self.span[k]
+        return np.maximum(np.searchsorted(self.severity_bounds, excess, side="right") - 1, 0)
+
+    def _update(self, k: np.ndarray, x: np.ndarray, t: np.ndarray) -> list:
+        state = self.state[k]
+        x = x * self.sign[k]
+        hold = x >= self.clear[k]                       # 해제 기준 위 (에피소드 유지)
+        begin = (state == IDLE) & (x > self.alert[k])
+        running = begin | ((state != IDLE) & hold)
+        dropped = (state == PENDING) & ~hold            # 최소 지속 시간을 못 채우고 내려옴
+
+        start_ts = np.where(begin, t, self.start_ts[k])
+        higher = running & (begin | (x > self.peak[k]))
+        self.start_ts[k] = start_ts
+        self.peak[k] = np.where(higher, x, self.peak[k])
+        self.peak_ts[k] = np.where(higher, t, self.peak_ts[k])
+        self.samples[k] = np.where(begin, 1, self.samples[k] + (state != IDLE))
+        below_ts = np.where(running, np.nan, np.where(np.isnan(self.below_ts[k]), t, self.below_ts[k]))
+        self.below_ts[k] = below_ts
+        self.last_ts[k] = t
+
+        opened = running & (state != OPEN) & (t - start_ts >= self.min_duration)
+        closed = (state == OPEN) & ~hold & (t - below_ts >= self.min_clear)
+        level = self._severity(k)
+        updated = ((state == OPEN) & hold
+                   & ((level > self.level[k]) | (t - self.emit_ts[k] >= self.update_interval)))
+
+        new_state = np.where(begin, PENDING, state)
+        new_state[dropped | closed] = IDLE
+        new_state[opened] = OPEN
+        self.state[k] = new_state
+        self.counts["suppressed"] += int(np.count_nonzero(dropped))
+
+        events = []
+        for kind, mask in (("OPEN", opened), ("UPDATE", updated), ("CLOSE", closed)):
+            if mask.any():
+                i = k[mask]
+                self.emit_ts[i] = t[mask]
+                self.level[i] = level[mask]
+                end = below_ts[mask] if kind == "CLOSE" else t[mask]
+                events.extend(self._events(kind, i, end))
+        return events
+
+    def expire(self, now: float = None) -> list:
+        """now(기본: 지금까지 본 가장 늦은 timestamp) 기준 stale_timeout 동안 값이 없던 에피소드를 닫습니다."""
+        now = self.max_ts if now is None else now
+        n = len(self.index)
+        stale = (self.state[:n] != IDLE) & (self.last_ts[:n] < now - self.stale_timeout)
+        if not stale.any():
+            return []
+        k = np.flatnonzero(stale)
+        opened = self.state[k] == OPEN
+        self.counts["suppressed"] += int(np.count_nonzero(~opened))
+        self.state[k] = IDLE
+        k = k[opened]
+        end = np.where(np.isnan(self.below_ts[k]), self.last_ts[k], self.below_ts[k])
+        return self._events("CLOSE", k, end)
+
+    def _events(self, kind: str, k: np.ndarray, end: np.ndarray) -> list:
+        self.counts[kind] += len(k)
+        names = self.severity_names
+        keys = self.index.keys
+        return [{
+            "event": kind,
+            "machine_id": keys[i][0],
+            "sensor": keys[i][1],
+            "severity": names[level],
+            "start": _iso(start),
+            "timestamp": _iso(ts),
+            "duration": round(ts - start, 3),
+            "peak": peak,
+            "peak_at": _iso(peak_ts),
+            "alert": alert,
+            "samples": samples,
+        } for i, level, start, ts, peak, peak_ts, alert, samples in zip(
+            k.tolist(), self.level[k].tolist(), self.start_ts[k].tolist(), end.tolist(),
+            (self.peak[k] * self.sign[k]).tolist(), self.peak_ts[k].tolist(), (self.alert[k] * self.sign[k]).tolist(),
+            self.samples[k].tolist())]
+
+    def to_state(self) -> dict:
+        """진행 중(PENDING / OPEN)인 센서의 상태만 담습니다. (IDLE은 다시 들어오면 새로 등록)"""
+        active = np.flatnonzero(self.state[:len(self.index)] != IDLE)
+        keys = self.index.keys
+        return {
+            "max_ts": self.max_ts,
+            "counts": self.counts,
+            "keys": [keys[i] for i in active.tolist()],
+            **{name: getattr(self, name)[active].tolist() for name in FIELDS},
+        }
+
+    def load_state(self, state: dict):
+        self.max_ts = state["max_ts"]
+        self.counts.update(state["counts"])
+        k = np.array([self.index.get(machine_id, sensor) for machine_id, sensor in state["keys"]], dtype=np.intp)
+        self._grow(len(self.index))
+        for name, dtype in FIELDS.items():
+            getattr(self, name)[k] = np.array(state[name], dtype=dtype)
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def save_checkpoint(path: str, tracker: EpisodeTracker, offsets: dict):
+    """에피소드 상태와 다음에 읽을 오프셋을 원자적으로 저장합니다. (임시 파일 → rename)"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"offsets": offsets, "state": tracker.to_state()}, f)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_offline(ticks: int, copies: int, seed: int):
+    """Kafka 없이 Fleet 데이터로 sensor-alert 메시지 수와 에피소드 이벤트 수를 비교합니다."""
+    from clock import SimClock, DEFAULT_REPLAY_START
+    from fleet import Fleet, expand_machines, STATUS_RUNNING
+
+    fleet = Fleet(expand_machines(MACHINES, copies) if copies > 1 else MACHINES, seed=seed)
+    clock = SimClock(mode="fast", start=DEFAULT_REPLAY_START)
+    tracker = EpisodeTracker()
+    alert_messages = crossings = 0
+    above = np.zeros(fleet.size, dtype=bool)
+    elapsed = 0.0
+    for _ in range(ticks):
+        fleet.step()
+        batch = fleet.batch(round(clock.epoch() * 1000))
+        clock.advance()
+        alert_messages += int(np.count_nonzero(fleet.status != STATUS_RUNNING))   # bridge가 sensor-alert로 보내는 건수
+        crossings += int(np.count_nonzero(fleet.exceeds_alert & ~above))          # alert 기준 상향 돌파 횟수
+        above = fleet.exceeds_alert
+        start = time.perf_counter()
+        tracker.process(*tracker.flatten_batch(batch))
+        elapsed += time.perf_counter() - start
+    tracker.expire(float("inf"))        # 끝에 남은 에피소드 정리
+
+    counts = tracker.counts
+    events = counts["OPEN"] + counts["UPDATE"] + counts["CLOSE"]
+    print(f"설비 {len(fleet)}대 × {ticks}틱")
+    print(f"  sensor-alert 메시지:   {alert_messages:>10,}건")
+    print(f"  alert 기준 상향 돌파: {crossings:>10,}회")
+    print(f"  에피소드 이벤트:       {events:>10,}건 (OPEN {counts['OPEN']:,} / UPDATE {counts['UPDATE']:,} / "
+          f"CLOSE {counts['CLOSE']:,}, 최소 지속 시간 미달 {counts['suppressed']:,})")
+    print(f"  감소: {alert_messages / max(events, 1):,.1f}배 | 처리량: {ticks * fleet.size / elapsed:,.0f} 센서값/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="경고 에피소드 엔진 (OPEN / UPDATE / CLOSE)")
+    parser.add_argument("--offline", type=int, metavar="TICKS", default=None,
+                        help="Kafka 대신 시뮬레이터 데이터로 TICKS틱 비교")
+    parser.add_argument("--copies", type=int, default=1,
+                        help="config.MACHINES 복제 배수 (발행기와 같게, 오프라인 비교에도 사용)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--topic", default=ALERT_CONFIG["input_topic"])
+    parser.add_argument("--checkpoint", default=ALERT_CONFIG["checkpoint_path"])
+    parser.add_argument("--from", dest="start_from", choices=("earliest", "latest"),
+                        default=ALERT_CONFIG["start_from"])
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="풀 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        run_offline(args.offline, args.copies, args.seed)
+        return
+
+    from kafka import KafkaConsumer, KafkaProducer, TopicPartition
+    from fleet import expand_machines
+
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        enable_auto_commit=False,
+    )
+    producer = KafkaProducer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        value_serializer=lambda x: json.dumps(x, ensure_ascii=False).encode("utf-8"),
+        key_serializer=lambda x: x.encode("utf-8"),
+        linger_ms=50,
+    )
+
+    # 파티션을 직접 할당하고 체크포인트 위치로 이동
+    partitions = [TopicPartition(args.topic, p)
+                  for p in sorted(consumer.partitions_for_topic(args.topic) or [])]
+    consumer.assign(partitions)
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    dead_letters = DeadLetters("alerts", args.dead_letter_topic)
+    tracker = EpisodeTracker()
+    checkpoint = load_checkpoint(args.checkpoint)
+    if checkpoint:
+        tracker.load_state(checkpoint["state"])
+        for tp in partitions:
+            offset = checkpoint["offsets"].get(str(tp.partition))
+            if offset is not None:
+                consumer.seek(tp, offset)
+        print(f"체크포인트에서 복구: {checkpoint['offsets']} (진행 중 에피소드 {len(checkpoint['state']['keys'])}개)")
+    elif args.start_from == "earliest":
+        consumer.seek_to_beginning(*partitions)
+    else:
+        consumer.seek_to_end(*partitions)
+
+    output_topic = ALERT_CONFIG["output_topic"]
+    metrics = start_metrics("alerts")
+    stage = StageMetrics(metrics, "alerts")
+    metrics.gauge("episodes", lambda: {**tracker.counts, "open": tracker.open_count})
+    print(f"경고 에피소드 엔진 시작! {args.topic} → {output_topic}")
+    last_checkpoint = last_report = time.monotonic()
+    try:
+        while True:
+            parts = []
+            for messages in consumer.poll(timeout_ms=200).values():
+                for msg in messages:
+                    try:
+                        batch = ReadingBatch.from_payload(msg.value, schema)
+                    except ValueError as e:     # WireFormatError, 깨진 JSON
+                        dead_letters.add(msg.value, e, msg.key)
+                        continue
+                    stage.observe_kafka(msg, len(batch))
+                    parts.append(batch)
+            batch = ReadingBatch.concat(parts, schema)
+            if len(batch):
+                stage.observe_batch(batch)
+                events = tracker.process(*tracker.flatten_batch(batch))
+                events.extend(tracker.expire())
+                for event in events:
+                    producer.send(output_topic, key=event["machine_id"], value=event)
+
+            now = time.monotonic()
+            if now - last_checkpoint >= ALERT_CONFIG["checkpoint_interval"]:
+                producer.flush()    # 내보낸 이벤트(와 dead-letter)가 Kafka에 들어간 뒤에 체크포인트
+                dead_letters.flush()
+                offsets = {str(tp.partition): consumer.position(tp) for tp in partitions}
+                save_checkpoint(args.checkpoint, tracker, offsets)
+                last_checkpoint = now
+            if now - last_report >= ALERT_CONFIG["stats_interval"]:
+                counts = tracker.counts
+                print(f"[경고] 센서 {len(tracker.index)}개 | 진행 중 {tracker.open_count} | "
+                      f"OPEN {counts['OPEN']:,} UPDATE {counts['UPDATE']:,} CLOSE {counts['CLOSE']:,} | "
+                      f"버림 {counts['suppressed']:,} | dead-letter {dead_letters.count:,}건")
+                last_report = now
+    except KeyboardInterrupt:
+        producer.flush()
+        dead_letters.flush()
+        offsets = {str(tp.partition): consumer.position(tp) for tp in partitions}
+        save_checkpoint(args.checkpoint, tracker, offsets)
+        print("\n⏹ 경고 에피소드 엔진 종료 (체크포인트 저장 완료)")
+
+
+if __name__ == "__main__":
+    main()
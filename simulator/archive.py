@@ -0,0 +1,401 @@
+"""
+sensor-raw 장기 보관용 Parquet 아카이브.
+
+Kafka에는 보존 기간만큼만, 그것도 센서 이름을 매번 적은 JSON으로 남아 있어서
+"CNC-001 spindle_temp 지난달"을 보려면 토픽 전체를 읽고 JSON을 다 풀어야 합니다.
+여기서는 sensor-raw를 받아 설비 타입별 열 형식(Parquet) 파일로 씁니다.
+
+  - 경로: {directory}/type=<타입>/date=<UTC 날짜>/machine_id=<설비>/part-<첫 행 시각>-<id>.parquet
+    (hive 방식 파티션 → 조회 시 날짜 / 설비 디렉터리만 열어 봄)
+  - 열: ts, seq, status, has_anomaly, has_alert + config.MACHINES의 센서마다 한 열 (float32, 없는 값은 null)
+  - 인코딩: ts / seq는 delta, status는 dictionary, 센서 값은 byte stream split + zstd 압축
+  - 설비별로 row_group_rows개씩 row group으로 씀 → row group마다 ts 최소 / 최대 통계가 있어 조회 구간 밖은 건너뜀
+  - 파일은 max_file_rows를 넘거나 날짜가 바뀌면 새로 열고, rotate_seconds마다 모두 닫음
+    쓰는 중인 파일은 .inprogress로 두었다가 닫을 때 이름을 바꿈 (footer가 없는 파일은 조회하지 않음)
+    Kafka 오프셋은 열린 파일을 모두 닫은 뒤에만 커밋 → 죽으면 마지막 커밋 이후를 다시 읽어서 씀 (at-least-once)
+    풀 수 없는 메시지(스키마에 없는 설비 등)는 dead-letter 토픽으로 보내고 건너뜀 (topics.DeadLetters)
+    시작할 때 남아 있는 .inprogress는 지우므로 디렉터리 하나에 아카이버 하나만 띄우세요.
+
+변화 보고 모드(partial) 레코드는 StateReconstructor로 전체 스냅샷으로 되돌려 저장합니다. (history.py와 같음)
+Kafka에서 받은 것은 ReadingBatch(batch.py)로 읽어 열 단위로 붙입니다. (add_batch, partial은 BatchReconstructor)
+
+조회 (ArchiveReader, 시각은 epoch 초):
+  - range(machine_id, start, end, sensors)   start <= 시각 < end → (시각, 값[행, 센서]) - history.range와 같은 모양
+  - table(machine_id, start, end, columns)   같은 구간의 pyarrow Table
+  필요한 열만 읽고(column pruning), ts 조건은 row group 통계로 먼저 거르며(predicate pushdown), 파일은 memory map으로 엽니다.
+
+실행: python simulator/archive.py
+조회: python simulator/archive.py --query CNC-001 --sensors spindle_temp --start 2026-01-01 --end 2026-01-02
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from lazy import np, lazy_import
+
+from config import MACHINES, KAFKA_CONFIG, ARCHIVE_CONFIG
+from deadband import StateReconstructor
+from wire import WireSchema, STATUS_NAMES
+from batch import BatchReconstructor, ReadingBatch
+from metrics import StageMetrics, start_metrics
+from topics import DeadLetters
+
+pa = lazy_import("pyarrow")       # --help에는 불러오지 않음 (pyarrow.parquet은 쓰는 곳에서 불러옴)
+
+META_COLUMNS = ("ts", "seq", "status", "has_anomaly", "has_alert")
+INPROGRESS = ".inprogress"
+
+
+def type_schema(sensors: list) -> pa.Schema:
+    return pa.schema([("ts", pa.timestamp("us", tz="UTC")), ("seq", pa.int64()),
+                      ("status", pa.dictionary(pa.int8(), pa.string())),
+                      ("has_anomaly", pa.bool_()), ("has_alert", pa.bool_())]
+                     + [(name, pa.float32()) for name in sensors])
+
+
+class PartitionFile:
+    """쓰는 중인 파일 하나: 한 설비의 하루 안 구간. 행을 모았다가 row group 단위로 씁니다."""
+
+    __slots__ = ("path", "sensors", "schema", "writer", "rows", "ts", "seq", "status", "anomaly", "alert", "values")
+
+    def __init__(self, path: str, sensors: list, schema: pa.Schema, options: dict):
+        self.path = path
+        self.sensors = sensors
+        self.schema = schema
+        import pyarrow.parquet as pq
+
+        self.writer = pq.ParquetWriter(path + INPROGRESS, schema, **options)
+        self.rows = 0               # 파일에 쓴 행 수
+        self._reset()
+
+    def _reset(self):
+        self.ts, self.seq, self.status, self.anomaly, self.alert = [], [], [], [], []
+        self.values = [[] for _ in self.sensors]
+
+    @property
+    def pending(self) -> int:
+        return len(self.ts)
+
+    def append(self, ts_us: int, record: dict):
+        self.ts.append(ts_us)
+        self.seq.append(record.get("seq"))
+        self.status.append(record.get("status"))
+        self.anomaly.append(record.get("has_anomaly"))
+        self.alert.append(record.get("has_alert"))
+        sensors = record["sensors"]
+        for column, name in zip(self.values, self.sensors):
+            column.append(sensors.get(name))
+
+    def extend(self, ts_us: list, seq: list, status: list, anomaly: list, alert: list, values: list):
+        """여러 행을 한 번에 (열별 목록, values는 self.sensors 순서의 열 목록)."""
+        self.ts.extend(ts_us)
+        self.seq.extend(seq)
+        self.status.extend(status)
+        self.anomaly.extend(anomaly)
+        self.alert.extend(alert)
+        for column, new in zip(self.values, values):
+            column.extend(new)
+
+    def flush(self):
+        """모은 행을 row group 하나로 씁니다."""
+        if not self.ts:
+            return
+        schema = self.schema
+        columns = [pa.array(self.ts, type=pa.int64()).cast(schema.field("ts").type),
+                   pa.array(self.seq, type=pa.int64()),
+                   pa.array(self.status, type=pa.string()).dictionary_encode().cast(schema.field("status").type),
+                   pa.array(self.anomaly, type=pa.bool_()),
+                   pa.array(self.alert, type=pa.bool_())]
+        columns += [pa.array(values, type=pa.float32()) for values in self.values]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+        self.rows += len(self.ts)
+        self._reset()
+
+    def close(self) -> int:
+        """남은 행을 쓰고 파일을 닫은 뒤 .parquet 이름으로 바꿉니다. 반환: 파일 크기(바이트)."""
+        self.flush()
+        self.writer.close()
+        os.replace(self.path + INPROGRESS, self.path)
+        return os.path.getsize(self.path)
+
+
+class ArchiveWriter:
+    """레코드를 (타입, 날짜, 설비) 파티션 파일에 나눠 씁니다."""
+
+    def __init__(self, directory: str = None, machines: dict = None, row_group_rows: int = None,
+                 max_file_rows: int = None, compression: str = None, compression_level: int = None):
+        cfg = ARCHIVE_CONFIG
+        machines = MACHINES if machines is None else machines
+        self.directory = directory or cfg["directory"]
+        self.row_group_rows = row_group_rows or cfg["row_group_rows"]
+        self.max_file_rows = max_file_rows or cfg["max_file_rows"]
+        self.layouts = {}           # machine_type → (센서 목록, 스키마, 파일 옵션)
+        for config in machines.values():
+            if config["type"] not in self.layouts:
+                sensors = list(config["sensors"])
+                self.layouts[config["type"]] = (sensors, type_schema(sensors), {
+                    "compression": compression or cfg["compression"],
+                    "compression_level": cfg["compression_level"] if compression_level is None else compression_level,
+                    "use_dictionary": ["status"],
+                    "column_encoding": {"ts": "DELTA_BINARY_PACKED", "seq": "DELTA_BINARY_PACKED",
+                                        **{name: "BYTE_STREAM_SPLIT" for name in sensors}},
+                })
+        self.state = StateReconstructor(machines)
+        self.batch_state = None     # add_batch용 BatchReconstructor (스키마가 정해지면 만듦)
+        self.files = {}             # (타입, 날짜, 설비) → PartitionFile
+        self._stamp, self._parsed = None, None
+        self.records = 0
+        self.unknown = 0
+        self.closed_files = 0
+        self.closed_bytes = 0
+
+        # 지난번에 닫지 못한 파일은 오프셋도 커밋되지 않았으므로 지우고 다시 씀
+        for path in glob.glob(os.path.join(self.directory, "**", "*" + INPROGRESS), recursive=True):
+            os.remove(path)
+
+    def _parse(self, stamp: str):
+        # 한 틱의 레코드는 timestamp가 같으므로 직전 값을 재사용
+        if stamp != self._stamp:
+            t = datetime.fromisoformat(stamp)
+            if t.tzinfo is None:
+                t = t.replace(tzinfo=timezone.utc)
+            t = t.astimezone(timezone.utc)
+            self._stamp, self._parsed = stamp, (round(t.timestamp() * 1e6), t.date().isoformat(), t)
+        return self._parsed
+
+    def add(self, record: dict):
+        layout = self.layouts.get(record["machine_type"])
+        if layout is None:
+            self.unknown += 1
+            return
+        machine_id = record["machine_id"]
+        ts_us, day, t = self._parse(record["timestamp"])
+        key = (record["machine_type"], day, machine_id)
+        part = self.files.get(key)
+        if part is None:
+            part = self.files[key] = self._open(key, t, layout)
+        part.append(ts_us, self.state.apply(record))
+        self.records += 1
+        if part.pending >= self.row_group_rows:
+            part.flush()
+            if part.rows >= self.max_file_rows:
+                self._close(key)
+
+    def add_many(self, records: list):
+        for record in records:
+            self.add(record)
+
+    def add_batch(self, batch):
+        """ReadingBatch를 씁니다. 행마다 add와 같은 결과 (partial 행은 BatchReconstructor로 채움).
+        add와 add_batch는 partial 복원 상태를 따로 들고 있으므로 한 writer에는 한쪽만 쓰세요."""
+        if not len(batch):
+            return
+        schema = batch.schema
+        if self.batch_state is None or self.batch_state.schema is not schema:
+            self.batch_state = BatchReconstructor(schema)
+        batch = self.batch_state.apply(batch)
+        # (설비, 날짜)별로 나눔 - 안에서는 원래 순서 유지
+        day = batch.ts // 86_400_000
+        group = batch.machine.astype(np.int64) * (int(day.max()) + 1) + day
+        order = np.argsort(group, kind="stable")
+        bounds = np.flatnonzero(np.diff(group[order])) + 1
+        ts_us = (batch.ts * 1000).tolist()
+        seq = [s or None for s in batch.seq.tolist()]
+        status = [STATUS_NAMES[s] for s in batch.status.tolist()]
+        anomaly, alert = batch.has_anomaly.tolist(), batch.has_alert.tolist()
+        for rows in np.split(order, bounds):
+            m = int(batch.machine[rows[0]])
+            t = int(schema.machine_type[m])
+            layout = self.layouts.get(schema.types[t])
+            if layout is None:
+                self.unknown += len(rows)
+                continue
+            first = datetime.fromtimestamp(ts_us[rows[0]] / 1e6, timezone.utc)
+            key = (schema.types[t], first.date().isoformat(), schema.machine_ids[m])
+            position = schema.positions[t]
+            columns = [position.get(name) for name in layout[0]]
+            values = batch.values[rows].T.tolist()
+            values = [[None if v != v else v for v in values[j]] if j is not None else [None] * len(rows)
+                      for j in columns]
+            rows = rows.tolist()
+            start = 0
+            while start < len(rows):
+                part = self.files.get(key)
+                if part is None:
+                    first = datetime.fromtimestamp(ts_us[rows[start]] / 1e6, timezone.utc)
+                    part = self.files[key] = self._open(key, first, layout)
+                stop = min(len(rows), start + self.row_group_rows - part.pending)
+                chunk = rows[start:stop]
+                part.extend([ts_us[i] for i in chunk], [seq[i] for i in chunk], [status[i] for i in chunk],
+                            [anomaly[i] for i in chunk], [alert[i] for i in chunk],
+                            [column[start:stop] for column in values])
+                self.records += len(chunk)
+                start = stop
+                if part.pending >= self.row_group_rows:
+                    part.flush()
+                    if part.rows >= self.max_file_rows:
+                        self._close(key)
+
+    def _open(self, key: tuple, t: datetime, layout: tuple) -> PartitionFile:
+        machine_type, day, machine_id = key
+        directory = os.path.join(self.directory, f"type={machine_type}", f"date={day}", f"machine_id={machine_id}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{t:%H%M%S}-{uuid.uuid4().hex[:8]}.parquet")
+        return PartitionFile(path, *layout)
+
+    def _close(self, key: tuple):
+        self.closed_bytes += self.files.pop(key).close()
+        self.closed_files += 1
+
+    def close_all(self):
+        """열린 파일을 모두 닫습니다. 이후에 오프셋을 커밋하면 커밋된 데이터는 모두 파일에 있습니다."""
+        for key in list(self.files):
+            self._close(key)
+
+    def stats(self) -> dict:
+        return {"records": self.records, "unknown": self.unknown, "open_files": len(self.files),
+                "pending_rows": sum(part.pending for part in self.files.values()),
+                "closed_files": self.closed_files, "closed_bytes": self.closed_bytes}
+
+
+class ArchiveReader:
+    """아카이브 조회. 닫힌 .parquet 파일만 읽습니다."""
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or ARCHIVE_CONFIG["directory"]
+
+    def files(self, machine_id: str, start: float, end: float) -> list:
+        """구간에 걸친 날짜 디렉터리의 파일 목록 (파티션 경로로 먼저 거름). machine_id가 None이면 전체 설비."""
+        first = datetime.fromtimestamp(start, timezone.utc).date().isoformat()
+        last = datetime.fromtimestamp(end, timezone.utc).date().isoformat()
+        paths = []
+        pattern = f"machine_id={'*' if machine_id is None else machine_id}"
+        for directory in glob.glob(os.path.join(self.directory, "type=*", "date=*", pattern)):
+            day = os.path.basename(os.path.dirname(directory))[len("date="):]
+            if first <= day <= last:
+                paths.extend(glob.glob(os.path.join(directory, "*.parquet")))
+        # 경로가 날짜 / 첫 행 시각 순이므로 정렬하면 시간 순서
+        return sorted(paths, key=lambda p: (os.path.basename(os.path.dirname(os.path.dirname(p))),
+                                            os.path.basename(p)))
+
+    def table(self, machine_id: str, start: float, end: float, columns: list = None) -> pa.Table:
+        """start <= ts < end인 행. columns를 주면 그 열만 읽습니다. 파일이 없으면 None."""
+        paths = self.files(machine_id, start, end)
+        if not paths:
+            return None
+        bounds = [("ts", ">=", datetime.fromtimestamp(start, timezone.utc)),
+                  ("ts", "<", datetime.fromtimestamp(end, timezone.utc))]
+        import pyarrow.parquet as pq
+
+        # 파티션 값(type / date / machine_id)은 이미 경로로 골랐으므로 열로 붙이지 않음
+        return pq.read_table(paths, columns=columns, filters=bounds, memory_map=True, partitioning=None)
+
+    def range(self, machine_id: str, start: float, end: float, sensors: list = None):
+        """start <= 시각 < end. 반환: (시각[epoch 초], 값[행, 센서]) - 센서를 안 주면 그 타입의 센서 전부."""
+        columns = None if sensors is None else ["ts"] + list(sensors)
+        table = self.table(machine_id, start, end, columns)
+        if table is None:
+            return np.empty(0), np.empty((0, len(sensors) if sensors is not None else 0))
+        names = [name for name in table.column_names if name not in META_COLUMNS] if sensors is None else sensors
+        times = table["ts"].cast(pa.int64()).to_numpy() / 1e6
+        if not names:
+            return times, np.empty((len(times), 0))
+        return times, np.column_stack([table[name].to_numpy(zero_copy_only=False) for name in names]).astype(np.float64)
+
+
+def run_query(args):
+    from clock import parse_start
+
+    reader = ArchiveReader(args.directory)
+    start = parse_start(args.start).timestamp()
+    end = parse_start(args.end).timestamp() if args.end else time.time()
+    began = time.perf_counter()
+    times, values = reader.range(args.query, start, end, args.sensors)
+    took = (time.perf_counter() - began) * 1e3
+    print(f"{args.query} {args.sensors or '전체 센서'}: {len(times):,}행 ({took:.1f} ms, "
+          f"파일 {len(reader.files(args.query, start, end))}개)")
+    for t, row in list(zip(times, values))[:5]:
+        print(f"  {datetime.fromtimestamp(t, timezone.utc).isoformat()}  {np.round(row, 2).tolist()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw → Parquet 아카이브")
+    parser.add_argument("--directory", default=ARCHIVE_CONFIG["directory"])
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    parser.add_argument("--from", dest="start_from", choices=("earliest", "latest"),
+                        default=ARCHIVE_CONFIG["start_from"])
+    parser.add_argument("--query", metavar="MACHINE_ID", help="아카이버 대신 설비 하나의 구간을 조회")
+    parser.add_argument("--sensors", nargs="+", help="조회할 센서 (기본: 전체)")
+    parser.add_argument("--start", default=(datetime.now(timezone.utc) - timedelta(days=1)).isoformat(),
+                        help="조회 시작 시각 (ISO, 기본: 하루 전)")
+    parser.add_argument("--end", help="조회 끝 시각 (ISO, 기본: 지금)")
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="풀 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        run_query(args)
+        return
+
+    from kafka import KafkaConsumer
+
+    machines = MACHINES
+    if args.copies > 1:
+        from fleet import expand_machines
+        machines = expand_machines(MACHINES, args.copies)
+    consumer = KafkaConsumer(
+        KAFKA_CONFIG["raw_topic"],
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        group_id=ARCHIVE_CONFIG["group_id"],
+        enable_auto_commit=False,
+        auto_offset_reset=args.start_from,
+    )
+    schema = WireSchema(machines)
+    dead_letters = DeadLetters("archiver", args.dead_letter_topic)
+    writer = ArchiveWriter(args.directory, machines)
+    metrics = start_metrics("archiver")
+    stage = StageMetrics(metrics, "archiver")
+    metrics.gauge("archive", writer.stats)
+    print(f"아카이버 시작! {KAFKA_CONFIG['raw_topic']} → {writer.directory} "
+          f"(파일 교체 {ARCHIVE_CONFIG['rotate_seconds']:g}s)")
+    last_rotate = last_report = time.monotonic()
+    try:
+        while True:
+            for messages in consumer.poll(timeout_ms=500).values():
+                for msg in messages:
+                    try:
+                        batch = ReadingBatch.from_payload(msg.value, schema)
+                    except ValueError as e:     # WireFormatError, 깨진 JSON
+                        dead_letters.add(msg.value, e, msg.key)
+                        continue
+                    stage.observe_kafka(msg, len(batch))
+                    stage.observe_batch(batch)
+                    writer.add_batch(batch)
+
+            now = time.monotonic()
+            if now - last_rotate >= ARCHIVE_CONFIG["rotate_seconds"]:
+                writer.close_all()
+                dead_letters.flush()
+                consumer.commit()       # 파일을 모두 닫은 뒤에 커밋
+                last_rotate = now
+            if now - last_report >= ARCHIVE_CONFIG["stats_interval"]:
+                stats = writer.stats()
+                print(f"[아카이브] {stats['records']:,}건 | 열린 파일 {stats['open_files']} "
+                      f"(대기 {stats['pending_rows']:,}행) | 닫힌 파일 {stats['closed_files']:,}개 "
+                      f"{stats['closed_bytes'] / 1024 ** 2:,.1f} MiB | dead-letter {dead_letters.count:,}건")
+                last_report = now
+    except KeyboardInterrupt:
+        writer.close_all()
+        dead_letters.flush()
+        consumer.commit()
+        print("\n⏹ 아카이버 종료 (파일 닫고 오프셋 커밋 완료)")
+
+
+if __name__ == "__main__":
+    main()
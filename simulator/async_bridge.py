@@ -0,0 +1,509 @@
+"""
+asyncio 기반 MQTT → Kafka 브릿지.
+
+bridge.py는 paho 콜백 하나에서 파싱 / 라우팅 / 전송을 모두 처리합니다.
+AsyncBridge는 이를 세 단계로 나누고 bounded 큐로 연결해, 한 단계가 느려도 다른 단계는 계속 돌게 합니다.
+
+흐름: MQTT(paho 네트워크 스레드) → [수신 큐 × decode_workers] → 디코딩/라우팅 태스크
+      → [전송 큐 × send_workers] → 전송 태스크 → KafkaProducer → ack
+
+  - 수신: paho 스레드는 MQTT 토픽으로 디코딩 워커를 골라 큐에 넣기만 함 (같은 토픽은 같은 워커 → 순서 유지)
+          큐가 가득 차면 최대 block_timeout 기다린 뒤 버림 (네트워크 스레드를 오래 막으면 keepalive가 끊김)
+  - 디코딩/라우팅: MQTT 토픽 필터로 경로(routes)를 고르고 PayloadRouter로 파티션 / 키 / 경고를 정함
+  - 전송: 파티션 번호로 전송 워커를 고름 (같은 파티션은 같은 워커 → 파티션 안 순서 유지)
+          워커마다 배치 하나를 보내고 ack를 기다린 뒤 다음 배치로 넘어감
+          실패한 메시지는 백오프 후 순서대로 다시 보냄 (at-least-once, 배치 일부만 실패하면 그 부분은 뒤로 밀림)
+  - 재연결: MQTT / Kafka 첫 연결은 백오프로 재시도, 연결 후 끊김은 paho / kafka-python이 다시 연결
+            (MQTT는 다시 연결되면 구독을 새로 함)
+  - 종료: MQTT 수신을 먼저 멈추고, 큐에 남은 메시지를 단계 순서대로 모두 보낸 뒤 producer를 flush
+          (drain_timeout 안에 끝나지 않으면 남은 건수를 알리고 멈춤)
+
+여러 경로(ASYNC_BRIDGE_CONFIG["routes"])를 한 프로세스에서 처리할 수 있습니다. 경로마다 Kafka 토픽과 파티션 배정이 따로 있습니다.
+
+실행: python simulator/async_bridge.py [--decode-workers 2] [--send-workers 4] [--copies N (발행기와 같게)]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import signal
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from config import MACHINES, MQTT_CONFIG, ASYNC_BRIDGE_CONFIG
+from forwarder import PayloadRouter, create_producer
+from metrics import LatencyHistogram, StageMetrics, start_metrics
+from wire import is_frame
+
+
+def create_mqtt_client():
+    import paho.mqtt.client as mqtt
+    return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    import paho.mqtt.client as mqtt
+    return mqtt.topic_matches_sub(subscription, topic)
+
+
+class Route:
+    """MQTT 토픽 필터 하나 → Kafka 토픽과 라우터."""
+
+    def __init__(self, mqtt_filter: str, raw_topic: str, alert_topic: str, router: PayloadRouter):
+        self.mqtt_filter = mqtt_filter
+        self.raw_topic = raw_topic
+        self.alert_topic = alert_topic
+        self.router = router
+
+
+class _Inbox:
+    """paho 스레드 → 디코딩 태스크 큐. 메시지마다 이벤트 루프를 깨우지 않고, 잠들어 있을 때만 깨웁니다."""
+
+    def __init__(self, loop, size: int):
+        self._loop = loop
+        self._items = collections.deque()
+        self._credits = threading.Semaphore(size)     # 남은 자리 (bounded)
+        self._event = asyncio.Event()
+        self._signalled = False
+        self.closed = False
+
+    def put(self, item, timeout: float) -> bool:
+        """paho 스레드에서 호출. 자리가 없으면 timeout까지 기다리고 False."""
+        if not self._credits.acquire(timeout=timeout):
+            return False
+        self._items.append(item)
+        self._wake()
+        return True
+
+    def close(self):
+        self.closed = True
+        self._wake()
+
+    def _wake(self):
+        if not self._signalled:
+            self._signalled = True
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    async def take(self, max_batch: int) -> list:
+        """최대 max_batch개를 꺼냅니다. 닫혔고 비었으면 빈 목록."""
+        while not self._items:
+            if self.closed:
+                return []
+            self._signalled = False
+            self._event.clear()
+            if self._items or self.closed:
+                continue
+            await self._event.wait()
+        items = self._items
+        batch = [items.popleft() for _ in range(min(max_batch, len(items)))]
+        self._credits.release(len(batch))
+        return batch
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _Batch:
+    """전송한 배치의 ack 집계. 콜백은 producer 스레드에서 불리므로 마지막 콜백만 이벤트 루프를 깨웁니다."""
+
+    def __init__(self, loop, items: list, latency: LatencyHistogram):
+        self.items = items
+        self.failed = []            # 실패한 항목의 배치 내 위치
+        self.error = None
+        self.done = loop.create_future()
+        self._loop = loop
+        self._latency = latency
+        self._remaining = len(items)
+        self._lock = threading.Lock()
+
+    def on_ack(self, enqueued_at, _metadata):
+        self._latency.record_seconds(time.perf_counter() - enqueued_at)
+        self._finish_one()
+
+    def on_error(self, index, exc):
+        with self._lock:
+            self.failed.append(index)
+            self.error = exc
+        self._finish_one()
+
+    def abandon(self, start: int, exc):
+        """send()가 예외를 던진 위치부터는 보내지 않은 것으로 처리합니다."""
+        with self._lock:
+            self.failed.extend(range(start, len(self.items)))
+            self.error = exc
+            self._remaining -= len(self.items) - start
+            finished = self._remaining == 0
+        if finished:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _finish_one(self):
+        with self._lock:
+            self._remaining -= 1
+            finished = self._remaining == 0
+        if finished:
+            self._loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.done.done():
+            self.done.set_result(None)
+
+
+class AsyncBridge:
+    """MQTT 수신 / 디코딩·라우팅 / Kafka 전송을 각각 태스크로 돌리는 브릿지."""
+
+    def __init__(self, client_factory=None, producer_factory=None, routes: list = None,
+                 decode_workers: int = None, send_workers: int = None, inbox_size: int = None,
+                 send_queue_size: int = None, max_batch: int = None, metrics=None, schema=None,
+                 mqtt_host: str = None, mqtt_port: int = None):
+        cfg = ASYNC_BRIDGE_CONFIG
+        self.client_factory = client_factory or create_mqtt_client
+        self.producer_factory = producer_factory or create_producer
+        self.route_config = routes or cfg["routes"]
+        self.decode_workers = decode_workers or cfg["decode_workers"]
+        self.send_workers = send_workers or cfg["send_workers"]
+        self.inbox_size = inbox_size or cfg["inbox_size"]
+        self.send_queue_size = send_queue_size or cfg["send_queue_size"]
+        self.max_batch = max_batch or cfg["max_batch"]
+        self.schema = schema
+        self.mqtt_host = mqtt_host or MQTT_CONFIG["host"]
+        self.mqtt_port = mqtt_port or MQTT_CONFIG["port"]
+
+        self.client = None
+        self.producer = None
+        self.routes = []
+        self.ready = threading.Event()      # MQTT 구독까지 끝남 (다른 스레드에서 기다릴 때)
+        self._loop = None
+        self._stop = None
+        self._inboxes = []
+        self._send_queues = []
+        self._executor = None
+        self._route_cache = {}              # MQTT 토픽 → Route (None: 맞는 경로 없음)
+
+        if metrics is not None:
+            self.latency = metrics.histogram("bridge_to_kafka")
+            self.stage = StageMetrics(metrics, "bridge", schema)
+            metrics.gauge("async_bridge", self.stats)
+        else:
+            self.latency = LatencyHistogram()
+            self.stage = None
+
+        # 통계 카운터 (int 증가는 GIL 아래에서 충분히 안전)
+        self.received = 0
+        self.dropped = 0            # 수신 큐가 가득 차서 버림
+        self.unrouted = 0           # 맞는 경로가 없음
+        self.invalid = 0            # 형식 오류
+        self.sent = 0
+        self.acked = 0
+        self.retried = 0
+        self.alerts = 0
+        self.abandoned = 0          # 종료 시 drain_timeout 안에 보내지 못함
+
+    # ------------------------------------------------------------
+    # 실행 / 종료
+    # ------------------------------------------------------------
+    async def run(self):
+        """stop()이 불릴 때까지 실행하고, 남은 메시지를 보낸 뒤 돌아옵니다."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        # producer.send()는 메타데이터 / 버퍼를 기다리며 막힐 수 있으므로 전송 워커마다 스레드 하나
+        self._executor = ThreadPoolExecutor(self.send_workers + 1, thread_name_prefix="bridge-send")
+        try:
+            self.producer = await self._retry("Kafka", self._connect_kafka)
+            if self.producer is None:
+                return
+            self._inboxes = [_Inbox(self._loop, self.inbox_size) for _ in range(self.decode_workers)]
+            self._send_queues = [asyncio.Queue(self.send_queue_size) for _ in range(self.send_workers)]
+            decoders = [asyncio.create_task(self._decode_worker(inbox), name=f"decode-{n}")
+                        for n, inbox in enumerate(self._inboxes)]
+            senders = [asyncio.create_task(self._send_worker(q), name=f"send-{n}")
+                       for n, q in enumerate(self._send_queues)]
+
+            self.client = await self._retry("MQTT", self._connect_mqtt)
+            if self.client is not None:
+                self.ready.set()
+                await self._stop.wait()
+            await self._drain(decoders, senders)
+        finally:
+            self._executor.shutdown(wait=False)
+
+    def stop(self):
+        """종료 요청. 다른 스레드 / 시그널 핸들러에서 불러도 됩니다."""
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _retry(self, name: str, connect):
+        """connect를 스레드에서 실행하고, 실패하면 지수 백오프로 다시 시도합니다. 종료 요청 시 None."""
+        delay = ASYNC_BRIDGE_CONFIG["reconnect_min"]
+        while True:
+            try:
+                return await self._loop.run_in_executor(self._executor, connect)
+            except Exception as e:
+                print(f"[WARN] {name} 연결 실패 ({e}), {delay:.1f}초 후 재시도")
+            try:
+                await asyncio.wait_for(self._stop.wait(), delay)
+                return None         # 연결 전에 종료 요청
+            except asyncio.TimeoutError:
+                pass
+            delay = min(delay * 2, ASYNC_BRIDGE_CONFIG["reconnect_max"])
+
+    def _connect_kafka(self):
+        producer = self.producer_factory()
+        self.routes = [Route(r["mqtt"], r["raw_topic"], r["alert_topic"],
+                             PayloadRouter.for_topics(producer, r["raw_topic"], r["alert_topic"], self.schema))
+                       for r in self.route_config]
+        return producer
+
+    def _connect_mqtt(self):
+        client = self.client_factory()
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        # 연결 후 끊기면 paho 네트워크 스레드가 이 간격으로 다시 연결
+        client.reconnect_delay_set(max(1, round(ASYNC_BRIDGE_CONFIG["reconnect_min"])),
+                                   round(ASYNC_BRIDGE_CONFIG["reconnect_max"]))
+        client.connect(self.mqtt_host, self.mqtt_port)
+        client.loop_start()
+        return client
+
+    async def _drain(self, decoders: list, senders: list):
+        """수신을 멈추고 단계 순서대로 남은 메시지를 보냅니다."""
+        started = time.monotonic()
+        client = self.client
+        await self._loop.run_in_executor(self._executor, _stop_client, client)
+
+        timeout = ASYNC_BRIDGE_CONFIG["drain_timeout"]
+        for inbox in self._inboxes:
+            inbox.close()
+        _, pending = await asyncio.wait(decoders, timeout=timeout)
+        for q in self._send_queues:
+            await q.put(None)
+        _, late = await asyncio.wait(senders, timeout=max(0.0, timeout - (time.monotonic() - started)))
+        pending |= late
+        if pending:
+            left = sum(len(inbox) for inbox in self._inboxes) + sum(q.qsize() for q in self._send_queues)
+            self.abandoned += left
+            print(f"[WARN] {timeout:g}초 안에 다 보내지 못했습니다 (남은 {left:,}건)")
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._loop.run_in_executor(self._executor, self.producer.flush, timeout)
+        print(f"[종료] 남은 메시지 전송 완료 ({time.monotonic() - started:.1f}s)")
+
+    # ------------------------------------------------------------
+    # MQTT (paho 네트워크 스레드)
+    # ------------------------------------------------------------
+    def _on_connect(self, client, userdata, flags, rc, properties):
+        print("MQTT 연결 성공!")
+        # 다시 연결될 때도 불리므로 여기서 구독
+        for route in self.routes:
+            client.subscribe(route.mqtt_filter)
+
+    def _on_disconnect(self, client, userdata, flags, rc, properties):
+        if not self._stop.is_set():
+            print(f"[WARN] MQTT 연결 끊김 (rc={rc}) → 재연결 시도")
+
+    def _on_message(self, client, userdata, msg):
+        self.received += 1
+        inbox = self._inboxes[zlib.crc32(msg.topic.encode("utf-8")) % len(self._inboxes)]
+        if not inbox.put((time.perf_counter(), msg.topic, msg.payload), ASYNC_BRIDGE_CONFIG["block_timeout"]):
+            self.dropped += 1
+
+    # ------------------------------------------------------------
+    # 디코딩 / 라우팅
+    # ------------------------------------------------------------
+    def _route_for(self, topic: str):
+        try:
+            return self._route_cache[topic]
+        except KeyError:
+            route = next((r for r in self.routes if topic_matches(r.mqtt_filter, topic)), None)
+            self._route_cache[topic] = route
+            return route
+
+    async def _decode_worker(self, inbox: _Inbox):
+        queues = self._send_queues
+        while True:
+            batch = await inbox.take(self.max_batch)
+            if not batch:
+                return
+            for enqueued_at, topic, payload in batch:
+                route = self._route_for(topic)
+                if route is None:
+                    self.unrouted += 1
+                    continue
+                try:
+                    # JSON은 한 번만 파싱해서 계측과 라우팅에 같이 씀
+                    data = None if is_frame(payload) else json.loads(payload)
+                    if self.stage is not None:
+                        if data is None:
+                            self.stage.observe_payload(payload)
+                        elif isinstance(data, dict):
+                            self.stage.observe_records([data])
+                    raw, alerts = route.router.route(payload, data)
+                except ValueError as e:
+                    self.invalid += 1
+                    print(f"[ERROR] 잘못된 메시지 형식: {e}")
+                    continue
+                for partition, key, value in raw:
+                    await _put(queues[(partition or 0) % len(queues)],
+                               (route.raw_topic, partition, key, value, enqueued_at))
+                for partition, key, value in alerts:
+                    await _put(queues[(partition or 0) % len(queues)],
+                               (route.alert_topic, partition, key, value, None))
+            # 배치 사이에 다른 태스크(전송 워커)가 돌 수 있게 양보
+            await asyncio.sleep(0)
+
+    # ------------------------------------------------------------
+    # Kafka 전송
+    # ------------------------------------------------------------
+    async def _send_worker(self, q: asyncio.Queue):
+        closing = False
+        while not closing:
+            item = await q.get()
+            if item is None:
+                return
+            items = [item]
+            while len(items) < self.max_batch and not q.empty():
+                item = q.get_nowait()
+                if item is None:
+                    closing = True
+                    break
+                items.append(item)
+            await self._deliver(items)
+
+    async def _deliver(self, items: list):
+        """배치를 보내고 ack를 기다립니다. 실패한 메시지만 백오프 후 순서대로 다시 보냅니다."""
+        delay = ASYNC_BRIDGE_CONFIG["reconnect_min"]
+        while items:
+            batch = _Batch(self._loop, items, self.latency)
+            await self._loop.run_in_executor(self._executor, self._send_batch, batch)
+            try:
+                await asyncio.wait_for(asyncio.shield(batch.done), ASYNC_BRIDGE_CONFIG["ack_timeout"])
+            except asyncio.TimeoutError:
+                # ack가 오지 않은 메시지는 실패로 보고 다시 보냄 (중복 가능)
+                with batch._lock:
+                    batch.failed = list(range(len(items)))
+                    batch.error = TimeoutError("ack 대기 시간 초과")
+            failed = sorted(batch.failed)
+            failed_set = set(failed)
+            self.acked += sum(1 for n, item in enumerate(items) if item[4] is not None and n not in failed_set)
+            if not failed:
+                return
+            print(f"[WARN] Kafka 전송 실패 {len(failed):,}건 ({batch.error}), {delay:.1f}초 후 재전송")
+            self.retried += len(failed)
+            items = [items[n] for n in failed]
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, ASYNC_BRIDGE_CONFIG["reconnect_max"])
+
+    def _send_batch(self, batch: _Batch):
+        """executor 스레드: 배치를 producer에 넘깁니다. (ack는 콜백으로)"""
+        send = self.producer.send
+        for n, (topic, partition, key, value, enqueued_at) in enumerate(batch.items):
+            try:
+                future = send(topic, value=value, key=key, partition=partition)
+            except Exception as e:
+                batch.abandon(n, e)
+                return
+            if enqueued_at is None:
+                self.alerts += 1
+                future.add_callback(_ignore_ack, batch)
+            else:
+                self.sent += 1
+                future.add_callback(batch.on_ack, enqueued_at)
+            future.add_errback(batch.on_error, n)
+
+    # ------------------------------------------------------------
+    # 통계
+    # ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "unrouted": self.unrouted,
+            "invalid": self.invalid,
+            "sent": self.sent,
+            "acked": self.acked,
+            "retried": self.retried,
+            "alerts": self.alerts,
+            "abandoned": self.abandoned,
+            "inbox_depth": [len(inbox) for inbox in self._inboxes],
+            "send_depth": [q.qsize() for q in self._send_queues],
+            "p50_ms": _ms(self.latency.percentile(50)),
+            "p99_ms": _ms(self.latency.percentile(99)),
+        }
+
+
+async def _put(q: asyncio.Queue, item):
+    try:
+        q.put_nowait(item)
+    except asyncio.QueueFull:
+        await q.put(item)       # 전송 단계가 밀리면 디코딩 워커도 기다림 → 수신 큐가 차오름
+
+
+def _ignore_ack(batch: _Batch, _metadata):
+    batch._finish_one()
+
+
+def _stop_client(client):
+    if client is None:
+        return
+    client.disconnect()
+    client.loop_stop()
+
+
+def _ms(us):
+    return None if us is None else round(us / 1000, 2)
+
+
+async def report_forever(bridge: AsyncBridge, interval: float = None):
+    """주기적으로 처리량과 단계별 큐 길이, p50/p99 지연을 출력합니다."""
+    interval = interval or ASYNC_BRIDGE_CONFIG["stats_interval"]
+    last_acked = bridge.acked
+    while True:
+        await asyncio.sleep(interval)
+        stats = bridge.stats()
+        rate = (stats["acked"] - last_acked) / interval
+        last_acked = stats["acked"]
+        print(f"[→ Kafka] {rate:,.0f} msg/s | acked={stats['acked']:,} dropped={stats['dropped']} "
+              f"retried={stats['retried']} | inbox={sum(stats['inbox_depth']):,} "
+              f"send={sum(stats['send_depth']):,} | p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
+
+
+async def serve(bridge: AsyncBridge):
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, bridge.stop)
+        except (NotImplementedError, RuntimeError, ValueError):
+            # Windows: 이벤트 루프 시그널 핸들러가 없으므로 일반 핸들러에서 종료 요청
+            signal.signal(sig, lambda *_: bridge.stop())
+    reporter = asyncio.create_task(report_forever(bridge))
+    try:
+        await bridge.run()
+    finally:
+        reporter.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="asyncio MQTT → Kafka 브릿지")
+    parser.add_argument("--decode-workers", type=int, default=ASYNC_BRIDGE_CONFIG["decode_workers"])
+    parser.add_argument("--send-workers", type=int, default=ASYNC_BRIDGE_CONFIG["send_workers"])
+    parser.add_argument("--max-batch", type=int, default=ASYNC_BRIDGE_CONFIG["max_batch"])
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+
+    from fleet import expand_machines
+    from wire import WireSchema
+
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    bridge = AsyncBridge(decode_workers=args.decode_workers, send_workers=args.send_workers,
+                         max_batch=args.max_batch, metrics=start_metrics("bridge"), schema=schema)
+    routes = ", ".join(f"{r['mqtt']} → {r['raw_topic']}" for r in bridge.route_config)
+    print(f"asyncio MQTT-Kafka Bridge 시작! (디코딩 {args.decode_workers}, 전송 {args.send_workers}, {routes})")
+    asyncio.run(serve(bridge))
+    print(f"⏹ 브릿지 종료: {bridge.stats()}")
+
+
+if __name__ == "__main__":
+    main()
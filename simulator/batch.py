@@ -0,0 +1,288 @@
+"""
+센서 읽기 묶음 (ReadingBatch): 레코드 dict 목록 대신 단계 사이에 넘기는 열 배열.
+
+dict 레코드는 한 건마다 바깥 dict + sensors dict + 문자열 필드(timestamp, machine_id, machine_type,
+location, status)를 새로 만들어서, 설비가 많거나 오래 도는 소비자에서는 할당 횟수와 메모리를 대부분 차지합니다.
+ReadingBatch는 같은 내용을 행 n개짜리 배열 몇 개로 들고 있습니다.
+
+  ts          int64  [n]          읽은 시각 (epoch ms)
+  machine     uint16 [n]          설비 번호 (WireSchema.machine_ids 순서)
+  flags       uint8  [n]          상태 / has_anomaly / has_alert / partial 비트 (wire.py와 같음)
+  seq         uint32 [n]          설비별 일련번호 (0 = 없음)
+  created_ms  int64  [n]          발행 시각 (0 = 없음, metrics.py 계측용)
+  values      float64 [n, width]  설비 타입의 센서 순서(WireSchema.type_sensors)대로, 값 없음은 NaN
+
+설비 id / 타입 / location / 센서 이름은 WireSchema(config.MACHINES)에 한 번만 들고 번호로만 가리킵니다.
+설비 m의 센서 j는 평탄 센서 키 schema.offsets[m] + j → 소비자는 키로 상태 배열을 바로 찾습니다. (readings())
+값은 float64로 들고 있어 dict 경로와 판정 결과가 같습니다. (바이너리 프레임의 float32 값은 wire.decode와 같이 소수 2자리로 되돌림)
+
+dict와의 변환은 가장자리에서만 합니다.
+  - 받기: from_payload(JSON 또는 바이너리 프레임), from_records, Fleet.batch (시뮬레이터 배열에서 바로)
+  - 내보내기: to_records (JSON 발행 / 출력), to_frame (바이너리 프레임)
+스키마에 없는 설비는 WireFormatError, 스키마에 없는 센서 이름은 버립니다.
+"""
+from __future__ import annotations
+
+import json
+
+from lazy import np
+
+from wire import (WireFormatError, default_schema, epoch_ms, is_frame, iso_timestamp, peek_created_ms,
+                  record_flags, STATUS_NAMES, FLAG_STATUS_MASK, FLAG_HAS_ANOMALY, FLAG_HAS_ALERT, FLAG_PARTIAL)
+
+COLUMNS = ("ts", "machine", "flags", "seq", "created_ms")
+DTYPES = {"ts": "int64", "machine": "uint16", "flags": "uint8", "seq": "uint32", "created_ms": "int64"}
+
+
+def occurrence_rank(keys: np.ndarray):
+    """같은 키의 몇 번째 등장인지. 반환: (stable 정렬 순서, 등장 순번) - 순번이 같은 것끼리는 키가 겹치지 않음."""
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    rank = np.empty(len(keys), dtype=np.intp)
+    rank[order] = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+    return order, rank
+
+
+class ReadingBatch:
+    """센서 읽기 n건을 열 배열로 들고 있는 묶음. 만들고 나면 배열을 바꾸지 않는 것을 전제로 합니다."""
+
+    __slots__ = ("schema",) + COLUMNS + ("values",)
+
+    def __init__(self, schema, ts, machine, flags, seq, created_ms, values):
+        self.schema = schema
+        self.ts = ts
+        self.machine = machine
+        self.flags = flags
+        self.seq = seq
+        self.created_ms = created_ms
+        self.values = values
+
+    def __len__(self):
+        return len(self.ts)
+
+    def __repr__(self):
+        return f"ReadingBatch({len(self)} rows, {self.nbytes:,} bytes)"
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in COLUMNS) + self.values.nbytes
+
+    # ------------------------------------------------------------
+    # 만들기
+    # ------------------------------------------------------------
+    @classmethod
+    def empty(cls, schema=None) -> "ReadingBatch":
+        schema = schema or default_schema()
+        return cls(schema, *[np.empty(0, dtype=DTYPES[name]) for name in COLUMNS],
+                   np.empty((0, schema.width)))
+
+    @classmethod
+    def from_records(cls, records: list, schema=None) -> "ReadingBatch":
+        """기존 JSON 형태(dict) 레코드 목록에서 만듭니다."""
+        schema = schema or default_schema()
+        n = len(records)
+        index, machine_type, positions = schema.machine_index, schema.machine_type, schema.positions
+        nan_row = [np.nan] * schema.width
+        machine = np.empty(n, dtype=np.uint16)
+        ts = np.empty(n, dtype=np.int64)
+        flags = np.empty(n, dtype=np.uint8)
+        seq = np.empty(n, dtype=np.uint32)
+        created = np.empty(n, dtype=np.int64)
+        rows = []
+        stamp, stamp_ms = None, 0
+        for i, record in enumerate(records):
+            m = index.get(record["machine_id"])
+            if m is None:
+                raise WireFormatError(f"스키마에 없는 설비: {record['machine_id']}")
+            if record["timestamp"] != stamp:        # 한 틱의 레코드는 timestamp가 같음
+                stamp, stamp_ms = record["timestamp"], epoch_ms(record["timestamp"])
+            machine[i], ts[i] = m, stamp_ms
+            flags[i] = record_flags(record["status"], record["has_anomaly"], record["has_alert"],
+                                    record.get("partial", False))
+            seq[i] = record.get("seq", 0)
+            created[i] = record.get("created_ms", 0)
+            position = positions[machine_type[m]]
+            row = nan_row.copy()
+            for name, value in record["sensors"].items():
+                j = position.get(name)
+                if j is not None:
+                    row[j] = value
+            rows.append(row)
+        values = np.array(rows, dtype=np.float64) if rows else np.empty((0, schema.width))
+        return cls(schema, ts, machine, flags, seq, created, values)
+
+    @classmethod
+    def from_frame(cls, payload: bytes, schema=None) -> "ReadingBatch":
+        """바이너리 프레임(wire.py)에서 만듭니다. dict를 만들지 않습니다. 행은 프레임 섹션(설비 타입) 순서."""
+        schema = schema or default_schema()
+        base_ts, sections = schema.decode_arrays(payload)
+        n = sum(len(rows) for _, rows in sections)
+        batch = cls(schema, np.empty(n, dtype=np.int64), np.empty(n, dtype=np.uint16), np.empty(n, dtype=np.uint8),
+                    np.empty(n, dtype=np.uint32), np.full(n, peek_created_ms(payload), dtype=np.int64),
+                    np.full((n, schema.width), np.nan))
+        start = 0
+        for t, rows in sections:
+            stop = start + len(rows)
+            batch.ts[start:stop] = rows["dt"]
+            batch.machine[start:stop] = rows["machine"]
+            batch.flags[start:stop] = rows["flags"]
+            batch.seq[start:stop] = rows["seq"]
+            batch.values[start:stop, :len(schema.type_sensors[t])] = np.round(rows["values"].astype(np.float64), 2)
+            start = stop
+        batch.ts += base_ts
+        return batch
+
+    @classmethod
+    def from_payload(cls, payload: bytes, schema=None) -> "ReadingBatch":
+        """JSON 메시지든 바이너리 프레임이든 (wire.decode_payload의 ReadingBatch판)."""
+        if is_frame(payload):
+            return cls.from_frame(payload, schema)
+        return cls.from_records([json.loads(payload)], schema)
+
+    @classmethod
+    def from_payloads(cls, payloads, schema=None) -> "ReadingBatch":
+        """payload 여러 개를 한 묶음으로. JSON 메시지는 모아서 한 번에 변환합니다. (순서는 도착 순서)"""
+        schema = schema or default_schema()
+        parts, pending = [], []
+        for payload in payloads:
+            if is_frame(payload):
+                if pending:
+                    parts.append(cls.from_records(pending, schema))
+                    pending = []
+                parts.append(cls.from_frame(payload, schema))
+            else:
+                pending.append(json.loads(payload))
+        if pending:
+            parts.append(cls.from_records(pending, schema))
+        return cls.concat(parts, schema)
+
+    @classmethod
+    def concat(cls, batches: list, schema=None) -> "ReadingBatch":
+        batches = [b for b in batches if len(b)]
+        if len(batches) == 1:
+            return batches[0]
+        if not batches:
+            return cls.empty(schema)
+        schema = batches[0].schema
+        return cls(schema, *[np.concatenate([getattr(b, name) for b in batches]) for name in COLUMNS],
+                   np.concatenate([b.values for b in batches]))
+
+    def take(self, index) -> "ReadingBatch":
+        """행 선택 (정수 인덱스 배열, bool 마스크, slice)."""
+        return ReadingBatch(self.schema, *[getattr(self, name)[index] for name in COLUMNS], self.values[index])
+
+    # ------------------------------------------------------------
+    # 열 보기
+    # ------------------------------------------------------------
+    @property
+    def status(self) -> np.ndarray:
+        """상태 번호 (0 RUNNING, 1 WARNING, 2 ANOMALY)."""
+        return self.flags & FLAG_STATUS_MASK
+
+    @property
+    def has_anomaly(self) -> np.ndarray:
+        return (self.flags & FLAG_HAS_ANOMALY) != 0
+
+    @property
+    def has_alert(self) -> np.ndarray:
+        return (self.flags & FLAG_HAS_ALERT) != 0
+
+    @property
+    def partial(self) -> np.ndarray:
+        return (self.flags & FLAG_PARTIAL) != 0
+
+    @property
+    def types(self) -> np.ndarray:
+        """행별 설비 타입 번호 (schema.types 순서)."""
+        return self.schema.machine_type[self.machine]
+
+    def machine_id(self, i: int) -> str:
+        return self.schema.machine_ids[self.machine[i]]
+
+    def readings(self):
+        """값이 있는 센서값을 펼칩니다. 반환: (행 번호, 평탄 센서 키, 값) - 행 순서, 행 안에서는 센서 순서."""
+        row, column = np.nonzero(~np.isnan(self.values))     # 타입 센서 수를 넘는 칸은 늘 NaN
+        return row, self.schema.offsets[self.machine[row]] + column, self.values[row, column]
+
+    # ------------------------------------------------------------
+    # 내보내기 (가장자리)
+    # ------------------------------------------------------------
+    def to_records(self) -> list:
+        """기존 JSON 형태(dict) 레코드 목록 (wire.decode와 같은 모양)."""
+        schema = self.schema
+        machine_ids, locations, types, type_sensors = (schema.machine_ids, schema.locations,
+                                                       schema.types, schema.type_sensors)
+        machine_type = schema.machine_type.tolist()
+        records = []
+        for ts, m, flags, seq, created, row in zip(self.ts.tolist(), self.machine.tolist(), self.flags.tolist(),
+                                                   self.seq.tolist(), self.created_ms.tolist(), self.values.tolist()):
+            t = machine_type[m]
+            record = {
+                "timestamp": iso_timestamp(ts),
+                "machine_id": machine_ids[m],
+                "machine_type": types[t],
+                "location": locations[m],
+                "sensors": {name: v for name, v in zip(type_sensors[t], row) if v == v},  # NaN(값 없음) 제외
+                "status": STATUS_NAMES[flags & FLAG_STATUS_MASK],
+                "has_anomaly": bool(flags & FLAG_HAS_ANOMALY),
+                "has_alert": bool(flags & FLAG_HAS_ALERT),
+            }
+            if flags & FLAG_PARTIAL:
+                record["partial"] = True
+            if seq:
+                record["seq"] = seq
+            if created:
+                record["created_ms"] = created
+            records.append(record)
+        return records
+
+    def to_frame(self) -> bytes:
+        """바이너리 프레임 하나로 인코딩합니다. created_ms는 행 중 가장 이른 값."""
+        if not len(self):
+            raise ValueError("빈 프레임은 만들 수 없습니다.")
+        schema = self.schema
+        base_ts = int(self.ts.min())
+        created = self.created_ms[self.created_ms > 0]
+        types = self.types
+        values = {}
+        for t in np.unique(types).tolist():
+            rows = np.flatnonzero(types == t)
+            values[t] = (rows, self.values[rows, :len(schema.type_sensors[t])])
+        return schema.encode_arrays(base_ts, self.machine, self.flags, values, dt=self.ts - base_ts,
+                                    seq=self.seq, created_ms=int(created.min()) if len(created) else 0)
+
+
+class BatchReconstructor:
+    """partial 행(변화 보고 모드)의 빈 센서를 설비별 마지막 값으로 채웁니다. (deadband.StateReconstructor의 배열판)
+
+    아직 한 번도 받지 못한 센서는 NaN으로 남습니다.
+    """
+
+    def __init__(self, schema=None):
+        self.schema = schema or default_schema()
+        self.last = np.full((len(self.schema.machine_ids), self.schema.width), np.nan)
+
+    def apply(self, batch: ReadingBatch) -> ReadingBatch:
+        """전체 스냅샷 묶음을 반환합니다. partial 비트는 지웁니다. partial 행이 없으면 상태만 갱신하고 그대로 반환."""
+        if not len(batch):
+            return batch
+        values = batch.values
+        partial = batch.partial
+        if partial.any():
+            values = values.copy()
+        # 같은 설비의 n번째 행끼리 묶어 순서대로 (라운드 안에서는 설비가 겹치지 않음)
+        _, rank = occurrence_rank(batch.machine)
+        for r in range(int(rank.max()) + 1):
+            rows = np.flatnonzero(rank == r)
+            m = batch.machine[rows]
+            current = values[rows]
+            fill = np.isnan(current) & partial[rows, None]
+            if fill.any():
+                current = np.where(fill, self.last[m], current)
+                values[rows] = current
+            self.last[m] = np.where(np.isnan(current), self.last[m], current)
+        if values is batch.values:
+            return batch
+        return ReadingBatch(batch.schema, batch.ts, batch.machine, batch.flags & ~np.uint8(FLAG_PARTIAL),
+                            batch.seq, batch.created_ms, values)
@@ -0,0 +1,501 @@
+"""
+파이프라인 부하 테스트 / 벤치마크.
+
+Docker 스택 없이 standins.py의 대역(프로세스 내부 MQTT 브로커, 가짜 KafkaProducer)을 써서
+시뮬레이터 → MQTT → 브릿지 → Kafka 경로를 단계별로 측정합니다.
+
+단계(stage):
+  - machine:       Machine.read_all_sensors() (설비 1대씩 도는 기존 경로)
+  - fleet:         Fleet.step() + records()
+  - encode_json:   레코드 → json.dumps (main.py)
+  - encode_binary: FleetEncoder.encode (틱마다 프레임 1개)
+  - mqtt:          publish → 구독자 on_message (프로세스 내부 브로커)
+  - bridge:        KafkaForwarder.submit → FakeKafkaProducer ack (bridge.py pipelined 모드)
+  - pipeline:      전체 연결 - Fleet → 인코딩 → 브로커 → 브릿지 on_message(계측 포함) → Kafka ack
+  - async_bridge:  pipeline과 같지만 브릿지를 AsyncBridge(async_bridge.py)로 (수신 / 디코딩 / 전송 태스크 분리)
+  - outage:        bridge와 같지만 가운데 1/3 구간 동안 Kafka 장애 → 디스크 스풀 → 복구 후 재전송 (유실 확인)
+
+지표 (reading = 설비 1대의 1틱 데이터 기준):
+  - msgs_per_s:           벽시계 기준 처리량
+  - cpu_us_per_msg:       프로세스 CPU 시간(모든 스레드 합) / reading
+  - alloc_bytes_per_msg:  tracemalloc 피크 증가량 / reading (별도 패스에서 측정, 처리 중 잡는 메모리)
+  - alloc_blocks_per_msg: 단계가 끝난 뒤 남은 메모리 블록 증가 / reading (누수 확인용)
+  - latency_ms:           인코딩 단계는 reading당 처리 시간, 전송 단계는 메시지별 실제 전달 지연
+
+--rate로 목표 틱 속도를 주면 전송 단계(mqtt / bridge / pipeline / outage)를 그 속도로 흘려 보냅니다. (0: 최대 속도)
+결과를 JSON으로 저장하고(--output), 이전 결과와 비교해(--compare) 처리량 감소나
+CPU / 메모리 증가가 --threshold를 넘으면 종료 코드 1을 돌려줍니다.
+
+실행: python simulator/bench.py --copies 200 --ticks 30 --output bench_results.json
+      python simulator/bench.py --copies 200 --ticks 30 --compare bench_results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from config import MACHINES, SIMULATION_CONFIG, BRIDGE_CONFIG, KAFKA_CONFIG
+from clock import SimClock, DEFAULT_REPLAY_START
+from fleet import Fleet, expand_machines
+from forwarder import KafkaForwarder
+from machine import Machine
+from metrics import LatencyHistogram, MetricsRegistry, StageMetrics, now_ms
+from spool import Spool
+from standins import InProcessBroker, FakeKafkaProducer
+from wire import WireSchema, FleetEncoder, epoch_ms
+
+STAGES = ("machine", "fleet", "encode_json", "encode_binary", "mqtt", "bridge", "pipeline", "async_bridge", "outage")
+TIMESTAMP = DEFAULT_REPLAY_START.isoformat()
+
+# --compare에서 보는 지표: (이름, 커질수록 나쁜지)
+COMPARED = (("msgs_per_s", False), ("cpu_us_per_msg", True), ("alloc_bytes_per_msg", True))
+
+
+class StageTimer:
+    """단계 하나의 벽시계 / CPU 시간, reading 수, 지연 히스토그램."""
+
+    def __init__(self):
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.messages = 0
+        self.latency = {}
+
+    def histogram(self, name: str = "per_message") -> LatencyHistogram:
+        return self.latency.setdefault(name, LatencyHistogram())
+
+    @contextmanager
+    def measure(self, messages: int, per_message: bool = True):
+        """블록 실행 시간을 잽니다. per_message면 (블록 시간 / messages)를 reading별 지연으로 기록."""
+        wall, cpu = time.perf_counter(), time.process_time()
+        yield
+        elapsed = time.perf_counter() - wall
+        self.wall += elapsed
+        self.cpu += time.process_time() - cpu
+        self.messages += messages
+        if per_message and messages:
+            self.histogram().record_seconds(elapsed / messages, messages)
+
+
+class Context:
+    """벤치마크 설정과 공용 데이터."""
+
+    def __init__(self, copies: int, ticks: int, rate: float, fmt: str, partitions: int = 1):
+        self.machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+        self.ticks = ticks
+        self.partitions = partitions    # 가짜 Kafka 토픽의 파티션 수
+        self.rate = rate
+        self.format = fmt
+        self.schema = WireSchema(self.machines)
+
+    def clock(self) -> SimClock:
+        interval = SIMULATION_CONFIG["interval_seconds"]
+        if self.rate <= 0:
+            return SimClock(interval, "fast", start=DEFAULT_REPLAY_START)
+        return SimClock(interval, "accelerated", self.rate * interval, DEFAULT_REPLAY_START)
+
+    def payloads(self, ticks: int) -> list:
+        """틱별 (토픽, payload) 목록을 미리 만듭니다. (전송 단계에서 생성 / 인코딩 비용을 빼기 위해)"""
+        fleet = Fleet(self.machines, seed=0)
+        encoder = FleetEncoder(fleet, self.schema)
+        base_ts = epoch_ms(TIMESTAMP)
+        ticks_out = []
+        for _ in range(ticks):
+            fleet.step()
+            if self.format == "binary":
+                ticks_out.append([("factory/frames", encoder.encode(fleet, base_ts))])
+            else:
+                ticks_out.append([(f"factory/{r['machine_id']}/sensors",
+                                   json.dumps(r, ensure_ascii=False).encode("utf-8"))
+                                  for r in fleet.records(TIMESTAMP)])
+        return ticks_out
+
+
+# ============================================================
+# 단계별 측정 함수: (ctx, ticks, timer)
+# ============================================================
+
+def stage_machine(ctx: Context, ticks: int, timer: StageTimer):
+    machines = [Machine(machine_id, config) for machine_id, config in ctx.machines.items()]
+    for _ in range(ticks):
+        with timer.measure(len(machines)):
+            for machine in machines:
+                machine.read_all_sensors()
+
+
+def stage_fleet(ctx: Context, ticks: int, timer: StageTimer):
+    fleet = Fleet(ctx.machines, seed=0)
+    for _ in range(ticks):
+        with timer.measure(len(fleet)):
+            fleet.step()
+            fleet.records(TIMESTAMP)
+
+
+def stage_encode_json(ctx: Context, ticks: int, timer: StageTimer):
+    fleet = Fleet(ctx.machines, seed=0)
+    for _ in range(ticks):
+        fleet.step()
+        records = fleet.records(TIMESTAMP)
+        with timer.measure(len(records)):
+            for r in records:
+                json.dumps(r, ensure_ascii=False).encode("utf-8")
+
+
+def stage_encode_binary(ctx: Context, ticks: int, timer: StageTimer):
+    fleet = Fleet(ctx.machines, seed=0)
+    encoder = FleetEncoder(fleet, ctx.schema)
+    base_ts = epoch_ms(TIMESTAMP)
+    for _ in range(ticks):
+        fleet.step()
+        with timer.measure(len(fleet)):
+            encoder.encode(fleet, base_ts)
+
+
+def stage_mqtt(ctx: Context, ticks: int, timer: StageTimer):
+    """publish 시각 → 구독자 on_message 호출 시각."""
+    payloads = ctx.payloads(ticks)
+    latency = timer.histogram("publish_to_deliver")
+    broker = InProcessBroker()
+    subscriber = broker.client("bench-subscriber")
+
+    def on_message(client, userdata, msg):
+        latency.record_seconds(time.monotonic() - msg.timestamp)
+
+    subscriber.on_message = on_message
+    subscriber.connect()
+    subscriber.subscribe("factory/#")
+    subscriber.loop_start()
+    publisher = broker.client("bench-publisher")
+    publisher.connect()
+
+    clock = ctx.clock()
+    with timer.measure(len(ctx.machines) * ticks, per_message=False):
+        for tick in payloads:
+            for topic, payload in tick:
+                publisher.publish(topic, payload)
+            clock.advance()
+        subscriber.loop_stop()      # 남은 메시지까지 전달
+    subscriber.disconnect()
+
+
+def stage_bridge(ctx: Context, ticks: int, timer: StageTimer):
+    """KafkaForwarder 큐에 넣은 시각 → Kafka ack 콜백."""
+    payloads = ctx.payloads(ticks)
+    producer = FakeKafkaProducer(linger_ms=BRIDGE_CONFIG["linger_ms"], partitions=ctx.partitions)
+    registry = MetricsRegistry("bench")
+    forwarder = _forwarder(ctx, producer, registry)
+    timer.latency["enqueue_to_ack"] = registry.histogram("bridge_to_kafka")
+    forwarder.start()
+
+    clock = ctx.clock()
+    with timer.measure(len(ctx.machines) * ticks, per_message=False):
+        for tick in payloads:
+            for _, payload in tick:
+                forwarder.submit(payload)
+            clock.advance()
+        forwarder.stop()
+    producer.close()
+    _finish_forwarder(forwarder)
+
+
+def stage_pipeline(ctx: Context, ticks: int, timer: StageTimer):
+    """Fleet → 인코딩 → MQTT → 브릿지(bridge.py on_message와 같은 처리) → Kafka ack."""
+    broker = InProcessBroker()
+    producer = FakeKafkaProducer(linger_ms=BRIDGE_CONFIG["linger_ms"], partitions=ctx.partitions)
+    registry = MetricsRegistry("bench")
+    stage = StageMetrics(registry, "bridge", ctx.schema)
+    forwarder = _forwarder(ctx, producer, registry)
+    timer.latency["sim_to_bridge"] = stage.latency
+    timer.latency["bridge_to_kafka"] = registry.histogram("bridge_to_kafka")
+
+    def on_message(client, userdata, msg):
+        try:
+            stage.observe_payload(msg.payload)
+        except ValueError:
+            pass
+        forwarder.submit(msg.payload)
+
+    bridge = broker.client("bench-bridge")
+    bridge.on_message = on_message
+    bridge.connect()
+    bridge.subscribe("factory/#")
+    bridge.loop_start()
+    forwarder.start()
+    publisher = broker.client("bench-publisher")
+    publisher.connect()
+
+    fleet = Fleet(ctx.machines, seed=0)
+    encoder = FleetEncoder(fleet, ctx.schema)
+    clock = ctx.clock()
+    with timer.measure(len(fleet) * ticks, per_message=False):
+        for _ in range(ticks):
+            fleet.step()
+            if ctx.format == "binary":
+                publisher.publish("factory/frames",
+                                  encoder.encode(fleet, round(clock.epoch() * 1000), now_ms()))
+            else:
+                for data in fleet.records(clock.timestamp(), now_ms()):
+                    publisher.publish(f"factory/{data['machine_id']}/sensors",
+                                      json.dumps(data, ensure_ascii=False))
+            clock.advance()
+        bridge.loop_stop()
+        forwarder.stop()
+    bridge.disconnect()
+    producer.close()
+    _finish_forwarder(forwarder)
+    sequence = stage.sequence.to_dict()
+    if sequence["dropped"] or sequence["duplicates"] or sequence["out_of_order"]:
+        print(f"  ⚠ pipeline seq 이상: {sequence}", file=sys.stderr)
+
+
+def stage_async_bridge(ctx: Context, ticks: int, timer: StageTimer):
+    """Fleet → 인코딩 → MQTT → AsyncBridge → Kafka ack. 브릿지는 별도 스레드의 이벤트 루프에서 돌림."""
+    import asyncio      # 이 단계를 돌릴 때만 불러옴 (asyncio import가 시작 시간의 상당 부분)
+    from async_bridge import AsyncBridge
+
+    broker = InProcessBroker()
+    producer = FakeKafkaProducer(linger_ms=BRIDGE_CONFIG["linger_ms"], partitions=ctx.partitions)
+    registry = MetricsRegistry("bench")
+    bridge = AsyncBridge(lambda: broker.client("bench-bridge"), lambda: producer,
+                         metrics=registry, schema=ctx.schema)
+    timer.latency["sim_to_bridge"] = bridge.stage.latency
+    timer.latency["bridge_to_kafka"] = bridge.latency
+    thread = threading.Thread(target=asyncio.run, args=(bridge.run(),), name="async-bridge")
+    thread.start()
+    if not bridge.ready.wait(10):
+        raise RuntimeError("AsyncBridge가 시작되지 않았습니다.")
+    publisher = broker.client("bench-publisher")
+    publisher.connect()
+
+    fleet = Fleet(ctx.machines, seed=0)
+    encoder = FleetEncoder(fleet, ctx.schema)
+    clock = ctx.clock()
+    with timer.measure(len(fleet) * ticks, per_message=False):
+        for _ in range(ticks):
+            fleet.step()
+            if ctx.format == "binary":
+                publisher.publish("factory/frames",
+                                  encoder.encode(fleet, round(clock.epoch() * 1000), now_ms()))
+            else:
+                for data in fleet.records(clock.timestamp(), now_ms()):
+                    publisher.publish(f"factory/{data['machine_id']}/sensors",
+                                      json.dumps(data, ensure_ascii=False))
+            clock.advance()
+        bridge.stop()       # 받은 메시지를 모두 보낸 뒤 돌아옴
+        thread.join()
+    producer.close()
+    stats = bridge.stats()
+    if stats["dropped"] or stats["invalid"] or stats["unrouted"] or stats["abandoned"] or stats["acked"] != stats["sent"]:
+        print(f"  ⚠ async_bridge: {stats}", file=sys.stderr)
+    sequence = bridge.stage.sequence.to_dict()
+    if sequence["dropped"] or sequence["duplicates"] or sequence["out_of_order"]:
+        print(f"  ⚠ async_bridge seq 이상: {sequence}", file=sys.stderr)
+
+
+def stage_outage(ctx: Context, ticks: int, timer: StageTimer):
+    """bridge와 같지만 가운데 1/3 구간 동안 Kafka 장애. 큐에 넣은 시각 → 최종 ack (스풀 재전송분은 재전송 ack 기준 아님)."""
+    payloads = ctx.payloads(ticks)
+    producer = FakeKafkaProducer(linger_ms=BRIDGE_CONFIG["linger_ms"], keep=True, partitions=ctx.partitions)
+    registry = MetricsRegistry("bench")
+    forwarder = _forwarder(ctx, producer, registry)
+    timer.latency["enqueue_to_ack"] = registry.histogram("bridge_to_kafka")
+    forwarder.start()
+
+    clock = ctx.clock()
+    total = sum(len(tick) for tick in payloads)
+    with timer.measure(len(ctx.machines) * ticks, per_message=False):
+        for n, tick in enumerate(payloads):
+            producer.down = ticks // 3 <= n < 2 * ticks // 3
+            for _, payload in tick:
+                forwarder.submit(payload)
+            clock.advance()
+        producer.down = False
+        # 스풀이 다 빠질 때까지 기다림 (재시도 백오프 포함)
+        deadline = time.monotonic() + 60
+        while forwarder.spool is not None and time.monotonic() < deadline:
+            if not len(forwarder.spool) and forwarder.healthy and forwarder._queue.empty():
+                break
+            time.sleep(0.01)
+        forwarder.stop()
+    producer.close()
+    delivered = len(producer.messages.get(forwarder.raw_topic, []))
+    if delivered != total:
+        print(f"  ⚠ outage: {total:,}건 중 {delivered:,}건 전달", file=sys.stderr)
+    _finish_forwarder(forwarder)
+
+
+def _forwarder(ctx: Context, producer, registry: MetricsRegistry) -> KafkaForwarder:
+    """벤치마크용 KafkaForwarder. 스풀은 임시 디렉터리에 만듭니다. (_finish_forwarder에서 지움)"""
+    spool = None
+    if BRIDGE_CONFIG["spill_policy"] == "spool":
+        spool = Spool(tempfile.mkdtemp(prefix="bench-spool-"))
+    return KafkaForwarder(producer, metrics=registry, schema=ctx.schema, spool=spool)
+
+
+def _finish_forwarder(forwarder: KafkaForwarder):
+    stats = forwarder.stats()
+    if stats["failed"] or stats["dropped"] or stats["acked"] != stats["sent"]:
+        print(f"  ⚠ forwarder: {stats}", file=sys.stderr)
+    if forwarder.spool is not None:
+        shutil.rmtree(forwarder.spool.directory, ignore_errors=True)
+
+
+STAGE_FUNCTIONS = {
+    "machine": stage_machine,
+    "fleet": stage_fleet,
+    "encode_json": stage_encode_json,
+    "encode_binary": stage_encode_binary,
+    "mqtt": stage_mqtt,
+    "bridge": stage_bridge,
+    "pipeline": stage_pipeline,
+    "async_bridge": stage_async_bridge,
+    "outage": stage_outage,
+}
+
+
+# ============================================================
+# 실행 / 결과
+# ============================================================
+
+def run_stage(name: str, ctx: Context, alloc_ticks: int) -> dict:
+    fn = STAGE_FUNCTIONS[name]
+    gc.collect()
+    timer = StageTimer()
+    fn(ctx, ctx.ticks, timer)
+
+    # 메모리 측정은 tracemalloc 때문에 느려지므로 짧게 따로 한 번 더 돌림
+    alloc = StageTimer()
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    base, _ = tracemalloc.get_traced_memory()
+    fn(ctx, min(alloc_ticks, ctx.ticks), alloc)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    gc.collect()
+    leaked = sys.getallocatedblocks() - blocks
+
+    messages = max(timer.messages, 1)
+    return {
+        "messages": timer.messages,
+        "msgs_per_s": round(timer.messages / timer.wall, 1) if timer.wall else None,
+        "cpu_us_per_msg": round(timer.cpu / messages * 1e6, 3),
+        "alloc_bytes_per_msg": round((peak - base) / max(alloc.messages, 1), 1),
+        "alloc_blocks_per_msg": round(leaked / max(alloc.messages, 1), 3),
+        "latency_ms": {name: h.to_dict() for name, h in timer.latency.items()},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(copies: int, ticks: int, rate: float, fmt: str, stages: list, alloc_ticks: int = 3,
+        partitions: int = 1) -> dict:
+    ctx = Context(copies, ticks, rate, fmt, partitions)
+    results = {
+        "meta": {
+            "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machines": len(ctx.machines),
+            "copies": copies,
+            "ticks": ticks,
+            "rate": rate,
+            "format": fmt,
+            "partitions": partitions,
+        },
+        "stages": {},
+    }
+    for name in stages:
+        print(f"  {name} ...", file=sys.stderr)
+        results["stages"][name] = run_stage(name, ctx, alloc_ticks)
+    return results
+
+
+def print_results(results: dict):
+    meta = results["meta"]
+    print(f"설비 {meta['machines']:,}대 × {meta['ticks']}틱, rate={meta['rate']:g}, "
+          f"format={meta['format']} (commit {meta['commit']})")
+    print(f"{'stage':<15}{'msgs/s':>12}{'cpu µs/msg':>12}{'alloc B/msg':>13}{'blocks/msg':>12}"
+          f"  latency p50 / p99 / p99.9 (ms)")
+    for name, r in results["stages"].items():
+        print(f"{name:<15}{r['msgs_per_s'] or 0:>12,.0f}{r['cpu_us_per_msg']:>12}"
+              f"{r['alloc_bytes_per_msg']:>13}{r['alloc_blocks_per_msg']:>12}", end="")
+        for label, h in r["latency_ms"].items():
+            if h["count"]:
+                print(f"  {label}={h['p50']}/{h['p99']}/{h['p99.9']}", end="")
+        print()
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """기준 결과 대비 변화를 출력하고, threshold(비율)를 넘게 나빠진 항목 목록을 반환합니다."""
+    regressions = []
+    print(f"\n기준: commit {baseline['meta'].get('commit')} ({baseline['meta'].get('time')})")
+    if any(baseline["meta"].get(k) != current["meta"].get(k) for k in ("machines", "ticks", "rate", "format")):
+        print("  ⚠ 설비 수 / 틱 / rate / format이 달라서 직접 비교하기 어렵습니다.")
+    for name, r in current["stages"].items():
+        base = baseline["stages"].get(name)
+        if base is None:
+            continue
+        changes = []
+        for metric, higher_is_worse in COMPARED:
+            old, new = base.get(metric), r.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if higher_is_worse else change < -threshold
+            changes.append(f"{metric} {change:+.1%}{' ✗' if worse else ''}")
+            if worse:
+                regressions.append((name, metric, old, new))
+        print(f"  {name:<15}" + ", ".join(changes))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="파이프라인 벤치마크 (로컬 대역 사용, Docker 불필요)")
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--ticks", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=0, help="전송 단계 목표 틱 속도 (틱/초, 0: 최대)")
+    parser.add_argument("--format", choices=("json", "binary"), default=SIMULATION_CONFIG["output_format"])
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--partitions", type=int, default=KAFKA_CONFIG["partitions"][KAFKA_CONFIG["raw_topic"]],
+                        help="가짜 Kafka 토픽의 파티션 수 (브릿지가 설비별로 나눠 보냄)")
+    parser.add_argument("--alloc-ticks", type=int, default=3, help="메모리 측정 패스의 틱 수")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 볼 변화 비율")
+    args = parser.parse_args(argv)
+
+    results = run(args.copies, args.ticks, args.rate, args.format, args.stages, args.alloc_ticks,
+                  args.partitions)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n✗ 회귀 {len(regressions)}건 (threshold {args.threshold:.0%})")
+            sys.exit(1)
+        print("\n✓ 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Parquet 아카이브(archive.py) vs Kafka 구간 읽기 벤치마크.
+
+Fleet으로 --seconds초 분량을 만들어 ArchiveWriter로 임시 디렉터리에 쓰고 (적재 속도, 파일 크기 vs JSON 크기),
+같은 구간을 아카이브와 Kafka 방식으로 읽는 시간을 비교합니다. 두 결과가 같은지도 확인합니다. (float32 오차 허용)
+  - 아카이브: ArchiveReader.range (필요한 열만, row group 통계로 구간 밖 건너뜀, memory map)
+  - Kafka:    구간 시작 오프셋부터 JSON을 모두 풀어 설비 / 시각으로 거름
+              기본은 메모리에 든 JSON payload 목록 (네트워크 없음 → Kafka 쪽에 유리한 하한)
+              --kafka: 실제 Kafka의 --topic에 먼저 보내 두고 offsets_for_times로 찾아가 읽음
+
+조회:
+  - sensor-10m:    설비 하나, 센서 하나, 마지막 10분
+  - sensor-all:    설비 하나, 센서 하나, 전체 구간
+  - machine-1h:    설비 하나, 센서 전부, 마지막 1시간
+
+실행: python simulator/bench_archive.py --copies 20 --seconds 3600
+"""
+import argparse
+import json
+import shutil
+import statistics
+import tempfile
+import time
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG
+from clock import DEFAULT_REPLAY_START
+from fleet import Fleet, expand_machines
+from archive import ArchiveReader, ArchiveWriter
+
+
+def build(copies: int, seconds: int, directory: str, row_group_rows: int):
+    """반환: (JSON payload 목록 [(epoch 초, bytes)], 적재 rec/s, ArchiveWriter)."""
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    writer = ArchiveWriter(directory, machines, row_group_rows=row_group_rows)
+    fleet = Fleet(machines, seed=0)
+    start = DEFAULT_REPLAY_START.timestamp()
+    payloads = []
+    elapsed = 0.0
+    for tick in range(seconds):
+        fleet.step()
+        timestamp = DEFAULT_REPLAY_START.fromtimestamp(start + tick, DEFAULT_REPLAY_START.tzinfo).isoformat()
+        records = fleet.records(timestamp)
+        payloads.extend((start + tick, json.dumps(r, ensure_ascii=False).encode("utf-8")) for r in records)
+        began = time.perf_counter()
+        writer.add_many(records)
+        elapsed += time.perf_counter() - began
+    began = time.perf_counter()
+    writer.close_all()
+    elapsed += time.perf_counter() - began
+    return payloads, len(payloads) / elapsed, writer
+
+
+def scan_payloads(payloads: list, machine_id: str, start: float, end: float, sensors: list):
+    """Kafka 방식 (메모리): start부터 JSON을 풀어 거름. 오프셋 찾기는 이분 탐색으로 공짜라고 봄."""
+    times, rows = [], []
+    # 1000건마다 뽑은 시각으로 이분 탐색 → 한 블록 앞에서부터 읽음
+    lo = np.searchsorted([t for t, _ in payloads[::1000]], start) * 1000 - 1000
+    for t, payload in payloads[max(lo, 0):]:
+        if t >= end:
+            break
+        record = json.loads(payload)
+        if record["machine_id"] == machine_id and t >= start:
+            times.append(t)
+            rows.append([record["sensors"][name] for name in sensors])
+    return np.array(times), np.array(rows).reshape(len(rows), len(sensors))
+
+
+def produce(payloads: list, topic: str):
+    from kafka import KafkaProducer
+
+    producer = KafkaProducer(bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+                             api_version=KAFKA_CONFIG["api_version"], linger_ms=50)
+    for t, payload in payloads:
+        producer.send(topic, payload, timestamp_ms=int(t * 1000))
+    producer.flush()
+    producer.close()
+
+
+def scan_kafka(consumer, partitions: list, machine_id: str, start: float, end: float, sensors: list):
+    """Kafka 방식 (실제): 파티션마다 start 시각의 오프셋으로 가서 end 전까지 읽음."""
+    ends = consumer.end_offsets(partitions)
+    starts = consumer.offsets_for_times({tp: int(start * 1000) for tp in partitions})
+    remaining = set()
+    for tp in partitions:
+        if starts[tp] is not None:
+            consumer.seek(tp, starts[tp].offset)
+            remaining.add(tp)
+    times, rows = [], []
+    while remaining:
+        for tp, messages in consumer.poll(timeout_ms=1000).items():
+            for msg in messages:
+                if tp not in remaining:
+                    break
+                if msg.timestamp >= end * 1000 or msg.offset >= ends[tp] - 1:
+                    remaining.discard(tp)
+                if msg.timestamp >= end * 1000:
+                    break
+                record = json.loads(msg.value)
+                if record["machine_id"] == machine_id:
+                    times.append(msg.timestamp / 1000)
+                    rows.append([record["sensors"][name] for name in sensors])
+        consumer.pause(*[tp for tp in partitions if tp not in remaining])
+    consumer.resume(*partitions)
+    order = np.argsort(times, kind="stable")
+    return np.array(times)[order], np.array(rows).reshape(len(rows), len(sensors))[order]
+
+
+def time_query(fn, repeat: int):
+    """반환: (p50 ms, 결과)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1e3)
+    return statistics.median(times), result
+
+
+def same(a, b) -> bool:
+    return len(a[0]) == len(b[0]) and np.allclose(a[0], b[0]) and np.allclose(a[1], b[1], rtol=1e-6, atol=1e-4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parquet 아카이브 vs Kafka 구간 읽기 벤치마크")
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--seconds", type=int, default=3600, help="만들 데이터 길이(초, 설비당 초당 1건)")
+    parser.add_argument("--row-group-rows", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--kafka", action="store_true", help="메모리 대신 실제 Kafka에서 읽음")
+    parser.add_argument("--topic", default="bench-archive", help="--kafka일 때 데이터를 보낼 토픽")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench-archive-")
+    try:
+        payloads, rate, writer = build(args.copies, args.seconds, directory, args.row_group_rows)
+        json_bytes = sum(len(p) for _, p in payloads)
+        stats = writer.stats()
+        print(f"적재 {len(payloads):,}건: {rate:,.0f} rec/s | JSON {json_bytes / 1024 ** 2:,.1f} MiB → "
+              f"Parquet {stats['closed_bytes'] / 1024 ** 2:,.1f} MiB (파일 {stats['closed_files']:,}개, "
+              f"{json_bytes / stats['closed_bytes']:.1f}배 작음)")
+
+        reader = ArchiveReader(directory)
+        machine_id = "CNC-001"
+        sensors = list(MACHINES[machine_id]["sensors"])
+        first, last = payloads[0][0], payloads[-1][0] + 1
+        queries = {
+            "sensor-10m": (max(first, last - 600), last, sensors[:1]),
+            "sensor-all": (first, last, sensors[:1]),
+            "machine-1h": (max(first, last - 3600), last, sensors),
+        }
+
+        if args.kafka:
+            from kafka import KafkaConsumer, TopicPartition
+            produce(payloads, args.topic)
+            consumer = KafkaConsumer(bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+                                     api_version=KAFKA_CONFIG["api_version"], enable_auto_commit=False)
+            partitions = [TopicPartition(args.topic, p) for p in sorted(consumer.partitions_for_topic(args.topic))]
+            consumer.assign(partitions)
+            scan = lambda m, s, e, names: scan_kafka(consumer, partitions, m, s, e, names)
+        else:
+            scan = lambda m, s, e, names: scan_payloads(payloads, m, s, e, names)
+
+        print(f"{'query':<14}{'rows':>8}{'archive ms':>12}{'kafka ms':>12}{'speedup':>10}  ok")
+        for name, (start, end, names) in queries.items():
+            archive_ms, result = time_query(lambda: reader.range(machine_id, start, end, names), args.repeat)
+            kafka_ms, expected = time_query(lambda: scan(machine_id, start, end, names), max(1, args.repeat // 5))
+            print(f"{name:<14}{len(result[0]):>8,}{archive_ms:>12.1f}{kafka_ms:>12.1f}{kafka_ms / archive_ms:>9.0f}x"
+                  f"  {'✓' if same(result, expected) else '✗'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
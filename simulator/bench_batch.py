@@ -0,0 +1,150 @@
+"""
+dict 레코드 vs ReadingBatch(batch.py) 메모리 / 할당 벤치마크.
+
+Fleet을 --ticks틱 돌린 데이터로 같은 일을 두 형태로 하고, 결과를 모두 들고 있는 상태에서 잽니다.
+  - produce:      시뮬레이터 배열 → Fleet.records(dict) / Fleet.batch  (Fleet.step 시간은 빼고 잼)
+  - decode-json:  설비별 JSON payload → decode_payload / ReadingBatch.from_payloads (틱마다)
+  - decode-frame: 틱별 바이너리 프레임 → decode_payload / ReadingBatch.from_frame
+  - detector:     위에서 만든 입력으로 OnlineDetector.detect / detect_batch (판정 결과가 같은지도 확인)
+출력: 건당 시간(µs), 남아 있는 메모리(MiB, 건당 바이트), 살아 있는 할당 블록 수(건당),
+      최대 메모리(MiB, tracemalloc peak) - 시간은 tracemalloc 없이 따로 잼
+
+실행: python simulator/bench_batch.py --copies 20 --ticks 600
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from lazy import np
+
+from config import MACHINES
+from clock import DEFAULT_REPLAY_START
+from fleet import Fleet, expand_machines
+from wire import WireSchema, FleetEncoder, decode_payload, iso_timestamp
+from batch import ReadingBatch
+from detector import OnlineDetector
+
+FORMS = ("dict", "batch")
+
+
+def produce(machines: dict, ticks: int, seed: int, form: str):
+    """반환: (틱별 결과 목록, 변환에 걸린 초)."""
+    fleet = Fleet(machines, seed=seed)
+    start_ms = round(DEFAULT_REPLAY_START.timestamp() * 1000)
+    out, elapsed = [], 0.0
+    for tick in range(ticks):
+        fleet.step()
+        ts_ms = start_ms + tick * 1000
+        began = time.perf_counter()
+        out.append(fleet.records(iso_timestamp(ts_ms)) if form == "dict" else fleet.batch(ts_ms))
+        elapsed += time.perf_counter() - began
+    return out, elapsed
+
+
+def payloads(machines: dict, ticks: int, seed: int):
+    """반환: (틱별 JSON payload 목록, 틱별 프레임)."""
+    fleet = Fleet(machines, seed=seed)
+    encoder = FleetEncoder(fleet)
+    start_ms = round(DEFAULT_REPLAY_START.timestamp() * 1000)
+    messages, frames = [], []
+    for tick in range(ticks):
+        fleet.step()
+        ts_ms = start_ms + tick * 1000
+        messages.append([json.dumps(r, ensure_ascii=False).encode("utf-8")
+                         for r in fleet.records(iso_timestamp(ts_ms))])
+        frames.append(encoder.encode(fleet, ts_ms))
+    return messages, frames
+
+
+def decode(ticks_of_payloads: list, form: str, schema):
+    began = time.perf_counter()
+    if form == "dict":
+        out = [[record for payload in tick for record in decode_payload(payload, schema)]
+               for tick in ticks_of_payloads]
+    else:
+        out = [ReadingBatch.from_payloads(tick, schema) for tick in ticks_of_payloads]
+    return out, time.perf_counter() - began
+
+
+def decode_frames(frames: list, form: str, schema):
+    began = time.perf_counter()
+    if form == "dict":
+        out = [decode_payload(frame, schema) for frame in frames]
+    else:
+        out = [ReadingBatch.from_frame(frame, schema) for frame in frames]
+    return out, time.perf_counter() - began
+
+
+def detect(ticks_of_input: list, form: str):
+    detector = OnlineDetector()
+    began = time.perf_counter()
+    if form == "dict":
+        out = [detector.detect(records)[0] for records in ticks_of_input]
+    else:
+        out = [detector.detect_batch(batch)[0] for batch in ticks_of_input]
+    return out, time.perf_counter() - began
+
+
+def measure(run):
+    """run() → (결과, 초). 반환: (결과, 초, 남은 bytes, 살아 있는 블록 수, peak bytes)."""
+    result, seconds = run()
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result, _ = run()
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    return result, seconds, current, blocks, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="dict 레코드 vs ReadingBatch 메모리 / 할당 벤치마크")
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--ticks", type=int, default=600, help="시뮬레이션 틱 수")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    machines = expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES
+    rows = len(machines) * args.ticks
+    print(f"설비 {len(machines)}대 × {args.ticks}틱 = {rows:,}건")
+    messages, frames = payloads(machines, args.ticks, args.seed)
+    schema = WireSchema(machines)
+
+    scenarios = {
+        "produce": lambda form: produce(machines, args.ticks, args.seed, form),
+        "decode-json": lambda form: decode(messages, form, schema),
+        "decode-frame": lambda form: decode_frames(frames, form, schema),
+    }
+    print(f"{'scenario':<14}{'form':<7}{'µs/rec':>8}{'retained MiB':>14}{'B/rec':>8}"
+          f"{'blocks':>12}{'blocks/rec':>12}{'peak MiB':>10}")
+    inputs = {}
+    for name, run in scenarios.items():
+        results = {}
+        for form in FORMS:
+            result, seconds, current, blocks, peak = measure(lambda: run(form))
+            results[form] = (seconds, current, blocks)
+            if name == "produce":
+                inputs[form] = result
+            print(f"{name:<14}{form:<7}{seconds / rows * 1e6:>8.2f}{current / 1024 ** 2:>14.1f}"
+                  f"{current / rows:>8.0f}{blocks:>12,}{blocks / rows:>12.2f}{peak / 1024 ** 2:>10.1f}")
+            del result
+        (dict_s, dict_b, dict_n), (batch_s, batch_b, batch_n) = results["dict"], results["batch"]
+        print(f"{'':<14}→ batch: 시간 {dict_s / batch_s:.1f}배 빠름, 메모리 {dict_b / max(batch_b, 1):.1f}배, "
+              f"블록 {dict_n / max(batch_n, 1):,.0f}배 적음")
+
+    predicted = {}
+    for form in FORMS:
+        result, seconds, current, blocks, peak = measure(lambda: detect(inputs[form], form))
+        predicted[form] = np.concatenate(result)
+        print(f"{'detector':<14}{form:<7}{seconds / rows * 1e6:>8.2f}{current / 1024 ** 2:>14.1f}"
+              f"{current / rows:>8.0f}{blocks:>12,}{blocks / rows:>12.2f}{peak / 1024 ** 2:>10.1f}")
+    same = np.array_equal(predicted["dict"], predicted["batch"])
+    print(f"detector 판정 결과 {'같음 ✓' if same else '다름 ✗'} (이상 {int(predicted['batch'].sum()):,}건)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+변화 보고(deadband) 모드 효과 측정.
+
+같은 seed로 전체 발행과 변화 보고 모드를 나란히 돌려 메시지 수 / 바이트 수를 비교하고,
+StateReconstructor로 복원한 값이 실제 값과 deadband 안에서 맞는지 확인합니다.
+  - json:   설비마다 메시지 1개 (main.py 기본)
+  - binary: 틱마다 프레임 1개 (바뀐 설비가 없는 틱은 보내지 않음)
+
+측정은 현재 config.MACHINES / DEADBAND_CONFIG 기준입니다. 틱 수가 heartbeat보다 길어야 정상 상태 값이 나옵니다.
+
+실행: python simulator/bench_deadband.py --copies 20 --ticks 600
+"""
+import argparse
+import json
+
+from lazy import np
+
+from config import MACHINES, DEADBAND_CONFIG
+from deadband import DeadbandFilter, StateReconstructor
+from fleet import Fleet, expand_machines
+from wire import WireSchema, FleetEncoder, epoch_ms, decode_payload
+
+TIMESTAMP = "2026-01-01T00:00:00+00:00"
+
+
+def run(copies: int, ticks: int, seed: int = 0) -> dict:
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    fleet = Fleet(machines, seed=seed)
+    schema = WireSchema(machines)
+    encoder = FleetEncoder(fleet, schema)
+    deadband = DeadbandFilter(fleet, machines)
+    state = StateReconstructor(machines)
+    base_ts = epoch_ms(TIMESTAMP)
+
+    totals = {name: {"messages": 0, "bytes": 0} for name in
+              ("json-full", "json-deadband", "binary-full", "binary-deadband")}
+    worst = 0.0         # 복원 값과 실제 값 차이 / deadband 의 최댓값 (1 이하여야 함)
+    for _ in range(ticks):
+        fleet.step()
+        mask = deadband.update(fleet)
+
+        full = [json.dumps(r, ensure_ascii=False).encode("utf-8") for r in fleet.records(TIMESTAMP)]
+        partial = [json.dumps(r, ensure_ascii=False).encode("utf-8")
+                   for r in fleet.records(TIMESTAMP, mask=mask, seq=deadband.seq)]
+        _add(totals["json-full"], full)
+        _add(totals["json-deadband"], partial)
+        _add(totals["binary-full"], [encoder.encode(fleet, base_ts)])
+        frame = encoder.encode(fleet, base_ts, mask=mask, seq=deadband.seq)
+        _add(totals["binary-deadband"], [frame] if frame is not None else [])
+
+        # 컨슈머 쪽 복원 (바이너리 프레임 기준)
+        if frame is not None:
+            state.apply_many(decode_payload(frame, schema))
+        worst = max(worst, _reconstruction_error(fleet, state, deadband))
+
+    readings = len(fleet) * ticks
+    results = {"readings": readings, "sensor_values": fleet.size * ticks,
+               "max_error_over_band": round(worst, 3), **deadband.stats(), "formats": {}}
+    for name, total in totals.items():
+        base = totals[name.split("-")[0] + "-full"]
+        results["formats"][name] = {
+            "messages": total["messages"],
+            "bytes": total["bytes"],
+            "bytes_per_reading": round(total["bytes"] / readings, 1),
+            "message_ratio": round(total["messages"] / base["messages"], 4),
+            "byte_ratio": round(total["bytes"] / base["bytes"], 4),
+        }
+    return results
+
+
+def _add(total: dict, payloads: list):
+    total["messages"] += len(payloads)
+    total["bytes"] += sum(len(p) for p in payloads)
+
+
+def _reconstruction_error(fleet, state: StateReconstructor, deadband: DeadbandFilter) -> float:
+    """복원한 값과 실제 값의 차이를 deadband로 나눈 최댓값. (deadband가 0인 센서는 정확히 같아야 함)"""
+    restored = np.array([state.state.get(m, {}).get(name, np.nan)
+                         for m, names in zip(fleet.machine_ids, fleet.sensor_names) for name in names])
+    error = np.abs(restored - fleet.values)
+    # float32 전송 오차는 허용
+    error = np.where(error <= np.abs(fleet.values) * 1e-6 + 1e-6, 0.0, error)
+    band = np.where(deadband.band > 0, deadband.band, np.inf)
+    ratio = np.where(deadband.band > 0, error / band, np.where(error > 0, np.inf, 0.0))
+    return float(np.nanmax(ratio))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="변화 보고(deadband) 모드 메시지 / 바이트 절감 측정")
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--ticks", type=int, default=600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = parser.parse_args(argv)
+
+    results = run(args.copies, args.ticks, args.seed)
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"설비 {len(MACHINES) * args.copies}대 × {args.ticks}틱 "
+          f"(noise × {DEADBAND_CONFIG['noise_multiple']:g}, heartbeat {DEADBAND_CONFIG['heartbeat']:g}s)")
+    print(f"보낸 센서 값 {results['sensor_ratio']:.1%}, 보낸 레코드 {results['record_ratio']:.1%}, "
+          f"복원 오차 최대 {results['max_error_over_band']} × deadband")
+    print(f"{'format':<18}{'messages':>12}{'bytes':>14}{'B/reading':>12}{'msgs':>9}{'bytes':>9}")
+    for name, r in results["formats"].items():
+        print(f"{name:<18}{r['messages']:>12,}{r['bytes']:>14,}{r['bytes_per_reading']:>12}"
+              f"{r['message_ratio']:>9.1%}{r['byte_ratio']:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
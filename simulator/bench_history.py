@@ -0,0 +1,101 @@
+"""
+이력 캐시(history.py) 적재 / 조회 벤치마크.
+
+Fleet으로 --seconds초 분량을 만들어 HistoryStore에 넣고 (cold 세그먼트는 임시 디렉터리),
+조회별 중앙값(p50, µs)을 잽니다. 조회 결과는 넣은 값과 맞는지도 확인합니다. (cold는 float32 오차 허용)
+  - latest:           설비 하나의 최근 값
+  - window-hot:       최근 --window초 (hot 링 안)
+  - window-cold:      hot 범위를 넘는 최근 --cold-window초 (cold 세그먼트 + hot)
+  - downsample-hour:  최근 1시간을 1분 평균으로
+
+실행: python simulator/bench_history.py --copies 20 --seconds 7200
+"""
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+
+from lazy import np
+
+from config import MACHINES, HISTORY_CONFIG
+from clock import DEFAULT_REPLAY_START
+from fleet import Fleet, expand_machines
+from history import ColdStore, HistoryStore
+
+
+def build(copies: int, seconds: int, directory: str, hot_seconds: float, chunk_seconds: float):
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    store = HistoryStore(machines, hot_seconds, chunk_seconds, rate=1.0, cold=ColdStore(directory))
+    fleet = Fleet(machines, seed=0)
+    start = DEFAULT_REPLAY_START.timestamp()
+    target = next(iter(machines))
+    expected = []       # 확인용: 첫 설비의 (시각, 값 row)
+    began = time.perf_counter()
+    for tick in range(seconds):
+        fleet.step()
+        timestamp = DEFAULT_REPLAY_START.fromtimestamp(start + tick, DEFAULT_REPLAY_START.tzinfo).isoformat()
+        records = fleet.records(timestamp)
+        store.add_many(records)
+        expected.append((start + tick, list(records[0]["sensors"].values())))
+    rate = len(machines) * seconds / (time.perf_counter() - began)
+    return store, target, expected, rate
+
+
+def time_query(fn, repeat: int):
+    """반환: (p50 µs, 결과)."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started) * 1e6)
+    return statistics.median(times), result
+
+
+def check(result, expected: list, seconds: float) -> bool:
+    times, values = result
+    want = [row for t, row in expected if t > expected[-1][0] - seconds]
+    return len(times) == len(want) and np.allclose(values, np.array(want), rtol=1e-6, atol=1e-4)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="이력 캐시 적재 / 조회 벤치마크")
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--seconds", type=int, default=7200, help="넣을 데이터 길이(초, 설비당 초당 1건)")
+    parser.add_argument("--hot-seconds", type=float, default=HISTORY_CONFIG["hot_seconds"])
+    parser.add_argument("--chunk-seconds", type=float, default=HISTORY_CONFIG["chunk_seconds"])
+    parser.add_argument("--window", type=float, default=120.0)
+    parser.add_argument("--cold-window", type=float, default=1800.0)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix="bench-history-")
+    try:
+        store, machine, expected, rate = build(args.copies, args.seconds, directory,
+                                               args.hot_seconds, args.chunk_seconds)
+        cold = store.cold.stats()
+        print(f"적재 {len(store.machines)}대 × {args.seconds:,}초: {rate:,.0f} rec/s | "
+              f"cold 세그먼트 {cold['segments']:,}개, {cold['bytes'] / 1024 ** 2:,.1f} MiB")
+
+        last = expected[-1][0]
+        queries = {
+            "latest": (lambda: store.latest(machine), None),
+            "window-hot": (lambda: store.window(machine, args.window), args.window),
+            "window-cold": (lambda: store.window(machine, args.cold_window), args.cold_window),
+            "downsample-hour": (lambda: store.downsample(machine, last - 3599, last + 1, 60), None),
+        }
+        print(f"{'query':<18}{'p50 µs':>10}{'rows':>8}  ok")
+        for name, (fn, seconds) in queries.items():
+            p50, result = time_query(fn, args.repeat)
+            if name == "latest":
+                rows, ok = 1, np.allclose(list(result["sensors"].values()), expected[-1][1])
+            else:
+                rows = len(result[0])
+                ok = check(result, expected, seconds) if seconds else rows == 60
+            print(f"{name:<18}{p50:>10.1f}{rows:>8,}  {'✓' if ok else '✗'}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
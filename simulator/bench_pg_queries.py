@@ -0,0 +1,154 @@
+"""
+PostgreSQL 조회 벤치마크 (sql/init.sql의 저장 형식 기준).
+
+BENCH_START(2000-01-01)부터 --days일치 데이터를 --step초 간격으로 적재하고 1분 / 1시간 rollup을 만든 뒤,
+대시보드에서 자주 쓰는 조회를 반복 실행해 중앙값(p50)을 비교합니다.
+  - recent:        설비 하나의 최근 N분 원본 (BRIN(ts) + (machine_id, ts) 인덱스)
+  - hourly-raw:    일주일 시간별 평균을 원본에서 바로 계산 (unnest + GROUP BY)
+  - hourly-rollup: 같은 결과를 sensor_rollup_1h에서 읽기
+hourly-*는 설비 하나(machine)와 전체 설비(fleet) 두 가지로 잽니다.
+
+끝나면 벤치마크 구간의 일 파티션과 rollup 행을 지웁니다.
+
+실행: python simulator/bench_pg_queries.py --copies 4 --days 7 --step 10
+      python simulator/bench_pg_queries.py --explain      # 조회별 실행 계획도 출력
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import MACHINES
+from fleet import Fleet, expand_machines
+from pg_sink import ReadingWriter, TABLE, connect
+
+BENCH_START = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+QUERIES = {
+    "recent": """
+        SELECT ts, flags, vals FROM factory.sensor_readings
+         WHERE machine_id = %(machine)s AND ts >= %(end)s::timestamptz - %(recent)s::interval AND ts < %(end)s
+         ORDER BY ts""",
+    "hourly-raw/machine": """
+        SELECT date_trunc('hour', t.ts, 'UTC') AS bucket, v.pos, avg(v.val)
+          FROM factory.sensor_readings t
+         CROSS JOIN LATERAL unnest(t.vals) WITH ORDINALITY AS v(val, pos)
+         WHERE t.machine_id = %(machine)s AND t.ts >= %(start)s AND t.ts < %(end)s
+         GROUP BY 1, 2 ORDER BY 1, 2""",
+    "hourly-rollup/machine": """
+        SELECT bucket, avg_vals FROM factory.sensor_rollup_1h
+         WHERE machine_id = %(machine)s AND bucket >= %(start)s AND bucket < %(end)s
+         ORDER BY bucket""",
+    "hourly-raw/fleet": """
+        SELECT t.machine_id, date_trunc('hour', t.ts, 'UTC') AS bucket, v.pos, avg(v.val)
+          FROM factory.sensor_readings t
+         CROSS JOIN LATERAL unnest(t.vals) WITH ORDINALITY AS v(val, pos)
+         WHERE t.ts >= %(start)s AND t.ts < %(end)s
+         GROUP BY 1, 2, 3""",
+    "hourly-rollup/fleet": """
+        SELECT machine_id, bucket, avg_vals FROM factory.sensor_rollup_1h
+         WHERE bucket >= %(start)s AND bucket < %(end)s""",
+}
+
+
+def load(conn, copies: int, days: int, step: float, batch_size: int) -> int:
+    """벤치마크 구간 데이터를 COPY로 적재합니다. 반환: 행 수."""
+    fleet = Fleet(expand_machines(MACHINES, copies) if copies > 1 else MACHINES, seed=0)
+    writer = ReadingWriter(conn, "copy")
+    ticks = int(days * 86400 / step)
+    rows, batch = 0, []
+    for tick in range(ticks):
+        fleet.step()
+        batch.extend(fleet.records((BENCH_START + timedelta(seconds=tick * step)).isoformat()))
+        if len(batch) >= batch_size or tick == ticks - 1:
+            writer.write(batch)
+            rows += len(batch)
+            batch = []
+    return rows
+
+
+def build_rollups(conn, start: datetime, end: datetime) -> dict:
+    """벤치마크 구간의 1분 → 1시간 rollup을 만듭니다. (rollup_state는 건드리지 않음)"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT factory.rollup_minutes(%s, %s)", (start, end))
+        minutes = cur.fetchone()[0]
+        cur.execute("SELECT factory.rollup_hours(%s, %s)", (start, end))
+        hours = cur.fetchone()[0]
+        cur.execute("ANALYZE factory.sensor_rollup_1m")
+        cur.execute("ANALYZE factory.sensor_rollup_1h")
+    conn.commit()
+    return {"1m": minutes, "1h": hours}
+
+
+def time_query(conn, sql: str, params: dict, repeat: int) -> tuple:
+    """반환: (p50 ms, 결과 행 수). 첫 실행은 캐시 예열로 빼고 잽니다."""
+    times, rows = [], 0
+    with conn.cursor() as cur:
+        for n in range(repeat + 1):
+            start = time.perf_counter()
+            cur.execute(sql, params)
+            rows = len(cur.fetchall())
+            if n:
+                times.append((time.perf_counter() - start) * 1000)
+    conn.rollback()
+    return statistics.median(times), rows
+
+
+def explain(conn, sql: str, params: dict) -> str:
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        plan = "\n".join(row[0] for row in cur.fetchall())
+    conn.rollback()
+    return plan
+
+
+def cleanup(conn, start: datetime, days: int):
+    with conn.cursor() as cur:
+        # ReadingWriter는 다음 날 파티션까지 만듦
+        for n in range(days + 1):
+            cur.execute(f"DROP TABLE IF EXISTS {TABLE}_{start + timedelta(days=n):%Y%m%d}")
+        end = start + timedelta(days=days + 1)
+        cur.execute("DELETE FROM factory.sensor_rollup_1m WHERE bucket >= %s AND bucket < %s", (start, end))
+        cur.execute("DELETE FROM factory.sensor_rollup_1h WHERE bucket >= %s AND bucket < %s", (start, end))
+    conn.commit()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PostgreSQL 시계열 조회 벤치마크 (원본 vs rollup)")
+    parser.add_argument("--copies", type=int, default=4, help="config.MACHINES 복제 배수")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--step", type=float, default=10.0, help="reading 간격(초)")
+    parser.add_argument("--recent", default="15 minutes", help="recent 조회 구간")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=20000)
+    parser.add_argument("--explain", action="store_true", help="조회별 EXPLAIN (ANALYZE, BUFFERS) 출력")
+    args = parser.parse_args(argv)
+
+    start, end = BENCH_START, BENCH_START + timedelta(days=args.days)
+    conn = connect()
+    try:
+        began = time.perf_counter()
+        rows = load(conn, args.copies, args.days, args.step, args.batch_size)
+        loaded = time.perf_counter() - began
+        with conn.cursor() as cur:
+            cur.execute(f"ANALYZE {TABLE}")
+        conn.commit()
+        began = time.perf_counter()
+        rollups = build_rollups(conn, start, end)
+        print(f"적재 {rows:,}행 ({rows / loaded:,.0f} rows/s), rollup 1m {rollups['1m']:,}행 / "
+              f"1h {rollups['1h']:,}행 ({time.perf_counter() - began:.1f}s)")
+
+        params = {"machine": next(iter(MACHINES)), "start": start, "end": end, "recent": args.recent}
+        print(f"{'query':<24}{'p50 ms':>10}{'rows':>10}")
+        for name, sql in QUERIES.items():
+            p50, count = time_query(conn, sql, params, args.repeat)
+            print(f"{name:<24}{p50:>10.1f}{count:>10,}")
+            if args.explain:
+                print(explain(conn, sql, params) + "\n")
+    finally:
+        cleanup(conn, start, args.days)
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+PostgreSQL 적재 처리량 벤치마크.
+
+Fleet이 만든 레코드를 ReadingWriter로 직접 적재하며 방식(COPY / 다중 행 INSERT)과
+배치 크기에 따른 rows/s를 비교합니다. (Kafka 없이 DB 쪽만 측정)
+end-to-end lag는 실제 파이프라인에서 pg_sink.py가 주기적으로 출력합니다.
+
+벤치마크 데이터는 2000-01-01 파티션에 쓰고, 끝나면 그 파티션을 지웁니다.
+
+실행: python simulator/bench_pg_sink.py --rows 100000 --batch-sizes 500 5000 20000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import MACHINES
+from fleet import Fleet, expand_machines
+from pg_sink import ReadingWriter, TABLE, connect
+
+BENCH_DAY = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def make_records(rows: int, copies: int) -> list:
+    fleet = Fleet(expand_machines(MACHINES, copies), seed=0)
+    records = []
+    tick = 0
+    while len(records) < rows:
+        fleet.step()
+        records.extend(fleet.records((BENCH_DAY + timedelta(seconds=tick)).isoformat()))
+        tick += 1
+    return records[:rows]
+
+
+def run(conn, records: list, method: str, batch_size: int) -> float:
+    writer = ReadingWriter(conn, method)
+    start = time.perf_counter()
+    for i in range(0, len(records), batch_size):
+        writer.write(records[i:i + batch_size])
+    return len(records) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PostgreSQL 적재 벤치마크")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--methods", nargs="+", default=["copy", "insert"])
+    args = parser.parse_args(argv)
+
+    records = make_records(args.rows, args.copies)
+    conn = connect()
+    try:
+        print(f"{'method':<8}{'batch':>8}{'rows/s':>12}")
+        for method in args.methods:
+            for batch_size in args.batch_sizes:
+                rate = run(conn, records, method, batch_size)
+                print(f"{method:<8}{batch_size:>8}{rate:>12,.0f}")
+    finally:
+        with conn.cursor() as cur:
+            # ReadingWriter는 다음 날 파티션까지 만듦
+            for day in (BENCH_DAY, BENCH_DAY + timedelta(days=1)):
+                cur.execute(f"DROP TABLE IF EXISTS {TABLE}_{day:%Y%m%d}")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
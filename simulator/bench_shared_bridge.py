@@ -0,0 +1,186 @@
+"""
+공유 구독 브릿지(shared_bridge.py) 확장성 벤치마크.
+
+인스턴스 수를 바꿔 가며(--instances 1 2 4) 같은 양의 메시지를 보내고 그룹 전체 처리량(msg/s)을 잽니다.
+  - --broker mqtt:       실제 Mosquitto(docker compose) + 인스턴스마다 별도 프로세스 → 코어 수만큼 늘어나는지 확인
+  - --broker inprocess:  standins.InProcessBroker + 인스턴스를 스레드로 (GIL 때문에 늘어나지 않음, 분배 / 유실 / 중복 확인용)
+Kafka는 FakeKafkaProducer (--kafka: 실제 Kafka). 실행마다 새 공유 그룹을 써서 이전 세션이 섞이지 않게 합니다.
+
+메시지는 Fleet JSON 레코드를 미리 인코딩해 두고 발행기 --publishers개가 최대 속도로 보냅니다.
+처리량 = Kafka ack 합계 / (첫 발행 → 마지막 ack). 발행 속도가 먼저 막히면 발행기 수를 늘리세요.
+출력: 인스턴스 수, 처리량, 인스턴스별 분배(최소 / 최대 건수), 유실 / 중복 (ack 합계 - 보낸 건수)
+
+실행: python simulator/bench_shared_bridge.py --broker mqtt --instances 1 2 4 --messages 200000
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+from config import MACHINES, MQTT_CONFIG
+from fleet import Fleet, expand_machines
+
+
+def build_payloads(copies: int, messages: int) -> list:
+    """[(토픽, payload)] messages건 (설비 순서대로 틱을 이어 붙임)."""
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    fleet = Fleet(machines, seed=0)
+    payloads = []
+    while len(payloads) < messages:
+        fleet.step()
+        payloads.extend((f"factory/{r['machine_id']}/sensors", json.dumps(r, ensure_ascii=False).encode("utf-8"))
+                        for r in fleet.records())
+    return payloads[:messages]
+
+
+def run_instance(name: str, group: str, broker, use_kafka: bool, results, stop):
+    """브릿지 인스턴스 하나: 준비되면 알리고, 진행 상황을 보내다가 stop 후 종료 결과를 보냄."""
+    from forwarder import KafkaForwarder, create_producer
+    from shared_bridge import SharedBridge
+    from standins import FakeKafkaProducer
+
+    producer = create_producer() if use_kafka else FakeKafkaProducer(linger_ms=5)
+    forwarder = KafkaForwarder(producer, spill_policy="drop_newest")
+    factory = (lambda cid: broker.client(cid)) if broker is not None else None
+    bridge = SharedBridge(forwarder, name, group, qos=0, health_interval=60, client_factory=factory)
+    bridge.start()
+    if not bridge.ready.wait(10):
+        results.put(("error", name, "MQTT 구독 실패"))
+        return
+    results.put(("ready", name, 0, 0))
+    while not stop.wait(0.1):
+        results.put(("progress", name, bridge.received, forwarder.acked))
+    bridge.stop()
+    results.put(("done", name, bridge.received, forwarder.acked))
+
+
+def run_publisher(payloads: list, broker, start, results):
+    if broker is not None:
+        client = broker.client(f"bench-publisher-{threading.get_ident()}")
+        client.connect()
+    else:
+        import paho.mqtt.client as mqtt
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, protocol=mqtt.MQTTv5)
+        client.connect(MQTT_CONFIG["host"], MQTT_CONFIG["port"])
+        client.loop_start()
+    start.wait()
+    began = time.perf_counter()
+    info = None
+    for topic, payload in payloads:
+        info = client.publish(topic, payload)
+    if info is not None:
+        info.wait_for_publish(60)       # paho: 보낼 큐가 다 비워질 때까지
+    results.put(("published", len(payloads), time.perf_counter() - began))
+    client.disconnect()
+    if broker is None:
+        client.loop_stop()
+
+
+def run(n: int, payloads: list, args) -> dict:
+    """인스턴스 n개로 payloads를 모두 처리하는 데 걸린 시간을 잽니다."""
+    if args.broker == "mqtt":
+        spawn, results, stop, start, broker = mp.Process, mp.Queue(), mp.Event(), mp.Event(), None
+    else:
+        from standins import InProcessBroker
+        spawn, results, stop, start = threading.Thread, queue.Queue(), threading.Event(), threading.Event()
+        broker = InProcessBroker()
+    group = f"bench-{os.getpid()}-{n}-{int(time.time())}"
+
+    instances = [spawn(target=run_instance, args=(f"i{k}", group, broker, args.kafka, results, stop), daemon=True)
+                 for k in range(n)]
+    for worker in instances:
+        worker.start()
+    ready = 0
+    while ready < n:
+        kind, name, *rest = results.get(timeout=30)
+        if kind == "error":
+            raise RuntimeError(f"{name}: {rest[0]}")
+        ready += kind == "ready"
+
+    shares = [payloads[p::args.publishers] for p in range(args.publishers)]
+    publishers = [spawn(target=run_publisher, args=(share, broker, start, results), daemon=True)
+                  for share in shares]
+    for worker in publishers:
+        worker.start()
+    time.sleep(0.5)         # 발행기 접속 대기
+    start.set()
+    began = time.perf_counter()
+
+    acked, received, finished_at, published = {}, {}, None, []
+    last_change, last_total = time.perf_counter(), -1
+    while True:
+        try:
+            kind, *rest = results.get(timeout=0.5)
+        except queue.Empty:
+            kind = None
+        if kind == "progress":
+            name, got, ok = rest
+            received[name], acked[name] = got, ok
+        elif kind == "published":
+            published.append(rest)
+        total = sum(acked.values())
+        if total != last_total:
+            last_total, last_change = total, time.perf_counter()
+        if total >= len(payloads):
+            finished_at = time.perf_counter()
+            break
+        if len(published) == len(publishers) and time.perf_counter() - last_change > args.stall:
+            finished_at = last_change     # 더 이상 늘지 않음 → 유실
+            break
+
+    stop.set()
+    done = {}
+    while len(done) < n:
+        kind, *rest = results.get(timeout=30)
+        if kind == "done":
+            name, got, ok = rest
+            done[name] = (got, ok)
+        elif kind == "published":
+            published.append(rest)
+    for worker in instances + publishers:
+        worker.join(10)
+
+    counts = [ok for _, ok in done.values()]
+    total = sum(counts)
+    publish_seconds = max(seconds for _, seconds in published) if published else float("nan")
+    return {
+        "instances": n,
+        "rate": total / (finished_at - began),
+        "publish_rate": len(payloads) / publish_seconds,
+        "min_share": min(counts),
+        "max_share": max(counts),
+        "lost": max(0, len(payloads) - total),
+        "duplicates": max(0, total - len(payloads)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="공유 구독 브릿지 확장성 벤치마크")
+    parser.add_argument("--broker", choices=("mqtt", "inprocess"), default="mqtt")
+    parser.add_argument("--instances", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--messages", type=int, default=200_000)
+    parser.add_argument("--publishers", type=int, default=2)
+    parser.add_argument("--copies", type=int, default=20, help="config.MACHINES 복제 배수 (설비 수)")
+    parser.add_argument("--kafka", action="store_true", help="FakeKafkaProducer 대신 실제 Kafka로 전송")
+    parser.add_argument("--stall", type=float, default=5.0, help="ack가 이 시간(초) 동안 늘지 않으면 종료")
+    args = parser.parse_args(argv)
+
+    payloads = build_payloads(args.copies, args.messages)
+    size = sum(len(p) for _, p in payloads) / len(payloads)
+    print(f"broker={args.broker} | 메시지 {len(payloads):,}건 (평균 {size:.0f} B), 발행기 {args.publishers}개, "
+          f"Kafka={'실제' if args.kafka else 'FakeKafkaProducer'} | CPU {os.cpu_count()}개")
+    print(f"{'instances':>9}{'msg/s':>12}{'publish/s':>12}{'scale':>8}{'min share':>11}{'max share':>11}"
+          f"{'lost':>8}{'dup':>6}")
+    base = None
+    for n in args.instances:
+        result = run(n, payloads, args)
+        base = base or result["rate"]
+        print(f"{n:>9}{result['rate']:>12,.0f}{result['publish_rate']:>12,.0f}{result['rate'] / base:>7.2f}x"
+              f"{result['min_share']:>11,}{result['max_share']:>11,}{result['lost']:>8,}{result['duplicates']:>6,}")
+
+
+if __name__ == "__main__":
+    main()
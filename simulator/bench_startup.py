@@ -0,0 +1,165 @@
+"""
+명령별 시작 시간(cold start) 측정.
+
+명령마다 새 프로세스를 --repeat번 띄워 벽시계 시간 중앙값(ms)을 잽니다.
+  - help:    python -m simulator <명령> --help  (인자 해석까지)
+  - import:  python -c "import <모듈>"          (모듈을 불러오기만 했을 때, 브로커 연결 등 부작용이 없어야 함)
+  - run:     실제로 짧게 실행 (브로커 없이 돌 수 있는 명령만, 예: main --ticks 1 --output 파일)
+기준선으로 python -c pass(인터프리터만)와 python -m simulator(명령 목록)도 잽니다.
+설비 수가 많을 때 Fleet 준비 시간(fleetspec.py 명세 + 난수 스트림 키)도 함께 출력합니다.
+  명세 디스크 캐시(spec_cache_dir)가 빈 상태(처음 뜬 프로세스)와 채워진 상태(다음 프로세스부터)를 따로 잼
+
+--baseline <git ref>: 그 커밋의 simulator/를 임시 디렉터리에 풀어서 같은 명령을 전후로 비교합니다.
+  명령 하나를 두 트리에서 똑같이 python simulator/<모듈>.py --help / import <모듈>로 잼
+  (python -m simulator가 없던 트리도 비교할 수 있도록)
+  예전 트리에 없는 모듈은 -, 실패하거나 --timeout 안에 끝나지 않으면 nan (예: import만 했는데 브로커에 연결)
+
+실행: python simulator/bench_startup.py --repeat 5
+비교: python simulator/bench_startup.py --baseline <이전 커밋>
+"""
+import argparse
+import importlib.util
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+
+def _load_commands() -> dict:
+    # simulator/__main__.py의 명령 목록 (이 스크립트를 직접 실행하면 __main__이 자기 자신이므로 경로로 불러옴)
+    spec = importlib.util.spec_from_file_location("simulator_cli", os.path.join(HERE, "__main__.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.COMMANDS
+
+
+COMMANDS = _load_commands()
+
+# 브로커 / DB 없이 끝까지 실행해 볼 수 있는 명령
+RUNS = {
+    "main": ["--seed", "0", "--mode", "fast", "--ticks", "1", "--output", os.devnull],
+}
+
+
+def time_process(args: list, cwd: str, repeat: int, timeout: float = 60) -> float:
+    """반환: 벽시계 시간 중앙값(ms). 실패하면 nan."""
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            done = subprocess.run([sys.executable] + args, cwd=cwd, stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return float("nan")     # 예: import만 했는데 브로커 연결을 기다림
+        if done.returncode != 0:
+            return float("nan")
+        times.append((time.perf_counter() - started) * 1000)
+    return statistics.median(times)
+
+
+def time_fleet(copies: int, cache_dir: str) -> float:
+    """설비 config.MACHINES × copies대의 Fleet 준비 시간(ms, 모듈 import 제외, 새 프로세스에서 처음 한 번).
+    cache_dir: 이 실행에서 쓸 명세 디스크 캐시 디렉터리."""
+    code = ("import time; from config import SIMULATION_CONFIG; "
+            f"SIMULATION_CONFIG['spec_cache_dir'] = {cache_dir!r}; "
+            "from fleet import Fleet; from fleetspec import fleet_spec; import numpy; "
+            "t = time.perf_counter(); "
+            f"Fleet(spec=fleet_spec(copies={copies}), seed=0); "
+            "print((time.perf_counter() - t) * 1000)")
+    done = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, timeout=120)
+    return float(done.stdout) if done.returncode == 0 else float("nan")
+
+
+def extract_tree(ref: str, directory: str) -> str:
+    """git ref의 simulator/를 directory에 풉니다. 반환: 그 simulator 디렉터리."""
+    archive = subprocess.run(["git", "archive", "--format=tar", ref, "simulator"], cwd=ROOT,
+                             capture_output=True, check=True).stdout
+    with tempfile.TemporaryFile() as f:
+        f.write(archive)
+        f.seek(0)
+        with tarfile.open(fileobj=f) as tar:
+            tar.extractall(directory)
+    return os.path.join(directory, "simulator")
+
+
+def time_module(tree: str, module: str, repeat: int, timeout: float) -> tuple:
+    """tree(simulator 디렉터리)에서 (--help ms, import ms). 모듈이 없으면 (None, None)."""
+    if not os.path.exists(os.path.join(tree, module + ".py")):
+        return None, None
+    help_ms = time_process([os.path.join(tree, module + ".py"), "--help"], tree, repeat, timeout)
+    import_ms = time_process(["-c", f"import {module}"], tree, repeat, timeout)
+    return help_ms, import_ms
+
+
+def _ms(value) -> str:
+    return f"{'-':>11}" if value is None else f"{value:>11.1f}"
+
+
+def _ratio(before, after) -> str:
+    # 예전 / 지금: 1보다 크면 빨라진 것
+    if before is None or after is None or math.isnan(before) or math.isnan(after):
+        return f"{'-':>8}"
+    return f"{before / after:>7.1f}x"
+
+
+def compare(ref: str, commands: list, repeat: int, timeout: float):
+    """ref 트리와 지금 트리의 명령별 시작 시간 비교표를 출력합니다."""
+    with tempfile.TemporaryDirectory() as directory:
+        before_tree = extract_tree(ref, directory)
+        print(f"기준: {ref} → 지금 작업 트리 (python simulator/<모듈>.py --help, import <모듈>)")
+        print(f"{'command':<20}{'ref help':>11}{'help':>11}{'':>8}{'ref import':>11}{'import':>11}")
+        for command in commands:
+            module, _ = COMMANDS[command]
+            before_help, before_import = time_module(before_tree, module, repeat, timeout)
+            after_help, after_import = time_module(HERE, module, repeat, timeout)
+            print(f"{command:<20}{_ms(before_help)}{_ms(after_help)}{_ratio(before_help, after_help)}"
+                  f"{_ms(before_import)}{_ms(after_import)}{_ratio(before_import, after_import)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="명령별 시작 시간 측정")
+    parser.add_argument("--commands", nargs="+", default=[c for c in COMMANDS if c != "bench-startup"],
+                        choices=list(COMMANDS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 200, 2000],
+                        help="Fleet 준비 시간을 잴 설비 복제 배수")
+    parser.add_argument("--baseline", metavar="REF", default=None,
+                        help="이 git ref(커밋 / 태그 / 브랜치)의 simulator/와 전후 비교")
+    parser.add_argument("--timeout", type=float, default=10.0,
+                        help="실행 한 번의 제한 시간(초), 넘으면 nan")
+    args = parser.parse_args(argv)
+
+    print(f"python -c pass:      {time_process(['-c', 'pass'], ROOT, args.repeat):8.1f} ms")
+    print(f"python -m simulator: {time_process(['-m', 'simulator'], ROOT, args.repeat):8.1f} ms")
+    print()
+    print(f"{'command':<20}{'help ms':>10}{'import ms':>11}{'run ms':>10}")
+    for command in args.commands:
+        module, _ = COMMANDS[command]
+        help_ms = time_process(["-m", "simulator", command, "--help"], ROOT, args.repeat, args.timeout)
+        import_ms = time_process(["-c", f"import {module}"], HERE, args.repeat, args.timeout)
+        run = RUNS.get(command)
+        run_ms = (f"{time_process(['-m', 'simulator', command] + run, ROOT, args.repeat, args.timeout):10.1f}"
+                  if run else f"{'-':>10}")
+        print(f"{command:<20}{help_ms:>10.1f}{import_ms:>11.1f}{run_ms}")
+
+    if args.baseline:
+        print()
+        compare(args.baseline, args.commands, args.repeat, args.timeout)
+
+    print()
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for copies in args.copies:
+            cold = time_fleet(copies, os.path.join(cache_dir, str(copies)))
+            warm = time_fleet(copies, os.path.join(cache_dir, str(copies)))
+            print(f"Fleet 준비 (설비 {copies}배): 명세 캐시 없음 {cold:8.1f} ms, 디스크 캐시 {warm:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
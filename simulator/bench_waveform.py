@@ -0,0 +1,82 @@
+"""
+진동 파형 엣지 처리(waveform.py) 벤치마크: 원시 파형 발행 vs 특징 발행.
+
+Fleet을 --seconds틱 돌리면서 진동 센서마다 파형 블록을 만들고 (생성 시간은 따로 잼), 두 방식을 비교합니다.
+  - raw:      모든 블록을 원시 payload(encode_raw)로 인코딩
+  - features: EdgeProcessor로 특징 추출 → 설비별 JSON + 트리거 앞뒤의 원시 블록만 인코딩
+출력: 초당 바이트(대역폭), 틱당 CPU 시간(ms)과 실시간 1초 대비 비율, 블록당 특징 추출 시간(µs)
+      원시 블록을 남긴 비율, 이상 블록(Fleet.is_anomaly) 중 원시 파형이 남은 비율, 정상 블록 중 남은 비율
+MQTT 발행 자체의 비용은 payload 크기에 비례하므로 여기서는 인코딩까지만 잽니다.
+
+실행: python simulator/bench_waveform.py --copies 5 --seconds 600
+"""
+import argparse
+import json
+import time
+
+from lazy import np
+
+from config import MACHINES, WAVEFORM_CONFIG
+from fleet import Fleet, expand_machines
+from waveform import EdgeProcessor, WaveformGenerator, encode_raw
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="진동 파형: 원시 발행 vs 엣지 특징 발행")
+    parser.add_argument("--copies", type=int, default=5, help="config.MACHINES 복제 배수")
+    parser.add_argument("--seconds", type=int, default=600, help="시뮬레이션 틱 수 (틱 = 블록 1개)")
+    parser.add_argument("--sample-rate", type=int, default=WAVEFORM_CONFIG["sample_rate"])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    fleet = Fleet(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES, seed=args.seed)
+    generator = WaveformGenerator(fleet, sample_rate=args.sample_rate)
+    edge = EdgeProcessor(generator)
+    sensors = len(generator)
+    print(f"설비 {len(fleet)}대, 진동 센서 {sensors}개 × {generator.sample_rate:,} Hz "
+          f"(블록 {generator.samples:,}샘플), {args.seconds}틱")
+
+    generate = raw_cpu = edge_cpu = extract_cpu = 0.0
+    raw_bytes = feature_bytes = kept_bytes = 0
+    anomalous = np.zeros((args.seconds, sensors), dtype=bool)
+    kept = np.zeros((args.seconds, sensors), dtype=bool)
+    for tick in range(args.seconds):
+        fleet.step()
+        began = time.perf_counter()
+        blocks = generator.block(fleet)
+        generate += time.perf_counter() - began
+        anomalous[tick] = fleet.is_anomaly[generator.index]
+
+        # 원시: 모든 블록을 그대로
+        began = time.perf_counter()
+        raw_bytes += sum(len(encode_raw(block, tick * 1000, generator.sample_rate)) for block in blocks)
+        raw_cpu += time.perf_counter() - began
+
+        # 특징: 추출 + JSON + 트리거 앞뒤 원시 블록
+        began = time.perf_counter()
+        features, triggered, raw = edge.process(blocks, tick * 1000)
+        extracted = time.perf_counter()
+        for record in edge.records(features, triggered, ""):
+            feature_bytes += len(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        for i, start_ms, block in raw:
+            kept_bytes += len(encode_raw(block, start_ms, generator.sample_rate))
+            kept[start_ms // 1000, i] = True
+        edge_cpu += time.perf_counter() - began
+        extract_cpu += extracted - began
+
+    ticks = args.seconds
+    edge_bytes = feature_bytes + kept_bytes
+    print(f"파형 생성 (시뮬레이터 쪽, 비교에서 제외): {generate / ticks * 1e3:.2f} ms/틱")
+    print(f"{'mode':<10}{'KB/s':>12}{'ms/tick':>10}{'CPU':>8}")
+    print(f"{'raw':<10}{raw_bytes / ticks / 1024:>12,.1f}{raw_cpu / ticks * 1e3:>10.2f}{raw_cpu / ticks:>8.1%}")
+    print(f"{'features':<10}{edge_bytes / ticks / 1024:>12,.1f}{edge_cpu / ticks * 1e3:>10.2f}{edge_cpu / ticks:>8.1%}"
+          f"   (특징 {feature_bytes / ticks / 1024:,.1f} KB/s + 원시 {kept_bytes / ticks / 1024:,.1f} KB/s)")
+    print(f"대역폭 {raw_bytes / edge_bytes:.1f}배 감소 (특징만: {raw_bytes / feature_bytes:,.0f}배) | "
+          f"특징 추출 {extract_cpu / (ticks * sensors) * 1e6:.0f} µs/블록")
+    normal = ~anomalous
+    print(f"원시 블록 보관 {kept.mean():.1%} | 이상 블록 중 보관 {kept[anomalous].mean():.1%} | "
+          f"정상 블록 중 보관 {kept[normal].mean():.1%} | 트리거 {edge.stats()['triggers']}회")
+
+
+if __name__ == "__main__":
+    main()
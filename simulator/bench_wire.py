@@ -0,0 +1,84 @@
+"""
+JSON vs 바이너리 전송 포맷 벤치마크.
+
+설비 데이터 1건(reading)당 바이트 수와 인코딩/디코딩 시간을 비교합니다.
+  - json:          지금 방식 (설비마다 json.dumps → 브릿지에서 json.loads)
+  - binary-single: 바이너리, 설비마다 프레임 1개
+  - binary-frame:  바이너리, 틱마다 전체 설비를 프레임 1개로 (FleetEncoder)
+
+실행: python simulator/bench_wire.py --copies 200 --ticks 20
+"""
+import argparse
+import json
+import time
+
+from config import MACHINES
+from fleet import Fleet, expand_machines
+from wire import WireSchema, FleetEncoder, epoch_ms
+
+TIMESTAMP = "2026-01-01T00:00:00+00:00"
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(copies: int, ticks: int) -> list:
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    fleet = Fleet(machines, seed=0)
+    schema = WireSchema(machines)
+    encoder = FleetEncoder(fleet, schema)
+    base_ts = epoch_ms(TIMESTAMP)
+
+    totals = {name: {"bytes": 0, "encode": 0.0, "decode": 0.0}
+              for name in ("json", "binary-single", "binary-frame")}
+    readings = 0
+    for _ in range(ticks):
+        fleet.step()
+        records = fleet.records(TIMESTAMP)
+        readings += len(records)
+
+        payloads, t = _timed(lambda: [json.dumps(r, ensure_ascii=False).encode("utf-8") for r in records])
+        _, t2 = _timed(lambda: [json.loads(p) for p in payloads])
+        _add(totals["json"], payloads, t, t2)
+
+        payloads, t = _timed(lambda: [schema.encode_records([r]) for r in records])
+        _, t2 = _timed(lambda: [schema.decode(p) for p in payloads])
+        _add(totals["binary-single"], payloads, t, t2)
+
+        payloads, t = _timed(lambda: [encoder.encode(fleet, base_ts)])
+        _, t2 = _timed(lambda: [schema.decode(p) for p in payloads])
+        _add(totals["binary-frame"], payloads, t, t2)
+
+    return [{
+        "format": name,
+        "bytes_per_reading": round(total["bytes"] / readings, 1),
+        "encode_us_per_reading": round(total["encode"] / readings * 1e6, 2),
+        "decode_us_per_reading": round(total["decode"] / readings * 1e6, 2),
+    } for name, total in totals.items()]
+
+
+def _add(total: dict, payloads: list, encode: float, decode: float):
+    total["bytes"] += sum(len(p) for p in payloads)
+    total["encode"] += encode
+    total["decode"] += decode
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON vs 바이너리 포맷 벤치마크")
+    parser.add_argument("--copies", type=int, default=200, help="config.MACHINES 복제 배수")
+    parser.add_argument("--ticks", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = run(args.copies, args.ticks)
+    print(f"설비 {len(MACHINES) * args.copies}대 × {args.ticks}틱")
+    print(f"{'format':<15}{'bytes/reading':>15}{'encode µs':>12}{'decode µs':>12}")
+    for r in results:
+        print(f"{r['format']:<15}{r['bytes_per_reading']:>15}"
+              f"{r['encode_us_per_reading']:>12}{r['decode_us_per_reading']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,118 @@
-import json
-import paho.mqtt.client as mqtt
-from kafka import KafkaProducer
-
-# ① Kafka Producer 생성
-producer = KafkaProducer(
-    bootstrap_servers=['127.0.0.1:9094'],
-    value_serializer=lambda x: json.dumps(x).encode('utf-8'),
-    api_version=(2, 5, 0)
-)
-
-# ② MQTT 연결 시
-def on_connect(client, userdata, flags, rc, properties):
-    print("MQTT 연결 성공!")
-    client.subscribe("factory/#")
-
-# ③ MQTT 메시지 수신 시 → Kafka로 전달
-def on_message(client, userdata, msg):
-    data = json.loads(msg.payload)
-    
+"""
+MQTT → Kafka 브릿지.
+
+실행: python simulator/bridge.py  (또는 python -m simulator bridge)
+  --mode pipelined  큐 + 배치 전송 (forwarder.py, 기본값은 BRIDGE_CONFIG["mode"])
+  --mode sync       메시지마다 전송 완료를 기다림
+두 모드 모두 키 / 파티션 / 경고 분리는 forwarder.PayloadRouter (topics.Partitioner, KAFKA_CONFIG["partitioner"])
+  --copies N        발행기와 같은 설비 구성으로 프레임을 나누고 경고를 읽음 (fleet_publisher --copies N)
+여러 개를 띄워 나눠 받으려면 shared_bridge.py (MQTT v5 공유 구독)
+"""
+import argparse
+import threading
+import time
+
+from config import MACHINES, MQTT_CONFIG, KAFKA_CONFIG, BRIDGE_CONFIG
+
+
+def run(mode: str = None, copies: int = 1):
+    """브릿지를 띄우고 Ctrl+C까지 MQTT 메시지를 Kafka로 전달합니다."""
+    # 무거운 모듈(paho, kafka, numpy)은 실행할 때만 불러옴 → --help / import는 바로 끝남
+    import paho.mqtt.client as mqtt
+    from fleet import expand_machines
+    from forwarder import KafkaForwarder, PayloadRouter, create_producer, report_forever
+    from metrics import start_metrics, StageMetrics
+    from wire import WireSchema
+
+    mode = mode or BRIDGE_CONFIG["mode"]
+    pipelined = mode == "pipelined"
+    schema = WireSchema(expand_machines(MACHINES, copies) if copies > 1 else MACHINES)
+
+    # 계측: 시뮬레이터 → 브릿지 지연, 설비별 seq(유실/중복/순서), 처리량, 큐 길이 → /metrics
+    metrics = start_metrics("bridge")
+    stage = StageMetrics(metrics, "bridge", schema)
+
+    # ① Kafka Producer 생성
+    forwarder = None
+    if pipelined:
+        # 큐 + 배치 전송: 값은 MQTT payload(bytes)를 그대로 전달
+        producer = create_producer()
+        forwarder = KafkaForwarder(producer, metrics=metrics, schema=schema)
+        forwarder.start()
+        threading.Thread(target=report_forever, args=(forwarder,), daemon=True).start()
+    else:
+        from kafka import KafkaProducer
+        # 값은 MQTT payload(bytes)를 그대로 보냄 (sensor-alert로 보내는 경고 레코드만 JSON으로 만듦)
+        producer = KafkaProducer(
+            bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+            api_version=KAFKA_CONFIG["api_version"]
+        )
+        # pipelined와 같은 파티션 배정 (설비별 순서 / location 전략)
+        router = PayloadRouter.for_topics(producer, KAFKA_CONFIG["raw_topic"], KAFKA_CONFIG["alert_topic"], schema)
+
+    # ② MQTT 연결 시
+    def on_connect(client, userdata, flags, rc, properties):
+        print("MQTT 연결 성공!")
+        client.subscribe(MQTT_CONFIG["topic"])
+
+    # ③ MQTT 메시지 수신 시 → Kafka로 전달
+    def on_message(client, userdata, msg):
+        try:
+            stage.observe_payload(msg.payload)
+        except ValueError:
+            pass  # 형식 오류는 아래 전송 단계에서 처리 / 집계
+
+        if pipelined:
+            forwarder.submit(msg.payload)  # 큐에 넣고 바로 반환 (네트워크 스레드를 막지 않음)
+            return
+
+        # JSON은 machine_id 키로 Partitioner가 정한 파티션에, 프레임은 파티션별로 나눠서
+        # WARNING / ANOMALY 레코드는 sensor-alert로 (dict는 경고 레코드만 만듦)
+        try:
+            raw, alerts = router.route(msg.payload)
+        except ValueError as e:
+            print(f"[ERROR] 잘못된 메시지 형식: {e}")
+            return
+
+        try:
+            sent_at = time.perf_counter()
+            futures = [producer.send(KAFKA_CONFIG["raw_topic"], key=key, value=value, partition=partition)
+                       for partition, key, value in raw]
+            for future in futures:
+                future.get(timeout=5)  # 결과를 기다림 (에러 시 바로 표시)
+            metrics.histogram("bridge_to_kafka").record_seconds(time.perf_counter() - sent_at)
+
+            for partition, key, value in alerts:
+                producer.send(KAFKA_CONFIG["alert_topic"], key=key, value=value, partition=partition).get(timeout=5)
+
+            label = raw[0][1].decode("utf-8") if len(raw) == 1 and raw[0][1] else f"프레임 {len(raw)}조각"
+            print(f"[→ Kafka] {label} → 파티션 {', '.join(str(p) for p, _, _ in raw)}"
+                  f"{f' (경고 {len(alerts)}건)' if alerts else ''}")
+        except Exception as e:
+            print(f"[ERROR] Kafka 전송 실패: {e}")
+
+    # ④ MQTT 클라이언트 (subscriber.py와 동일)
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(MQTT_CONFIG["host"], MQTT_CONFIG["port"])
+
+    print(f"MQTT-Kafka Bridge 시작! (mode={mode})")
     try:
-        future = producer.send('sensor-raw', value=data)
-        result = future.get(timeout=5)  # 결과를 기다림 (에러 시 바로 표시)
-        
-        if data["status"] in ["WARNING","ANOMALY"]:
-            producer.send('sensor-alert', value=data).get(timeout=5)
-        
-        print(f"[→ Kafka] {data['machine_id']} - {data['status']}")
-    except Exception as e:
-        print(f"[ERROR] Kafka 전송 실패: {e}")
-
-# ④ MQTT 클라이언트 (subscriber.py와 동일)
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-client.on_connect = on_connect
-client.on_message = on_message
-client.connect("localhost", 1883)
-
-print("MQTT-Kafka Bridge 시작!")
-client.loop_forever()
\ No newline at end of file
+        client.loop_forever()
+    finally:
+        if forwarder is not None:
+            forwarder.stop()  # 큐에 남은 메시지까지 전송 후 종료
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MQTT → Kafka 브릿지")
+    parser.add_argument("--mode", choices=("pipelined", "sync"), default=BRIDGE_CONFIG["mode"],
+                        help="pipelined(큐 + 배치 전송) 또는 sync(메시지마다 전송 완료 대기)")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+    run(args.mode, args.copies)
+
+
+if __name__ == "__main__":
+    main()
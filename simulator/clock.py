@@ -0,0 +1,75 @@
+"""
+시뮬레이션 시계.
+
+데이터의 timestamp는 실제 시각(datetime.now)이 아니라 시뮬레이션 시각
+(start + tick × interval)으로 찍힙니다. 그래서 실행 속도와 상관없이 같은 데이터가 나옵니다.
+
+모드:
+  - realtime:    interval마다 1틱 (기존 동작)
+  - accelerated: speed배 빠르게 (예: speed=60 → 1분치를 1초에)
+  - fast:        기다리지 않고 최대한 빠르게 (과거 데이터 백필용)
+
+대기는 "시작 시각 + n × 간격"이라는 절대 마감 시각 기준이라 오차가 누적되지 않습니다.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+CLOCK_MODES = ("realtime", "accelerated", "fast")
+
+# seed를 지정했는데 시작 시각을 주지 않았을 때 쓰는 고정 시작 시각 (재현성 보장)
+DEFAULT_REPLAY_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_start(value: str) -> datetime:
+    """ISO 형식 문자열을 UTC datetime으로 변환합니다. (시간대가 없으면 UTC로 간주)"""
+    start = datetime.fromisoformat(value)
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    return start.astimezone(timezone.utc)
+
+
+class SimClock:
+    """틱 번호 ↔ 시뮬레이션 시각 변환과 실행 속도 조절을 담당합니다."""
+
+    def __init__(self, interval: float = 1.0, mode: str = "realtime",
+                 speed: float = 1.0, start: datetime = None, wall_start: float = None):
+        if mode not in CLOCK_MODES:
+            raise ValueError(f"알 수 없는 시계 모드: {mode}")
+        if mode == "realtime":
+            speed = 1.0
+        if speed <= 0:
+            raise ValueError("speed는 0보다 커야 합니다.")
+
+        self.interval = interval
+        self.mode = mode
+        self.speed = speed
+        self.start = start or datetime.now(timezone.utc).replace(microsecond=0)
+        self.tick = 0
+        self.late_ticks = 0        # 마감 시각을 이미 넘긴 채로 도착한 틱 수
+
+        # 여러 프로세스가 같은 박자로 움직이도록 time.monotonic() 기준 시작 시각을 넘겨받을 수 있음
+        self._wall_start = time.monotonic() if wall_start is None else wall_start
+        self._wall_interval = interval / speed
+
+    def now(self) -> datetime:
+        """현재 틱의 시뮬레이션 시각."""
+        return self.start + timedelta(seconds=self.tick * self.interval)
+
+    def timestamp(self) -> str:
+        return self.now().isoformat()
+
+    def epoch(self) -> float:
+        """현재 틱의 시뮬레이션 시각 (epoch 초)."""
+        return self.start.timestamp() + self.tick * self.interval
+
+    def advance(self):
+        """다음 틱으로 넘어갑니다. fast 모드가 아니면 다음 틱의 실제 마감 시각까지 기다립니다."""
+        self.tick += 1
+        if self.mode == "fast":
+            return
+        deadline = self._wall_start + self.tick * self._wall_interval
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        else:
+            self.late_ticks += 1
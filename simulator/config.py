@@ -2,6 +2,7 @@
 공장 설비 및 센서 구성 정보.
 실제 공장의 설비 사양을 참고하여 현실적인 범위로 설정.
 """
+import os
 
 # 설비 정의
 MACHINES = {
@@ -24,7 +25,8 @@ MACHINES = {
             "hydraulic_pressure": {"unit": "bar", "base": 150, "noise": 5, "min": 0, "max": 300, "alert": 250},
             "oil_temp":           {"unit": "°C", "base": 55,  "noise": 3, "min": 20, "max": 100, "alert": 85},
             "vibration":          {"unit": "mm/s","base": 1.2, "noise": 0.2, "min": 0, "max": 15, "alert": 5.0},
-            "cycle_count":        {"unit": "회",  "base": 0,   "noise": 0,  "min": 0, "max": 999999, "alert": -1},
+            "cycle_count":        {"unit": "회",  "base": 0,   "noise": 0,  "min": 0, "max": 999999, "alert": -1,
+                                   "deadband": 0, "heartbeat": 300},
             "power_consumption":  {"unit": "kW",  "base": 18,  "noise": 2, "min": 0, "max": 50, "alert": 40},
         }
     },
@@ -54,15 +56,21 @@ MACHINES = {
         "location": "A동 전력실",
         "sensors": {
             "total_power":    {"unit": "kW",  "base": 150, "noise": 10, "min": 0, "max": 500, "alert": 400},
-            "power_factor":   {"unit": "",    "base": 0.92, "noise": 0.02, "min": 0, "max": 1, "alert": 0.8},
+            "power_factor":   {"unit": "",    "base": 0.92, "noise": 0.02, "min": 0, "max": 1, "alert": 0.8,
+                               "deadband": 0.05},
             "voltage_r":      {"unit": "V",   "base": 380, "noise": 3, "min": 340, "max": 420, "alert": 400},
             "voltage_s":      {"unit": "V",   "base": 380, "noise": 3, "min": 340, "max": 420, "alert": 400},
             "voltage_t":      {"unit": "V",   "base": 380, "noise": 3, "min": 340, "max": 420, "alert": 400},
-            "frequency":      {"unit": "Hz",  "base": 60,  "noise": 0.1, "min": 59, "max": 61, "alert": 60.5},
+            "frequency":      {"unit": "Hz",  "base": 60,  "noise": 0.1, "min": 59, "max": 61, "alert": 60.5,
+                               "deadband": 0.2},
         }
     }
 }
 
+# 센서별 선택 항목 (변화 보고 모드, deadband.py):
+#   "deadband":  이만큼 넘게 변해야 발행 (생략하면 DEADBAND_CONFIG["noise_multiple"] × noise)
+#   "heartbeat": 변화가 없어도 이 시간(초)마다 한 번은 발행 (생략하면 DEADBAND_CONFIG["heartbeat"])
+
 # 이상 패턴 설정
 ANOMALY_CONFIG = {
     "probability": 0.02,        # 매 초 2% 확률로 이상 발생
@@ -72,6 +80,264 @@ ANOMALY_CONFIG = {
 
 # 시뮬레이션 설정
 SIMULATION_CONFIG = {
-    "interval_seconds": 1.0,    # 데이터 생성 간격
-    "output_format": "json",    # json 또는 csv
+    "interval_seconds": 1.0,    # 데이터 생성 간격 (시뮬레이션 시간 기준)
+    "output_format": "json",    # json(설비별 메시지) 또는 binary(틱마다 전체 설비를 프레임 하나로, wire.py)
+    "seed": None,               # 정수를 주면 같은 데이터를 재현 (None이면 매번 랜덤)
+    "clock_mode": "realtime",   # realtime / accelerated / fast
+    "speed": 1.0,               # accelerated 모드 배속
+    "start_time": None,         # 시뮬레이션 시작 시각 (ISO 형식, None이면 현재 시각)
+    "spec_cache_dir": "fleetspec_cache",    # 검증한 설비 명세(fleetspec.py) 디스크 캐시, None이면 프로세스 안에서만
+}
+
+# 변화 보고(report-by-exception) 모드 설정 (deadband.py)
+#   센서 값이 deadband를 넘게 변했거나, 경고 / 이상 상태가 바뀌었거나, heartbeat 시간 동안 조용했을 때만 발행
+#   레코드에는 바뀐 센서만 담고 "partial": True를 붙임 → 컨슈머는 StateReconstructor로 전체 상태 복원
+DEADBAND_CONFIG = {
+    "enabled": False,           # main.py / fleet_publisher.py의 --deadband 기본값
+    "noise_multiple": 3.0,      # 센서에 deadband가 없을 때: noise × 이 값
+    "heartbeat": 60.0,          # 최대 침묵 시간(초)
+}
+
+# 진동 파형 + 엣지 특징 추출 (waveform.py)
+#   vibration* 센서마다 sample_rate Hz 파형 블록을 만들고, 엣지에서 RMS / peak / crest / kurtosis / 대역별 RMS만
+#   1초마다 발행. 원시 파형은 트리거(기준 대비 RMS 상승 또는 kurtosis) 앞뒤로만 발행
+WAVEFORM_CONFIG = {
+    "enabled": False,               # main.py --waveform 기본값
+    "sensor_prefix": "vibration",   # 파형을 만들 센서 (이름 접두사)
+    "sample_rate": 10_240,          # Hz
+    "block_seconds": 1.0,           # 블록 길이 = 시뮬레이션 틱 간격
+    "shaft_hz": {"PRESS": 20.0, "CONVEYOR": 24.5},  # 회전 주파수. spindle_rpm 센서가 있으면 그 값 / 60
+    "default_shaft_hz": 25.0,
+    "bearing_order": 3.58,          # 베어링 외륜 결함 주파수(BPFO) = 회전 주파수 × 이 값
+    "resonance_hz": 3_000.0,        # 결함 충격이 울리는 구조 공진 주파수
+    "bands": [0, 10, 100, 500, 1_000, 2_000, 5_120],  # 스펙트럼 대역 경계(Hz) → 대역별 RMS
+    "trigger_rms_ratio": 1.4,       # RMS가 기준 RMS × 이 값을 넘으면 트리거 후보
+    "trigger_kurtosis": 4.0,        # kurtosis가 이 값을 넘으면 트리거 후보 (충격성 신호, 정상 ≈ 1.5~2)
+    "trigger_blocks": 2,            # 후보가 이만큼 연속되어야 트리거 (앞 블록은 pre_blocks로 함께 발행)
+    "baseline_alpha": 0.02,         # 기준 RMS(EWMA) 갱신 계수. 트리거 후보가 아닐 때만 갱신 → 드리프트만 따라감
+    "pre_blocks": 5,                # 트리거 전 원시 블록을 이만큼 보관했다가 함께 발행
+    "post_blocks": 5,               # 마지막 트리거 후 이만큼 더 발행
+    "topic": "edge/{machine_id}/vibration",              # 특징 (JSON). factory/# 밖 → 브릿지가 sensor-raw로 보내지 않음
+    "raw_topic": "edge/{machine_id}/vibration/{sensor}/raw",   # 원시 블록 (바이너리)
+}
+
+# MQTT 브로커 접속 설정
+MQTT_CONFIG = {
+    "host": "localhost",
+    "port": 1883,
+    "topic": "factory/#",
+}
+
+# Kafka 접속 설정
+KAFKA_CONFIG = {
+    "bootstrap_servers": ["127.0.0.1:9094"],  # Windows 외부 접속용
+    "api_version": (2, 5, 0),
+    "raw_topic": "sensor-raw",
+    "alert_topic": "sensor-alert",
+    # 풀 수 없거나 적재할 수 없는 메시지를 원본 그대로 보내는 토픽 (topics.DeadLetters, ""이면 로그만 남김)
+    "dead_letter_topic": "sensor-dead-letter",
+    # 토픽 구성 (topics.py로 생성). 키는 machine_id → 설비별 순서는 파티션 안에서 보장
+    "partitions": {"sensor-raw": 12, "sensor-alert": 3, "sensor-dead-letter": 1},
+    "replication_factor": 1,
+    "partitioner": "hash",      # hash(설비별로 고르게 분산) 또는 location(같은 라인은 같은 파티션)
+}
+
+# 컨슈머 그룹 워커 템플릿 설정 (consumer_group.py)
+CONSUMER_GROUP_CONFIG = {
+    "group_id": "partition-workers",
+    "max_pending": 10_000,      # 파티션 워커 큐에 밀린 메시지가 이만큼 넘으면 그 파티션만 일시 정지
+    "commit_interval": 2.0,     # 처리 완료된 오프셋 커밋 주기(초)
+    "stats_interval": 5.0,
+}
+
+# MQTT → Kafka 브릿지 설정
+BRIDGE_CONFIG = {
+    "mode": "pipelined",            # pipelined(큐 + 배치 전송) 또는 sync(메시지마다 전송 완료 대기)
+    "queue_size": 100_000,          # 내부 큐 최대 길이 (메시지 수)
+    "max_batch": 2000,              # 전송 스레드가 한 번에 꺼내는 최대 메시지 수
+    "block_timeout": 0.05,          # 큐가 가득 찼을 때 기다리는 최대 시간(초) → 역압
+    "spill_policy": "spool",        # 기다려도 자리가 없거나 Kafka 장애일 때: spool / drop_oldest / drop_newest
+    "linger_ms": 20,                # Kafka 배치를 모으는 최대 대기 시간
+    "batch_size": 256 * 1024,       # 파티션별 Kafka 배치 크기 (bytes)
+    "compression_type": "gzip",     # gzip / snappy / lz4 / zstd / None
+    "acks": 1,
+    "max_block_ms": 1000,           # 브로커 장애 시 send()가 막히는 최대 시간 → 넘으면 스풀로
+    "stats_interval": 5.0,          # 통계 출력 주기(초)
+    # 디스크 스풀 (spool.py)
+    "spool_dir": "bridge_spool",
+    "spool_segment_bytes": 64 * 1024 * 1024,     # 세그먼트 파일 하나의 최대 크기
+    "spool_max_bytes": 2 * 1024 ** 3,           # 스풀 전체 최대 크기
+    "spool_eviction": "drop_oldest",            # 가득 찼을 때: drop_oldest 또는 drop_newest
+    "spool_fsync": "none",                      # none: 묶음마다 OS로 flush (프로세스 종료에 안전) / batch: 묶음마다 fsync
+    "drain_rate": 20_000,           # 복구 후 재전송 최대 속도 (메시지/초) → 브로커에 몰리지 않게
+    "drain_batch": 1000,            # 재전송 배치 크기 (배치마다 ack 확인 후 커밋)
+    "retry_min": 0.5,               # 재시도 백오프 (초, 실패할 때마다 2배)
+    "retry_max": 30.0,
+}
+
+# asyncio 브릿지 (async_bridge.py): 수신 → 디코딩/라우팅 → Kafka 전송 단계를 bounded 큐로 연결
+ASYNC_BRIDGE_CONFIG = {
+    # MQTT 토픽 필터 → Kafka 토픽 (위에서부터 처음 맞는 경로 사용)
+    "routes": [
+        {"mqtt": "factory/#", "raw_topic": "sensor-raw", "alert_topic": "sensor-alert"},
+    ],
+    "decode_workers": 2,            # 디코딩/라우팅 태스크 수 (MQTT 토픽별로 한 워커 → 토픽 안 순서 유지)
+    "send_workers": 4,              # Kafka 전송 태스크 수 (파티션별로 한 워커 → 파티션 안 순서 유지)
+    "inbox_size": 50_000,           # 디코딩 워커별 수신 큐 최대 길이 (메시지 수)
+    "send_queue_size": 20_000,      # 전송 워커별 큐 최대 길이
+    "max_batch": 2000,              # 워커가 한 번에 꺼내는 최대 메시지 수
+    "block_timeout": 0.05,          # 수신 큐가 가득 찼을 때 MQTT 스레드가 기다리는 최대 시간(초) → 넘으면 버림
+    "reconnect_min": 0.5,           # MQTT / Kafka 재연결 백오프 (초, 실패할 때마다 2배)
+    "reconnect_max": 30.0,
+    "ack_timeout": 60.0,            # 전송한 배치의 ack를 기다리는 최대 시간 → 넘으면 재전송
+    "drain_timeout": 30.0,          # 종료 시 남은 메시지를 보내는 최대 시간
+    "stats_interval": 5.0,
+}
+
+# 수평 확장 브릿지 (shared_bridge.py): MQTT v5 공유 구독으로 인스턴스 여러 개가 메시지를 나눠 받음
+SHARED_BRIDGE_CONFIG = {
+    "group": "bridge",              # $share/<group>/<topic> - 같은 그룹의 인스턴스끼리 메시지를 나눠 받음
+    "topic": "factory/#",
+    "qos": 1,                       # 구독 QoS (발행 QoS보다 높게 받지는 않음 → 재시작 시 이어받으려면 발행도 QoS 1)
+    "session_expiry": 300,          # 연결이 끊겨도 브로커가 세션을 유지하는 시간(초) → 같은 instance로 다시 접속하면 이어받음
+    # 상태 보고 토픽 (retained). factory/# 밖에 두어야 브릿지가 자기 상태를 Kafka로 보내지 않음
+    "status_topic": "bridges/{group}/{instance}/status",
+    "health_interval": 5.0,         # 상태 보고 주기(초). 3배 넘게 갱신이 없으면 stale로 표시
+    "handoff_timeout": 10.0,        # 종료 시 구독 해제 → 남은 메시지 전송까지 기다리는 최대 시간(초)
+    "quiet_period": 0.2,            # 구독 해제 후 이 시간 동안 메시지가 없으면 다 받은 것으로 봄(초)
+}
+
+# 최근 이력 캐시 (history.py)
+HISTORY_CONFIG = {
+    "hot_seconds": 600.0,           # 메모리 링 버퍼에 두는 시간 (설비마다)
+    "chunk_seconds": 300.0,         # 이만큼 모이면 cold 세그먼트 파일 하나로 씀 (hot_seconds보다 작게)
+    "cold_dir": "history_cold",
+    "max_cold_bytes": 1024 ** 3,    # cold 세그먼트 전체 최대 크기 → 넘으면 가장 오래 안 쓴 것부터 삭제
+    "max_open_segments": 256,       # 동시에 열어 두는 memmap 수
+    "start_from": "latest",         # sensor-raw 시작 위치: earliest / latest
+}
+
+# 장기 보관용 Parquet 아카이브 (archive.py): {directory}/type=<타입>/date=<UTC 날짜>/machine_id=<설비>/part-*.parquet
+ARCHIVE_CONFIG = {
+    "directory": "archive",
+    "group_id": "archiver",
+    "start_from": "earliest",       # 커밋된 오프셋이 없을 때 시작 위치: earliest / latest
+    "compression": "zstd",
+    "compression_level": 3,
+    "row_group_rows": 600,          # 설비별로 이만큼 모이면 row group 하나로 씀 (조회 시 시각 통계로 건너뛰는 단위)
+    "max_file_rows": 86_400,        # 파일 하나의 최대 행 수 → 넘으면 새 파일
+    "rotate_seconds": 3600.0,       # 이 시간(초)마다 열린 파일을 모두 닫고 오프셋 커밋 (닫힌 파일만 조회 대상)
+    "stats_interval": 10.0,
+}
+
+# 재생기 (replay.py): 과거 sensor-raw / JSON Lines / Parquet 아카이브를 원래 timestamp 간격대로 다시 흘려보냄
+REPLAY_CONFIG = {
+    "source_topic": "sensor-raw",
+    "target_topic": "sensor-replay",    # 운영 토픽(sensor-raw)에 섞이지 않도록 별도 토픽
+    "mode": "accelerated",          # realtime(1배) / accelerated(speed배) / fast(기다리지 않음)
+    "speed": 10.0,
+    "prefetch_batches": 32,         # 읽기 / 디코딩 스레드가 미리 채워 두는 배치 수
+    "fetch_max_records": 5000,      # Kafka poll 한 번에 가져오는 최대 메시지 수
+    "fetch_max_bytes": 64 * 1024 ** 2,
+    "file_batch_records": 5000,     # JSON Lines / 아카이브에서 배치 하나로 읽는 레코드 수
+    "archive_chunk_seconds": 600.0, # 아카이브는 이 구간씩 읽어 시간 순으로 합침
+    "report_interval": 5.0,
+}
+
+# PostgreSQL 접속 설정 (.env와 같은 환경 변수 사용)
+POSTGRES_CONFIG = {
+    "host": os.environ.get("POSTGRES_HOST", "localhost"),
+    "port": int(os.environ.get("POSTGRES_PORT", "5432")),
+    "dbname": os.environ.get("POSTGRES_DB", "factory"),
+    "user": os.environ.get("POSTGRES_USER", "postgres"),
+    "password": os.environ.get("POSTGRES_PASSWORD", ""),
+}
+
+# Kafka(sensor-raw) → PostgreSQL 적재 설정
+SINK_CONFIG = {
+    "group_id": "pg-sink",
+    "method": "copy",            # copy(COPY FROM STDIN) 또는 insert(다중 행 INSERT)
+    "batch_size": 5000,          # 이만큼 모이면 바로 적재 (행 수)
+    "flush_interval": 1.0,       # 덜 모여도 이 시간(초)이 지나면 적재 → 지연 vs DB 부하 조절
+    "max_retries": 5,            # DB 연결 오류 시 재시도 횟수 (초과하면 종료, 오프셋은 커밋 안 됨)
+                                 # 데이터 때문에 실패한 레코드는 재시도하지 않고 dead-letter 토픽으로 보냄
+    "stats_interval": 5.0,
+    # 1분 / 1시간 rollup 증분 갱신 (sql/init.sql factory.refresh_rollups)
+    "rollup_interval": 30.0,         # 갱신 주기(초), 0이면 갱신하지 않음
+    "rollup_lateness": "2 minutes",  # 늦게 도착한 데이터를 반영하려고 다시 계산하는 구간
+    # 보존 기간 (factory.apply_retention, 기준 시각은 적재한 데이터의 가장 늦은 timestamp)
+    "retention": {"raw": "7 days", "1m": "90 days", "1h": "730 days"},
+    # 기준 시각을 고정하려면 ISO 시각 (None이면 적재한 가장 늦은 timestamp)
+    # 어느 쪽이든 적재한 가장 늦은 timestamp보다 뒤로는 가지 않음 → 방금 적재한 파티션은 지우지 않음
+    "retention_as_of": None,
+    "retention_interval": 3600.0,    # 보존 기간 정리 주기(초), 0이면 정리하지 않음
+}
+
+# 윈도우 집계(rollup) 설정
+AGGREGATOR_CONFIG = {
+    "group_id": "aggregator",
+    "topic_prefix": "sensor-agg-",    # 출력 토픽: sensor-agg-1s, sensor-agg-1m, ...
+    # size: 윈도우 길이(초), hop: 이동 간격(초). hop == size면 tumbling, hop < size면 sliding
+    "windows": [
+        {"name": "1s", "size": 1, "hop": 1},
+        {"name": "1m", "size": 60, "hop": 60},
+        {"name": "1h", "size": 3600, "hop": 3600},
+        {"name": "1m-sliding", "size": 60, "hop": 10},
+    ],
+    "allowed_lateness": 5.0,          # 이 시간(초)까지 늦게 온 데이터는 윈도우에 반영
+    "start_from": "latest",           # 체크포인트가 없을 때 시작 위치: earliest / latest
+    "checkpoint_path": "aggregator_checkpoint.json",
+    "checkpoint_interval": 10.0,      # 윈도우 상태 + 오프셋 저장 주기(초)
+}
+
+# 온라인 이상 탐지 설정 (값만 보고 판단, 시뮬레이터의 has_anomaly는 채점용)
+DETECTOR_CONFIG = {
+    "group_id": "detector",
+    "output_topic": "sensor-anomaly",
+    "alpha": 0.05,              # EWMA/EWMV 평활 계수
+    "anomaly_alpha": 0.0025,    # 이상으로 판정된 값은 이 계수로만 반영 (기준선 오염 방지)
+    "warmup": 30,               # 이만큼 본 뒤부터 판정
+    "z_threshold": 4.0,         # |z| 초과 시 이상
+    "cusum_k": 0.5,             # CUSUM 허용 편차 (표준편차 단위)
+    "cusum_h": 8.0,             # CUSUM 판정 임계값
+    "stats_interval": 10.0,
+}
+
+# 경고 에피소드 설정 (alerts.py): 센서값이 alert 기준을 넘는 구간을 OPEN / UPDATE / CLOSE 이벤트로 묶음
+ALERT_CONFIG = {
+    "input_topic": "sensor-raw",    # 정상 복귀도 봐야 하므로 전체 데이터 (sensor-alert만 보면 stale_timeout으로만 닫힘)
+    "output_topic": "sensor-alert-episodes",
+    # 히스테리시스: alert 초과로 열고, alert - clear_ratio × (alert - base) 아래로 내려가야 닫음
+    "clear_ratio": 0.2,
+    "min_duration": 3.0,            # 이 시간(초) 이상 이어져야 OPEN (짧은 튐은 이벤트 없이 버림)
+    "min_clear": 2.0,               # 해제 기준 아래로 이 시간(초) 이상 머물러야 CLOSE
+    "update_interval": 60.0,        # 열린 에피소드의 UPDATE 주기(초). 심각도가 올라가면 바로 UPDATE
+    # 심각도: (peak - alert) / (alert - base)가 이 값 이상인 가장 높은 단계
+    "severity_levels": [(0.0, "minor"), (0.25, "major"), (1.0, "critical")],
+    "stale_timeout": 30.0,          # 이 시간(초, event time) 동안 값이 안 오면 열린 에피소드를 닫음
+    "start_from": "latest",         # 체크포인트가 없을 때 시작 위치: earliest / latest
+    "checkpoint_path": "alerts_checkpoint.json",
+    "checkpoint_interval": 10.0,    # 에피소드 상태 + 오프셋 저장 주기(초)
+    "stats_interval": 10.0,
+}
+
+# 멀티 프로세스 설비군 발행기 설정 (fleet_publisher.py)
+FLEET_PUBLISHER_CONFIG = {
+    "workers": os.cpu_count() or 1,   # 워커 프로세스 수 (워커마다 MQTT 연결 1개)
+    "copies": 1,                      # config.MACHINES 복제 배수 (예: 200 → 설비 1000대)
+    "rate": 1.0,                      # 목표 틱 속도 (틱/초, 설비마다 초당 메시지 수)
+    "report_interval": 5.0,           # 요약 출력 주기(초)
+}
+
+# 파이프라인 계측 설정 (metrics.py)
+METRICS_CONFIG = {
+    "http_host": "127.0.0.1",
+    # 서비스별 로컬 HTTP 엔드포인트 포트 (GET /metrics). 없으면 HTTP 엔드포인트를 열지 않음
+    "http_ports": {"bridge": 9201, "pg_sink": 9202, "aggregator": 9203,
+                   "detector": 9204, "subscriber": 9205, "alerts": 9206,
+                   "archiver": 9207},
+    "snapshot_dir": None,         # 지정하면 {snapshot_dir}/{서비스}.json에 주기적으로 스냅샷 저장
+    "snapshot_interval": 5.0,
+    "histogram_bits": 7,          # 히스토그램 정밀도 (상대 오차 2^-(bits-1) ≈ 1.6%)
+    "sequence_window": 1024,      # 늦게 도착한 seq를 '순서 뒤바뀜'으로 인정하는 범위
 }
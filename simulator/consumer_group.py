@@ -0,0 +1,279 @@
+"""
+sensor-raw 컨슈머 그룹 워커 템플릿.
+
+브릿지가 machine_id 기준으로 파티션을 정하므로(topics.py) 한 설비의 데이터는 항상 한 파티션에 순서대로 있습니다.
+이 템플릿은 파티션마다 워커 스레드를 하나씩 두고 그 파티션의 메시지를 순서대로 처리합니다.
+  - poll 스레드는 메시지를 파티션 워커 큐에 넣기만 함 → 파티션끼리는 병렬, 파티션 안(= 설비별)은 순서 유지
+  - 워커가 처리를 끝낸 위치까지만 오프셋을 커밋 (at-least-once)
+  - 한 파티션이 밀리면 그 파티션만 pause, 따라잡으면 resume (다른 파티션은 계속 진행)
+  - 리밸런스로 파티션을 뺏기면 그 워커가 받은 것까지 처리하고 커밋한 뒤 멈춤
+  - 풀 수 없는 메시지(스키마에 없는 설비 등)는 dead-letter 토픽으로 보내고 다음 메시지로 (topics.DeadLetters)
+    handler가 실패하면 그 파티션은 커밋하지 않고 멈춤 (재시작하면 그 위치부터)
+  - --processes N: 같은 그룹에 컨슈머 프로세스를 N개 띄움 → 파티션이 프로세스에 나눠 배정됨
+    (GIL 때문에 CPU를 많이 쓰는 처리는 스레드보다 프로세스로 늘려야 파티션 수만큼 확장됨)
+
+실제 처리는 handler(batch, partition)만 바꿔 끼우면 됩니다. batch는 메시지 하나의 ReadingBatch(batch.py)이고
+dict 레코드가 필요하면 batch.to_records()로 바꿉니다. 기본 handler는 설비별 seq로 순서를 확인합니다.
+
+실행: python simulator/consumer_group.py --processes 4
+      python simulator/consumer_group.py --copies 200 --group my-workers
+"""
+import argparse
+import multiprocessing as mp
+import queue
+import threading
+import time
+
+from config import MACHINES, KAFKA_CONFIG, CONSUMER_GROUP_CONFIG
+from metrics import SequenceTracker
+from wire import WireSchema
+from batch import ReadingBatch
+from topics import DeadLetters
+
+
+class PartitionWorker:
+    """파티션 하나를 맡아 메시지 묶음을 순서대로 처리하는 스레드."""
+
+    def __init__(self, partition, handler, schema: WireSchema = None, dead_letters: DeadLetters = None):
+        self.partition = partition      # TopicPartition
+        self.handler = handler
+        self.schema = schema
+        self.dead_letters = DeadLetters("consumer_group") if dead_letters is None else dead_letters
+        self._queue = queue.Queue()
+        self.pending = 0                # 큐에 들어 있는 메시지 수
+        self.offset = None              # 처리를 끝낸 다음 오프셋 (커밋할 위치)
+        self.committed = None
+        self.processed = 0
+        self.records = 0
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name=f"partition-{partition.partition}", daemon=True)
+        self._thread.start()
+
+    def submit(self, messages: list):
+        self.pending += len(messages)
+        self._queue.put(messages)
+
+    def _run(self):
+        while True:
+            messages = self._queue.get()
+            if messages is None:
+                return
+            try:
+                for msg in messages:
+                    try:
+                        batch = ReadingBatch.from_payload(msg.value, self.schema)
+                    except ValueError as e:     # WireFormatError, 깨진 JSON → 건너뜀 (멈추면 파티션 전체가 막힘)
+                        self.dead_letters.add(msg.value, e, msg.key)
+                    else:
+                        self.handler(batch, self.partition.partition)
+                        self.records += len(batch)
+                    self.offset = msg.offset + 1
+                    self.processed += 1
+            except Exception as e:
+                # 처리하지 못한 메시지부터 커밋하지 않고 멈춤 → 재시작하면 그 위치부터 다시 읽음
+                self.error = e
+                print(f"[ERROR] 파티션 {self.partition.partition} 처리 실패: {e}")
+                return
+            finally:
+                self.pending -= len(messages)
+
+    def stop(self, timeout: float = 30.0):
+        """큐에 받은 메시지까지 처리하고 멈춥니다."""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+class PartitionedConsumer:
+    """컨슈머 그룹의 poll 루프 + 파티션별 워커 + 처리 완료 오프셋 커밋."""
+
+    def __init__(self, consumer, handler, schema: WireSchema = None, max_pending: int = None,
+                 commit_interval: float = None, dead_letters: DeadLetters = None):
+        self.consumer = consumer
+        self.handler = handler
+        self.schema = schema
+        self.dead_letters = DeadLetters("consumer_group") if dead_letters is None else dead_letters
+        self.max_pending = max_pending or CONSUMER_GROUP_CONFIG["max_pending"]
+        self.commit_interval = commit_interval or CONSUMER_GROUP_CONFIG["commit_interval"]
+        self.workers = {}               # TopicPartition → PartitionWorker
+        self._paused = set()
+        self._last_commit = time.monotonic()
+
+    def subscribe(self, topic: str):
+        from kafka import ConsumerRebalanceListener
+
+        owner = self
+
+        class Listener(ConsumerRebalanceListener):
+            def on_partitions_revoked(self, revoked):
+                owner._release(revoked)
+
+            def on_partitions_assigned(self, assigned):
+                print(f"[할당] 파티션 {sorted(tp.partition for tp in assigned)}")
+
+        self.consumer.subscribe([topic], listener=Listener())
+
+    def run(self, stop=lambda: False):
+        try:
+            while not stop():
+                for tp, messages in self.consumer.poll(timeout_ms=200).items():
+                    self._worker(tp).submit(messages)
+                self._flow_control()
+                if time.monotonic() - self._last_commit >= self.commit_interval:
+                    self.commit()
+        finally:
+            self._release(list(self.workers))
+
+    def _worker(self, tp) -> PartitionWorker:
+        worker = self.workers.get(tp)
+        if worker is None:
+            worker = self.workers[tp] = PartitionWorker(tp, self.handler, self.schema, self.dead_letters)
+        return worker
+
+    def _flow_control(self):
+        """밀린 파티션만 멈추고, 절반 아래로 줄면 다시 읽습니다."""
+        for tp, worker in self.workers.items():
+            if worker.error is not None or worker.pending > self.max_pending:
+                if tp not in self._paused:
+                    self.consumer.pause(tp)
+                    self._paused.add(tp)
+            elif tp in self._paused and worker.pending <= self.max_pending // 2:
+                self.consumer.resume(tp)
+                self._paused.discard(tp)
+
+    def commit(self, partitions: list = None):
+        """워커가 처리를 끝낸 위치까지 오프셋을 커밋합니다."""
+        offsets = {}
+        for tp in partitions or list(self.workers):
+            worker = self.workers.get(tp)
+            if worker is not None and worker.offset is not None and worker.offset != worker.committed:
+                offsets[tp] = _offset_and_metadata(worker.offset)
+        if offsets:
+            self.dead_letters.flush()   # 건너뛴 메시지가 dead-letter 토픽에 들어간 뒤에 커밋
+            self.consumer.commit(offsets)
+            for tp, meta in offsets.items():
+                self.workers[tp].committed = meta.offset
+        self._last_commit = time.monotonic()
+
+    def _release(self, partitions: list):
+        """파티션을 내놓기 전: 받은 메시지까지 처리하고 커밋한 뒤 워커를 정리합니다."""
+        partitions = [tp for tp in partitions if tp in self.workers]
+        for tp in partitions:
+            self.workers[tp].stop()
+        try:
+            self.commit(partitions)
+        except Exception as e:
+            print(f"[WARN] 리밸런스 중 커밋 실패 ({e}) → 다음 소유자가 일부를 다시 처리할 수 있음")
+        for tp in partitions:
+            del self.workers[tp]
+            self._paused.discard(tp)
+
+    def stats(self) -> dict:
+        return {tp.partition: {"processed": w.processed, "records": w.records, "pending": w.pending,
+                               "offset": w.offset, "error": None if w.error is None else str(w.error)}
+                for tp, w in sorted(self.workers.items(), key=lambda item: item[0].partition)}
+
+
+def _offset_and_metadata(offset: int):
+    from kafka.structs import OffsetAndMetadata
+    try:
+        return OffsetAndMetadata(offset, "", -1)    # kafka-python 2.1+ (leader_epoch 추가)
+    except TypeError:
+        return OffsetAndMetadata(offset, "")
+
+
+class OrderCheck:
+    """기본 handler: 파티션별 SequenceTracker로 설비별 순서를 확인합니다. (설비는 한 파티션에만 있으므로 잠금 불필요)"""
+
+    def __init__(self):
+        self.trackers = {}
+
+    def __call__(self, batch, partition: int):
+        tracker = self.trackers.get(partition)
+        if tracker is None:
+            tracker = self.trackers[partition] = SequenceTracker()
+        machine_ids = batch.schema.machine_ids
+        tracker.observe_many([machine_ids[m] for m in batch.machine.tolist()], batch.seq.tolist())   # seq 0은 건너뜀
+
+    def summary(self) -> dict:
+        totals = {"received": 0, "dropped": 0, "duplicates": 0, "out_of_order": 0}
+        for tracker in list(self.trackers.values()):
+            stats = tracker.to_dict(top=0)
+            for key in totals:
+                totals[key] += stats.get(key, 0)
+        return totals
+
+
+def run_consumer(index: int, args: dict):
+    """컨슈머 프로세스 하나: 그룹에 들어가 배정받은 파티션을 처리합니다."""
+    from kafka import KafkaConsumer
+
+    machines = MACHINES
+    if args["copies"] > 1:
+        from fleet import expand_machines
+        machines = expand_machines(MACHINES, args["copies"])
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        group_id=args["group"],
+        enable_auto_commit=False,       # 워커가 처리한 위치까지만 직접 커밋
+        auto_offset_reset=args["start_from"],
+    )
+    handler = OrderCheck()
+    group = PartitionedConsumer(consumer, handler, WireSchema(machines),
+                                dead_letters=DeadLetters("consumer_group", args["dead_letter_topic"]))
+    group.subscribe(KAFKA_CONFIG["raw_topic"])
+
+    last_report, last_records = time.monotonic(), 0
+    def stop():
+        nonlocal last_report, last_records
+        now = time.monotonic()
+        if now - last_report >= CONSUMER_GROUP_CONFIG["stats_interval"]:
+            stats = group.stats()
+            records = sum(s["records"] for s in stats.values())
+            rate = (records - last_records) / (now - last_report)
+            print(f"[컨슈머 {index}] {rate:,.0f} rec/s | 파티션 {sorted(stats)} | "
+                  f"밀림 {sum(s['pending'] for s in stats.values()):,} | seq {handler.summary()} | "
+                  f"dead-letter {group.dead_letters.count:,}건")
+            last_report, last_records = now, records
+        return False
+
+    try:
+        group.run(stop)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        consumer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw 파티션별 병렬 컨슈머 그룹 (워커 템플릿)")
+    parser.add_argument("--processes", type=int, default=1, help="같은 그룹에 띄울 컨슈머 프로세스 수")
+    parser.add_argument("--group", default=CONSUMER_GROUP_CONFIG["group_id"])
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    parser.add_argument("--from", dest="start_from", choices=("earliest", "latest"), default="latest")
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="풀 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    args = parser.parse_args(argv)
+
+    options = {"group": args.group, "copies": args.copies, "start_from": args.start_from,
+               "dead_letter_topic": args.dead_letter_topic}
+    print(f"컨슈머 그룹 시작! group={args.group}, 프로세스 {args.processes}개")
+    if args.processes == 1:
+        run_consumer(0, options)
+        return
+
+    processes = [mp.Process(target=run_consumer, name=f"consumer-{n}", args=(n, options))
+                 for n in range(args.processes)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.join()
+        print("\n⏹ 컨슈머 그룹 종료")
+
+
+if __name__ == "__main__":
+    main()
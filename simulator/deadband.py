@@ -0,0 +1,132 @@
+"""
+변화 보고(report-by-exception) 모드.
+
+정상 상태에서는 센서 값이 노이즈 범위 안에서만 움직이므로 매 틱 전체를 보내는 것은 대부분 중복입니다.
+DeadbandFilter는 Fleet 배열을 그대로 보고 이번 틱에 보낼 센서를 고릅니다. (센서별 bool mask, 반복문 없음)
+
+센서를 보내는 경우:
+  - 마지막으로 보낸 값에서 deadband를 넘게 변함
+  - 센서의 경고(alert 초과) / 이상 여부가 바뀜
+  - 설비 상태(RUNNING / WARNING / ANOMALY)가 바뀜 → 그 설비의 센서 전부 (전체 스냅샷)
+  - heartbeat 시간 동안 보내지 않음 (최대 침묵 시간 → 값이 그대로여도 살아 있음을 알림)
+  - 처음 보는 센서
+
+deadband / heartbeat는 config.MACHINES의 센서별 "deadband" / "heartbeat"로 정하고,
+없으면 DEADBAND_CONFIG 기본값(noise × noise_multiple, heartbeat초)을 씁니다.
+
+보낸 레코드에는 바뀐 센서만 담고 "partial": True를 붙입니다. (바이너리 프레임은 partial 플래그 + 나머지 NaN)
+seq는 틱 번호 대신 설비별 발행 번호 → 조용한 틱이 있어도 SequenceTracker가 유실로 세지 않음.
+
+컨슈머는 StateReconstructor로 설비별 마지막 값을 이어 붙여 전체 스냅샷을 복원합니다.
+"""
+from __future__ import annotations
+
+import math
+
+from lazy import np
+
+from config import MACHINES, SIMULATION_CONFIG, DEADBAND_CONFIG
+
+
+class DeadbandFilter:
+    """Fleet의 마지막 틱에서 보낼 센서를 고릅니다."""
+
+    def __init__(self, fleet, machines: dict = None, interval: float = None):
+        machines = MACHINES if machines is None else machines
+        interval = interval or SIMULATION_CONFIG["interval_seconds"]
+        cfg = DEADBAND_CONFIG
+        band, heartbeat = [], []
+        for machine_id, names in zip(fleet.machine_ids, fleet.sensor_names):
+            sensors = machines[machine_id]["sensors"]
+            for name in names:
+                sensor = sensors[name]
+                band.append(sensor.get("deadband", sensor["noise"] * cfg["noise_multiple"]))
+                heartbeat.append(max(1, math.ceil(sensor.get("heartbeat", cfg["heartbeat"]) / interval)))
+        self.band = np.array(band, dtype=np.float64)
+        self.heartbeat = np.array(heartbeat, dtype=np.int64)     # 틱 단위
+        self.machine_of = fleet.machine_of
+
+        self.last_value = np.full(fleet.size, np.nan)
+        self.last_tick = np.full(fleet.size, np.iinfo(np.int64).min // 2, dtype=np.int64)
+        self.last_flags = np.zeros(fleet.size, dtype=np.uint8)
+        self.last_status = np.full(len(fleet), 0xFF, dtype=np.uint8)
+        self.seq = np.zeros(len(fleet), dtype=np.uint32)       # 설비별 발행 번호
+
+        # 통계
+        self.ticks = 0
+        self.sensors_total = 0
+        self.sensors_sent = 0
+        self.records_total = 0
+        self.records_sent = 0
+
+    def update(self, fleet) -> np.ndarray:
+        """이번 틱에 보낼 센서 mask를 돌려주고, 보낸 것으로 기록합니다. seq도 여기서 올립니다."""
+        values = fleet.values
+        flags = fleet.exceeds_alert.astype(np.uint8) | (fleet.is_anomaly.astype(np.uint8) << 1)
+        status_changed = fleet.status != self.last_status
+
+        # NaN(처음)과의 비교는 False → ~(<=)로 처음 보는 센서도 보냄
+        mask = ~(np.abs(values - self.last_value) <= self.band)
+        mask |= flags != self.last_flags
+        mask |= fleet.tick - self.last_tick >= self.heartbeat
+        mask |= status_changed[self.machine_of]
+
+        self.last_value[mask] = values[mask]
+        self.last_tick[mask] = fleet.tick
+        self.last_flags = flags
+        self.last_status = fleet.status.copy()
+        emitted = np.logical_or.reduceat(mask, fleet.offsets[:-1])
+        self.seq += emitted
+
+        self.ticks += 1
+        self.sensors_total += mask.size
+        self.sensors_sent += int(mask.sum())
+        self.records_total += emitted.size
+        self.records_sent += int(emitted.sum())
+        return mask
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "sensor_ratio": round(self.sensors_sent / self.sensors_total, 4) if self.sensors_total else None,
+            "record_ratio": round(self.records_sent / self.records_total, 4) if self.records_total else None,
+        }
+
+
+class StateReconstructor:
+    """partial 레코드를 설비별 마지막 값과 합쳐 전체 스냅샷 레코드로 되돌립니다.
+
+    아직 한 번도 받지 못한 센서는 스냅샷에 없습니다. (complete()로 확인)
+    """
+
+    def __init__(self, machines: dict = None):
+        machines = MACHINES if machines is None else machines
+        self.expected = {m: len(config["sensors"]) for m, config in machines.items()}
+        self.state = {}         # machine_id → {센서: 값}
+        self.updated = {}       # machine_id → {센서: 마지막으로 값을 받은 timestamp}
+
+    def apply(self, record: dict) -> dict:
+        """레코드를 반영하고 전체 스냅샷 레코드(새 dict)를 반환합니다. partial이 아니면 그대로 반환합니다."""
+        machine_id = record["machine_id"]
+        sensors = self.state.setdefault(machine_id, {})
+        sensors.update(record["sensors"])
+        updated = self.updated.setdefault(machine_id, {})
+        for name in record["sensors"]:
+            updated[name] = record["timestamp"]
+        if not record.get("partial"):
+            return record
+        snapshot = dict(record)
+        snapshot["sensors"] = dict(sensors)
+        del snapshot["partial"]
+        return snapshot
+
+    def apply_many(self, records: list) -> list:
+        return [self.apply(record) for record in records]
+
+    def complete(self, machine_id: str) -> bool:
+        """설비의 센서 값을 모두 한 번 이상 받았는지."""
+        expected = self.expected.get(machine_id)
+        return expected is not None and len(self.state.get(machine_id, ())) >= expected
+
+    def snapshot(self, machine_id: str) -> dict:
+        return dict(self.state.get(machine_id, {}))
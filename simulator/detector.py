@@ -0,0 +1,299 @@
+"""
+온라인 통계 기반 이상 탐지기.
+
+시뮬레이터가 붙여주는 status/has_anomaly 대신, 센서 값만 보고 이상을 판정합니다.
+(실제 설비는 스스로 이상이라고 알려주지 않으므로)
+
+센서마다 EWMA(평균) / EWMV(분산)를 유지하고 두 가지 규칙을 적용합니다.
+  - z-score: |x - 평균| / 표준편차 > z_threshold       → 급격한 튐
+  - CUSUM:   z의 누적합이 cusum_h를 넘음               → 작지만 지속되는 치우침
+편차는 잘라서(winsorize) 반영하고, 판정된 값은 아주 작은 계수로 평균에만 반영해서
+이상이 길어져도 기준선과 분산이 끌려가지 않게 합니다.
+
+Kafka poll 한 번에 받은 데이터를 ReadingBatch(batch.py)로 모아 센서값 배열로 펼치고 NumPy로 한꺼번에 계산합니다.
+같은 센서가 한 배치에 여러 번 나오면 순서대로 나눠서(라운드) 처리하므로 결과는 한 건씩 처리한 것과 같습니다.
+
+시뮬레이터의 has_anomaly(정답)와 비교해 precision / recall을 보고합니다.
+풀 수 없는 메시지(스키마에 없는 설비 등)는 dead-letter 토픽으로 보내고 건너뜁니다. (topics.DeadLetters)
+발행기를 --copies로 띄웠으면 탐지기도 같은 --copies로 띄우세요.
+
+실행: python simulator/detector.py
+오프라인 튜닝: python simulator/detector.py --offline 3600 --copies 20
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG, DETECTOR_CONFIG
+from wire import WireSchema, iso_timestamp
+from batch import ReadingBatch
+from metrics import StageMetrics, start_metrics
+from topics import DeadLetters
+
+
+class KeyIndex:
+    """(machine_id, sensor) → 상태 배열의 인덱스."""
+
+    def __init__(self):
+        self._index = {}
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, machine_id: str, sensor: str) -> int:
+        key = (machine_id, sensor)
+        i = self._index.get(key)
+        if i is None:
+            i = self._index[key] = len(self.keys)
+            self.keys.append(key)
+        return i
+
+
+class OnlineDetector:
+    """센서별 EWMA/EWMV + z-score + CUSUM 상태를 배열로 들고 있는 탐지기."""
+
+    def __init__(self, alpha: float = None, anomaly_alpha: float = None, warmup: int = None,
+                 z_threshold: float = None, cusum_k: float = None, cusum_h: float = None):
+        cfg = DETECTOR_CONFIG
+        self.alpha = cfg["alpha"] if alpha is None else alpha
+        self.anomaly_alpha = cfg["anomaly_alpha"] if anomaly_alpha is None else anomaly_alpha
+        self.warmup = cfg["warmup"] if warmup is None else warmup
+        self.z_threshold = cfg["z_threshold"] if z_threshold is None else z_threshold
+        self.cusum_k = cfg["cusum_k"] if cusum_k is None else cusum_k
+        self.cusum_h = cfg["cusum_h"] if cusum_h is None else cusum_h
+
+        self.index = KeyIndex()
+        self._schema, self._schema_keys = None, None    # ReadingBatch 평탄 센서 키 → 상태 배열 인덱스
+        self._capacity = 0
+        self.mean = np.zeros(0)
+        self.var = np.zeros(0)
+        self.count = np.zeros(0, dtype=np.int64)
+        self.cusum_pos = np.zeros(0)
+        self.cusum_neg = np.zeros(0)
+
+    def _grow(self, size: int):
+        if size <= self._capacity:
+            return
+        capacity = max(size, self._capacity * 2, 64)
+        for name in ("mean", "var", "count", "cusum_pos", "cusum_neg"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self._capacity = capacity
+
+    def flatten(self, records: list):
+        """레코드 목록 → (센서 인덱스, 값, 레코드 번호) 배열."""
+        keys, values, owner = [], [], []
+        get = self.index.get
+        for n, record in enumerate(records):
+            machine_id = record["machine_id"]
+            for sensor, value in record["sensors"].items():
+                keys.append(get(machine_id, sensor))
+                values.append(value)
+                owner.append(n)
+        self._grow(len(self.index))
+        return (np.array(keys, dtype=np.intp), np.array(values, dtype=np.float64),
+                np.array(owner, dtype=np.intp))
+
+    def flatten_batch(self, batch):
+        """ReadingBatch → (센서 인덱스, 값, 행 번호) 배열. flatten과 같은 결과 (dict를 거치지 않음)."""
+        if batch.schema is not self._schema:
+            # 스키마의 센서를 한 번에 등록해 두고 배열 인덱싱으로 바꿈
+            get = self.index.get
+            self._schema = batch.schema
+            self._schema_keys = np.array([get(machine_id, sensor) for machine_id, sensor in batch.schema.sensor_keys],
+                                         dtype=np.intp)
+            self._grow(len(self.index))
+        rows, keys, values = batch.readings()
+        return self._schema_keys[keys], values, rows
+
+    def process(self, keys: np.ndarray, values: np.ndarray):
+        """값 배열을 판정합니다. 반환: (이상 여부, z-score) - 입력과 같은 순서."""
+        flags = np.zeros(len(keys), dtype=bool)
+        z_out = np.zeros(len(keys))
+        if len(keys) == 0:
+            return flags, z_out
+
+        # 같은 센서의 n번째 등장끼리 묶어서 라운드별로 처리 (라운드 안에서는 센서가 겹치지 않음)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        rank = np.arange(len(keys)) - np.repeat(starts, np.diff(np.r_[starts, len(keys)]))
+        for r in range(int(rank.max()) + 1):
+            pos = order[rank == r]
+            flags[pos], z_out[pos] = self._update(keys[pos], values[pos])
+        return flags, z_out
+
+    def _update(self, k: np.ndarray, x: np.ndarray):
+        mean, var, count = self.mean[k], self.var[k], self.count[k]
+        warm = count >= self.warmup
+
+        std = np.maximum(np.sqrt(var), np.maximum(np.abs(mean) * 1e-3, 1e-6))
+        z = np.where(warm, (x - mean) / std, 0.0)
+        pos = np.maximum(0.0, self.cusum_pos[k] + z - self.cusum_k)
+        neg = np.maximum(0.0, self.cusum_neg[k] - z - self.cusum_k)
+        flagged = warm & ((np.abs(z) > self.z_threshold) | (pos > self.cusum_h) | (neg > self.cusum_h))
+
+        # 판정 후 CUSUM은 0으로 되돌림 (정상 복귀를 빨리 알 수 있도록)
+        self.cusum_pos[k] = np.where(flagged, 0.0, pos)
+        self.cusum_neg[k] = np.where(flagged, 0.0, neg)
+
+        # EWMA / EWMV (워밍업 중에는 1/n으로 빠르게 수렴)
+        # 편차는 ±z_threshold 표준편차로 잘라서 반영하고, 이상 판정된 값은 분산에 반영하지 않음
+        alpha = np.where(warm, self.alpha, 1.0 / (count + 1))
+        alpha = np.where(flagged, self.anomaly_alpha, alpha)
+        diff = np.where(warm, np.clip(x - mean, -self.z_threshold * std, self.z_threshold * std), x - mean)
+        incr = alpha * diff
+        self.mean[k] = mean + incr
+        self.var[k] = np.where(flagged, var, (1 - alpha) * (var + diff * incr))
+        self.count[k] = count + 1
+        return flagged, z
+
+    def detect(self, records: list):
+        """레코드 목록을 판정합니다. 반환: (레코드별 이상 여부, 센서값별 (레코드 번호, 키, z) 목록)."""
+        keys, values, owner = self.flatten(records)
+        flags, z = self.process(keys, values)
+        predicted = np.zeros(len(records), dtype=bool)
+        predicted[owner[flags]] = True
+        hits = [(int(n), self.index.keys[i], float(s))
+                for n, i, s in zip(owner[flags], keys[flags], z[flags])]
+        return predicted, hits
+
+    def detect_batch(self, batch):
+        """ReadingBatch를 판정합니다. 반환: detect와 같음 (레코드 번호 대신 행 번호)."""
+        keys, values, owner = self.flatten_batch(batch)
+        flags, z = self.process(keys, values)
+        predicted = np.zeros(len(batch), dtype=bool)
+        predicted[owner[flags]] = True
+        hits = [(n, self.index.keys[i], s)
+                for n, i, s in zip(owner[flags].tolist(), keys[flags].tolist(), z[flags].tolist())]
+        return predicted, hits
+
+
+class DetectionScore:
+    """레코드 단위 precision / recall (정답: 시뮬레이터의 has_anomaly)."""
+
+    def __init__(self):
+        self.tp = self.fp = self.fn = self.tn = 0
+
+    def update(self, predicted: np.ndarray, actual: np.ndarray):
+        self.tp += int(np.sum(predicted & actual))
+        self.fp += int(np.sum(predicted & ~actual))
+        self.fn += int(np.sum(~predicted & actual))
+        self.tn += int(np.sum(~predicted & ~actual))
+
+    @property
+    def precision(self) -> float:
+        return self.tp / (self.tp + self.fp) if self.tp + self.fp else 0.0
+
+    @property
+    def recall(self) -> float:
+        return self.tp / (self.tp + self.fn) if self.tp + self.fn else 0.0
+
+    def summary(self) -> str:
+        return (f"precision={self.precision:.3f} recall={self.recall:.3f} "
+                f"(tp={self.tp} fp={self.fp} fn={self.fn})")
+
+
+def run_offline(ticks: int, copies: int, seed: int):
+    """Kafka 없이 Fleet 데이터로 탐지기를 돌려 점수를 봅니다. (파라미터 튜닝용)"""
+    from fleet import Fleet, expand_machines
+
+    fleet = Fleet(expand_machines(MACHINES, copies) if copies > 1 else MACHINES, seed=seed)
+    detector = OnlineDetector()
+    score = DetectionScore()
+    elapsed = 0.0
+    readings = 0
+    for _ in range(ticks):
+        fleet.step()
+        batch = fleet.batch(0)
+        start = time.perf_counter()
+        predicted, _ = detector.detect_batch(batch)
+        elapsed += time.perf_counter() - start
+        readings += fleet.size
+        score.update(predicted, batch.has_anomaly)
+    print(f"설비 {len(fleet)}대 × {ticks}틱: {score.summary()}")
+    print(f"처리량: {readings / elapsed:,.0f} 센서값/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw 온라인 이상 탐지기")
+    parser.add_argument("--offline", type=int, metavar="TICKS", default=None,
+                        help="Kafka 대신 시뮬레이터 데이터로 TICKS틱 평가")
+    parser.add_argument("--copies", type=int, default=1,
+                        help="config.MACHINES 복제 배수 (발행기와 같게, 오프라인 평가에도 사용)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="풀 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    args = parser.parse_args(argv)
+
+    if args.offline:
+        run_offline(args.offline, args.copies, args.seed)
+        return
+
+    from kafka import KafkaConsumer, KafkaProducer
+    from fleet import expand_machines
+    consumer = KafkaConsumer(
+        KAFKA_CONFIG["raw_topic"],
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        group_id=DETECTOR_CONFIG["group_id"],
+    )
+    producer = KafkaProducer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        value_serializer=lambda x: json.dumps(x, ensure_ascii=False).encode("utf-8"),
+        key_serializer=lambda x: x.encode("utf-8"),
+    )
+
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    dead_letters = DeadLetters("detector", args.dead_letter_topic)
+    detector = OnlineDetector()
+    score = DetectionScore()
+    metrics = start_metrics("detector")
+    stage = StageMetrics(metrics, "detector")
+    metrics.gauge("score", lambda: {"precision": round(score.precision, 4),
+                                    "recall": round(score.recall, 4), "sensors": len(detector.index)})
+    print("이상 탐지기 시작!")
+    last_report = time.monotonic()
+    while True:
+        parts = []
+        for messages in consumer.poll(timeout_ms=500).values():
+            for msg in messages:
+                try:
+                    batch = ReadingBatch.from_payload(msg.value, schema)
+                except ValueError as e:     # WireFormatError, 깨진 JSON
+                    dead_letters.add(msg.value, e, msg.key)
+                    continue
+                stage.observe_kafka(msg, len(batch))
+                parts.append(batch)
+        batch = ReadingBatch.concat(parts, schema)
+        if len(batch):
+            stage.observe_batch(batch)
+            predicted, hits = detector.detect_batch(batch)
+            score.update(predicted, batch.has_anomaly)
+
+            # 행별로 이상 센서를 묶어서 발행 (dict는 내보낼 이벤트만 만듦)
+            events = {}
+            for n, (machine_id, sensor), z in hits:
+                events.setdefault(n, (machine_id, {}))[1][sensor] = round(z, 2)
+            for n, (machine_id, sensors) in events.items():
+                producer.send(DETECTOR_CONFIG["output_topic"], key=machine_id, value={
+                    "timestamp": iso_timestamp(int(batch.ts[n])),
+                    "machine_id": machine_id,
+                    "z_scores": sensors,
+                })
+
+        if time.monotonic() - last_report >= DETECTOR_CONFIG["stats_interval"]:
+            print(f"[탐지] 센서 {len(detector.index)}개 | {score.summary()} | dead-letter {dead_letters.count:,}건")
+            last_report = time.monotonic()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+NumPy 기반 설비군(fleet) 시뮬레이션 엔진.
+
+모든 설비의 모든 센서 상태(base/noise/drift/이상 상태)를 하나의 평탄한 배열에 담고,
+한 번의 step()으로 전체 설비를 1틱 진행합니다.
+값 생성 모델은 sensor.py의 Sensor.read()와 같습니다:
+  기본값 + 드리프트 + 일주기 사인 + 가우시안 노이즈, 이상 시 base × severity + 2배 노이즈,
+  min/max 범위 제한, alert 기준 초과 여부.
+
+난수는 rng.StreamRNG로 설비마다, 센서마다 독립된 스트림에서 뽑습니다.
+같은 seed와 설정이면 항상 같은 값이 나옵니다.
+
+레코드에는 설비별 일련번호 seq(= 틱 번호)가 붙고, 발행 시각 created_ms를 넘기면 함께 붙습니다. (계측용, metrics.py)
+
+설비 수천 대 규모의 부하 테스트용. 설비 1대만 필요하면 machine.Machine을 쓰면 됩니다.
+"""
+from __future__ import annotations
+
+import math
+from datetime import datetime, timezone
+
+from lazy import np
+
+from config import ANOMALY_CONFIG
+from fleetspec import FleetSpec, fleet_spec
+from rng import StreamRNG, fleet_stream_keys, random_seed
+
+STATUS_NAMES = ("RUNNING", "WARNING", "ANOMALY")
+STATUS_RUNNING, STATUS_WARNING, STATUS_ANOMALY = range(3)
+
+DRIFT_SIGMA = 0.01        # 드리프트 랜덤워크 표준편차 (Sensor와 동일)
+CYCLE_PERIOD = 3600       # 주기성 주기 (틱)
+
+# 난수 용도(lane) - 센서 스트림 (정규분포는 lane 2개 사용)
+LANE_DRIFT, LANE_NOISE = 0, 2
+# 난수 용도(lane) - 설비 스트림
+LANE_INJECT, LANE_PICK, LANE_DURATION, LANE_SEVERITY = range(4)
+# 수동 주입(inject_anomaly)의 기본값용 - 틱 번호 대신 설비별 수동 주입 횟수를 카운터로 씀
+LANE_MANUAL_PICK, LANE_MANUAL_DURATION, LANE_MANUAL_SEVERITY = range(4, 7)
+
+
+def expand_machines(machines: dict, copies: int) -> dict:
+    """설비 구성을 copies배로 복제합니다. 예: CNC-001 → CNC-001, CNC-002, ..."""
+    expanded = {}
+    for machine_id, config in machines.items():
+        prefix = machine_id.rsplit("-", 1)[0]
+        for n in range(1, copies + 1):
+            expanded[f"{prefix}-{n:03d}"] = config
+    return expanded
+
+
+class Fleet:
+    """여러 설비의 센서를 배열 단위로 한꺼번에 시뮬레이션합니다."""
+
+    def __init__(self, machines: dict = None, seed: int = None, spec: FleetSpec = None):
+        """machines 대신 미리 만든 명세(fleetspec.fleet_spec)를 spec으로 넘겨도 됩니다."""
+        spec = fleet_spec(machines) if spec is None else spec
+        self.spec = spec
+        self.machine_ids = spec.machine_ids
+        self.machine_types = spec.machine_types
+        self.locations = spec.locations
+        self.sensor_names = spec.sensor_names   # 설비별 센서 이름 목록
+        self.units = spec.units                 # 설비별 센서 단위 목록
+
+        self._index = {machine_id: i for i, machine_id in enumerate(self.machine_ids)}
+        self.counts = spec.counts
+        self.offsets = spec.offsets
+        self.machine_of = spec.machine_of
+        self.column_of = np.arange(spec.size) - spec.offsets[spec.machine_of]    # 센서의 설비 안 순번
+        self._schema = None     # batch()용 wire 스키마 (처음 쓸 때 만듦)
+        self.base, self.noise, self.min_val, self.max_val, self.alert = (
+            spec.base, spec.noise, spec.min_val, spec.max_val, spec.alert)
+        self.size = spec.size
+        counts = self.counts
+
+        # 센서별 상태
+        self.drift = np.zeros(self.size)
+        self.anomaly_active = np.zeros(self.size, dtype=bool)
+        self.anomaly_remaining = np.zeros(self.size, dtype=np.int64)
+        self.anomaly_severity = np.ones(self.size)
+        self.tick = 0
+
+        # 설비별 / 센서별 난수 스트림
+        self.seed = random_seed() if seed is None else seed
+        machine_keys, sensor_keys = fleet_stream_keys(self.seed, self.machine_ids, self.sensor_names)
+        self.machine_rng = StreamRNG(machine_keys)
+        self.sensor_rng = StreamRNG(sensor_keys)
+        self.manual_injections = np.zeros(len(counts), dtype=np.int64)
+
+        # 마지막 step() 결과
+        self.values = np.zeros(self.size)
+        self.is_anomaly = np.zeros(self.size, dtype=bool)
+        self.exceeds_alert = np.zeros(self.size, dtype=bool)
+        self.has_anomaly = np.zeros(len(counts), dtype=bool)
+        self.has_alert = np.zeros(len(counts), dtype=bool)
+        self.status = np.zeros(len(counts), dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.machine_ids)
+
+    def index_of(self, machine_id: str) -> int:
+        return self._index[machine_id]
+
+    def step(self):
+        """전체 설비를 1틱 진행합니다."""
+        self.tick += 1
+        self._maybe_inject_anomalies()
+
+        # 1. 기본값 + 미세 드리프트
+        self.drift += self.sensor_rng.normal(self.tick, LANE_DRIFT) * DRIFT_SIGMA
+        # 3. 약간의 주기성 (낮/밤 온도 차이)
+        cycle = math.sin(self.tick * 2 * math.pi / CYCLE_PERIOD)
+        # 2/4. 가우시안 노이즈 - 정상이면 noise, 이상이면 noise × 2
+        z = self.sensor_rng.normal(self.tick, LANE_NOISE)
+        normal = self.base + self.drift + cycle * self.noise * 0.5 + z * self.noise
+        abnormal = self.base * self.anomaly_severity + z * self.noise * 2
+
+        active = self.anomaly_active
+        value = np.where(active, abnormal, normal)
+        self.anomaly_remaining -= active
+        self.anomaly_active = active & (self.anomaly_remaining > 0)
+
+        # 5. 범위 제한 + 경고 기준 판정
+        np.clip(value, self.min_val, self.max_val, out=value)
+        self.exceeds_alert = (self.alert > 0) & (value > self.alert)
+        self.is_anomaly = active
+        self.values = np.round(value, 2)
+
+        # 설비 단위 집계
+        starts = self.offsets[:-1]
+        self.has_anomaly = np.logical_or.reduceat(self.is_anomaly, starts)
+        self.has_alert = np.logical_or.reduceat(self.exceeds_alert, starts)
+        self.status = np.where(self.has_alert, STATUS_WARNING,
+                               np.where(self.has_anomaly, STATUS_ANOMALY, STATUS_RUNNING)
+                               ).astype(np.uint8)
+
+    def inject_anomaly(self, machine_id: str, sensor_name: str = None, duration: int = None,
+                       severity: float = None):
+        """특정 센서에 이상 패턴을 주입합니다.
+        생략한 인자는 ANOMALY_CONFIG 범위에서 설비 난수 스트림으로 고릅니다. (같은 seed / 같은 주입 순서면 재현됨)"""
+        m = self._index[machine_id]
+        rng, n, idx = self.machine_rng, int(self.manual_injections[m]), [m]
+        self.manual_injections[m] += 1
+        if sensor_name is None:
+            sensor_name = self.sensor_names[m][int(rng.uniform(n, LANE_MANUAL_PICK, idx)[0] * self.counts[m])]
+        if duration is None:
+            duration = int(rng.integers(n, LANE_MANUAL_DURATION, *ANOMALY_CONFIG["duration_range"], idx)[0])
+        if severity is None:
+            sev_low, sev_high = ANOMALY_CONFIG["severity_range"]
+            severity = float(sev_low + rng.uniform(n, LANE_MANUAL_SEVERITY, idx)[0] * (sev_high - sev_low))
+        i = self.offsets[m] + self.sensor_names[m].index(sensor_name)
+        self.anomaly_active[i] = True
+        self.anomaly_remaining[i] = duration
+        self.anomaly_severity[i] = severity
+
+    def _maybe_inject_anomalies(self):
+        """설비마다 확률적으로 랜덤 센서 하나에 이상을 주입합니다."""
+        rng, tick = self.machine_rng, self.tick
+        hit = np.flatnonzero(rng.uniform(tick, LANE_INJECT) < ANOMALY_CONFIG["probability"])
+        if hit.size == 0:
+            return
+        picked = self.offsets[hit] + (rng.uniform(tick, LANE_PICK, hit) * self.counts[hit]).astype(np.intp)
+        low, high = ANOMALY_CONFIG["duration_range"]
+        sev_low, sev_high = ANOMALY_CONFIG["severity_range"]
+        self.anomaly_active[picked] = True
+        self.anomaly_remaining[picked] = rng.integers(tick, LANE_DURATION, low, high, hit)
+        self.anomaly_severity[picked] = sev_low + rng.uniform(tick, LANE_SEVERITY, hit) * (sev_high - sev_low)
+
+    def record(self, index: int, timestamp: str = None, created_ms: int = None) -> dict:
+        """마지막 틱의 설비 하나를 기존 JSON 형태(dict)로 반환합니다."""
+        lo, hi = self.offsets[index], self.offsets[index + 1]
+        return self._record(index, self.values[lo:hi].tolist(), timestamp or _now(), created_ms)
+
+    def records(self, timestamp: str = None, created_ms: int = None, mask: np.ndarray = None,
+                seq: np.ndarray = None) -> list:
+        """마지막 틱의 전체 설비를 기존 JSON 형태(dict) 목록으로 반환합니다.
+        mask(센서별 bool, deadband.py)를 주면 mask에 든 센서만 담은 partial 레코드를, 그런 센서가 있는 설비만 만듭니다.
+        seq(설비별 배열)를 주면 틱 번호 대신 그 값을 seq로 씁니다."""
+        timestamp = timestamp or _now()
+        values = self.values.tolist()
+        offsets = self.offsets.tolist()
+        seqs = self.tick if seq is None else seq.tolist()
+        if mask is None:
+            return [self._record(m, values[offsets[m]:offsets[m + 1]], timestamp, created_ms,
+                                 seqs if seq is None else seqs[m])
+                    for m in range(len(self.machine_ids))]
+
+        records = []
+        flat = mask.tolist()
+        for m in np.flatnonzero(np.logical_or.reduceat(mask, self.offsets[:-1])).tolist():
+            lo, hi = offsets[m], offsets[m + 1]
+            record = self._record(m, values[lo:hi], timestamp, created_ms, seqs if seq is None else seqs[m])
+            if not all(flat[lo:hi]):
+                # 센서가 전부 들어 있으면 보통 레코드와 같음 (partial 없음)
+                record["sensors"] = {name: v for name, v, keep
+                                     in zip(self.sensor_names[m], values[lo:hi], flat[lo:hi]) if keep}
+                record["partial"] = True
+            records.append(record)
+        return records
+
+    def batch(self, ts_ms: int, created_ms: int = 0, mask: np.ndarray = None, seq: np.ndarray = None):
+        """마지막 틱의 전체 설비를 batch.ReadingBatch로 반환합니다. (dict를 만들지 않음)
+        mask / seq는 records()와 같음. 설비 번호는 이 Fleet의 인덱스 (wire.fleet_schema)."""
+        from batch import ReadingBatch
+        from wire import fleet_schema, FLAG_HAS_ANOMALY, FLAG_HAS_ALERT, FLAG_PARTIAL
+
+        if self._schema is None:
+            self._schema = fleet_schema(self)
+        n = len(self.machine_ids)
+        values = np.full((n, self._schema.width), np.nan)
+        values[self.machine_of, self.column_of] = self.values if mask is None else np.where(mask, self.values, np.nan)
+        flags = (self.status | self.has_anomaly * np.uint8(FLAG_HAS_ANOMALY)
+                 | self.has_alert * np.uint8(FLAG_HAS_ALERT)).astype(np.uint8)
+        seq = np.full(n, self.tick, dtype=np.uint32) if seq is None else seq.astype(np.uint32)
+        batch = ReadingBatch(self._schema, np.full(n, ts_ms, dtype=np.int64), np.arange(n, dtype=np.uint16),
+                             flags, seq, np.full(n, created_ms, dtype=np.int64), values)
+        if mask is None:
+            return batch
+        starts = self.offsets[:-1]
+        batch.flags[~np.logical_and.reduceat(mask, starts)] |= FLAG_PARTIAL
+        return batch.take(np.logical_or.reduceat(mask, starts))
+
+    def _record(self, m: int, values: list, timestamp: str, created_ms: int = None, seq: int = None) -> dict:
+        record = {
+            "timestamp": timestamp,
+            "machine_id": self.machine_ids[m],
+            "machine_type": self.machine_types[m],
+            "location": self.locations[m],
+            "sensors": dict(zip(self.sensor_names[m], values)),
+            "status": STATUS_NAMES[self.status[m]],
+            "has_anomaly": bool(self.has_anomaly[m]),
+            "has_alert": bool(self.has_alert[m]),
+            "seq": self.tick if seq is None else seq,
+        }
+        if created_ms is not None:
+            record["created_ms"] = created_ms
+        return record
+
+    def machine(self, machine_id: str):
+        """설비 하나에 대한 Machine 뷰를 반환합니다."""
+        from machine import Machine
+        return Machine(machine_id, fleet=self)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,161 @@
+"""
+멀티 프로세스 설비군 발행기.
+
+설비 수천 대를 흉내 내기 위해 설비를 여러 워커 프로세스에 나눠(shard) 맡깁니다.
+  - 워커마다 자기 몫의 Fleet과 MQTT 연결을 따로 가짐 → CPU 코어 수만큼 확장
+  - 틱 간격은 SimClock의 절대 마감 시각 기준 → sleep 오차가 쌓이지 않고, 늦은 틱은 따로 집계
+  - 난수는 설비 ID 기준 스트림이라 워커 수를 바꿔도 같은 seed면 같은 데이터
+  - 콘솔에는 메시지마다 출력하지 않고 주기적으로 요약(ticks/s, messages/s, 늦은 틱)만 출력
+
+실행: python simulator/fleet_publisher.py --copies 200 --workers 4 --rate 1
+"""
+import argparse
+import json
+import multiprocessing as mp
+import queue
+import signal
+import time
+from datetime import datetime, timezone
+
+from config import MACHINES, SIMULATION_CONFIG, MQTT_CONFIG, FLEET_PUBLISHER_CONFIG, DEADBAND_CONFIG
+from fleet import expand_machines
+from metrics import now_ms
+from rng import random_seed
+
+
+def shard(machine_ids: list, workers: int) -> list:
+    """설비 ID 목록을 워커 수만큼 연속 구간으로 나눕니다."""
+    size, extra = divmod(len(machine_ids), workers)
+    shards, start = [], 0
+    for w in range(workers):
+        end = start + size + (1 if w < extra else 0)
+        shards.append(machine_ids[start:end])
+        start = end
+    return [s for s in shards if s]
+
+
+def worker(worker_id: int, machine_ids: list, copies: int, args: dict,
+           wall_start: float, stats_queue, stop_event):
+    """워커 프로세스: 맡은 설비를 시뮬레이션해 자기 MQTT 연결로 발행합니다."""
+    import paho.mqtt.client as mqtt
+    from clock import SimClock
+    from fleet import Fleet
+    from deadband import DeadbandFilter
+    from wire import WireSchema, FleetEncoder
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 종료는 부모가 stop_event로 알림
+    all_machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    fleet = Fleet({m: all_machines[m] for m in machine_ids}, seed=args["seed"])
+    encoder = FleetEncoder(fleet, WireSchema(all_machines)) if args["format"] == "binary" else None
+    deadband = DeadbandFilter(fleet, all_machines) if args["deadband"] else None
+
+    interval = SIMULATION_CONFIG["interval_seconds"]
+    clock = SimClock(interval, "accelerated", args["rate"] * interval,
+                     args["start"], wall_start=wall_start)
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"fleet-publisher-{worker_id}")
+    client.connect(MQTT_CONFIG["host"], MQTT_CONFIG["port"])
+    client.loop_start()
+
+    ticks = messages = sent_bytes = 0
+    time.sleep(max(0.0, wall_start - time.monotonic()))
+    last_report = time.monotonic()
+    frame_topic = f"factory/frames/{worker_id}"
+    while not stop_event.is_set():
+        fleet.step()
+        mask = seq = None
+        if deadband is not None:
+            mask, seq = deadband.update(fleet), deadband.seq
+        if encoder is not None:
+            payload = encoder.encode(fleet, round(clock.epoch() * 1000), now_ms(), mask, seq)
+            if payload is not None:
+                client.publish(frame_topic, payload)
+                messages += 1
+                sent_bytes += len(payload)
+        else:
+            for data in fleet.records(clock.timestamp(), now_ms(), mask, seq):
+                payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                client.publish(f"factory/{data['machine_id']}/sensors", payload)
+                messages += 1
+                sent_bytes += len(payload)
+        ticks += 1
+
+        now = time.monotonic()
+        if now - last_report >= 1.0:
+            stats_queue.put((worker_id, ticks, messages, sent_bytes, clock.late_ticks))
+            ticks = messages = sent_bytes = 0
+            last_report = now
+        clock.advance()
+
+    stats_queue.put((worker_id, ticks, messages, sent_bytes, clock.late_ticks))
+    client.loop_stop()
+    client.disconnect()
+
+
+def main(argv=None):
+    cfg = FLEET_PUBLISHER_CONFIG
+    parser = argparse.ArgumentParser(description="멀티 프로세스 설비군 발행기")
+    parser.add_argument("--copies", type=int, default=cfg["copies"], help="config.MACHINES 복제 배수")
+    parser.add_argument("--workers", type=int, default=cfg["workers"])
+    parser.add_argument("--rate", type=float, default=cfg["rate"], help="목표 틱 속도 (틱/초)")
+    parser.add_argument("--format", choices=("json", "binary"), default=SIMULATION_CONFIG["output_format"])
+    parser.add_argument("--seed", type=int, default=SIMULATION_CONFIG["seed"])
+    parser.add_argument("--duration", type=float, default=None, help="실행 시간(초), 생략하면 Ctrl+C까지")
+    parser.add_argument("--deadband", action=argparse.BooleanOptionalAction, default=DEADBAND_CONFIG["enabled"],
+                        help="변화 보고 모드 (바뀐 센서만 발행, deadband.py)")
+    args = parser.parse_args(argv)
+
+    machines = expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES
+    shards = shard(list(machines), args.workers)
+    start = datetime.now(timezone.utc).replace(microsecond=0)
+    wall_start = time.monotonic() + 1.0     # 모든 워커가 같은 시각에 첫 틱 시작
+    seed = random_seed() if args.seed is None else args.seed   # 모든 워커가 같은 seed 사용
+    options = {"seed": seed, "rate": args.rate, "format": args.format, "start": start,
+               "deadband": args.deadband}
+
+    print("=" * 60)
+    print("🏭 Smart Factory Fleet Publisher")
+    print(f"   설비 수: {len(machines):,}대 / 워커 {len(shards)}개 / 목표 {args.rate:g}틱/s")
+    print(f"   목표 메시지: {len(machines) * args.rate:,.0f} readings/s ({args.format}), seed {seed}")
+    print("=" * 60)
+
+    stats_queue = mp.Queue()
+    stop_event = mp.Event()
+    processes = [mp.Process(target=worker, name=f"fleet-worker-{w}",
+                            args=(w, ids, args.copies, options, wall_start, stats_queue, stop_event))
+                 for w, ids in enumerate(shards)]
+    for p in processes:
+        p.start()
+
+    started = time.monotonic()
+    late = {}
+    window = {"ticks": 0, "messages": 0, "bytes": 0}
+    last_report = time.monotonic()
+    try:
+        while args.duration is None or time.monotonic() - started < args.duration:
+            try:
+                worker_id, ticks, messages, sent_bytes, late_ticks = stats_queue.get(timeout=0.5)
+                window["ticks"] += ticks
+                window["messages"] += messages
+                window["bytes"] += sent_bytes
+                late[worker_id] = late_ticks
+            except queue.Empty:
+                pass
+
+            elapsed = time.monotonic() - last_report
+            if elapsed >= cfg["report_interval"]:
+                print(f"[fleet] {window['ticks'] / elapsed / len(shards):6.2f} ticks/s/worker | "
+                      f"{window['messages'] / elapsed:10,.0f} msg/s | "
+                      f"{window['bytes'] / elapsed / 1e6:6.2f} MB/s | late ticks={sum(late.values())}")
+                window = {"ticks": 0, "messages": 0, "bytes": 0}
+                last_report = time.monotonic()
+    except KeyboardInterrupt:
+        print("\n⏹ 발행기 종료 중...")
+    finally:
+        stop_event.set()
+        for p in processes:
+            p.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+설비군 명세(fleet spec): config.MACHINES를 검증하고 배열로 펼쳐 둔 것.
+
+설비 구성 dict를 매번 돌면서 센서 파라미터를 모으는 대신 한 번만 검증 / 변환하고,
+같은 구성이면 결과를 재사용합니다. (구성 내용 해시가 키)
+  - 프로세스 안: _cache
+  - 프로세스 사이: SIMULATION_CONFIG["spec_cache_dir"]/<구성 해시>.npz (복제 전 명세, pickle 없이 배열 + JSON 메타데이터)
+    짧게 뜨는 워커 / CLI가 매번 다시 검증하지 않음. 파일이 깨졌거나 형식이 다르면 다시 만들어 덮어씀
+    검증 / 변환 규칙을 바꾸면 CACHE_VERSION을 올릴 것 (구성 해시에는 규칙이 들어 있지 않음)
+  - 설비 순서대로 machine_ids / machine_types / locations / sensor_names / units
+  - 센서를 평탄하게 이어 붙인 base / noise / min_val / max_val / alert 배열 (읽기 전용)
+  - counts / offsets / machine_of: 설비 ↔ 평탄 센서 인덱스 변환
+
+Fleet, 부하 테스트 도구가 이 명세를 씁니다.
+설비 수천 대 구성은 expand()로 배열을 바로 복제합니다. (fleet.expand_machines와 같은 설비 ID / 순서)
+
+잘못된 구성은 ValueError (어느 설비 / 센서의 무엇이 문제인지 메시지에 표시).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import zipfile
+
+from lazy import np
+
+from config import MACHINES, SIMULATION_CONFIG
+
+PARAM_FIELDS = ("base", "noise", "min", "max", "alert")
+CACHE_VERSION = 1
+
+_cache = {}     # (구성 해시, copies) → FleetSpec
+
+
+def _check_sensor(machine_id: str, name: str, sensor) -> tuple:
+    where = f"{machine_id}.{name}"
+    if not isinstance(sensor, dict):
+        raise ValueError(f"{where}: 센서 설정은 dict여야 합니다.")
+    missing = [key for key in ("unit",) + PARAM_FIELDS if key not in sensor]
+    if missing:
+        raise ValueError(f"{where}: 필수 항목 누락 {missing}")
+    params = []
+    for key in PARAM_FIELDS:
+        value = sensor[key]
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f"{where}: {key}={value!r}는 유한한 숫자여야 합니다.")
+        params.append(float(value))
+    base, noise, low, high, alert = params
+    if low > high:
+        raise ValueError(f"{where}: min({low:g}) > max({high:g})")
+    if not low <= base <= high:
+        raise ValueError(f"{where}: base({base:g})가 범위 [{low:g}, {high:g}] 밖입니다.")
+    if noise < 0:
+        raise ValueError(f"{where}: noise({noise:g})는 0 이상이어야 합니다.")
+    if alert > 0 and not low <= alert <= high:
+        # 0 이하는 경고 기준 없음
+        raise ValueError(f"{where}: alert({alert:g})가 범위 [{low:g}, {high:g}] 밖입니다.")
+    if sensor.get("deadband", 0) < 0 or sensor.get("heartbeat", 1) <= 0:
+        raise ValueError(f"{where}: deadband는 0 이상, heartbeat는 0보다 커야 합니다.")
+    return params
+
+
+def _check_machine(machine_id: str, config) -> tuple:
+    if not isinstance(config, dict):
+        raise ValueError(f"{machine_id}: 설비 설정은 dict여야 합니다.")
+    for key in ("type", "location", "sensors"):
+        if key not in config:
+            raise ValueError(f"{machine_id}: 필수 항목 누락 '{key}'")
+    sensors = config["sensors"]
+    if not sensors:
+        raise ValueError(f"{machine_id}: 센서가 없습니다.")
+    rows = [_check_sensor(machine_id, name, sensor) for name, sensor in sensors.items()]
+    return list(sensors), [sensor["unit"] for sensor in sensors.values()], rows
+
+
+def _fingerprint(machines: dict) -> str:
+    # 복제한 구성(expand_machines)은 같은 설정 dict를 공유하므로 설정 내용은 객체당 한 번만 직렬화
+    h = hashlib.blake2b(digest_size=16)
+    seen = {}
+    for machine_id, config in machines.items():
+        digest = seen.get(id(config))
+        if digest is None:
+            text = json.dumps(config, ensure_ascii=False, separators=(",", ":"), default=str)
+            digest = seen[id(config)] = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        h.update(machine_id.encode("utf-8") + b"\x00" + digest)
+    return h.hexdigest()
+
+
+class FleetSpec:
+    """검증된 설비 구성. compile() 또는 fleet_spec()으로 만듭니다."""
+
+    def __init__(self, machine_ids: list, machine_types: list, locations: list,
+                 sensor_names: list, units: list, counts: np.ndarray, params: np.ndarray):
+        self.machine_ids = machine_ids
+        self.machine_types = machine_types
+        self.locations = locations
+        self.sensor_names = sensor_names        # 설비별 센서 이름 목록
+        self.units = units                      # 설비별 센서 단위 목록
+        self.counts = counts
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+        self.machine_of = np.repeat(np.arange(len(counts)), counts)
+        self.base, self.noise, self.min_val, self.max_val, self.alert = params.T.copy()
+        self.size = len(params)
+        self._params = params
+        for array in (self.counts, self.offsets, self.machine_of,
+                      self.base, self.noise, self.min_val, self.max_val, self.alert):
+            array.flags.writeable = False   # 캐시에서 여러 Fleet이 같이 쓰므로 읽기 전용
+
+    @classmethod
+    def compile(cls, machines: dict) -> "FleetSpec":
+        """설비 구성 dict를 검증하고 배열로 변환합니다. 잘못된 구성이면 ValueError."""
+        if not machines:
+            raise ValueError("설비가 하나도 없습니다.")
+        machine_ids, types, locations, sensor_names, units, counts, params = [], [], [], [], [], [], []
+        checked = {}    # id(설정 dict) → (센서 이름, 단위, 파라미터): 복제한 구성은 한 번만 검증
+        for machine_id, config in machines.items():
+            entry = checked.get(id(config))
+            if entry is None:
+                # config도 같이 잡아 두어 검사 중에 id가 다른 객체에 재사용되지 않게 함
+                entry = checked[id(config)] = (config, _check_machine(machine_id, config))
+            names, unit_list, rows = entry[1]
+            machine_ids.append(machine_id)
+            types.append(config["type"])
+            locations.append(config["location"])
+            sensor_names.append(names)
+            units.append(unit_list)
+            counts.append(len(names))
+            params.extend(rows)
+        return cls(machine_ids, types, locations, sensor_names, units,
+                   np.array(counts, dtype=np.intp), np.array(params, dtype=np.float64))
+
+    def __len__(self):
+        return len(self.machine_ids)
+
+    def expand(self, copies: int) -> "FleetSpec":
+        """설비를 copies배로 복제한 명세. compile(expand_machines(machines, copies))와 같은 결과."""
+        if copies <= 1:
+            return self
+        # expand_machines는 dict에 차례로 넣으므로 ID가 겹치면 뒤 설비 구성이 앞 자리를 덮어씀
+        source = {}
+        for m, machine_id in enumerate(self.machine_ids):
+            prefix = machine_id.rsplit("-", 1)[0]
+            for n in range(1, copies + 1):
+                source[f"{prefix}-{n:03d}"] = m
+        picks = np.fromiter(source.values(), dtype=np.intp, count=len(source))
+        counts = self.counts[picks]
+        # 고른 설비의 센서 구간을 이어 붙인 평탄 인덱스
+        starts = np.repeat(self.offsets[:-1][picks] - np.concatenate(([0], np.cumsum(counts)[:-1])), counts)
+        rows = starts + np.arange(counts.sum())
+        picks = picks.tolist()
+        return FleetSpec(list(source),
+                         [self.machine_types[m] for m in picks],
+                         [self.locations[m] for m in picks],
+                         [self.sensor_names[m] for m in picks],
+                         [self.units[m] for m in picks],
+                         counts.copy(), self._params[rows])
+
+    def params(self, machine_id: str) -> dict:
+        """설비 하나의 센서별 파라미터 {센서: {base, noise, min, max, alert}} (확인 / 디버깅용)."""
+        m = self.machine_ids.index(machine_id)
+        rows = self._params[self.offsets[m]:self.offsets[m + 1]].tolist()
+        return {name: dict(zip(PARAM_FIELDS, row)) for name, row in zip(self.sensor_names[m], rows)}
+
+
+def _load(path: str) -> FleetSpec:
+    """디스크 캐시 → FleetSpec. 없거나 깨졌거나 형식이 다르면 None."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["version"] != CACHE_VERSION:
+                return None
+            return FleetSpec(meta["machine_ids"], meta["machine_types"], meta["locations"], meta["sensor_names"],
+                             meta["units"], data["counts"].astype(np.intp), data["params"].astype(np.float64))
+    except (OSError, EOFError, ValueError, KeyError, TypeError, zipfile.BadZipFile):
+        return None
+
+
+def _save(path: str, spec: FleetSpec):
+    """FleetSpec → 디스크 캐시. 임시 파일에 쓰고 이름을 바꾸므로 동시에 뜬 프로세스가 반쯤 쓴 파일을 읽지 않음."""
+    meta = json.dumps({"version": CACHE_VERSION, "machine_ids": spec.machine_ids, "machine_types": spec.machine_types,
+                       "locations": spec.locations, "sensor_names": spec.sensor_names, "units": spec.units},
+                      ensure_ascii=False)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(tmp, "wb") as f:
+            np.savez(f, counts=spec.counts, params=spec._params, meta=np.array(meta))
+        os.replace(tmp, path)
+    except OSError as e:
+        # 캐시는 없어도 동작하므로 쓰지 못하면 알리고 넘어감
+        print(f"[WARN] 설비 명세 캐시 저장 실패 ({path}): {e}")
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def _compiled(fingerprint: str, machines: dict) -> FleetSpec:
+    """복제 전 명세: 디스크 캐시에 있으면 읽고, 없으면 검증 / 변환해서 저장합니다."""
+    directory = SIMULATION_CONFIG["spec_cache_dir"]
+    if not directory:
+        return FleetSpec.compile(machines)
+    path = os.path.join(directory, f"{fingerprint}.npz")
+    spec = _load(path)
+    if spec is None:
+        spec = FleetSpec.compile(machines)
+        _save(path, spec)
+    return spec
+
+
+def fleet_spec(machines: dict = None, copies: int = 1) -> FleetSpec:
+    """설비 구성의 명세를 반환합니다. 같은 구성(내용 기준)과 copies면 캐시한 명세를 그대로 돌려줍니다."""
+    machines = MACHINES if machines is None else machines
+    key = (_fingerprint(machines), copies)
+    spec = _cache.get(key)
+    if spec is None:
+        base = _cache.get((key[0], 1)) or _compiled(key[0], machines)
+        _cache[(key[0], 1)] = base
+        spec = _cache[key] = base.expand(copies)
+    return spec
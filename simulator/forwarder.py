@@ -0,0 +1,434 @@
+"""
+MQTT → Kafka 파이프라인 전송기.
+
+paho 네트워크 스레드는 메시지를 큐에 넣기만 하고 바로 돌아갑니다.
+별도 전송 스레드가 큐에서 메시지를 묶어 꺼내 KafkaProducer에 넘기고,
+전송 결과는 future.get() 대신 콜백으로 확인합니다.
+큐에 넣은 시각부터 Kafka ack까지의 지연은 히스토그램(metrics.LatencyHistogram)에 기록합니다.
+
+흐름: on_message → [bounded queue] → 전송 스레드 → KafkaProducer(linger/batch/압축) → 콜백
+
+바이너리 프레임(wire.py)은 JSON으로 풀지 않고 sensor-raw로 보내고,
+헤더에 경고 플래그가 있을 때만 디코딩해서 해당 레코드를 JSON으로 sensor-alert에 보냅니다.
+
+키와 파티션 (topics.py):
+  - JSON 메시지는 machine_id를 키로, Partitioner가 정한 파티션으로 보냄 → 설비별 순서 보장
+  - 프레임은 파티션별 프레임으로 나눠서 보냄 (배열 단위로 나누고 다시 묶기만 함)
+  - 파티션 수는 시작할 때 producer 메타데이터에서 가져옴 (못 가져오면 config.KAFKA_CONFIG)
+
+spill_policy="spool"이면 Kafka 장애 중에 보내지 못한 payload를 디스크 스풀(spool.py)에 쌓습니다.
+  - 전송 실패(예외 / 콜백 에러) 또는 큐가 가득 찬 경우 → 스풀에 저장, 장애 상태로 전환
+  - 전송 중에 실패한 메시지는 보낼 토픽 태그(SPOOL_RAW / SPOOL_ALERT)를 붙여 그 메시지만 저장
+    (sensor-raw 조각만 실패했으면 경고는 다시 만들지 않고, sensor-alert 레코드만 실패했으면 그것만 다시 보냄)
+  - 스풀에 데이터가 남아 있는 동안은 새 메시지도 스풀 뒤에 붙임 (순서 유지)
+  - 드레인 스레드가 스풀을 순서대로 읽어 drain_rate 이하로 보내고, ack를 확인한 뒤에만 위치를 넘김
+    실패하면 지수 백오프 후 같은 위치부터 다시 시도
+  - MQTT 쪽(submit)은 Kafka를 기다리지 않음 (최대 block_timeout 후 스풀로)
+"""
+import json
+import queue
+import threading
+import time
+
+from config import KAFKA_CONFIG, BRIDGE_CONFIG
+from metrics import LatencyHistogram, Meter
+from spool import Spool, SpoolError
+from topics import Partitioner, partition_count
+from wire import is_frame, peek_flags, FRAME_HAS_ALERTS, WireFormatError
+from batch import ReadingBatch
+
+ALERT_STATUSES = ("WARNING", "ANOMALY")
+SPILL_POLICIES = ("drop_oldest", "drop_newest", "spool")
+
+# 스풀 레코드 태그. 태그가 없으면 MQTT 원본 payload (경로 계산부터 다시 함)
+# JSON은 "{", 프레임은 wire.MAGIC로 시작하므로 NUL로 시작하는 태그와 겹치지 않음
+SPOOL_RAW = b"\x00R"       # 나눠 둔 sensor-raw 메시지 (경고는 따로 보냈거나 따로 스풀됨)
+SPOOL_ALERT = b"\x00A"     # sensor-alert로 보낼 JSON 레코드
+
+
+def create_producer(**overrides):
+    """브릿지 설정(linger/batch/압축)을 적용한 KafkaProducer를 만듭니다."""
+    from kafka import KafkaProducer
+
+    options = {
+        "bootstrap_servers": KAFKA_CONFIG["bootstrap_servers"],
+        "api_version": KAFKA_CONFIG["api_version"],
+        "linger_ms": BRIDGE_CONFIG["linger_ms"],
+        "batch_size": BRIDGE_CONFIG["batch_size"],
+        "compression_type": BRIDGE_CONFIG["compression_type"],
+        "acks": BRIDGE_CONFIG["acks"],
+        "max_block_ms": BRIDGE_CONFIG["max_block_ms"],
+    }
+    options.update(overrides)
+    return KafkaProducer(**options)
+
+
+class PayloadRouter:
+    """MQTT payload → sensor-raw / sensor-alert로 보낼 (파티션, 키, 값) 목록. (KafkaForwarder, AsyncBridge 공용)"""
+
+    def __init__(self, partitioner: Partitioner, alert_partitioner: Partitioner, schema=None):
+        self.partitioner = partitioner
+        self.alert_partitioner = alert_partitioner
+        self.schema = schema
+        self._schema_warned = False
+
+    @classmethod
+    def for_topics(cls, producer, raw_topic: str, alert_topic: str, schema=None,
+                   partitioner: Partitioner = None, alert_partitioner: Partitioner = None) -> "PayloadRouter":
+        """토픽의 실제 파티션 수로 Partitioner를 만듭니다. (넘긴 Partitioner는 그대로 사용)"""
+        return cls(partitioner or Partitioner(partition_count(producer, raw_topic), schema=schema),
+                   alert_partitioner or Partitioner(partition_count(producer, alert_topic), schema=schema),
+                   schema)
+
+    def route(self, payload: bytes, data: dict = None):
+        """payload → (sensor-raw 메시지 목록, sensor-alert 메시지 목록). 메시지: (파티션, 키, 값).
+        JSON payload를 이미 풀었으면 data로 넘김 (다시 파싱하지 않음). JSON이 깨졌으면 ValueError."""
+        if is_frame(payload):
+            try:
+                raw = self.partitioner.split_frame(payload)
+            except WireFormatError as e:
+                # 스키마가 다른 프레임은 나누지 않고 그대로 보냄 (파티션은 producer가 정함)
+                if not self._schema_warned:
+                    print(f"[WARN] 프레임을 파티션별로 나누지 못했습니다 ({e}), 그대로 전송")
+                    self._schema_warned = True
+                return [(None, None, payload)], []
+            # 경고 레코드가 있는 프레임만 디코딩, dict는 경고 레코드만 만듦
+            if not peek_flags(payload) & FRAME_HAS_ALERTS:
+                return raw, []
+            batch = ReadingBatch.from_frame(payload, self.schema)
+            alerts = [(self.alert_partitioner.partition(data["machine_id"]), data["machine_id"].encode("utf-8"),
+                       json.dumps(data, ensure_ascii=False).encode("utf-8"))
+                      for data in batch.take(batch.status != 0).to_records()]
+            return raw, alerts
+
+        if data is None:
+            data = json.loads(payload)
+        if not isinstance(data, dict):
+            raise ValueError("JSON 객체가 아닙니다.")
+        machine_id = data.get("machine_id")
+        key = machine_id.encode("utf-8") if machine_id else None
+        raw = [(self.partitioner.partition(machine_id), key, payload)]
+        # 원본 bytes를 그대로 전달 (json.dumps 재직렬화 생략)
+        if data.get("status") in ALERT_STATUSES:
+            return raw, [(self.alert_partitioner.partition(machine_id), key, payload)]
+        return raw, []
+
+
+class KafkaForwarder:
+    """큐 + 배치 + 콜백 방식으로 센서 데이터를 Kafka에 전달합니다."""
+
+    def __init__(self, producer, raw_topic: str = None, alert_topic: str = None,
+                 queue_size: int = None, max_batch: int = None,
+                 block_timeout: float = None, spill_policy: str = None, metrics=None, schema=None,
+                 spool: Spool = None, partitioner: Partitioner = None,
+                 alert_partitioner: Partitioner = None):
+        self.producer = producer
+        self.raw_topic = raw_topic or KAFKA_CONFIG["raw_topic"]
+        self.alert_topic = alert_topic or KAFKA_CONFIG["alert_topic"]
+        self.max_batch = max_batch or BRIDGE_CONFIG["max_batch"]
+        self.block_timeout = (BRIDGE_CONFIG["block_timeout"]
+                              if block_timeout is None else block_timeout)
+        self.spill_policy = spill_policy or BRIDGE_CONFIG["spill_policy"]
+        if self.spill_policy not in SPILL_POLICIES:
+            raise ValueError(f"알 수 없는 spill_policy: {self.spill_policy}")
+
+        self.schema = schema            # 프레임 분할 / 경고 디코딩용 (생략하면 config.MACHINES 기준)
+        self.router = PayloadRouter.for_topics(producer, self.raw_topic, self.alert_topic, schema,
+                                               partitioner, alert_partitioner)
+        self.partitioner = self.router.partitioner
+        self.alert_partitioner = self.router.alert_partitioner
+        self.partition_sent = [0] * self.partitioner.num_partitions
+        self._queue = queue.Queue(maxsize=queue_size or BRIDGE_CONFIG["queue_size"])
+        self._thread = None
+        self._drain_thread = None
+        self._running = False
+
+        # 디스크 스풀 (spill_policy="spool")
+        self.spool = None
+        if self.spill_policy == "spool":
+            self.spool = spool or Spool()
+        self.healthy = True             # False: Kafka 장애 중 (새 메시지는 스풀로)
+        self._retry_at = 0.0
+        self._backoff = BRIDGE_CONFIG["retry_min"]
+        self.drained = Meter()
+        # 계측 레지스트리를 넘기면 지연 히스토그램과 통계를 그쪽에 등록 (/metrics에 함께 노출)
+        if metrics is not None:
+            self.latency = metrics.histogram("bridge_to_kafka")
+            metrics.gauge("forwarder", self.stats)
+            if self.spool is not None:
+                metrics.gauge("spool", self.spool_stats)
+        else:
+            self.latency = LatencyHistogram()
+
+        # 통계 카운터 (int 증가는 GIL 아래에서 충분히 안전)
+        self.received = 0
+        self.sent = 0
+        self.acked = 0
+        self.failed = 0
+        self.dropped = 0
+        self.alerts = 0
+        self.spooled = 0
+
+    # ------------------------------------------------------------
+    # MQTT 쪽 (paho 네트워크 스레드에서 호출)
+    # ------------------------------------------------------------
+    def submit(self, payload: bytes) -> bool:
+        """원본 payload를 큐에 넣습니다. 큐가 가득 차면 잠깐 기다린 뒤 spill 정책을 적용합니다."""
+        self.received += 1
+        item = (time.perf_counter(), payload)
+        try:
+            self._queue.put(item, timeout=self.block_timeout)
+            return True
+        except queue.Full:
+            pass
+
+        if self.spool is not None:
+            return self._to_spool([payload])
+        self.dropped += 1
+        if self.spill_policy == "drop_newest":
+            return False
+        # drop_oldest: 가장 오래된 메시지를 버리고 새 메시지를 넣음
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    # ------------------------------------------------------------
+    # 전송 스레드
+    # ------------------------------------------------------------
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="kafka-forwarder", daemon=True)
+        self._thread.start()
+        if self.spool is not None:
+            self._drain_thread = threading.Thread(target=self._drain, name="spool-drain", daemon=True)
+            self._drain_thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """큐에 남은 메시지를 모두 넘기고 producer를 flush한 뒤 종료합니다.
+        스풀에 남은 데이터는 디스크에 그대로 두고 다음 실행 때 이어서 보냅니다."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._drain_thread is not None:
+            self._drain_thread.join(timeout)
+        self.producer.flush(timeout)
+        if self.spool is not None:
+            self.spool.close()
+
+    def _run(self):
+        while self._running or not self._queue.empty():
+            batch = self._take_batch()
+            for n, (enqueued_at, payload) in enumerate(batch):
+                if self._spooling():
+                    # 장애 중에는 남은 배치를 통째로 스풀 뒤에 붙임 (send()가 막히지 않도록)
+                    self._to_spool([p for _, p in batch[n:]])
+                    break
+                self._send(enqueued_at, payload)
+
+    def _take_batch(self) -> list:
+        """첫 메시지는 최대 0.1초 기다리고, 나머지는 큐에 있는 만큼 한꺼번에 꺼냅니다."""
+        try:
+            batch = [self._queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _send(self, enqueued_at: float, payload: bytes):
+        try:
+            raw, alerts = self.router.route(payload)
+        except ValueError as e:
+            self.failed += 1
+            print(f"[ERROR] 잘못된 메시지 형식: {e}")
+            return
+
+        try:
+            for partition, key, value in raw:
+                future = self.producer.send(self.raw_topic, value=value, key=key, partition=partition)
+                future.add_callback(self._on_ack, enqueued_at)
+                # 실패하면 나눈 프레임만 스풀에 넣음 (다른 파티션으로 간 부분은 다시 보내지 않음)
+                future.add_errback(self._on_send_error, SPOOL_RAW, value)
+                self.sent += 1
+                if partition is not None:
+                    self.partition_sent[partition] += 1
+
+            for partition, key, value in alerts:
+                self.producer.send(self.alert_topic, value=value, key=key,
+                                   partition=partition).add_errback(self._on_send_error, SPOOL_ALERT, value)
+                self.alerts += 1
+        except Exception as e:
+            self._on_error(payload, e)
+
+    def _on_ack(self, enqueued_at, _metadata):
+        self.acked += 1
+        self.latency.record_seconds(time.perf_counter() - enqueued_at)
+
+    def _on_error(self, payload, exc):
+        """전송 전 실패 (send() 예외). 스풀을 쓰면 원본 payload를 스풀에 넣고 장애 상태로 바꿉니다."""
+        if self.spool is not None:
+            if self.healthy:
+                print(f"[WARN] Kafka 전송 실패 ({exc}) → 스풀에 저장 후 재전송")
+            self._mark_unhealthy()
+            self._to_spool([payload])
+            return
+        self.failed += 1
+        print(f"[ERROR] Kafka 전송 실패: {exc}")
+
+    def _on_send_error(self, tag: bytes, value: bytes, exc):
+        """토픽 하나로 보낸 메시지의 실패 (콜백). 스풀을 쓰면 태그를 붙여 그 메시지만 스풀에 넣습니다."""
+        if self.spool is None:
+            self.failed += 1
+            print(f"[ERROR] Kafka 전송 실패: {exc}")
+            return
+        if self.healthy:
+            print(f"[WARN] Kafka 전송 실패 ({exc}) → 스풀에 저장 후 재전송")
+        self._mark_unhealthy()
+        # 스풀에서 다시 보내므로 전송 수에서 뺌 (스풀이 받지 못하면 dropped로 셈)
+        if tag == SPOOL_RAW:
+            self.sent -= 1
+        else:
+            self.alerts -= 1
+        self._to_spool([tag + value])
+
+    # ------------------------------------------------------------
+    # 디스크 스풀
+    # ------------------------------------------------------------
+    def _spooling(self) -> bool:
+        """새 메시지를 스풀 뒤에 붙여야 하는지 (장애 중이거나 아직 못 보낸 스풀 데이터가 있음)."""
+        return self.spool is not None and (not self.healthy or len(self.spool) > 0)
+
+    def _to_spool(self, payloads: list) -> bool:
+        accepted = self.spool.append_many(payloads)
+        self.spooled += accepted
+        self.dropped += len(payloads) - accepted
+        return accepted == len(payloads)
+
+    def _mark_unhealthy(self):
+        if self.healthy:
+            self.healthy = False
+            self._retry_at = time.monotonic() + self._backoff
+
+    def _drain(self):
+        """스풀을 순서대로 Kafka에 다시 보냅니다. 배치마다 ack를 확인한 뒤에만 커밋합니다."""
+        rate = BRIDGE_CONFIG["drain_rate"]
+        batch_size = BRIDGE_CONFIG["drain_batch"]
+        while self._running:
+            if len(self.spool) == 0 or time.monotonic() < self._retry_at:
+                time.sleep(0.05)
+                continue
+            started = time.monotonic()
+            try:
+                payloads, cursor = self.spool.read(batch_size)
+            except (SpoolError, OSError, ValueError) as e:
+                print(f"[ERROR] 스풀 읽기 실패: {e}")
+                time.sleep(1.0)
+                continue
+            if not payloads:
+                time.sleep(0.05)
+                continue
+
+            if self._send_and_wait(payloads):
+                self.spool.commit(cursor, len(payloads))
+                self.drained.mark(len(payloads))
+                if not self.healthy:
+                    print(f"[INFO] Kafka 복구 - 스풀 재전송 중 (남은 {len(self.spool):,}건)")
+                self.healthy = True
+                self._backoff = BRIDGE_CONFIG["retry_min"]
+            else:
+                self.healthy = False
+                self._retry_at = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, BRIDGE_CONFIG["retry_max"])
+
+            # drain_rate 이하로 보내도록 배치 사이 간격 유지
+            time.sleep(max(0.0, len(payloads) / rate - (time.monotonic() - started)))
+
+    def _send_and_wait(self, payloads: list) -> bool:
+        """배치를 보내고 flush한 뒤 모두 ack됐는지 확인합니다."""
+        futures = []
+        sent = 0
+        try:
+            for payload in payloads:
+                try:
+                    raw, alerts = self._route_spooled(payload)
+                except ValueError:
+                    self.failed += 1        # 깨진 메시지는 버림 (다시 보내도 소용없음)
+                    continue
+                for partition, key, value in raw:
+                    futures.append(self.producer.send(self.raw_topic, value=value, key=key, partition=partition))
+                    sent += 1
+                for partition, key, value in alerts:
+                    futures.append(self.producer.send(self.alert_topic, value=value, key=key, partition=partition))
+                self.alerts += len(alerts)
+            self.producer.flush(BRIDGE_CONFIG["max_block_ms"] / 1000 * 10)
+            for future in futures:
+                future.get(timeout=0)
+        except Exception as e:
+            print(f"[WARN] 스풀 재전송 실패 ({e}), {self._backoff:.1f}초 후 재시도")
+            return False
+        self.sent += sent
+        self.acked += sent
+        return True
+
+    def _route_spooled(self, payload: bytes):
+        """스풀 레코드 → (sensor-raw 메시지 목록, sensor-alert 메시지 목록). 태그가 있으면 그 토픽으로만."""
+        tag = payload[:2]
+        if tag == SPOOL_ALERT:
+            value = payload[2:]
+            machine_id = json.loads(value).get("machine_id")
+            key = machine_id.encode("utf-8") if machine_id else None
+            return [], [(self.alert_partitioner.partition(machine_id), key, value)]
+        if tag == SPOOL_RAW:
+            raw, _ = self.router.route(payload[2:])
+            return raw, []
+        return self.router.route(payload)
+
+    def spool_stats(self) -> dict:
+        return {**self.spool.stats(), "healthy": self.healthy,
+                "drain_rate": round(self.drained.rate(), 1), "drained": self.drained.count}
+
+    # ------------------------------------------------------------
+    # 통계
+    # ------------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "received": self.received,
+            "sent": self.sent,
+            "acked": self.acked,
+            "alerts": self.alerts,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "queue_depth": self._queue.qsize(),
+            "spooled": self.spooled,
+            "spool_depth": len(self.spool) if self.spool is not None else 0,
+            "partition_sent": list(self.partition_sent),
+            "p50_ms": _ms(self.latency.percentile(50)),
+            "p99_ms": _ms(self.latency.percentile(99)),
+        }
+
+
+def _ms(us):
+    return None if us is None else round(us / 1000, 2)
+
+
+def report_forever(forwarder: KafkaForwarder, interval: float = None):
+    """주기적으로 처리량과 p50/p99 지연 시간을 출력합니다."""
+    interval = interval or BRIDGE_CONFIG["stats_interval"]
+    last_acked = forwarder.acked
+    while True:
+        time.sleep(interval)
+        stats = forwarder.stats()
+        rate = (stats["acked"] - last_acked) / interval
+        last_acked = stats["acked"]
+        print(f"[→ Kafka] {rate:,.0f} msg/s | acked={stats['acked']:,} "
+              f"failed={stats['failed']} dropped={stats['dropped']} "
+              f"queue={stats['queue_depth']} spool={stats['spool_depth']:,} | p50={stats['p50_ms']}ms p99={stats['p99_ms']}ms")
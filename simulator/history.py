@@ -0,0 +1,403 @@
+"""
+최근 센서 이력 캐시 (hot / cold).
+
+"CNC-001의 최근 2분"이 필요할 때마다 Machine을 따로 돌리거나 Kafka를 오프셋부터 다시 읽지 않도록,
+sensor-raw를 받아 프로세스 메모리에 설비별 이력을 들고 있다가 바로 돌려줍니다.
+
+  - hot:  설비마다 미리 할당한 NumPy 링 버퍼(ringbuffer.py), 열 = 그 설비의 센서 (config 순서)
+          최근 hot_seconds 동안의 데이터 → 조회는 복사 몇 번으로 끝남 (마이크로초 단위)
+  - cold: chunk_seconds 분량이 모이면 세그먼트 파일(.npy, float32)로 써 두고 필요할 때 memmap으로 읽음
+          전체 크기가 max_cold_bytes를 넘으면 가장 오래 조회하지 않은 세그먼트부터 지움 (LRU)
+          열어 둔 memmap도 max_open_segments개까지만 유지 (LRU)
+          다시 시작하면 cold_dir에 남은 세그먼트를 그대로 이어서 씀
+
+hot 링은 chunk보다 크게 잡으므로 아직 세그먼트로 쓰지 않은 행은 항상 hot에 있습니다.
+조회 구간이 hot 범위 안이면 파일을 보지 않고, 벗어나면 cold 세그먼트와 이어 붙입니다.
+
+조회 (시각은 데이터 timestamp 기준 epoch 초):
+  - latest(machine_id)                         가장 최근 값 {센서: 값}
+  - snapshot()                                 전체 설비의 latest
+  - window(machine_id, seconds)                그 설비의 마지막 데이터로부터 최근 N초
+  - range(machine_id, start, end)              임의 구간 (hot + cold)
+  - downsample(machine_id, start, end, step)   step초 버킷별 평균 / 최소 / 최대
+
+변화 보고 모드(partial) 레코드는 StateReconstructor로 전체 스냅샷으로 되돌려 저장합니다.
+설비별로 시각이 거꾸로 가는 레코드는 버리고 late로 집계합니다. (파티션 안에서는 순서가 보장됨)
+풀 수 없는 메시지(스키마가 다른 프레임, 깨진 JSON 등)는 건너뛰고 invalid로 집계합니다.
+수신 스레드가 죽으면 main()은 오래된 이력을 계속 보여주지 않고 오류를 출력한 뒤 종료합니다.
+
+실행: python simulator/history.py --machine CNC-001 --seconds 120     # sensor-raw를 받으면서 주기적으로 조회
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG, SIMULATION_CONFIG, HISTORY_CONFIG
+from deadband import StateReconstructor
+from ringbuffer import RingBuffer
+from wire import WireSchema, decode_payload
+
+
+def _segment_dtype(width: int) -> np.dtype:
+    return np.dtype([("t", "<f8"), ("v", "<f4", (width,))])
+
+
+class Segment:
+    """cold 세그먼트 파일 하나: 한 설비의 [t0, t1] 구간."""
+
+    __slots__ = ("machine_id", "path", "t0", "t1", "rows", "bytes")
+
+    def __init__(self, machine_id: str, path: str, t0: float, t1: float, rows: int, size: int):
+        self.machine_id = machine_id
+        self.path = path
+        self.t0 = t0
+        self.t1 = t1
+        self.rows = rows
+        self.bytes = size
+
+
+class ColdStore:
+    """세그먼트 파일 목록과 LRU 정리. 세그먼트 파일명: {cold_dir}/{machine_id}/{t0}-{t1}.npy"""
+
+    def __init__(self, directory: str = None, max_bytes: int = None, max_open: int = None):
+        cfg = HISTORY_CONFIG
+        self.directory = directory or cfg["cold_dir"]
+        self.max_bytes = max_bytes or cfg["max_cold_bytes"]
+        self.max_open = max_open or cfg["max_open_segments"]
+        self.segments = OrderedDict()       # path → Segment (앞쪽이 가장 오래 안 쓴 것)
+        self.by_machine = {}                # machine_id → [Segment] (시각 순서)
+        self.bytes = 0
+        self.evicted = 0
+        self._open = OrderedDict()          # path → memmap
+        os.makedirs(self.directory, exist_ok=True)
+
+    def load(self, widths: dict):
+        """디스크에 남은 세그먼트를 등록합니다. 센서 수가 바뀐 설비의 파일은 건너뜁니다."""
+        found = []
+        for machine_id in sorted(os.listdir(self.directory)):
+            folder = os.path.join(self.directory, machine_id)
+            if machine_id not in widths or not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    t0, t1 = (float(x) for x in name[:-len(".npy")].split("-"))
+                    data = np.load(path, mmap_mode="r")
+                except (ValueError, OSError):
+                    continue
+                if data.dtype != _segment_dtype(widths[machine_id]):
+                    continue
+                found.append((os.path.getmtime(path),
+                              Segment(machine_id, path, t0, t1, len(data), os.path.getsize(path))))
+        for _, segment in sorted(found, key=lambda item: item[0]):
+            self._register(segment)
+        self._evict()
+
+    def write(self, machine_id: str, times: np.ndarray, values: np.ndarray) -> Segment:
+        folder = os.path.join(self.directory, machine_id)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{times[0]:.3f}-{times[-1]:.3f}.npy")
+        data = np.empty(len(times), dtype=_segment_dtype(values.shape[1]))
+        data["t"] = times
+        data["v"] = values
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp, path)      # 읽는 쪽이 반쯤 쓴 파일을 보지 않도록
+        segment = Segment(machine_id, path, float(times[0]), float(times[-1]), len(times), os.path.getsize(path))
+        self._register(segment)
+        self._evict()
+        return segment
+
+    def _register(self, segment: Segment):
+        self.segments[segment.path] = segment
+        segments = self.by_machine.setdefault(segment.machine_id, [])
+        segments.append(segment)
+        if len(segments) > 1 and segments[-2].t0 > segment.t0:
+            segments.sort(key=lambda s: s.t0)
+        self.bytes += segment.bytes
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self.segments:
+            _, segment = self.segments.popitem(last=False)
+            self.by_machine[segment.machine_id].remove(segment)
+            self._open.pop(segment.path, None)
+            self.bytes -= segment.bytes
+            self.evicted += 1
+            try:
+                os.remove(segment.path)
+            except OSError:
+                pass
+
+    def read(self, machine_id: str, t0: float, t1: float):
+        """[t0, t1) 구간을 덮는 세그먼트의 행을 이어 붙입니다. 반환: (시각, 값) 또는 None."""
+        parts = []
+        segments = self.by_machine.get(machine_id, [])
+        # 세그먼트는 시각 순서이고 겹치지 않으므로 t0 이후에 끝나는 첫 세그먼트부터 봄
+        for segment in segments[bisect.bisect_left(segments, t0, key=lambda s: s.t1):]:
+            if segment.t0 >= t1:
+                break
+            self.segments.move_to_end(segment.path)
+            data = self._map(segment)
+            if t0 <= segment.t0 and segment.t1 < t1:
+                parts.append(data)
+                continue
+            start, stop = np.searchsorted(data["t"], (t0, t1), side="left")
+            if stop > start:
+                parts.append(data[start:stop])
+        if not parts:
+            return None
+        rows = np.concatenate(parts)
+        return rows["t"], rows["v"].astype(np.float64)
+
+    def _map(self, segment: Segment):
+        data = self._open.get(segment.path)
+        if data is None:
+            # memmap 서브클래스는 슬라이스마다 부가 비용이 있어 일반 ndarray 뷰로 씀 (매핑은 그대로)
+            data = self._open[segment.path] = np.load(segment.path, mmap_mode="r").view(np.ndarray)
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+        else:
+            self._open.move_to_end(segment.path)
+        return data
+
+    def stats(self) -> dict:
+        return {"segments": len(self.segments), "bytes": self.bytes, "evicted": self.evicted,
+                "open": len(self._open)}
+
+
+class MachineHistory:
+    """설비 하나의 hot 링 + 아직 세그먼트로 쓰지 않은 chunk."""
+
+    def __init__(self, sensors: list, hot_rows: int, chunk_rows: int):
+        self.sensors = sensors
+        self.column = {name: i for i, name in enumerate(sensors)}
+        self.hot = RingBuffer(hot_rows, len(sensors))
+        self.chunk_times = np.empty(chunk_rows)
+        self.chunk_values = np.empty((chunk_rows, len(sensors)), dtype=np.float32)
+        self.chunk_size = 0
+        self.status = None
+        self.last_t = -np.inf
+
+    def append(self, t: float, row: list) -> bool:
+        """반환: chunk가 가득 참 (세그먼트로 쓸 때)."""
+        self.hot.append(t, row)
+        self.chunk_times[self.chunk_size] = t
+        self.chunk_values[self.chunk_size] = row
+        self.chunk_size += 1
+        self.last_t = t
+        return self.chunk_size == len(self.chunk_times)
+
+
+class HistoryStore:
+    """설비별 최근 이력. 수신 스레드가 add()로 채우고, 다른 스레드가 조회합니다."""
+
+    def __init__(self, machines: dict = None, hot_seconds: float = None, chunk_seconds: float = None,
+                 rate: float = None, cold: ColdStore = None):
+        cfg = HISTORY_CONFIG
+        machines = MACHINES if machines is None else machines
+        rate = rate or 1 / SIMULATION_CONFIG["interval_seconds"]
+        hot_seconds = hot_seconds or cfg["hot_seconds"]
+        chunk_seconds = chunk_seconds or cfg["chunk_seconds"]
+        chunk_rows = max(1, int(chunk_seconds * rate))
+        # 아직 세그먼트로 쓰지 않은 행이 항상 hot에 남도록 hot은 chunk보다 크게
+        hot_rows = max(int(hot_seconds * rate), chunk_rows + 1)
+        self.machines = {m: MachineHistory(list(config["sensors"]), hot_rows, chunk_rows)
+                         for m, config in machines.items()}
+        self.state = StateReconstructor(machines)
+        self.cold = cold if cold is not None else ColdStore()
+        self.cold.load({m: len(h.sensors) for m, h in self.machines.items()})
+        self.lock = threading.Lock()
+        self.records = 0
+        self.late = 0
+        self.unknown = 0
+        self.invalid = 0            # 풀 수 없어 건너뛴 메시지
+        self.consumer_error = None  # 수신 스레드를 멈춘 예외
+
+    # ------------------------------------------------------------
+    # 적재
+    # ------------------------------------------------------------
+    def add(self, record: dict):
+        history = self.machines.get(record["machine_id"])
+        if history is None:
+            self.unknown += 1
+            return
+        t = datetime.fromisoformat(record["timestamp"]).timestamp()
+        if t <= history.last_t:
+            self.late += 1
+            return
+        values = self.state.apply(record)["sensors"]
+        row = [values.get(name, np.nan) for name in history.sensors]
+        with self.lock:
+            history.status = record["status"]
+            if history.append(t, row):
+                self._spill(record["machine_id"], history)
+            self.records += 1
+
+    def add_many(self, records: list):
+        for record in records:
+            self.add(record)
+
+    def _spill(self, machine_id: str, history: MachineHistory):
+        n = history.chunk_size
+        self.cold.write(machine_id, history.chunk_times[:n], history.chunk_values[:n])
+        history.chunk_size = 0
+
+    # ------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------
+    def latest(self, machine_id: str) -> dict:
+        """{"t", "status", "sensors": {센서: 값}}. 데이터가 없으면 None."""
+        history = self.machines[machine_id]
+        with self.lock:
+            last = history.hot.latest()
+            status = history.status
+        if last is None:
+            return None
+        t, row = last
+        return {"t": float(t), "status": status, "sensors": dict(zip(history.sensors, row.tolist()))}
+
+    def snapshot(self) -> dict:
+        return {m: self.latest(m) for m in self.machines}
+
+    def window(self, machine_id: str, seconds: float, sensors: list = None):
+        """그 설비의 마지막 데이터 시각으로부터 최근 seconds초 (last - seconds, last]. 반환: (시각, 값[행, 센서])."""
+        last_t = self.machines[machine_id].last_t
+        if last_t == -np.inf:
+            return self._empty(machine_id, sensors)
+        return self.range(machine_id, np.nextafter(last_t - seconds, np.inf), np.nextafter(last_t, np.inf), sensors)
+
+    def range(self, machine_id: str, start: float, end: float, sensors: list = None):
+        """start <= 시각 < end. hot 범위를 벗어난 앞부분은 cold 세그먼트에서 읽어 붙입니다."""
+        history = self.machines[machine_id]
+        with self.lock:
+            times, values = history.hot.between(start, end)
+            oldest = history.hot.oldest()
+        hot_start = oldest[0] if oldest is not None else np.inf
+        if start < hot_start:
+            with self.lock:
+                older = self.cold.read(machine_id, start, min(end, hot_start))
+            if older is not None:
+                times = np.concatenate([older[0], times])
+                values = np.concatenate([older[1], values])
+        return times, self._columns(history, values, sensors)
+
+    def downsample(self, machine_id: str, start: float, end: float, step: float,
+                   sensors: list = None, how: str = "mean"):
+        """step초 버킷별 집계 (NaN 제외). how: mean / min / max. 반환: (버킷 시작 시각, 값[버킷, 센서])."""
+        times, values = self.range(machine_id, start, end, sensors)
+        if not len(times):
+            return times, values
+        buckets = np.floor((times - start) / step).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        if how == "mean":
+            present = ~np.isnan(values)
+            sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=0)
+            counts = np.add.reduceat(present, starts, axis=0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                result = sums / counts
+        elif how == "min":
+            result = np.fmin.reduceat(values, starts, axis=0)
+        elif how == "max":
+            result = np.fmax.reduceat(values, starts, axis=0)
+        else:
+            raise ValueError(f"알 수 없는 집계: {how}")
+        return start + buckets[starts] * step, result
+
+    def _columns(self, history: MachineHistory, values: np.ndarray, sensors: list):
+        if sensors is None:
+            return values
+        return values[:, [history.column[name] for name in sensors]]
+
+    def _empty(self, machine_id: str, sensors: list):
+        width = len(sensors) if sensors is not None else len(self.machines[machine_id].sensors)
+        return np.empty(0), np.empty((0, width))
+
+    def stats(self) -> dict:
+        return {"records": self.records, "late": self.late, "unknown": self.unknown, "invalid": self.invalid,
+                "cold": self.cold.stats()}
+
+
+def consume_forever(store: HistoryStore, consumer, stop=lambda: False, schema: WireSchema = None):
+    """sensor-raw 메시지를 store에 넣습니다. (그룹 없이 읽으므로 다른 컨슈머 그룹에 영향 없음)
+    schema: 바이너리 프레임용 (store와 같은 설비 구성, 생략하면 config.MACHINES 기준)"""
+    while not stop():
+        for messages in consumer.poll(timeout_ms=200).values():
+            for msg in messages:
+                try:
+                    records = decode_payload(msg.value, schema)
+                    store.add_many(records)
+                except (ValueError, KeyError, TypeError) as e:
+                    # 메시지 하나 때문에 수신 스레드가 죽지 않도록 건너뜀 (처음 몇 건만 출력)
+                    store.invalid += 1
+                    if store.invalid <= 10:
+                        print(f"[WARN] 이력: 처리할 수 없는 메시지 건너뜀 ({type(e).__name__}: {e})")
+
+
+def _consume_thread(store: HistoryStore, consumer, schema: WireSchema):
+    try:
+        consume_forever(store, consumer, schema=schema)
+    except Exception as e:
+        store.consumer_error = e
+        print(f"[ERROR] 이력 수신 스레드 종료: {type(e).__name__}: {e}")
+
+
+def start_kafka(store: HistoryStore, start_from: str = None, schema: WireSchema = None) -> threading.Thread:
+    """백그라운드 스레드에서 sensor-raw를 읽어 store를 채웁니다. 반환: 수신 스레드 (죽으면 store.consumer_error)"""
+    from kafka import KafkaConsumer
+
+    consumer = KafkaConsumer(
+        KAFKA_CONFIG["raw_topic"],
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        auto_offset_reset=start_from or HISTORY_CONFIG["start_from"],
+    )
+    thread = threading.Thread(target=_consume_thread, args=(store, consumer, schema),
+                              name="history-consumer", daemon=True)
+    thread.start()
+    return thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw 최근 이력 캐시 (hot 링 버퍼 + cold 세그먼트)")
+    parser.add_argument("--machine", default="CNC-001", help="주기적으로 조회할 설비")
+    parser.add_argument("--seconds", type=float, default=120.0, help="조회 구간(초)")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    parser.add_argument("--from", dest="start_from", choices=("earliest", "latest"), default=HISTORY_CONFIG["start_from"])
+    parser.add_argument("--interval", type=float, default=5.0, help="조회 / 출력 주기(초)")
+    args = parser.parse_args(argv)
+
+    machines = MACHINES
+    if args.copies > 1:
+        from fleet import expand_machines
+        machines = expand_machines(MACHINES, args.copies)
+    store = HistoryStore(machines)
+    consumer = start_kafka(store, args.start_from, WireSchema(machines))
+    print(f"이력 캐시 시작! 설비 {len(machines)}대, hot {HISTORY_CONFIG['hot_seconds']:g}s, "
+          f"cold {store.cold.directory} (세그먼트 {store.cold.stats()['segments']}개)")
+    try:
+        while True:
+            time.sleep(args.interval)
+            if not consumer.is_alive():
+                # 이력이 더 이상 갱신되지 않으므로 오래된 창을 계속 출력하지 않고 종료
+                raise SystemExit(f"이력 수신 스레드가 멈췄습니다: {store.consumer_error!r}")
+            started = time.perf_counter()
+            times, values = store.window(args.machine, args.seconds)
+            took = (time.perf_counter() - started) * 1e6
+            latest = store.latest(args.machine)
+            print(f"[이력] {args.machine} 최근 {args.seconds:g}s: {len(times)}행 ({took:.0f}µs) | "
+                  f"latest={latest and latest['status']} | {store.stats()}")
+    except KeyboardInterrupt:
+        print("\n⏹ 이력 캐시 종료")
+
+
+if __name__ == "__main__":
+    main()
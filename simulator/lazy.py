@@ -0,0 +1,32 @@
+"""
+처음 쓸 때 불러오는 모듈 (numpy).
+
+명령 모듈이 numpy를 맨 위에서 불러오면 python -m simulator <명령> --help만 해도 numpy import(~150ms)를 기다립니다.
+그래서 시뮬레이터 모듈은 import numpy as np 대신
+  from lazy import np
+를 쓰고, np.<이름>을 처음 찾는 순간(명령 모듈에서는 인자 파싱이 끝난 뒤) 실제로 불러옵니다.
+불러온 뒤에는 보통 모듈과 같고, 다른 라이브러리(pyarrow, matplotlib)의 import numpy도 이 모듈을 그대로 받습니다.
+
+주의 (불러오는 즉시 numpy를 불러오게 되는 것):
+  - 타입 힌트의 np.ndarray는 정의 시점에 평가됨 → 힌트에 np를 쓰는 모듈은 from __future__ import annotations
+  - 모듈 수준 상수, 기본 인자에 np.<이름>을 쓰지 않음
+"""
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    """sys.modules에 없으면 속성을 처음 찾을 때 불러오는 모듈을 등록해서 돌려줍니다."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+np = lazy_import("numpy")
@@ -1,85 +1,197 @@
 """
 센서 시뮬레이터 메인 실행 파일.
-모든 설비의 센서 데이터를 1초마다 생성하여 콘솔에 출력합니다.
+모든 설비의 센서 데이터를 1초마다 생성하여 MQTT로 발행하고 콘솔에 출력합니다.
 
 실행: python simulator/main.py
+재현/백필 예시:
+  python simulator/main.py --seed 42 --mode accelerated --speed 60
+  python simulator/main.py --seed 42 --mode fast --ticks 604800 --output week.jsonl
+바이너리 프레임: python simulator/main.py --format binary  (토픽 factory/frames)
+변화 보고 모드: python simulator/main.py --deadband  (바뀐 센서만 발행, deadband.py)
+진동 파형 + 엣지 특징: python simulator/main.py --waveform  (특징만 1초마다, 원시 파형은 이상 앞뒤로만, waveform.py)
+설비 수천 대 부하 테스트는 멀티 프로세스 발행기 사용: python simulator/fleet_publisher.py
+모든 도구는 통합 실행기로도 실행 가능: python -m simulator main ... (명령 목록은 python -m simulator)
 """
+import argparse
 import json
-import time
 import signal
 import sys
-from datetime import datetime
-import paho.mqtt.client as mqtt
 
-from config import MACHINES, SIMULATION_CONFIG
-from machine import Machine
+from config import MACHINES, SIMULATION_CONFIG, DEADBAND_CONFIG, WAVEFORM_CONFIG
+from clock import SimClock, CLOCK_MODES, DEFAULT_REPLAY_START, parse_start
 
+FRAME_TOPIC = "factory/frames"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Smart Factory Sensor Simulator")
+    parser.add_argument("--seed", type=int, default=SIMULATION_CONFIG["seed"],
+                        help="난수 seed (같은 seed + 설정 → 같은 데이터)")
+    parser.add_argument("--mode", choices=CLOCK_MODES, default=SIMULATION_CONFIG["clock_mode"],
+                        help="시계 모드")
+    parser.add_argument("--speed", type=float, default=SIMULATION_CONFIG["speed"],
+                        help="accelerated 모드 배속")
+    parser.add_argument("--start", default=SIMULATION_CONFIG["start_time"],
+                        help="시뮬레이션 시작 시각 (ISO 형식)")
+    parser.add_argument("--ticks", type=int, default=None,
+                        help="생성할 틱 수 (생략하면 Ctrl+C까지)")
+    parser.add_argument("--format", choices=("json", "binary"),
+                        default=SIMULATION_CONFIG["output_format"],
+                        help="MQTT 메시지 형식")
+    parser.add_argument("--output", default=None,
+                        help="MQTT 대신 JSON Lines 파일로 저장 (백필용)")
+    parser.add_argument("--deadband", action=argparse.BooleanOptionalAction,
+                        default=DEADBAND_CONFIG["enabled"],
+                        help="변화 보고 모드: deadband를 넘게 바뀐 센서만 발행 (heartbeat마다 한 번은 발행)")
+    parser.add_argument("--waveform", action=argparse.BooleanOptionalAction,
+                        default=WAVEFORM_CONFIG["enabled"],
+                        help="진동 센서 고주파 파형 생성 + 엣지 특징 발행 (MQTT로 보낼 때만)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # numpy를 쓰는 모듈은 인자를 해석한 뒤에 불러옴 (--help, 잘못된 인자는 바로 끝남)
+    from deadband import DeadbandFilter
+    from fleet import Fleet
+    from wire import WireSchema, FleetEncoder
+    from metrics import now_ms
+
+    # seed를 줬는데 시작 시각이 없으면 고정 시각에서 시작 (실행할 때마다 같은 timestamp)
+    start = parse_start(args.start) if args.start else None
+    if start is None and args.seed is not None:
+        start = DEFAULT_REPLAY_START
+    clock = SimClock(SIMULATION_CONFIG["interval_seconds"], args.mode, args.speed, start)
+    fleet = Fleet(MACHINES, seed=args.seed)
+
+    # 실시간으로 MQTT에 보낼 때만 설비별 콘솔 출력 (빠른 모드에서는 출력이 병목)
+    verbose = args.mode == "realtime" and args.output is None
+    binary = args.format == "binary" and args.output is None
+    encoder = FleetEncoder(fleet, WireSchema(MACHINES)) if binary else None
+    deadband = DeadbandFilter(fleet, MACHINES) if args.deadband else None
+    generator = edge = None
+    if args.waveform and args.output is None:
+        import waveform
+        generator = waveform.WaveformGenerator(fleet)
+        edge = waveform.EdgeProcessor(generator)
 
-def main():
     print("=" * 60)
     print("🏭 Smart Factory Sensor Simulator")
     print(f"   설비 수: {len(MACHINES)}대")
     print(f"   데이터 생성 간격: {SIMULATION_CONFIG['interval_seconds']}초")
+    print(f"   시계: {clock.mode} (x{clock.speed:g}), 시작 {clock.timestamp()}")
+    print(f"   seed: {fleet.seed}")
+    print(f"   형식: {'binary (' + FRAME_TOPIC + ')' if binary else 'json'}"
+          f"{' + 변화 보고(deadband)' if deadband else ''}")
+    if edge is not None:
+        print(f"   진동 파형: 센서 {len(generator)}개 × {generator.sample_rate:,} Hz → 특징만 발행 "
+              f"({WAVEFORM_CONFIG['topic'].format(machine_id='<설비>')})")
     print("=" * 60)
     print() #개요
-    
-    # 설비 인스턴스 생성
-    machines = {}
+
     for machine_id, config in MACHINES.items():
-        machines[machine_id] = Machine(machine_id, config)
         print(f"  ✅ {machine_id} ({config['type']}) 초기화 완료")
-    
+
     print()
     print("▶ 데이터 생성 시작... (Ctrl+C로 중지)")
     print("-" * 60)
-    
+
     # 종료 처리
     running = True
     def signal_handler(sig, frame):
         nonlocal running
         running = False
         print("\n\n⏹ 시뮬레이터 종료 중...")
-    
+
     signal.signal(signal.SIGINT, signal_handler)
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-    client.connect("localhost", 1883)
+
+    # 출력 대상: MQTT 또는 파일
+    client = None
+    output = None
+    if args.output:
+        output = open(args.output, "w", encoding="utf-8")
+    else:
+        import paho.mqtt.client as mqtt     # 파일 출력(백필)만 할 때는 불러오지 않음
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        client.connect("localhost", 1883)
+        client.loop_start()
 
     # 메인 루프
     count = 0
-    while running:
+    while running and (args.ticks is None or count < args.ticks):
         count += 1
-        
-        for machine_id, machine in machines.items():
-            data = machine.read_all_sensors()
-            topic = f"factory/{machine_id}/sensors"
-            client.publish(topic, json.dumps(data, ensure_ascii=False))
 
-            # 콘솔 출력 (나중에 MQTT Publish로 교체)
+        fleet.step()  # 전체 설비 1틱 진행
+        if edge is not None:
+            waveform.publish(client, edge, generator.block(fleet), round(clock.epoch() * 1000), clock.timestamp())
+        mask = seq = None
+        if deadband is not None:
+            mask, seq = deadband.update(fleet), deadband.seq
+        if binary:
+            # 틱마다 전체 설비를 프레임 하나로 발행 (dict/JSON을 만들지 않음)
+            payload = encoder.encode(fleet, round(clock.epoch() * 1000), now_ms(), mask, seq)
+            if payload is not None:     # 변화 보고 모드에서 바뀐 설비가 없으면 보내지 않음
+                client.publish(FRAME_TOPIC, payload)
+            if count % 60 == 0:
+                print(f"[{clock.timestamp()[:19]}] 프레임 {count}개 발행")
+            clock.advance()
+            continue
+
+        # 발행 시각(created_ms)은 MQTT로 보낼 때만 붙임 (파일 출력은 seed가 같으면 항상 같은 내용)
+        created_ms = now_ms() if client is not None else None
+        for data in fleet.records(clock.timestamp(), created_ms, mask, seq):
+            machine_id = data["machine_id"]
+            payload = json.dumps(data, ensure_ascii=False)
+            if output is not None:
+                output.write(payload + "\n")
+                continue
+            client.publish(f"factory/{machine_id}/sensors", payload)
+            if not verbose:
+                continue
+
+            # 콘솔 출력
             status_emoji = {
                 "RUNNING": "🟢",
                 "WARNING": "🟡",
                 "ANOMALY": "🔴"
             }.get(data["status"], "⚪")
-            
+
             print(f"[{data['timestamp'][:19]}] {status_emoji} {machine_id}: ", end="")
-            
+
             # 센서 값 요약 출력
             sensor_summary = ", ".join(
                 f"{k}={v}" for k, v in list(data["sensors"].items())[:3]
             )
             print(f"{sensor_summary} ...")
-            
-            # JSON 파일로도 저장 (디버깅 & 확인용)
-            if count == 1:  # 첫 번째 데이터만 예쁘게 출력
+
+            # 첫 번째 데이터만 예쁘게 출력 (디버깅 & 확인용)
+            if count == 1:
                 print(f"\n  📋 샘플 데이터 (전체 JSON):")
                 print(f"  {json.dumps(data, indent=2, ensure_ascii=False)}")
                 print()
-        
-        print()  # 설비 간 구분
-        time.sleep(SIMULATION_CONFIG["interval_seconds"])
-    
+
+        if verbose:
+            print()  # 설비 간 구분
+        elif count % 3600 == 0:
+            print(f"  ... {count:,}틱 생성 (시뮬레이션 시각 {clock.timestamp()})", file=sys.stderr)
+        clock.advance()
+
+    if output is not None:
+        output.close()
+    if client is not None:
+        client.loop_stop()
+        client.disconnect()
+
     print("✅ 시뮬레이터가 정상 종료되었습니다.")
-    print(f"   총 {count}회 데이터 생성")
+    print(f"   총 {count}회 데이터 생성 (늦은 틱 {clock.late_ticks}회)")
+    if edge is not None:
+        stats = edge.stats()
+        print(f"   진동 파형: 원시 블록 {stats['raw_blocks']:,} / {stats['blocks']:,}개만 발행 "
+              f"({stats['raw_ratio']:.1%}, 트리거 {stats['triggers']}회)")
+    if deadband is not None:
+        print(f"   변화 보고: 센서 값 {deadband.stats()['sensor_ratio']:.1%}, "
+              f"레코드 {deadband.stats()['record_ratio']:.1%}만 발행")
 
 
 if __name__ == "__main__":
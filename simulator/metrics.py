@@ -0,0 +1,431 @@
+"""
+파이프라인 계측(instrumentation) 공용 모듈.
+
+시뮬레이터가 레코드마다 붙이는 두 값을 기준으로 단계별 상태를 잽니다.
+  - seq:        설비별 일련번호 (틱 번호, 1부터) → 유실 / 중복 / 순서 뒤바뀜
+  - created_ms: 레코드를 만든 실제 시각 (epoch ms) → 시뮬레이터에서 이 단계까지의 지연
+
+구성 요소:
+  - LatencyHistogram: HDR 방식 로그-선형 히스토그램 (상대 오차 약 1.6%, 메모리 고정)
+  - SequenceTracker:  설비별 seq 추적
+  - Meter:            최근 N초 처리량
+  - MetricsRegistry:  위 항목 + 게이지(큐 길이 등)를 이름으로 모아 snapshot() 한 번에 반환
+  - 내보내기: 로컬 HTTP 엔드포인트(GET /metrics, JSON) 또는 주기적 스냅샷 파일
+
+기록 경로는 리스트/딕셔너리 연산 몇 번뿐이라 운영 중에도 켜 둘 수 있습니다.
+(스레드 간 카운터 증가는 GIL 아래 근사치 - 통계 용도로는 충분)
+
+실행 중인 브릿지 확인: curl -s localhost:9201/metrics
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from lazy import np
+
+from config import METRICS_CONFIG
+from wire import is_frame, peek_created_ms, default_schema
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def now_ms() -> int:
+    """현재 실제 시각 (epoch ms). created_ms와 같은 기준."""
+    return int(time.time() * 1000)
+
+
+class LatencyHistogram:
+    """HDR 방식 로그-선형 히스토그램. 값은 µs 정수로 기록합니다.
+
+    2^sub_bits 미만은 1µs 단위, 그 위로는 2의 거듭제곱 구간마다 2^(sub_bits-1)개로 나눔
+    → 크기와 상관없이 상대 오차가 2^-(sub_bits-1) 이하.
+    """
+
+    def __init__(self, sub_bits: int = None, max_us: int = 3600 * 10**6):
+        self.sub_bits = sub_bits or METRICS_CONFIG["histogram_bits"]
+        self.sub_count = 1 << self.sub_bits
+        self.half = self.sub_count >> 1
+        self.max_us = max_us
+        self.counts = [0] * (self._index(max_us) + 1)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us = max_us
+        self.max_seen_us = 0
+
+    def _index(self, us: int) -> int:
+        if us < self.sub_count:
+            return us
+        shift = us.bit_length() - self.sub_bits
+        return self.sub_count + (shift - 1) * self.half + (us >> shift) - self.half
+
+    def _bucket_value(self, index: int) -> float:
+        """버킷의 대표값 (구간 중앙, µs)."""
+        if index < self.sub_count:
+            return float(index)
+        shift, top = divmod(index - self.sub_count, self.half)
+        shift += 1
+        top += self.half
+        return ((top << shift) + ((top + 1) << shift) - 1) / 2
+
+    def record(self, us: int, count: int = 1):
+        us = int(us)
+        if us < self.sub_count:
+            index = us if us > 0 else 0
+            us = index
+        else:
+            if us > self.max_us:
+                us = self.max_us
+            shift = us.bit_length() - self.sub_bits
+            index = self.sub_count + (shift - 1) * self.half + (us >> shift) - self.half
+        self.counts[index] += count
+        self.total += count
+        self.sum_us += us * count
+        if us > self.max_seen_us:
+            self.max_seen_us = us
+        if us < self.min_us:
+            self.min_us = us
+
+    def record_seconds(self, seconds: float, count: int = 1):
+        self.record(int(seconds * 1_000_000), count)
+
+    def record_ms(self, ms: float, count: int = 1):
+        self.record(int(ms * 1000), count)
+
+    def record_many(self, us: np.ndarray):
+        """µs 배열을 한 번에 기록합니다."""
+        if len(us) == 0:
+            return
+        us = np.clip(np.asarray(us, dtype=np.int64), 0, self.max_us)
+        _, bits = np.frexp(us.astype(np.float64))
+        shift = np.maximum(bits - self.sub_bits, 0)
+        index = np.where(shift == 0, us,
+                         self.sub_count + (shift - 1) * self.half + (us >> shift) - self.half)
+        for i, n in zip(*np.unique(index, return_counts=True)):
+            self.counts[int(i)] += int(n)
+        self.total += len(us)
+        self.sum_us += int(us.sum())
+        self.min_us = min(self.min_us, int(us.min()))
+        self.max_seen_us = max(self.max_seen_us, int(us.max()))
+
+    def merge(self, other: "LatencyHistogram"):
+        if other.sub_bits != self.sub_bits or len(other.counts) != len(self.counts):
+            raise ValueError("구성이 다른 히스토그램은 합칠 수 없습니다.")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.min_us = min(self.min_us, other.min_us)
+        self.max_seen_us = max(self.max_seen_us, other.max_seen_us)
+
+    def _value_at(self, cumulative: np.ndarray, q: float) -> float:
+        rank = max(1, int(np.ceil(self.total * q / 100)))
+        index = int(np.searchsorted(cumulative, rank))
+        return min(self._bucket_value(index), float(self.max_seen_us))
+
+    def percentile(self, q: float) -> float:
+        """q 백분위 값 (µs). 기록이 없으면 None."""
+        if self.total == 0:
+            return None
+        return self._value_at(np.cumsum(self.counts), q)
+
+    def to_dict(self) -> dict:
+        """ms 단위 요약."""
+        if self.total == 0:
+            return {"count": 0}
+        cumulative = np.cumsum(self.counts)
+        summary = {"count": self.total,
+                   "mean": round(self.sum_us / self.total / 1000, 3),
+                   "min": round(self.min_us / 1000, 3),
+                   "max": round(self.max_seen_us / 1000, 3)}
+        for q in PERCENTILES:
+            summary[f"p{q:g}"] = round(self._value_at(cumulative, q) / 1000, 3)
+        return summary
+
+
+class SequenceTracker:
+    """설비별 seq로 유실 / 중복 / 순서 뒤바뀜을 셉니다.
+
+    빠진 seq는 최근 window개까지 기억해 두었다가 나중에 도착하면 '유실'에서 '순서 뒤바뀜'으로 옮깁니다.
+    seq가 1로 돌아가거나 window보다 멀리 뒤로 가면 발행기가 다시 시작된 것으로 봅니다.
+    """
+
+    def __init__(self, window: int = None):
+        self.window = window or METRICS_CONFIG["sequence_window"]
+        self._state = {}        # machine_id → [마지막 seq, dropped, duplicates, out_of_order, 빠진 seq set]
+        self.received = 0
+        self.resets = 0
+
+    def observe(self, machine_id: str, seq: int):
+        self.received += 1
+        state = self._state.get(machine_id)
+        if state is None:
+            self._state[machine_id] = [seq, 0, 0, 0, set()]
+            return
+        last = state[0]
+        if seq == last + 1:
+            state[0] = seq
+            return
+
+        missing = state[4]
+        if seq > last:
+            state[1] += seq - last - 1
+            missing.update(range(max(last + 1, seq - self.window), seq))
+            if len(missing) > self.window:
+                state[4] = {s for s in missing if s > seq - self.window}
+            state[0] = seq
+        elif seq in missing:
+            missing.discard(seq)
+            state[1] -= 1
+            state[3] += 1
+        elif seq == 1 or last - seq > self.window:
+            self.resets += 1
+            state[0] = seq
+            missing.clear()
+        else:
+            state[2] += 1
+
+    def observe_many(self, machine_ids, seqs):
+        observe = self.observe
+        for machine_id, seq in zip(machine_ids, seqs):
+            if seq:
+                observe(machine_id, seq)
+
+    def to_dict(self, top: int = 10) -> dict:
+        dropped = duplicates = out_of_order = 0
+        worst = []
+        for machine_id, (_, d, dup, ooo, _) in list(self._state.items()):
+            dropped += d
+            duplicates += dup
+            out_of_order += ooo
+            if d or dup or ooo:
+                worst.append((d + dup + ooo, machine_id, d, dup, ooo))
+        worst.sort(reverse=True)
+        return {
+            "machines": len(self._state),
+            "received": self.received,
+            "dropped": dropped,
+            "duplicates": duplicates,
+            "out_of_order": out_of_order,
+            "resets": self.resets,
+            "worst": {m: {"dropped": d, "duplicates": dup, "out_of_order": ooo}
+                      for _, m, d, dup, ooo in worst[:top]},
+        }
+
+
+class Meter:
+    """누적 건수와 최근 처리량.
+
+    mark()는 카운터만 올리고, 처리량은 rate()를 부를 때(스냅샷 주기) 남겨 둔 (시각, 누적 건수) 기록으로 계산합니다.
+    """
+
+    def __init__(self, window: float = 10.0):
+        self.window = window
+        self.count = 0
+        self._samples = deque([(time.monotonic(), 0)])
+        self._lock = threading.Lock()      # rate()는 HTTP / 스냅샷 스레드에서 동시에 불릴 수 있음
+
+    def mark(self, n: int = 1):
+        self.count += n
+
+    def rate(self) -> float:
+        """최근 약 window초 동안의 초당 건수."""
+        with self._lock:
+            now, count = time.monotonic(), self.count
+            samples = self._samples
+            while len(samples) > 1 and now - samples[1][0] >= self.window:
+                samples.popleft()
+            then, before = samples[0]
+            if now - samples[-1][0] >= 1.0:
+                samples.append((now, count))
+        return (count - before) / (now - then) if now > then else 0.0
+
+
+class MetricsRegistry:
+    """서비스 하나의 계측 항목을 이름으로 모아 둡니다."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.started = time.time()
+        self.histograms = {}
+        self.meters = {}
+        self.sequences = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        with self._lock:
+            return self.histograms.setdefault(name, LatencyHistogram())
+
+    def meter(self, name: str) -> Meter:
+        with self._lock:
+            return self.meters.setdefault(name, Meter())
+
+    def sequence(self, name: str) -> SequenceTracker:
+        with self._lock:
+            return self.sequences.setdefault(name, SequenceTracker())
+
+    def gauge(self, name: str, read):
+        """read(): 스냅샷 때마다 호출해 현재 값을 읽음 (예: 큐 길이, 통계 dict)."""
+        with self._lock:
+            self.gauges[name] = read
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            histograms = dict(self.histograms)
+            meters = dict(self.meters)
+            sequences = dict(self.sequences)
+            gauges = dict(self.gauges)
+        now = time.time()
+        return {
+            "service": self.service,
+            "time": round(now, 3),
+            "uptime_s": round(now - self.started, 1),
+            "latency_ms": {name: h.to_dict() for name, h in histograms.items()},
+            "throughput": {name: {"count": m.count, "rate": round(m.rate(), 1)}
+                           for name, m in meters.items()},
+            "sequence": {name: s.to_dict() for name, s in sequences.items()},
+            "gauges": {name: read() for name, read in gauges.items()},
+        }
+
+
+class StageMetrics:
+    """파이프라인 한 단계에서 받은 레코드의 지연(시뮬레이터 → 이 단계) / 처리량 / seq를 기록합니다."""
+
+    def __init__(self, registry: MetricsRegistry, stage: str, schema=None):
+        self.stage = stage
+        self.schema = schema        # 바이너리 프레임용 (생략하면 config.MACHINES 기준)
+        self.latency = registry.histogram(f"sim_to_{stage}")
+        self.kafka_latency = None
+        self.records = registry.meter(f"{stage}_records")
+        self.sequence = registry.sequence(stage)
+        self._registry = registry
+
+    def observe_records(self, records: list, now: int = None):
+        """dict 레코드 목록 (decode_payload 결과)."""
+        now = now_ms() if now is None else now
+        record = self.latency.record
+        observe = self.sequence.observe
+        for r in records:
+            created = r.get("created_ms")
+            if created:
+                record((now - created) * 1000)
+            seq = r.get("seq")
+            if seq:
+                observe(r["machine_id"], seq)
+        self.records.mark(len(records))
+
+    def observe_batch(self, batch, now: int = None):
+        """batch.ReadingBatch. (dict를 만들지 않음)"""
+        now = now_ms() if now is None else now
+        created = batch.created_ms[batch.created_ms > 0]
+        if len(created):
+            self.latency.record_many((now - created) * 1000)
+        numbered = batch.seq > 0
+        machine_ids = batch.schema.machine_ids
+        self.sequence.observe_many([machine_ids[m] for m in batch.machine[numbered].tolist()],
+                                   batch.seq[numbered].tolist())
+        self.records.mark(len(batch))
+
+    def observe_payload(self, payload: bytes, now: int = None):
+        """MQTT/Kafka payload 원본. 바이너리 프레임은 헤더와 seq 열만 읽습니다. (dict를 만들지 않음)"""
+        now = now_ms() if now is None else now
+        if not is_frame(payload):
+            self.observe_records([json.loads(payload)], now)
+            return
+        schema = self.schema or default_schema()
+        _, sections = schema.decode_arrays(payload)
+        count = sum(len(rows) for _, rows in sections)
+        created = peek_created_ms(payload)
+        if created:
+            self.latency.record((now - created) * 1000, count)
+        machine_ids = schema.machine_ids
+        for _, rows in sections:
+            self.sequence.observe_many([machine_ids[m] for m in rows["machine"].tolist()],
+                                       rows["seq"].tolist())
+        self.records.mark(count)
+
+    def observe_kafka(self, msg, records: int = 1, now: int = None):
+        """Kafka 메시지 timestamp(브릿지가 보낸 시각) → 이 단계까지의 지연."""
+        if self.kafka_latency is None:
+            self.kafka_latency = self._registry.histogram(f"kafka_to_{self.stage}")
+        if msg.timestamp and msg.timestamp > 0:
+            now = now_ms() if now is None else now
+            self.kafka_latency.record((now - msg.timestamp) * 1000, records)
+
+
+# ============================================================
+# 내보내기
+# ============================================================
+
+def _handler(registry: MetricsRegistry):
+    # http.server는 엔드포인트를 열 때만 import (email 등을 끌고 와서 시작 시간이 늘어남)
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+            body = json.dumps(registry.snapshot(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass    # 요청마다 콘솔 출력하지 않음
+
+    return MetricsHandler
+
+
+def serve_http(registry: MetricsRegistry, port: int, host: str = None):
+    """GET /metrics에 snapshot()을 JSON으로 돌려주는 HTTP 서버(ThreadingHTTPServer)를 백그라운드 스레드로 띄웁니다."""
+    from http.server import ThreadingHTTPServer
+    server = ThreadingHTTPServer((host or METRICS_CONFIG["http_host"], port), _handler(registry))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name=f"metrics-http-{port}", daemon=True).start()
+    return server
+
+
+def write_snapshot(registry: MetricsRegistry, path: str):
+    """스냅샷을 임시 파일에 쓰고 교체합니다. (읽는 쪽이 반쯤 쓴 파일을 보지 않도록)"""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(registry.snapshot(), f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def snapshot_forever(registry: MetricsRegistry, path: str, interval: float = None):
+    interval = interval or METRICS_CONFIG["snapshot_interval"]
+    while True:
+        time.sleep(interval)
+        write_snapshot(registry, path)
+
+
+def start_metrics(service: str, instance: str = None, port: int = None) -> MetricsRegistry:
+    """METRICS_CONFIG에 따라 레지스트리를 만들고 HTTP 엔드포인트 / 스냅샷 파일 내보내기를 시작합니다.
+
+    내보내기를 모두 꺼도(포트 없음, snapshot_dir None) 기록은 그대로 하므로 호출하는 쪽은 분기할 필요가 없습니다.
+    같은 서비스를 여러 개 띄울 때는 instance를 주면 스냅샷 파일이 {서비스}-{instance}.json으로 나뉩니다.
+    port를 주면 설정 대신 그 포트를 씁니다. (0: HTTP 엔드포인트 없음)
+    """
+    cfg = METRICS_CONFIG
+    name = service if instance is None else f"{service}-{instance}"
+    registry = MetricsRegistry(name)
+    port = cfg["http_ports"].get(service) if port is None else port
+    if port:
+        try:
+            serve_http(registry, port)
+            print(f"[metrics] http://{cfg['http_host']}:{port}/metrics")
+        except OSError as e:
+            print(f"[metrics] HTTP 엔드포인트를 열 수 없습니다 ({e}), 스냅샷 파일만 사용")
+    if cfg["snapshot_dir"]:
+        os.makedirs(cfg["snapshot_dir"], exist_ok=True)
+        path = os.path.join(cfg["snapshot_dir"], f"{name}.json")
+        threading.Thread(target=snapshot_forever, args=(registry, path),
+                         name="metrics-snapshot", daemon=True).start()
+    return registry
@@ -0,0 +1,415 @@
+"""
+Kafka(sensor-raw) → PostgreSQL 적재기.
+
+메시지를 모아서 COPY FROM STDIN(또는 다중 행 INSERT)으로 한 번에 적재합니다.
+Kafka 오프셋은 DB 트랜잭션이 커밋된 다음에만 커밋하므로,
+적재기가 죽어도 데이터가 빠지지 않습니다. (재시작 시 마지막 배치가 중복될 수는 있음: at-least-once)
+
+흐름: Kafka poll → 버퍼 → (batch_size 도달 또는 flush_interval 경과) → COPY → DB commit → 오프셋 commit
+
+잘못된 메시지 하나 때문에 적재기가 멈추지 않도록:
+  - 풀 수 없는 메시지 / 필수 필드가 빠진 레코드는 버퍼에 넣지 않고 dead-letter 토픽으로 보냄 (topics.DeadLetters)
+  - DB 연결 오류(OperationalError / InterfaceError)는 재시도
+  - 데이터 오류(DataError / IntegrityError, 센서 순서를 알 수 없는 타입)는 배치를 반씩 나눠 다시 써서
+    문제 레코드만 dead-letter로 보냄
+  - 그 밖의 오류(테이블 / 컬럼 없음, 권한 등 스키마·설정 문제)는 그대로 던져서 오프셋을 커밋하지 않음
+
+저장 형식 (sql/init.sql): 행 하나 = 설비 하나의 한 시점.
+센서 값은 JSONB 대신 설비 타입별 고정 순서의 REAL[] (factory.machine_types.sensors 순서),
+상태 / 이상 / 경고는 wire.py와 같은 비트의 flags smallint로 넣습니다. → 행이 작아 COPY와 스캔이 빠름
+rollup_interval마다 1분 / 1시간 rollup을 증분 갱신하고, retention_interval마다 보존 기간이 지난 파티션을 지웁니다.
+
+실행: python simulator/pg_sink.py [--batch-size 5000] [--flush-interval 1.0] [--method copy] [--copies N (발행기와 같게)]
+"""
+import argparse
+import csv
+import io
+import time
+from datetime import datetime, timezone
+
+from config import MACHINES, KAFKA_CONFIG, POSTGRES_CONFIG, SINK_CONFIG
+from wire import WireSchema, decode_payload, record_flags, STATUS_CODES
+from metrics import StageMetrics, now_ms, start_metrics
+from clock import parse_start
+from topics import DeadLetters
+
+TABLE = "factory.sensor_readings"
+COLUMNS = ("ts", "type_id", "flags", "machine_id", "vals")
+REQUIRED = ("timestamp", "machine_id", "machine_type", "sensors", "status", "has_anomaly", "has_alert")
+
+
+def connect():
+    import psycopg2
+    return psycopg2.connect(**POSTGRES_CONFIG)
+
+
+def transient_errors() -> tuple:
+    """재시도할 DB 오류 (연결 끊김, 교착 / 직렬화 실패 등)."""
+    import psycopg2
+    return psycopg2.OperationalError, psycopg2.InterfaceError
+
+
+def data_errors() -> tuple:
+    """레코드 때문에 난 오류 (값 형식 / 범위, 제약 위반, 센서 순서를 알 수 없는 타입). 이것만 dead-letter로 보냅니다."""
+    import psycopg2
+    return psycopg2.DataError, psycopg2.IntegrityError, ValueError
+
+
+def check_record(record) -> dict:
+    """적재할 수 있는 레코드인지 확인합니다. 아니면 ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError(f"레코드가 dict가 아님: {type(record).__name__}")
+    missing = [name for name in REQUIRED if name not in record]
+    if missing:
+        raise ValueError(f"필드 없음: {', '.join(missing)}")
+    if record["status"] not in STATUS_CODES:
+        raise ValueError(f"알 수 없는 status: {record['status']!r}")
+    if not isinstance(record["sensors"], dict) or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in record["sensors"].values()):
+        raise ValueError("sensors가 숫자 값 dict가 아님")
+    if not isinstance(record["machine_id"], str) or not isinstance(record["machine_type"], str):
+        raise ValueError("machine_id / machine_type이 문자열이 아님")
+    datetime.fromisoformat(record["timestamp"])     # 형식이 틀리면 ValueError
+    return record
+
+
+class SensorLayout:
+    """machine_type → (type_id, 센서 이름 → vals 배열 위치). factory.machine_types가 기준입니다.
+    DB에 없는 타입은 config.MACHINES의 센서 순서로 등록합니다."""
+
+    def __init__(self, machines: dict = None):
+        machines = MACHINES if machines is None else machines
+        self._config = {}
+        for config in machines.values():
+            self._config.setdefault(config["type"], (list(config["sensors"]),
+                                                     [s["unit"] for s in config["sensors"].values()]))
+        self.types = {}
+        self._unknown = set()       # 이미 경고한 (타입, 센서)
+
+    def load(self, cur):
+        cur.execute("SELECT type_id, machine_type, sensors FROM factory.machine_types")
+        self.types = {machine_type: (type_id, {name: i for i, name in enumerate(sensors)}, len(sensors))
+                      for type_id, machine_type, sensors in cur.fetchall()}
+
+    def register(self, cur, records: list):
+        """레코드에 나온 타입 중 모르는 것을 등록합니다."""
+        missing = {r["machine_type"] for r in records} - set(self.types)
+        if not missing:
+            return
+        self.load(cur)
+        for machine_type in missing - set(self.types):
+            if machine_type in self._config:
+                sensors, units = self._config[machine_type]
+            else:
+                # config에도 없는 타입: partial이 아닌 레코드의 센서 순서를 씀
+                sample = next((r for r in records if r["machine_type"] == machine_type and not r.get("partial")), None)
+                if sample is None:
+                    raise ValueError(f"센서 순서를 알 수 없는 설비 타입: {machine_type}")
+                sensors, units = list(sample["sensors"]), [""] * len(sample["sensors"])
+            cur.execute("INSERT INTO factory.machine_types (machine_type, sensors, units) VALUES (%s, %s, %s) "
+                        "ON CONFLICT (machine_type) DO NOTHING", (machine_type, sensors, units))
+        self.load(cur)
+
+    def row(self, record: dict) -> tuple:
+        """레코드 → (ts, type_id, flags, machine_id, vals 배열 리터럴). 값이 없는(partial / NaN) 센서는 NULL."""
+        type_id, index, size = self.types[record["machine_type"]]
+        vals = ["NULL"] * size
+        for name, value in record["sensors"].items():
+            i = index.get(name)
+            if i is None:
+                self._warn(record["machine_type"], name)
+            elif value == value:
+                vals[i] = str(value)
+        flags = record_flags(record["status"], record["has_anomaly"], record["has_alert"],
+                             record.get("partial", False))
+        return (record["timestamp"], type_id, flags, record["machine_id"], "{" + ",".join(vals) + "}")
+
+    def _warn(self, machine_type: str, name: str):
+        if (machine_type, name) not in self._unknown:
+            self._unknown.add((machine_type, name))
+            print(f"[WARN] {machine_type}: factory.machine_types에 없는 센서 {name} → 저장하지 않음")
+
+
+class ReadingWriter:
+    """레코드(dict) 묶음을 sensor_readings 테이블에 한 트랜잭션으로 씁니다."""
+
+    def __init__(self, conn, method: str = None, machines: dict = None):
+        self.conn = conn
+        self.method = method or SINK_CONFIG["method"]
+        if self.method not in ("copy", "insert"):
+            raise ValueError(f"알 수 없는 적재 방식: {self.method}")
+        self.layout = SensorLayout(machines)
+        self._partitions = set()    # 이미 확인한 일 파티션
+
+    def write(self, records: list):
+        """레코드를 적재하고 커밋합니다. 실패하면 롤백 후 예외를 그대로 던집니다."""
+        try:
+            with self.conn.cursor() as cur:
+                self.layout.register(cur, records)
+                self._ensure_partitions(cur, records)
+                rows = [self.layout.row(r) for r in records]
+                if self.method == "copy":
+                    self._copy(cur, rows)
+                else:
+                    self._insert(cur, rows)
+            self.conn.commit()
+        except Exception:
+            if not self.conn.closed:
+                self.conn.rollback()
+            # 롤백으로 취소됐을 수 있는 타입 등록 / 파티션은 다음에 다시 확인
+            self.layout.types = {}
+            self._partitions = set()
+            raise
+
+    def reconnect(self):
+        """연결이 끊겼으면 새로 연결합니다. (재시도 전에 호출)"""
+        if self.conn.closed:
+            self.conn = connect()
+            self.layout.types = {}
+            self._partitions = set()
+
+    def _ensure_partitions(self, cur, records: list):
+        days = {r["timestamp"][:10] for r in records} - self._partitions
+        for day in sorted(days):
+            # 타임존이 UTC가 아닌 timestamp도 있으므로 다음 날 파티션까지 만들어 둠
+            cur.execute("SELECT factory.create_reading_partitions(%s, 2)", (day,))
+            self._partitions.add(day)
+
+    def _copy(self, cur, rows: list):
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        cur.copy_expert(f"COPY {TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    def _insert(self, cur, rows: list):
+        from psycopg2.extras import execute_values
+        execute_values(cur, f"INSERT INTO {TABLE} ({', '.join(COLUMNS)}) VALUES %s",
+                       rows, page_size=len(rows))
+
+    # ------------------------------------------------------------
+    # rollup / 보존 기간
+    # ------------------------------------------------------------
+    def refresh_rollups(self, upto: str, lateness: str = None):
+        """1분 / 1시간 rollup을 upto까지 증분 갱신합니다."""
+        self._call("SELECT factory.refresh_rollups(%s, %s::interval)",
+                   (upto, lateness or SINK_CONFIG["rollup_lateness"]))
+
+    def apply_retention(self, as_of: str, retention: dict = None):
+        """보존 기간이 지난 일 파티션을 지우고 rollup 행을 정리합니다. 반환: 지운 파티션 수."""
+        keep = retention or SINK_CONFIG["retention"]
+        dropped = self._call("SELECT factory.apply_retention(%s::interval, %s::interval, %s::interval, %s)",
+                             (keep["raw"], keep["1m"], keep["1h"], as_of))
+        if dropped:
+            self._partitions = set()
+        return dropped
+
+    def _call(self, sql: str, params: tuple):
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(sql, params)
+                result = cur.fetchone()[0]
+            self.conn.commit()
+            return result
+        except Exception:
+            if not self.conn.closed:
+                self.conn.rollback()
+            raise
+
+
+class PostgresSink:
+    """sensor-raw를 읽어 배치 단위로 적재하고, 적재가 끝난 뒤에 오프셋을 커밋합니다."""
+
+    def __init__(self, consumer, writer: ReadingWriter, batch_size: int = None,
+                 flush_interval: float = None, max_retries: int = None, metrics=None,
+                 dead_letters: DeadLetters = None, retention_as_of: str = None, schema: WireSchema = None):
+        self.consumer = consumer
+        self.writer = writer
+        self.batch_size = batch_size or SINK_CONFIG["batch_size"]
+        self.flush_interval = flush_interval or SINK_CONFIG["flush_interval"]
+        self.max_retries = SINK_CONFIG["max_retries"] if max_retries is None else max_retries
+        self.dead_letters = DeadLetters("pg_sink") if dead_letters is None else dead_letters
+        self.retention_as_of = SINK_CONFIG["retention_as_of"] if retention_as_of is None else retention_as_of
+        self.schema = schema        # 바이너리 프레임용 (생략하면 config.MACHINES 기준)
+
+        self._buffer = []
+        self._first_at = None       # 버퍼에 첫 레코드가 들어온 시각
+        self.rows = 0
+        self.batches = 0
+        self.last_lag = None        # 마지막 배치의 (커밋 시각 - 가장 오래된 reading timestamp)
+        self.max_ts = None          # 적재한 가장 최근 reading timestamp (rollup 갱신 기준)
+        self._last_rollup = time.monotonic()
+        self._last_retention = None     # 시작하자마자 한 번 실행
+
+        # 계측: 수신 시점 지연 / seq, 그리고 DB 커밋까지의 전체 지연 (시뮬레이터 → DB)
+        self.stage = StageMetrics(metrics, "pg_sink", schema) if metrics is not None else None
+        self.committed = metrics.histogram("sim_to_db_commit") if metrics is not None else None
+
+    def run(self, stop=lambda: False):
+        while not stop():
+            polled = self.consumer.poll(timeout_ms=100, max_records=self.batch_size)
+            for messages in polled.values():
+                for msg in messages:
+                    try:
+                        records = decode_payload(msg.value, self.schema)
+                    except ValueError as e:     # WireFormatError / JSON / UTF-8 오류
+                        self.dead_letters.add(msg.value, e, msg.key)
+                        continue
+                    records = self._valid(records, msg.key)
+                    if self.stage is not None:
+                        self.stage.observe_kafka(msg, len(records))
+                        self.stage.observe_records(records)
+                    self._buffer.extend(records)
+            if self._buffer and self._first_at is None:
+                self._first_at = time.monotonic()
+            if self._should_flush():
+                self.flush()
+        self.flush()
+
+    def _valid(self, records: list, key: bytes = None) -> list:
+        """적재할 수 있는 레코드만 남기고 나머지는 dead-letter로."""
+        valid = []
+        for record in records:
+            try:
+                valid.append(check_record(record))
+            except (ValueError, TypeError) as e:
+                self.dead_letters.add(record, e, key)
+        return valid
+
+    def _should_flush(self) -> bool:
+        if not self._buffer:
+            return False
+        return (len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._first_at >= self.flush_interval)
+
+    def flush(self):
+        """버퍼를 DB에 쓰고 커밋한 뒤, Kafka 오프셋을 커밋합니다."""
+        if not self._buffer:
+            return
+        rejected = self.dead_letters.count
+        self._write(self._buffer)
+        self.dead_letters.flush()
+        self.consumer.commit()      # DB 커밋 (또는 dead-letter) 이후에만 오프셋 커밋
+        if self.committed is not None:
+            now = now_ms()
+            for r in self._buffer:
+                if "created_ms" in r:
+                    self.committed.record((now - r["created_ms"]) * 1000)
+        oldest = min(r["timestamp"] for r in self._buffer)
+        self.last_lag = (datetime.now(timezone.utc) - datetime.fromisoformat(oldest)).total_seconds()
+        self.rows += len(self._buffer) - (self.dead_letters.count - rejected)
+        self.batches += 1
+        newest = max(r["timestamp"] for r in self._buffer)
+        if self.max_ts is None or newest > self.max_ts:
+            self.max_ts = newest
+        self._buffer = []
+        self._first_at = None
+        self._maintain()
+
+    def _write(self, records: list):
+        """DB 연결 오류는 재시도하고 (max_retries를 넘으면 예외), 데이터 오류는 반씩 나눠 다시 씁니다.
+        한 건만 남아도 실패하면 그 레코드를 dead-letter로 보냅니다. 그 밖의 오류는 그대로 던집니다."""
+        transient, bad_data = transient_errors(), data_errors()
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.writer.write(records)
+                return
+            except transient as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = min(2 ** attempt * 0.5, 10)
+                print(f"[ERROR] DB 적재 실패 ({e}), {delay:.1f}초 후 재시도")
+                time.sleep(delay)
+                try:
+                    self.writer.reconnect()
+                except transient as e:
+                    print(f"[ERROR] DB 재연결 실패 ({e})")
+            except bad_data as e:
+                if len(records) == 1:
+                    self.dead_letters.add(records[0], e, records[0]["machine_id"].encode("utf-8"))
+                    return
+                half = len(records) // 2
+                self._write(records[:half])
+                self._write(records[half:])
+                return
+
+    def retention_reference(self) -> str:
+        """보존 기간 기준 시각. 설정값(retention_as_of)이 있어도 적재한 가장 늦은 timestamp를 넘지 않습니다.
+        (벽시계를 쓰면 과거 데이터를 재현 / 백필할 때 방금 적재하고 오프셋까지 커밋한 파티션을 지움)"""
+        newest = datetime.fromisoformat(self.max_ts)
+        if self.retention_as_of is None:
+            return newest.isoformat()
+        return min(parse_start(self.retention_as_of), newest).isoformat()
+
+    def _maintain(self):
+        """rollup 증분 갱신과 보존 기간 정리. 실패해도 적재는 계속합니다. (다음 주기에 다시 시도)"""
+        now = time.monotonic()
+        try:
+            if self.max_ts is not None and now - self._last_rollup >= SINK_CONFIG["rollup_interval"]:
+                self._last_rollup = now
+                self.writer.refresh_rollups(self.max_ts)
+            if self.max_ts is not None and SINK_CONFIG["retention_interval"] and (
+                    self._last_retention is None or now - self._last_retention >= SINK_CONFIG["retention_interval"]):
+                self._last_retention = now
+                dropped = self.writer.apply_retention(self.retention_reference())
+                if dropped:
+                    print(f"[보존] 오래된 일 파티션 {dropped}개 삭제")
+        except Exception as e:
+            print(f"[WARN] rollup / 보존 기간 정리 실패: {e}")
+
+
+def create_consumer():
+    from kafka import KafkaConsumer
+    return KafkaConsumer(
+        KAFKA_CONFIG["raw_topic"],
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        group_id=SINK_CONFIG["group_id"],
+        enable_auto_commit=False,       # 적재 후 직접 커밋
+        auto_offset_reset="earliest",
+        max_poll_records=SINK_CONFIG["batch_size"],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kafka sensor-raw → PostgreSQL 적재기")
+    parser.add_argument("--batch-size", type=int, default=SINK_CONFIG["batch_size"])
+    parser.add_argument("--flush-interval", type=float, default=SINK_CONFIG["flush_interval"])
+    parser.add_argument("--method", choices=("copy", "insert"), default=SINK_CONFIG["method"])
+    parser.add_argument("--dead-letter-topic", default=KAFKA_CONFIG["dead_letter_topic"],
+                        help="적재할 수 없는 메시지를 보낼 토픽 (\"\"이면 로그만 남기고 건너뜀)")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+
+    from fleet import expand_machines
+
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    sink = PostgresSink(create_consumer(), ReadingWriter(connect(), args.method),
+                        args.batch_size, args.flush_interval, metrics=start_metrics("pg_sink"),
+                        dead_letters=DeadLetters("pg_sink", args.dead_letter_topic), schema=schema)
+    print(f"PostgreSQL 적재기 시작! (method={args.method}, batch={args.batch_size}, "
+          f"flush={args.flush_interval}s)")
+
+    started = time.monotonic()
+    last_report, last_rows = started, 0
+    def stop():
+        nonlocal last_report, last_rows
+        now = time.monotonic()
+        if now - last_report >= SINK_CONFIG["stats_interval"]:
+            rate = (sink.rows - last_rows) / (now - last_report)
+            print(f"[→ DB] {rate:,.0f} rows/s | 누적 {sink.rows:,}행, {sink.batches}배치 | "
+                  f"lag={sink.last_lag if sink.last_lag is None else round(sink.last_lag, 2)}s | "
+                  f"dead-letter {sink.dead_letters.count:,}건")
+            last_report, last_rows = now, sink.rows
+        return False
+
+    try:
+        sink.run(stop)
+    except KeyboardInterrupt:
+        sink.flush()
+        if sink.max_ts is not None:
+            sink.writer.refresh_rollups(sink.max_ts)
+        print(f"\n⏹ 적재기 종료: {sink.rows:,}행 적재")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,594 @@
+"""
+sensor-raw 재생기 (백테스트용).
+
+과거 구간의 센서 데이터를 원래 읽힌 시각(레코드 timestamp) 간격대로 다시 흘려보내서
+탐지기 / 에피소드 엔진 / 집계기를 운영 데이터로 돌려 보거나, 부하를 재현합니다.
+
+  - 입력: sensor-raw 토픽의 시간 구간 (offsets_for_times로 파티션마다 시작 오프셋을 찾아감)
+          main.py --output으로 만든 JSON Lines 파일
+          archive.py의 Parquet 아카이브 (archive_chunk_seconds 구간씩 읽어 시간 순으로 합침)
+  - 출력: 대상 토픽 (원래 payload / key / timestamp 그대로, 기본 sensor-replay)
+          또는 같은 프로세스의 소비자 콜백 (detector / alerts / aggregator / count)
+  - 속도: realtime(1배) / accelerated(--speed N배) / fast(기다리지 않음) - clock.py의 CLOCK_MODES와 같음
+          첫 레코드 시각을 기준으로 (timestamp - 첫 timestamp) / speed 시점에 내보냄
+          늦으면 기다리지 않고 바로 내보내서 따라잡음 (건너뛰지 않음)
+  - 순서: 설비별 순서 유지. 한 파티션 / 파일 안의 순서를 그대로 두고 배치 안에서는 timestamp로 stable 정렬
+          대상 토픽으로는 설비 key를 그대로 쓰고 in-flight 요청을 1개로 제한 (재시도해도 순서가 뒤바뀌지 않음)
+  - 읽기와 디코딩(JSON / 바이너리 프레임 / Parquet)은 별도 스레드에서 큰 배치로 미리 해 두고
+    (prefetch_batches개까지) 메인 스레드는 시각 맞추기와 내보내기만 합니다.
+  - 읽은 데이터는 ReadingBatch(batch.py)로 들고, 소비자 콜백에는 그 행 구간을 넘깁니다. (dict 레코드를 만들지 않음)
+    아카이브는 Parquet 열에서 바로 ReadingBatch를 만듭니다.
+  - 풀 수 없는 메시지 / 줄(스키마에 없는 설비, 깨진 JSON)은 로그만 남기고 건너뜀 (--copies는 데이터를 만든 쪽과 같게)
+
+보고 (report_interval마다, 끝에 한 번 더):
+  - 달성 속도: 레코드/s, 데이터 시간 / 실제 시간 (배속)
+  - 소비자 지연: 예정 시각 대비 처리가 끝난 시각 (p50 / p99 / max) - 콜백 소비자
+                 대상 토픽을 읽는 소비자 그룹의 lag (--lag-group, end offset - committed offset)
+  - 읽기 대기: 메인 스레드가 비어 있는 prefetch 큐를 기다린 횟수 (많으면 읽기 / 디코딩이 병목)
+
+실행:
+  python simulator/replay.py --start 2026-01-01T00:00 --end 2026-01-01T01:00 --speed 60
+  python simulator/replay.py --jsonl week.jsonl --consumer detector --mode fast
+  python simulator/replay.py --archive archive --start 2026-01-01 --end 2026-01-02 --consumer alerts --speed 600
+"""
+import argparse
+import glob
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from operator import itemgetter
+
+from lazy import np
+
+from config import MACHINES, KAFKA_CONFIG, BRIDGE_CONFIG, REPLAY_CONFIG
+from clock import CLOCK_MODES, parse_start
+from wire import (WireSchema, WireFormatError, default_schema, epoch_ms,
+                  STATUS_CODES, FLAG_HAS_ANOMALY, FLAG_HAS_ALERT)
+from batch import ReadingBatch
+from metrics import LatencyHistogram
+from topics import DeadLetters
+
+CONSUMERS = ("detector", "alerts", "aggregator", "count")
+
+# 배치: (항목 목록, ReadingBatch) - 항목은 timestamp 순, 행도 같은 순서
+# 항목: (timestamp ms, Kafka key, 원래 payload 또는 None, 이 항목의 행 구간 start, stop)
+TS, KEY, PAYLOAD, START, STOP = range(5)
+
+
+def _epoch_ms_cached():
+    """한 틱의 레코드는 timestamp가 같으므로 직전 값을 재사용하는 epoch_ms."""
+    last = [None, 0]
+
+    def convert(stamp: str) -> int:
+        if stamp != last[0]:
+            last[0], last[1] = stamp, epoch_ms(stamp)
+        return last[1]
+    return convert
+
+
+def _sorted(items: list, batch: ReadingBatch):
+    """항목을 timestamp로 stable 정렬하고 행도 같은 순서로 옮깁니다. 반환: (항목 목록, ReadingBatch)."""
+    items.sort(key=itemgetter(TS))
+    starts = np.array([item[START] for item in items], dtype=np.intp)
+    if np.all(starts[1:] >= starts[:-1]):
+        return items, batch
+    lengths = np.array([item[STOP] for item in items], dtype=np.intp) - starts
+    offsets = np.r_[0, np.cumsum(lengths)]
+    rows = np.repeat(starts - offsets[:-1], lengths) + np.arange(offsets[-1])
+    items = [(ts, key, payload, lo, hi) for (ts, key, payload, _, _), lo, hi
+             in zip(items, offsets[:-1].tolist(), offsets[1:].tolist())]
+    return items, batch.take(rows)
+
+
+def kafka_batches(topic: str, start_ms: int = None, end_ms: int = None, max_records: int = None,
+                  schema: WireSchema = None):
+    """토픽의 start_ms <= timestamp < end_ms 구간을 배치로 냅니다. 메시지의 timestamp는 첫 행의 시각.
+
+    끝은 시작할 때의 end offset까지입니다. (재생 중에 들어온 메시지는 읽지 않음)
+    """
+    from kafka import KafkaConsumer, TopicPartition
+
+    max_records = REPLAY_CONFIG["fetch_max_records"] if max_records is None else max_records
+    consumer = KafkaConsumer(
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        enable_auto_commit=False,
+        max_poll_records=max_records,
+        fetch_max_bytes=REPLAY_CONFIG["fetch_max_bytes"],
+        max_partition_fetch_bytes=REPLAY_CONFIG["fetch_max_bytes"],
+    )
+    try:
+        partitions = [TopicPartition(topic, p) for p in sorted(consumer.partitions_for_topic(topic) or ())]
+        consumer.assign(partitions)
+        ends = consumer.end_offsets(partitions)
+        if start_ms is None:
+            starts = consumer.beginning_offsets(partitions)
+        else:
+            found = consumer.offsets_for_times({tp: start_ms for tp in partitions})
+            starts = {tp: (ends[tp] if found[tp] is None else found[tp].offset) for tp in partitions}
+        remaining = {}
+        for tp in partitions:
+            if starts[tp] < ends[tp]:
+                consumer.seek(tp, starts[tp])
+                remaining[tp] = ends[tp]
+        consumer.pause(*[tp for tp in partitions if tp not in remaining])
+
+        schema = schema or default_schema()
+        skipped = DeadLetters("replay", topic="")
+        while remaining:
+            items, parts, rows = [], [], 0
+            for tp, messages in consumer.poll(timeout_ms=500).items():
+                end_offset = remaining.get(tp)
+                if end_offset is None:
+                    continue
+                done = False
+                for msg in messages:
+                    try:
+                        batch = ReadingBatch.from_payload(msg.value, schema)
+                    except ValueError as e:     # WireFormatError, 깨진 JSON
+                        skipped.add(msg.value, e, msg.key)
+                    else:
+                        ts = int(batch.ts[0]) if len(batch) else msg.timestamp
+                        if end_ms is not None and ts >= end_ms:
+                            done = True
+                            break
+                        if start_ms is None or ts >= start_ms:
+                            items.append((ts, msg.key, msg.value, rows, rows + len(batch)))
+                            parts.append(batch)
+                            rows += len(batch)
+                    if msg.offset >= end_offset - 1:
+                        done = True
+                        break
+                if done:
+                    del remaining[tp]
+                    consumer.pause(tp)
+            if items:
+                yield _sorted(items, ReadingBatch.concat(parts, schema))
+    finally:
+        consumer.close()
+
+
+def jsonl_batches(path: str, start_ms: int = None, end_ms: int = None, batch_records: int = None,
+                  schema: WireSchema = None):
+    """main.py --output 파일(JSON Lines)을 배치로 냅니다. 파일은 틱 순서로 쓰여 있습니다."""
+    batch_records = REPLAY_CONFIG["file_batch_records"] if batch_records is None else batch_records
+    schema = schema or default_schema()
+    to_ms = _epoch_ms_cached()
+    skipped = DeadLetters("replay", topic="")
+    items, records = [], []
+
+    def chunk():
+        return _sorted(items, ReadingBatch.from_records(records, schema))
+
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.rstrip(b"\n")
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                ts = to_ms(record["timestamp"])
+                if record["machine_id"] not in schema.machine_index:
+                    raise WireFormatError(f"스키마에 없는 설비: {record['machine_id']}")
+            except (ValueError, KeyError, TypeError) as e:
+                skipped.add(line, e)
+                continue
+            if start_ms is not None and ts < start_ms:
+                continue
+            if end_ms is not None and ts >= end_ms:
+                break
+            items.append((ts, record["machine_id"].encode("utf-8"), line, len(records), len(records) + 1))
+            records.append(record)
+            if len(items) >= batch_records:
+                yield chunk()
+                items, records = [], []
+    if items:
+        yield chunk()
+
+
+def _archive_batch(table, machine_id: str, schema: WireSchema) -> ReadingBatch:
+    """아카이브 Table(설비 하나) → ReadingBatch. 센서 값은 float32로 저장되어 있어 소수 4자리로 되돌림."""
+    from archive import META_COLUMNS
+
+    m = schema.machine_index.get(machine_id)
+    if m is None:
+        raise WireFormatError(f"스키마에 없는 설비: {machine_id} (--copies가 아카이버와 같은지 확인)")
+    n = table.num_rows
+    position = schema.positions[schema.machine_type[m]]
+    values = np.full((n, schema.width), np.nan)
+    for name in table.column_names:
+        j = position.get(name) if name not in META_COLUMNS else None
+        if j is not None:
+            values[:, j] = np.round(table[name].to_numpy(zero_copy_only=False).astype(np.float64), 4)
+    flags = (np.array([STATUS_CODES[s] for s in table["status"].cast("string").to_pylist()], dtype=np.uint8)
+             | table["has_anomaly"].to_numpy(zero_copy_only=False).astype(np.uint8) * np.uint8(FLAG_HAS_ANOMALY)
+             | table["has_alert"].to_numpy(zero_copy_only=False).astype(np.uint8) * np.uint8(FLAG_HAS_ALERT))
+    return ReadingBatch(schema, table["ts"].cast("int64").to_numpy() // 1000, np.full(n, m, dtype=np.uint16),
+                        flags, table["seq"].fill_null(0).to_numpy().astype(np.uint32), np.zeros(n, dtype=np.int64),
+                        values)
+
+
+def archive_batches(directory: str, start_ms: int, end_ms: int, chunk_seconds: float = None,
+                    batch_records: int = None, schema: WireSchema = None):
+    """Parquet 아카이브의 start_ms <= ts < end_ms 구간을 chunk_seconds씩 읽어 배치로 냅니다."""
+    import pyarrow.parquet as pq
+    from archive import ArchiveReader
+
+    chunk_ms = int((REPLAY_CONFIG["archive_chunk_seconds"] if chunk_seconds is None else chunk_seconds) * 1000)
+    batch_records = REPLAY_CONFIG["file_batch_records"] if batch_records is None else batch_records
+    schema = schema or default_schema()
+    reader = ArchiveReader(directory)
+    for lo in range(start_ms, end_ms, chunk_ms):
+        hi = min(lo + chunk_ms, end_ms)
+        bounds = [("ts", ">=", datetime.fromtimestamp(lo / 1000, timezone.utc)),
+                  ("ts", "<", datetime.fromtimestamp(hi / 1000, timezone.utc))]
+        parts = []
+        for path in reader.files(None, lo / 1000, hi / 1000):
+            # 경로: type=<타입>/date=<날짜>/machine_id=<설비>/part-*.parquet
+            machine_id = os.path.basename(os.path.dirname(path))[len("machine_id="):]
+            table = pq.read_table(path, filters=bounds, memory_map=True, partitioning=None)
+            if table.num_rows:
+                parts.append(_archive_batch(table, machine_id, schema))
+        if not parts:
+            continue
+        # 파일(설비)마다 시간 순이므로 stable 정렬로 설비별 순서 유지
+        batch = ReadingBatch.concat(parts, schema)
+        order = np.argsort(batch.ts, kind="stable")
+        batch = batch.take(order)
+        ts = batch.ts.tolist()
+        keys = [schema.machine_ids[m].encode("utf-8") for m in batch.machine.tolist()]
+        for i in range(0, len(batch), batch_records):
+            part = batch.take(slice(i, i + batch_records))
+            yield [(ts[i + n], keys[i + n], None, n, n + 1) for n in range(len(part))], part
+
+
+class Prefetcher:
+    """배치 생성기를 별도 스레드에서 돌려 bounded 큐에 채웁니다. (읽기 / 디코딩을 메인 스레드 밖으로)"""
+
+    _END = object()
+
+    def __init__(self, batches, depth: int = None):
+        self.queue = queue.Queue(maxsize=REPLAY_CONFIG["prefetch_batches"] if depth is None else depth)
+        self.stop = threading.Event()
+        self.waits = 0              # 메인 스레드가 빈 큐를 기다린 횟수
+        self.thread = threading.Thread(target=self._run, args=(batches,), name="replay-reader", daemon=True)
+        self.thread.start()
+
+    def _put(self, item):
+        while not self.stop.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self, batches):
+        try:
+            for batch in batches:
+                if self.stop.is_set():
+                    break
+                self._put(batch)
+        except Exception as error:      # 메인 스레드에서 다시 던짐
+            self._put(error)
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+            self._put(self._END)
+
+    def __iter__(self):
+        while True:
+            if self.queue.empty():
+                self.waits += 1
+            item = self.queue.get()
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self):
+        self.stop.set()
+
+
+class Pacer:
+    """원래 timestamp 간격대로 내보낼 시점을 정합니다. (첫 레코드 시각 = 재생 시작 시각)"""
+
+    def __init__(self, mode: str = None, speed: float = None):
+        mode = REPLAY_CONFIG["mode"] if mode is None else mode
+        speed = REPLAY_CONFIG["speed"] if speed is None else speed
+        if mode not in CLOCK_MODES:
+            raise ValueError(f"알 수 없는 재생 모드: {mode}")
+        if mode == "realtime":
+            speed = 1.0
+        if speed <= 0:
+            raise ValueError("speed는 0보다 커야 합니다.")
+        self.mode = mode
+        self.speed = speed
+        self.first_ms = None
+        self.wall_start = None
+
+    def due(self, ts_ms: int) -> float:
+        """ts_ms 레코드를 내보낼 time.monotonic() 시각. fast 모드는 None."""
+        if self.first_ms is None:
+            self.first_ms, self.wall_start = ts_ms, time.monotonic()
+        if self.mode == "fast":
+            return None
+        return self.wall_start + (ts_ms - self.first_ms) / 1000 / self.speed
+
+    def wait(self, ts_ms: int) -> float:
+        """내보낼 시점까지 기다립니다. 반환: 예정 시각 (fast 모드는 None)."""
+        due = self.due(ts_ms)
+        if due is not None:
+            remaining = due - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+        return due
+
+
+class ReplayStats:
+    """재생 속도와 소비자 지연."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.records = 0
+        self.messages = 0
+        self.first_ms = None
+        self.last_ms = None
+        self.lag = LatencyHistogram()       # 예정 시각 → 처리 끝 (콜백 소비자는 내보내기가 곧 처리)
+        self.current_lag = 0.0
+        self.group_lag = None               # 대상 토픽 소비자 그룹의 lag (메시지 수)
+        self.max_group_lag = 0
+        self.waits = 0                      # 메인 스레드가 빈 prefetch 큐를 기다린 횟수 (끝난 뒤 채움)
+
+    def observe(self, items: list, rows: int, due: float, done: float):
+        self.messages += len(items)
+        self.records += rows
+        ts = items[0][TS]
+        if self.first_ms is None:
+            self.first_ms = ts
+        self.last_ms = ts
+        if due is not None:
+            self.current_lag = max(done - due, 0.0)
+            self.lag.record_seconds(self.current_lag, len(items))
+
+    def observe_group_lag(self, lag: int):
+        if lag is not None:
+            self.group_lag = lag
+            self.max_group_lag = max(self.max_group_lag, lag)
+
+    def to_dict(self) -> dict:
+        wall = time.monotonic() - self.started
+        span = 0.0 if self.first_ms is None else (self.last_ms - self.first_ms) / 1000
+        return {
+            "records": self.records,
+            "messages": self.messages,
+            "wall_seconds": round(wall, 3),
+            "data_seconds": round(span, 3),
+            "records_per_sec": round(self.records / wall, 1) if wall > 0 else 0.0,
+            "speedup": round(span / wall, 2) if wall > 0 else 0.0,
+            "lag_ms": self.lag.to_dict(),
+            "group_lag": self.group_lag,
+            "max_group_lag": self.max_group_lag,
+        }
+
+    def line(self, waits: int) -> str:
+        s = self.to_dict()
+        text = (f"{s['records']:,}건 | {s['records_per_sec']:,.0f} rec/s | 데이터 {s['data_seconds']:,.0f}초 / "
+                f"실제 {s['wall_seconds']:,.1f}초 = {s['speedup']:,.1f}배 | 읽기 대기 {waits}회")
+        if self.lag.total:
+            text += (f" | 지연 현재 {self.current_lag * 1e3:,.0f} ms, p50 {self.lag.percentile(50) / 1e3:,.1f} / "
+                     f"p99 {self.lag.percentile(99) / 1e3:,.1f} / max {self.lag.max_seen_us / 1e3:,.1f} ms")
+        if self.group_lag is not None:
+            text += f" | 그룹 lag {self.group_lag:,} (max {self.max_group_lag:,})"
+        return text
+
+
+def consumer_callback(name: str):
+    """같은 프로세스의 소비자. 반환: (콜백(항목 목록, ReadingBatch), 결과 요약 함수)."""
+    if name == "count":
+        return (lambda items, batch: None), (lambda: "")
+    if name == "detector":
+        from detector import OnlineDetector, DetectionScore
+        detector, score = OnlineDetector(), DetectionScore()
+
+        def detect(items, batch):
+            predicted, _ = detector.detect_batch(batch)
+            score.update(predicted, batch.has_anomaly)
+        return detect, score.summary
+    if name == "alerts":
+        from alerts import EpisodeTracker
+        tracker = EpisodeTracker()
+
+        def track(items, batch):
+            tracker.process(*tracker.flatten_batch(batch))
+
+        def summary():
+            counts = tracker.counts
+            return (f"OPEN {counts['OPEN']:,} / UPDATE {counts['UPDATE']:,} / CLOSE {counts['CLOSE']:,} "
+                    f"(최소 지속 시간 미달 {counts['suppressed']:,}, 열린 에피소드 {tracker.open_count:,})")
+        return track, summary
+    if name == "aggregator":
+        from aggregator import Aggregator
+        aggregator = Aggregator()
+        rollups = [0]
+
+        def aggregate(items, batch):
+            aggregator.add_batch(batch)
+            rollups[0] += sum(1 for _ in aggregator.emit())
+        return aggregate, lambda: f"rollup {rollups[0]:,}건 (늦게 와서 버린 값 {aggregator.late_dropped:,})"
+    raise ValueError(f"알 수 없는 소비자: {name}")
+
+
+class TopicSink:
+    """대상 토픽으로 원래 payload / key / timestamp를 그대로 보냅니다."""
+
+    def __init__(self, topic: str):
+        from kafka import KafkaProducer
+
+        self.topic = topic
+        # in-flight 요청 1개: 재시도가 일어나도 같은 파티션(설비) 안의 순서가 바뀌지 않음
+        self.producer = KafkaProducer(
+            bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+            api_version=KAFKA_CONFIG["api_version"],
+            linger_ms=BRIDGE_CONFIG["linger_ms"],
+            batch_size=BRIDGE_CONFIG["batch_size"],
+            max_in_flight_requests_per_connection=1,
+        )
+
+    def __call__(self, items: list, batch: ReadingBatch):
+        # 아카이브처럼 원래 payload가 없는 항목은 행을 JSON으로 만듦 (항목당 1행)
+        base = items[0][START]
+        records = None
+        for ts, key, payload, start, _ in items:
+            if payload is None:
+                records = batch.to_records() if records is None else records
+                payload = json.dumps(records[start - base], ensure_ascii=False).encode("utf-8")
+            self.producer.send(self.topic, payload, key=key, timestamp_ms=ts)
+
+    def close(self):
+        self.producer.flush()
+        self.producer.close()
+
+
+class GroupLag:
+    """소비자 그룹의 토픽 lag = 파티션별 (end offset - committed offset)의 합."""
+
+    def __init__(self, group: str, topic: str):
+        from kafka import KafkaAdminClient, KafkaConsumer
+
+        self.group, self.topic = group, topic
+        options = {"bootstrap_servers": KAFKA_CONFIG["bootstrap_servers"], "api_version": KAFKA_CONFIG["api_version"]}
+        self.admin = KafkaAdminClient(**options)
+        self.consumer = KafkaConsumer(enable_auto_commit=False, **options)
+
+    def measure(self) -> int:
+        """반환: lag (메시지 수). 그룹이 아직 이 토픽을 커밋한 적이 없으면 None."""
+        committed = {tp: meta.offset for tp, meta in self.admin.list_consumer_group_offsets(self.group).items()
+                     if tp.topic == self.topic}
+        if not committed:
+            return None
+        ends = self.consumer.end_offsets(list(committed))
+        return sum(max(ends[tp] - offset, 0) for tp, offset in committed.items())
+
+    def close(self):
+        self.admin.close()
+        self.consumer.close()
+
+
+def replay(batches, emit, pacer: Pacer = None, report_interval: float = None, on_report=None,
+           prefetch: int = None) -> ReplayStats:
+    """배치를 원래 timestamp 간격대로 emit(항목 목록, ReadingBatch)에 넘깁니다.
+    timestamp가 같은 항목은 그 행들과 함께 한 번에 넘깁니다.
+
+    on_report(stats, waits)는 report_interval마다 불립니다. 반환: ReplayStats
+    """
+    pacer = Pacer() if pacer is None else pacer
+    report_interval = REPLAY_CONFIG["report_interval"] if report_interval is None else report_interval
+    stats = ReplayStats()
+    reader = Prefetcher(batches, prefetch)
+    last_report = time.monotonic()
+    try:
+        for items, batch in reader:
+            start = 0
+            while start < len(items):
+                ts = items[start][TS]
+                stop = start + 1
+                while stop < len(items) and items[stop][TS] == ts:
+                    stop += 1
+                group = items[start:stop]
+                rows = batch.take(slice(group[0][START], group[-1][STOP]))
+                due = pacer.wait(ts)
+                emit(group, rows)
+                done = time.monotonic()
+                stats.observe(group, len(rows), due, done)
+                start = stop
+                if on_report is not None and done - last_report >= report_interval:
+                    on_report(stats, reader.waits)
+                    last_report = time.monotonic()
+    finally:
+        reader.close()
+    stats.waits = reader.waits
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw 재생기 (백테스트)")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--topic", default=REPLAY_CONFIG["source_topic"], help="읽을 토픽 (기본 입력)")
+    source.add_argument("--jsonl", default=None, help="main.py --output으로 만든 JSON Lines 파일")
+    source.add_argument("--archive", default=None, help="archive.py의 Parquet 아카이브 디렉터리")
+    parser.add_argument("--start", default=None, help="구간 시작 (ISO, 시간대가 없으면 UTC)")
+    parser.add_argument("--end", default=None, help="구간 끝 (이 시각은 포함하지 않음)")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--target-topic", default=REPLAY_CONFIG["target_topic"], help="보낼 토픽 (기본 출력)")
+    target.add_argument("--consumer", choices=CONSUMERS, default=None, help="같은 프로세스의 소비자로 넘김")
+    parser.add_argument("--mode", choices=CLOCK_MODES, default=REPLAY_CONFIG["mode"])
+    parser.add_argument("--speed", type=float, default=REPLAY_CONFIG["speed"], help="accelerated 모드의 배속")
+    parser.add_argument("--lag-group", default=None, help="대상 토픽을 읽는 소비자 그룹 (lag 보고)")
+    parser.add_argument("--copies", type=int, default=1, help="데이터를 만든 쪽의 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+
+    start_ms = None if args.start is None else round(parse_start(args.start).timestamp() * 1000)
+    end_ms = None if args.end is None else round(parse_start(args.end).timestamp() * 1000)
+    if args.copies > 1:
+        from fleet import expand_machines
+        schema = WireSchema(expand_machines(MACHINES, args.copies))
+    else:
+        schema = default_schema()
+    if args.jsonl is not None:
+        batches = jsonl_batches(args.jsonl, start_ms, end_ms, schema=schema)
+        origin = args.jsonl
+    elif args.archive is not None:
+        if start_ms is None or end_ms is None:
+            parser.error("--archive는 --start와 --end가 필요합니다.")
+        if not glob.glob(os.path.join(args.archive, "type=*")):
+            parser.error(f"아카이브가 아닙니다: {args.archive}")
+        batches = archive_batches(args.archive, start_ms, end_ms, schema=schema)
+        origin = args.archive
+    else:
+        batches = kafka_batches(args.topic, start_ms, end_ms, schema=schema)
+        origin = f"토픽 {args.topic}"
+
+    lag = sink = None
+    if args.consumer is not None:
+        emit, summary = consumer_callback(args.consumer)
+        destination = f"소비자 {args.consumer}"
+    else:
+        emit = sink = TopicSink(args.target_topic)
+        summary = lambda: ""
+        destination = f"토픽 {args.target_topic}"
+        if args.lag_group is not None:
+            lag = GroupLag(args.lag_group, args.target_topic)
+
+    pacer = Pacer(args.mode, args.speed)
+    speed = {"realtime": "1배", "accelerated": f"{pacer.speed:g}배", "fast": "최대 속도"}[pacer.mode]
+    print(f"재생 시작: {origin} → {destination} ({speed})")
+
+    def report(stats, waits):
+        if lag is not None:
+            stats.observe_group_lag(lag.measure())
+        print(f"[재생] {stats.line(waits)}")
+
+    try:
+        stats = replay(batches, emit, pacer, on_report=report)
+    except KeyboardInterrupt:
+        print("중단")
+        return
+    finally:
+        if sink is not None:
+            sink.close()
+    if lag is not None:
+        stats.observe_group_lag(lag.measure())
+        lag.close()
+    print(f"재생 끝: {stats.line(stats.waits)}")
+    result = summary()
+    if result:
+        print(f"{args.consumer}: {result}")
+
+
+if __name__ == "__main__":
+    main()
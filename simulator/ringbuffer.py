@@ -0,0 +1,102 @@
+"""
+미리 할당한 NumPy 링 버퍼.
+
+append할 때 리스트나 deque를 새로 만들지 않고, 정해진 배열 칸을 돌려 씁니다.
+다음에 쓸 칸(head)은 항상 NaN으로 비워 두므로, 배열을 정렬하지 않고 그대로 선 그래프에 넘겨도
+가장 최신 값과 가장 오래된 값 사이에 선이 이어지지 않습니다. (matplotlib은 NaN에서 선을 끊음)
+"""
+from __future__ import annotations
+
+from lazy import np
+
+
+class RingBuffer:
+    """(시각, 값 row) 쌍을 capacity개까지 보관하는 고정 크기 버퍼."""
+
+    def __init__(self, capacity: int, width: int = 1, dtype="float64"):
+        if capacity < 1:
+            raise ValueError("capacity는 1 이상이어야 합니다.")
+        self.capacity = capacity
+        self.width = width
+        self.times = np.full(capacity + 1, np.nan)
+        self.values = np.full((capacity + 1, width), np.nan, dtype=dtype)
+        self.head = 0       # 다음에 쓸 칸 (항상 NaN)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t: float, row):
+        slots = self.capacity + 1
+        self.times[self.head] = t
+        self.values[self.head] = row
+        self.head = (self.head + 1) % slots
+        self.times[self.head] = np.nan
+        self.values[self.head] = np.nan
+        self.count = min(self.count + 1, self.capacity)
+
+    def extend(self, times: np.ndarray, rows: np.ndarray):
+        """여러 행을 한 번에 추가합니다."""
+        n = len(times)
+        if n == 0:
+            return
+        if n > self.capacity:
+            times, rows = times[-self.capacity:], rows[-self.capacity:]
+            n = self.capacity
+        slots = self.capacity + 1
+        idx = (self.head + np.arange(n)) % slots
+        self.times[idx] = times
+        self.values[idx] = rows
+        self.head = (self.head + n) % slots
+        self.times[self.head] = np.nan
+        self.values[self.head] = np.nan
+        self.count = min(self.count + n, self.capacity)
+
+    def _order(self, n: int) -> np.ndarray:
+        return (self.head - n + np.arange(n)) % (self.capacity + 1)
+
+    def ordered(self):
+        """오래된 것부터 최신 순서의 (시각, 값) 복사본."""
+        idx = self._order(self.count)
+        return self.times[idx], self.values[idx]
+
+    def last(self, n: int):
+        """최근 n개 (오래된 것부터)."""
+        idx = self._order(min(n, self.count))
+        return self.times[idx], self.values[idx]
+
+    def since(self, t: float):
+        """시각 t 이후의 데이터 (시각 순서대로 들어왔다고 가정)."""
+        return self.between(t, np.inf)
+
+    def between(self, t0: float, t1: float):
+        """t0 <= 시각 < t1인 데이터. 시각 열에서만 위치를 찾고 값은 해당 구간만 복사합니다."""
+        first = (self.head - self.count) % (self.capacity + 1)
+        end = first + self.count
+        if end <= self.capacity + 1:
+            # 끊기지 않은 구간: 뷰에서 찾아 슬라이스로 복사
+            return self._slice(first, end, t0, t1)
+        # 배열 끝에서 한 번 감긴 구간: 앞(오래된) / 뒤(최근) 두 조각을 따로 찾아 이어 붙임
+        old_t, old_v = self._slice(first, self.capacity + 1, t0, t1)
+        new_t, new_v = self._slice(0, self.head, t0, t1)
+        return np.concatenate((old_t, new_t)), np.concatenate((old_v, new_v))
+
+    def _slice(self, lo: int, hi: int, t0: float, t1: float):
+        times = self.times[lo:hi]
+        start = lo + times.searchsorted(t0, side="left")
+        stop = lo + times.searchsorted(t1, side="left")
+        return self.times[start:stop].copy(), self.values[start:stop].copy()
+
+    def latest(self):
+        """가장 최근 (시각, 값 row). 비어 있으면 None."""
+        if self.count == 0:
+            return None
+        i = (self.head - 1) % (self.capacity + 1)
+        return self.times[i], self.values[i]
+
+    def oldest(self):
+        """가장 오래된 (시각, 값 row). 비어 있으면 None."""
+        if self.count == 0:
+            return None
+        i = (self.head - self.count) % (self.capacity + 1)
+        return self.times[i], self.values[i]
@@ -0,0 +1,343 @@
+"""
+수평 확장 MQTT → Kafka 브릿지 (MQTT v5 공유 구독).
+
+bridge.py를 두 개 띄우면 둘 다 factory/#를 구독하므로 모든 메시지가 Kafka에 두 번 들어갑니다.
+이 브릿지는 $share/<group>/factory/#로 구독해서, 같은 그룹의 인스턴스들이 메시지를 나눠 받습니다.
+(브로커가 메시지마다 그룹 안의 한 인스턴스에게만 전달, Mosquitto 2 지원)
+인스턴스를 코어 / 호스트마다 하나씩 늘리면 수신 용량이 콜백 스레드 하나에 묶이지 않습니다.
+Kafka 전송은 인스턴스마다 KafkaForwarder(forwarder.py) 하나 (큐 + 배치 + 스풀).
+
+인스턴스 식별:
+  - instance: --instance / 환경 변수 BRIDGE_INSTANCE / 호스트 이름 (재시작해도 같은 값이어야 세션을 이어받음)
+  - MQTT client_id = <group>-<instance>, 스풀 디렉터리 = <spool_dir>/<instance>, 계측 스냅샷 = bridge-<instance>.json
+  - 한 호스트에 여러 개를 띄우면 instance를 다르게 지정해야 함
+    (같은 client_id로 접속하면 브로커가 먼저 접속한 쪽을 끊음 → 끊긴 쪽은 다시 접속하지 않고 종료)
+
+상태 보고 (bridges/<group>/<instance>/status, retained, QoS 1):
+  - 접속하면 online, health_interval마다 처리량 / 큐 / 스풀 / Kafka 상태를 담아 다시 발행
+  - 종료 절차 중에는 draining, 끝나면 offline(reason=shutdown)
+  - 비정상 종료 / 네트워크 끊김은 LWT로 브로커가 offline(reason=lost)을 발행
+  - retained라 새로 구독해도 바로 전체 인스턴스 상태가 보임: python simulator/shared_bridge.py --status
+
+종료 / 재시작 (SIGINT, SIGTERM):
+  1. 공유 구독 해제 → 브로커가 새 메시지를 그룹의 다른 인스턴스로 보냄
+  2. 이미 받은 메시지가 quiet_period 동안 더 오지 않을 때까지 받고, 큐에 남은 메시지를 Kafka로 보낸 뒤 flush
+  3. offline 상태 발행 후 세션 만료 0으로 접속 종료 (브로커에 빈 세션이 남지 않음)
+  비정상 종료면 세션이 session_expiry 동안 남아 있다가 같은 instance로 다시 접속하면 이어받습니다.
+  (브로커가 보관하는 건 QoS 1 이상으로 발행된 메시지뿐 - 시뮬레이터 기본 발행은 QoS 0)
+
+설비별 순서: 공유 구독은 메시지 단위로 나눠 주므로 같은 설비의 메시지가 다른 인스턴스로 갈 수 있습니다.
+Kafka 안에서 설비별 순서가 바뀔 수 있으며, 하위 단계는 seq로 판단합니다. (metrics.SequenceTracker의 out_of_order)
+같은 이유로 인스턴스 안에서는 seq를 추적하지 않습니다. (일부만 받으므로 모두 유실로 보임)
+
+실행: python simulator/shared_bridge.py --instance a   (또는 python -m simulator shared-bridge --instance a)
+      python simulator/shared_bridge.py --status       그룹의 인스턴스 상태 출력
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import threading
+import time
+
+from config import MACHINES, MQTT_CONFIG, BRIDGE_CONFIG, SHARED_BRIDGE_CONFIG
+
+SESSION_TAKEN_OVER = 142        # MQTT v5 DISCONNECT reason code
+
+
+def default_instance() -> str:
+    return os.environ.get("BRIDGE_INSTANCE") or socket.gethostname()
+
+
+def status_topic(group: str, instance: str) -> str:
+    return SHARED_BRIDGE_CONFIG["status_topic"].format(group=group, instance=instance)
+
+
+def create_mqtt_client(client_id: str):
+    import paho.mqtt.client as mqtt
+    return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id, protocol=mqtt.MQTTv5)
+
+
+def _properties(packet: str, **values):
+    """MQTT v5 속성 (예: _properties("CONNECT", SessionExpiryInterval=300))."""
+    from paho.mqtt.packettypes import PacketTypes
+    from paho.mqtt.properties import Properties
+    properties = Properties(getattr(PacketTypes, packet))
+    for name, value in values.items():
+        setattr(properties, name, value)
+    return properties
+
+
+def _wait_published(info, timeout: float):
+    # paho는 MQTTMessageInfo를 돌려줌 (stand-in은 None)
+    if info is not None and hasattr(info, "wait_for_publish"):
+        try:
+            info.wait_for_publish(timeout)
+        except (RuntimeError, ValueError):
+            pass    # 이미 끊긴 경우
+
+
+class SharedBridge:
+    """공유 구독 그룹의 브릿지 인스턴스 하나."""
+
+    def __init__(self, forwarder, instance: str = None, group: str = None, topic: str = None,
+                 qos: int = None, session_expiry: int = None, health_interval: float = None,
+                 client_factory=None, mqtt_host: str = None, mqtt_port: int = None, metrics=None):
+        cfg = SHARED_BRIDGE_CONFIG
+        self.forwarder = forwarder
+        self.instance = instance or default_instance()
+        if any(c in self.instance for c in "/+#"):
+            raise ValueError(f"instance에 / + #는 쓸 수 없습니다: {self.instance}")
+        self.group = group or cfg["group"]
+        self.topic = topic or cfg["topic"]
+        self.qos = cfg["qos"] if qos is None else qos
+        self.session_expiry = cfg["session_expiry"] if session_expiry is None else session_expiry
+        self.health_interval = health_interval or cfg["health_interval"]
+        self.client_factory = client_factory or create_mqtt_client
+        self.mqtt_host = mqtt_host or MQTT_CONFIG["host"]
+        self.mqtt_port = mqtt_port or MQTT_CONFIG["port"]
+
+        self.client_id = f"{self.group}-{self.instance}"
+        self.shared_topic = f"$share/{self.group}/{self.topic}"
+        self.status_topic = status_topic(self.group, self.instance)
+        self.client = None
+        self.state = "starting"
+        self.started = time.time()
+        self.ready = threading.Event()      # 구독까지 끝남
+        self.stopped = threading.Event()    # 종료 요청 (시그널, 세션 뺏김)
+        self._unsubscribed = threading.Event()
+        self._health_thread = None
+        self._last_message = time.monotonic()
+        self._last_report = (time.monotonic(), 0)
+
+        # 통계 카운터 (int 증가는 GIL 아래에서 충분히 안전)
+        self.received = 0
+        self.connects = 0
+        self.session_resumed = 0
+        self.taken_over = False
+        if metrics is not None:
+            self.meter = metrics.meter("bridge_received")
+            metrics.gauge("shared_bridge", self.status)
+        else:
+            self.meter = None
+
+    # ------------------------------------------------------------
+    # 시작 / 종료
+    # ------------------------------------------------------------
+    def start(self):
+        self.forwarder.start()
+        client = self.client = self.client_factory(self.client_id)
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+        client.on_message = self._on_message
+        client.on_unsubscribe = self._on_unsubscribe
+        # 비정상 종료 시 브로커가 대신 발행할 상태
+        client.will_set(self.status_topic, self._status_payload("offline", reason="lost"), qos=1, retain=True)
+        client.reconnect_delay_set(1, 30)
+        # clean_start=False + 세션 만료: 다시 접속하면 끊긴 동안의 세션(구독 + QoS 1 메시지)을 이어받음
+        client.connect(self.mqtt_host, self.mqtt_port, clean_start=False,
+                       properties=_properties("CONNECT", SessionExpiryInterval=self.session_expiry))
+        client.loop_start()
+        self._health_thread = threading.Thread(target=self._report_health, name="bridge-health", daemon=True)
+        self._health_thread.start()
+
+    def stop(self, timeout: float = None) -> dict:
+        """구독 해제 → 남은 메시지 전송 → offline 발행 → 접속 종료. 반환: 마지막 상태."""
+        timeout = SHARED_BRIDGE_CONFIG["handoff_timeout"] if timeout is None else timeout
+        started = time.monotonic()
+        self.stopped.set()
+        client = self.client
+        if not self.taken_over:
+            self._publish_status("draining")
+            # 1. 새 메시지는 그룹의 다른 인스턴스로
+            client.unsubscribe(self.shared_topic)
+            self._unsubscribed.wait(min(2.0, timeout))
+            # 2. 구독 해제 전에 브로커가 보낸 메시지가 다 들어올 때까지
+            quiet = SHARED_BRIDGE_CONFIG["quiet_period"]
+            while time.monotonic() - self._last_message < quiet and time.monotonic() - started < timeout:
+                time.sleep(quiet / 4)
+        # 3. 큐에 남은 메시지를 Kafka로 (스풀에 남은 건 다음 실행 때 이어서)
+        self.forwarder.stop(max(1.0, timeout - (time.monotonic() - started)))
+        status = self.status("offline", reason="taken_over" if self.taken_over else "shutdown")
+        if not self.taken_over:
+            _wait_published(client.publish(self.status_topic, json.dumps(status), qos=1, retain=True), 2.0)
+            # 4. 세션 만료 0 → 브로커에 이 인스턴스 몫으로 쌓일 세션을 남기지 않음
+            client.disconnect(properties=_properties("DISCONNECT", SessionExpiryInterval=0))
+        client.loop_stop()
+        print(f"[{self.instance}] 종료 ({time.monotonic() - started:.1f}s) "
+              f"received={self.received:,} acked={self.forwarder.acked:,}")
+        return status
+
+    # ------------------------------------------------------------
+    # MQTT (paho 네트워크 스레드)
+    # ------------------------------------------------------------
+    def _on_connect(self, client, userdata, flags, rc, properties):
+        if getattr(rc, "is_failure", False):
+            print(f"[{self.instance}] MQTT 접속 거부: {rc}")
+            return
+        self.connects += 1
+        if getattr(flags, "session_present", False):
+            self.session_resumed += 1   # 이전 세션(구독 포함)을 이어받음
+        if self.stopped.is_set():
+            return
+        # 다시 연결될 때도 불리므로 여기서 구독 (세션이 남아 있어도 같은 구독이라 중복 없음)
+        client.subscribe(self.shared_topic, qos=self.qos)
+        self._publish_status("online")
+        print(f"[{self.instance}] MQTT 연결 → {self.shared_topic}")
+        self.ready.set()
+
+    def _on_disconnect(self, client, userdata, flags, rc, properties):
+        if rc == SESSION_TAKEN_OVER:
+            # 같은 client_id로 다른 프로세스가 접속 → 다시 접속하면 서로 끊기를 반복하므로 종료
+            self.taken_over = True
+            print(f"[{self.instance}] 같은 instance({self.client_id})로 다른 브릿지가 접속했습니다 → 종료")
+            self.stopped.set()
+            client.disconnect()     # paho 네트워크 루프가 자동 재연결하지 않도록
+        elif not self.stopped.is_set():
+            print(f"[{self.instance}] MQTT 연결 끊김 (rc={rc}) → 재연결 시도")
+
+    def _on_unsubscribe(self, client, userdata, mid, reason_codes, properties):
+        self._unsubscribed.set()
+
+    def _on_message(self, client, userdata, msg):
+        self.received += 1
+        self._last_message = time.monotonic()
+        if self.meter is not None:
+            self.meter.mark()
+        self.forwarder.submit(msg.payload)     # 큐에 넣고 바로 반환 (네트워크 스레드를 막지 않음)
+
+    # ------------------------------------------------------------
+    # 상태 보고
+    # ------------------------------------------------------------
+    def status(self, state: str = None, **extra) -> dict:
+        stats = self.forwarder.stats()
+        now = time.monotonic()
+        last_at, last_acked = self._last_report
+        rate = (stats["acked"] - last_acked) / (now - last_at) if now > last_at else 0.0
+        return {
+            "instance": self.instance,
+            "group": self.group,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "state": state or self.state,
+            "ts": round(time.time(), 3),
+            "started": round(self.started, 3),
+            "connects": self.connects,
+            "received": self.received,
+            "acked": stats["acked"],
+            "rate": round(rate, 1),
+            "failed": stats["failed"],
+            "dropped": stats["dropped"],
+            "queue_depth": stats["queue_depth"],
+            "spool_depth": stats["spool_depth"],
+            "kafka_healthy": self.forwarder.healthy,
+            "p99_ms": stats["p99_ms"],
+            **extra,
+        }
+
+    def _status_payload(self, state: str, **extra) -> str:
+        return json.dumps(self.status(state, **extra), ensure_ascii=False)
+
+    def _publish_status(self, state: str):
+        self.state = state
+        self.client.publish(self.status_topic, self._status_payload(state), qos=1, retain=True)
+
+    def _report_health(self):
+        while not self.stopped.wait(self.health_interval):
+            if self.ready.is_set():
+                self._publish_status(self.state)
+                self._last_report = (time.monotonic(), self.forwarder.acked)
+
+
+# ============================================================
+# 그룹 상태 조회
+# ============================================================
+
+def read_status(group: str = None, wait: float = 1.0, client_factory=None,
+                mqtt_host: str = None, mqtt_port: int = None) -> dict:
+    """그룹 인스턴스들의 retained 상태 {instance: status}. wait초 동안 받은 것까지."""
+    group = group or SHARED_BRIDGE_CONFIG["group"]
+    statuses = {}
+
+    def on_connect(client, userdata, flags, rc, properties):
+        client.subscribe(status_topic(group, "+"), qos=1)
+
+    def on_message(client, userdata, msg):
+        if msg.payload:
+            status = json.loads(msg.payload)
+            statuses[status["instance"]] = status
+
+    client = (client_factory or create_mqtt_client)(f"{group}-status-{os.getpid()}")
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(mqtt_host or MQTT_CONFIG["host"], mqtt_port or MQTT_CONFIG["port"])
+    client.loop_start()
+    time.sleep(wait)
+    client.disconnect()
+    client.loop_stop()
+    return statuses
+
+
+def print_status(statuses: dict):
+    stale_after = SHARED_BRIDGE_CONFIG["health_interval"] * 3
+    now = time.time()
+    print(f"{'instance':<20}{'state':<10}{'host':<16}{'msg/s':>10}{'acked':>12}{'queue':>8}{'spool':>9}  kafka")
+    for instance, s in sorted(statuses.items()):
+        state = s["state"]
+        if state == "online" and now - s["ts"] > stale_after:
+            state = "stale"     # 상태 갱신이 끊김 (LWT가 아직 안 왔거나 멈춤)
+        print(f"{instance:<20}{state:<10}{s['host']:<16}{s['rate']:>10,.0f}{s['acked']:>12,}"
+              f"{s['queue_depth']:>8,}{s['spool_depth']:>9,}  {'ok' if s['kafka_healthy'] else 'DOWN'}")
+
+
+def create_forwarder(instance: str, metrics=None, producer=None, schema=None):
+    """인스턴스용 KafkaForwarder. 스풀은 인스턴스마다 따로 (<spool_dir>/<instance>)."""
+    from forwarder import KafkaForwarder, create_producer
+    from spool import Spool
+
+    spool = None
+    if BRIDGE_CONFIG["spill_policy"] == "spool":
+        spool = Spool(os.path.join(BRIDGE_CONFIG["spool_dir"], instance))
+    return KafkaForwarder(producer or create_producer(), metrics=metrics, schema=schema, spool=spool)
+
+
+def main(argv=None):
+    cfg = SHARED_BRIDGE_CONFIG
+    parser = argparse.ArgumentParser(description="수평 확장 MQTT → Kafka 브릿지 (MQTT v5 공유 구독)")
+    parser.add_argument("--instance", default=default_instance(),
+                        help="인스턴스 ID (재시작해도 같은 값, 호스트당 여러 개면 서로 다르게)")
+    parser.add_argument("--group", default=cfg["group"], help="공유 구독 그룹")
+    parser.add_argument("--topic", default=cfg["topic"])
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=cfg["qos"])
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="계측 HTTP 포트 (기본: config의 bridge 포트, 0: 끔)")
+    parser.add_argument("--status", action="store_true", help="그룹 인스턴스 상태만 출력하고 종료")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        print_status(read_status(args.group))
+        return
+
+    from fleet import expand_machines
+    from forwarder import report_forever
+    from metrics import start_metrics
+    from wire import WireSchema
+
+    schema = WireSchema(expand_machines(MACHINES, args.copies) if args.copies > 1 else MACHINES)
+    metrics = start_metrics("bridge", instance=args.instance, port=args.metrics_port)
+    bridge = SharedBridge(create_forwarder(args.instance, metrics, schema=schema), args.instance, args.group,
+                          args.topic, args.qos, metrics=metrics)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: bridge.stopped.set())
+    bridge.start()
+    threading.Thread(target=report_forever, args=(bridge.forwarder,), daemon=True).start()
+    print(f"Shared MQTT-Kafka Bridge 시작! (instance={bridge.instance}, {bridge.shared_topic})")
+    while not bridge.stopped.wait(0.5):
+        pass
+    bridge.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+브릿지용 디스크 스풀 (Kafka 장애 대비).
+
+Kafka로 보내지 못한 payload를 로컬 파일에 순서대로 쌓아 두었다가, 브로커가 살아나면 순서대로 다시 보냅니다.
+
+파일 구조 (디렉터리 하나):
+  000000000001.seg, 000000000002.seg, ...   추가 전용 세그먼트 (segment_bytes를 넘으면 다음 파일로)
+  cursor.json                               다 보낸 위치 {"segment": n, "offset": bytes, "records": n}
+
+레코드: 길이 u32 | CRC32 u32 | 스풀에 넣은 시각 i64(ms) | payload
+  - 쓰기는 버퍼를 거친 묶음 쓰기 (append_many는 한 번의 write), 묶음마다 OS로 flush
+  - 시작할 때 마지막 세그먼트의 잘린 꼬리(쓰다 죽은 레코드)는 잘라냄
+  - 다 보낸 세그먼트는 지움
+
+크기 제한(max_bytes)을 넘으면 eviction 정책을 따릅니다.
+  - drop_oldest: 가장 오래된 세그먼트를 통째로 지움 (최신 데이터 우선)
+  - drop_newest: 새 payload를 받지 않음 (이미 쌓인 데이터 우선)
+
+내구성 (fsync 정책, BRIDGE_CONFIG["spool_fsync"]):
+  - none:  append_many가 반환되면 OS 페이지 캐시까지 들어간 것 → 브릿지 프로세스가 죽어도 남음 (OS / 전원 장애에는 잃을 수 있음)
+  - batch: append_many마다 fsync까지 → OS / 전원 장애에도 남음 (묶음마다 디스크 동기화 비용)
+  - cursor.json은 fsync하지 않으므로 장애 후에는 이미 보낸 레코드를 다시 보낼 수 있음 (at-least-once)
+"""
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+from config import BRIDGE_CONFIG
+
+_RECORD = struct.Struct("<IIq")
+SEGMENT_SUFFIX = ".seg"
+CURSOR_FILE = "cursor.json"
+EVICTION_POLICIES = ("drop_oldest", "drop_newest")
+FSYNC_POLICIES = ("none", "batch")
+
+
+class SpoolError(RuntimeError):
+    """스풀 파일이 손상되어 읽을 수 없을 때 발생합니다."""
+
+
+class _Segment:
+    __slots__ = ("seq", "path", "size", "records")
+
+    def __init__(self, seq: int, path: str, size: int = 0, records: int = 0):
+        self.seq = seq
+        self.path = path
+        self.size = size
+        self.records = records
+
+
+class Spool:
+    """세그먼트 파일로 나눠 쌓는 추가 전용 디스크 큐. (쓰기 여러 스레드, 읽기 한 스레드)"""
+
+    def __init__(self, directory: str = None, segment_bytes: int = None, max_bytes: int = None,
+                 eviction: str = None, fsync: str = None):
+        self.directory = directory or BRIDGE_CONFIG["spool_dir"]
+        self.segment_bytes = segment_bytes or BRIDGE_CONFIG["spool_segment_bytes"]
+        self.max_bytes = max_bytes or BRIDGE_CONFIG["spool_max_bytes"]
+        self.eviction = eviction or BRIDGE_CONFIG["spool_eviction"]
+        if self.eviction not in EVICTION_POLICIES:
+            raise ValueError(f"알 수 없는 eviction 정책: {self.eviction}")
+        self.fsync = fsync or BRIDGE_CONFIG["spool_fsync"]
+        if self.fsync not in FSYNC_POLICIES:
+            raise ValueError(f"알 수 없는 fsync 정책: {self.fsync}")
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._segments = []             # 오래된 순서, 마지막이 쓰는 중인 세그먼트
+        self._writer = None
+        self._read_file = None          # (seq, 파일 객체)
+        self.total_bytes = 0
+        self.depth = 0                  # 아직 보내지 않은 레코드 수
+
+        # 통계
+        self.appended = 0
+        self.committed = 0
+        self.evicted = 0
+        self.rejected = 0
+
+        self._recover()
+
+    # ------------------------------------------------------------
+    # 시작 / 복구
+    # ------------------------------------------------------------
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:012d}{SEGMENT_SUFFIX}")
+
+    def _recover(self):
+        seqs = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX))
+        for n, seq in enumerate(seqs):
+            path = self._segment_path(seq)
+            size, records = _scan(path, verify=(n == len(seqs) - 1))
+            if size != os.path.getsize(path):
+                with open(path, "r+b") as f:
+                    f.truncate(size)    # 쓰다 죽은 꼬리 제거
+            self._segments.append(_Segment(seq, path, size, records))
+            self.total_bytes += size
+            self.depth += records
+
+        self.cursor = {"segment": seqs[0] if seqs else 1, "offset": 0, "records": 0}
+        path = os.path.join(self.directory, CURSOR_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            if any(s.seq == saved["segment"] for s in self._segments):
+                self.cursor = saved
+            elif self._segments and saved["segment"] > self._segments[-1].seq:
+                self.cursor = {"segment": self._segments[-1].seq + 1, "offset": 0, "records": 0}
+        # 커서보다 앞선 세그먼트는 이미 다 보낸 것
+        while self._segments and self._segments[0].seq < self.cursor["segment"]:
+            self._drop_segment(self._segments[0])
+        current = self._find(self.cursor["segment"])
+        if current is not None and self.cursor["offset"] > current.size:
+            # 커서 뒤쪽이 잘려 나간 경우 (꼬리 복구) → 세그먼트 끝으로
+            self.cursor = {"segment": current.seq, "offset": current.size, "records": current.records}
+        self.depth -= self.cursor["records"]
+
+        if not self._segments or self._segments[-1].size >= self.segment_bytes:
+            seq = max([self.cursor["segment"]] + [s.seq + 1 for s in self._segments])
+            self._segments.append(_Segment(seq, self._segment_path(seq)))
+        self._writer = open(self._segments[-1].path, "ab", buffering=1024 * 1024)
+
+    # ------------------------------------------------------------
+    # 쓰기
+    # ------------------------------------------------------------
+    def append(self, payload: bytes) -> bool:
+        return self.append_many([payload]) == 1
+
+    def append_many(self, payloads: list) -> int:
+        """payload 여러 개를 한 번에 쓰고 OS로 flush합니다 (fsync="batch"면 fsync까지).
+        실제로 받은 개수를 반환합니다. (drop_newest로 거절되면 빠짐)"""
+        now = int(time.time() * 1000)
+        chunks = []
+        for payload in payloads:
+            chunks.append(_RECORD.pack(len(payload), zlib.crc32(payload), now))
+            chunks.append(payload)
+        data = b"".join(chunks)
+        count = len(payloads)
+
+        with self._lock:
+            if self.total_bytes + len(data) > self.max_bytes:
+                if self.eviction == "drop_newest":
+                    self.rejected += count
+                    return 0
+                self._evict(len(data))
+            segment = self._segments[-1]
+            if segment.size and segment.size + len(data) > self.segment_bytes:
+                segment = self._rotate()
+            self._writer.write(data)
+            self._writer.flush()
+            if self.fsync == "batch":
+                os.fsync(self._writer.fileno())
+            segment.size += len(data)
+            segment.records += count
+            self.total_bytes += len(data)
+            self.depth += count
+            self.appended += count
+        return count
+
+    def _rotate(self) -> _Segment:
+        self._writer.close()
+        seq = self._segments[-1].seq + 1
+        segment = _Segment(seq, self._segment_path(seq))
+        self._segments.append(segment)
+        self._writer = open(segment.path, "ab", buffering=1024 * 1024)
+        return segment
+
+    def _evict(self, needed: int):
+        """가장 오래된 세그먼트부터 지워서 needed만큼 자리를 만듭니다."""
+        while self.total_bytes + needed > self.max_bytes:
+            if len(self._segments) == 1:
+                if self._segments[0].size == 0:
+                    return
+                self._rotate()
+            oldest = self._segments[0]
+            unread = oldest.records
+            if self.cursor["segment"] == oldest.seq:
+                unread -= self.cursor["records"]
+            self.evicted += unread
+            self.depth -= unread
+            self._drop_segment(oldest)
+            self.cursor = {"segment": self._segments[0].seq, "offset": 0, "records": 0}
+            self._save_cursor()
+
+    def _drop_segment(self, segment: _Segment):
+        if self._read_file is not None and self._read_file[0] == segment.seq:
+            self._read_file[1].close()
+            self._read_file = None
+        self._segments.remove(segment)
+        self.total_bytes -= segment.size
+        try:
+            os.remove(segment.path)
+        except FileNotFoundError:
+            pass
+
+    def flush(self):
+        with self._lock:
+            self._writer.flush()
+
+    # ------------------------------------------------------------
+    # 읽기 (드레인 스레드 하나에서만 호출)
+    # ------------------------------------------------------------
+    def read(self, max_records: int):
+        """커밋된 위치부터 최대 max_records개를 읽습니다. 반환: (payload 목록, 다음 커서).
+        보낸 뒤 commit(커서)를 불러야 위치가 넘어갑니다. (부르지 않으면 다음 read에서 다시 읽음)"""
+        with self._lock:
+            cursor = dict(self.cursor)
+            segment = self._find(cursor["segment"])
+            # 다 읽은 세그먼트(쓰는 중이 아닌)는 다음 세그먼트로 넘어감
+            while (segment is not None and cursor["offset"] >= segment.size
+                   and segment is not self._segments[-1]):
+                segment = self._segments[self._segments.index(segment) + 1]
+                cursor = {"segment": segment.seq, "offset": 0, "records": 0}
+            if segment is None or cursor["offset"] >= segment.size:
+                return [], cursor
+            if segment is self._segments[-1]:
+                self._writer.flush()
+            end = segment.size
+            f = self._reader(segment)
+
+        f.seek(cursor["offset"])
+        payloads = []
+        offset = cursor["offset"]
+        while len(payloads) < max_records and offset < end:
+            header = f.read(_RECORD.size)
+            length, crc, _ = _RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                raise SpoolError(f"{segment.path}: {offset}에서 레코드가 손상되었습니다.")
+            payloads.append(payload)
+            offset += _RECORD.size + length
+        cursor["offset"] = offset
+        cursor["records"] += len(payloads)
+        return payloads, cursor
+
+    def _find(self, seq: int):
+        for segment in self._segments:
+            if segment.seq == seq:
+                return segment
+        return None
+
+    def _reader(self, segment: _Segment):
+        if self._read_file is None or self._read_file[0] != segment.seq:
+            if self._read_file is not None:
+                self._read_file[1].close()
+            self._read_file = (segment.seq, open(segment.path, "rb"))
+        return self._read_file[1]
+
+    def commit(self, cursor: dict, count: int):
+        """read()가 돌려준 커서까지 보냈다고 기록합니다. 다 보낸 세그먼트는 지웁니다."""
+        with self._lock:
+            if self._find(cursor["segment"]) is None:
+                return          # 그 사이에 eviction으로 지워짐
+            while self._segments[0].seq < cursor["segment"]:
+                self._drop_segment(self._segments[0])
+            self.cursor = cursor
+            self.depth -= count
+            self.committed += count
+            self._save_cursor()
+
+    def _save_cursor(self):
+        path = os.path.join(self.directory, CURSOR_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.cursor, f)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------
+    def __len__(self):
+        return self.depth
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "bytes": self.total_bytes,
+            "segments": len(self._segments),
+            "appended": self.appended,
+            "committed": self.committed,
+            "evicted": self.evicted,
+            "rejected": self.rejected,
+        }
+
+    def close(self):
+        with self._lock:
+            self._writer.close()
+            if self._read_file is not None:
+                self._read_file[1].close()
+                self._read_file = None
+
+
+def _scan(path: str, verify: bool):
+    """세그먼트의 온전한 레코드 수와 길이(bytes)를 셉니다. verify면 CRC까지 확인합니다."""
+    size = records = 0
+    total = os.path.getsize(path)
+    with open(path, "rb") as f:
+        while size + _RECORD.size <= total:
+            length, crc, _ = _RECORD.unpack(f.read(_RECORD.size))
+            if size + _RECORD.size + length > total:
+                break
+            if verify:
+                if zlib.crc32(f.read(length)) != crc:
+                    break
+            else:
+                f.seek(length, os.SEEK_CUR)
+            size += _RECORD.size + length
+            records += 1
+    return size, records
@@ -0,0 +1,371 @@
+"""
+로컬 브로커 대역(stand-in).
+
+Docker 스택(Mosquitto, Kafka) 없이 파이프라인 코드를 돌려 보기 위한 프로세스 내부 대역입니다.
+벤치마크(bench.py)와 오프라인 실험용이며, 실제 서비스 코드는 그대로 두고 클라이언트 객체만 바꿔 끼웁니다.
+
+  - InProcessBroker / FakeMQTTClient: paho mqtt.Client에서 쓰는 만큼의 API
+    (on_connect / on_message, connect, subscribe, publish, loop_start / loop_forever ...)
+    구독자마다 전달 스레드 1개 → paho 네트워크 스레드처럼 on_message가 별도 스레드에서 호출됨
+    MQTT v5 공유 구독($share/<그룹>/<필터>: 그룹 안에서 메시지마다 한 구독자에게 round-robin),
+    retained 메시지, LWT(will_set, drop()으로 연결 끊김 흉내)도 흉내 냄. 세션 유지(clean_start)는 없음
+  - FakeKafkaProducer: kafka-python KafkaProducer의 send / flush / future 콜백 API
+    linger_ms마다 쌓인 메시지를 한꺼번에 ack (실제 producer의 배치 전송 흉내)
+"""
+import queue
+import threading
+import time
+import zlib
+
+
+def topic_matches(subscription: str, topic: str) -> bool:
+    """MQTT 토픽 필터(+, # 와일드카드) 매칭."""
+    sub_parts = subscription.split("/")
+    topic_parts = topic.split("/")
+    for i, part in enumerate(sub_parts):
+        if part == "#":
+            return True
+        if i >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[i]:
+            return False
+    return len(sub_parts) == len(topic_parts)
+
+
+# ============================================================
+# MQTT
+# ============================================================
+
+class FakeMessage:
+    """paho MQTTMessage 대역."""
+
+    __slots__ = ("topic", "payload", "qos", "retain", "timestamp")
+
+    def __init__(self, topic: str, payload: bytes, qos: int = 0, retain: bool = False):
+        self.topic = topic
+        self.payload = payload
+        self.qos = qos
+        self.retain = retain
+        self.timestamp = time.monotonic()
+
+
+class InProcessBroker:
+    """같은 프로세스 안의 FakeMQTTClient끼리 메시지를 전달하는 브로커."""
+
+    def __init__(self, queue_size: int = 0):
+        self.queue_size = queue_size       # 구독자별 전달 큐 길이 (0: 무제한)
+        self._clients = []
+        self._lock = threading.Lock()
+        self._retained = {}                 # 토픽 → (payload, qos)
+        self._next = {}                     # (공유 그룹, 필터) → round-robin 위치
+        self.published = 0
+        self.delivered = 0
+
+    def client(self, client_id: str = "") -> "FakeMQTTClient":
+        return FakeMQTTClient(self, client_id)
+
+    def _attach(self, client):
+        with self._lock:
+            if client not in self._clients:
+                self._clients.append(client)
+
+    def _detach(self, client):
+        with self._lock:
+            if client in self._clients:
+                self._clients.remove(client)
+
+    def publish(self, topic: str, payload, qos: int = 0, retain: bool = False):
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        self.published += 1
+        targets = []
+        with self._lock:
+            if retain:
+                if payload:
+                    self._retained[topic] = (payload, qos)
+                else:
+                    self._retained.pop(topic, None)     # 빈 payload는 retained 메시지 삭제
+            groups = {}
+            for client in self._clients:
+                if client._matches(topic):
+                    targets.append(client)
+                for key in client._shared:
+                    if topic_matches(key[1], topic):
+                        groups.setdefault(key, []).append(client)
+            for key, members in groups.items():
+                n = self._next.get(key, 0)
+                self._next[key] = n + 1
+                targets.append(members[n % len(members)])
+        for client in targets:
+            client._inbox.put(FakeMessage(topic, payload, qos, retain))
+            self.delivered += 1
+
+    def retained(self, subscription: str) -> list:
+        """구독 필터에 맞는 retained 메시지 [(토픽, payload, qos)]."""
+        with self._lock:
+            return [(topic, payload, qos) for topic, (payload, qos) in self._retained.items()
+                    if topic_matches(subscription, topic)]
+
+
+class FakeMQTTClient:
+    """paho mqtt.Client 대역 (CallbackAPIVersion.VERSION2 콜백 시그니처)."""
+
+    def __init__(self, broker: InProcessBroker, client_id: str = ""):
+        self.broker = broker
+        self.client_id = client_id
+        self.on_connect = None
+        self.on_message = None
+        self.on_disconnect = None
+        self.on_unsubscribe = None
+        self._subscriptions = []
+        self._shared = []               # 공유 구독 (그룹, 필터)
+        self._will = None
+        self._connected = False
+        self._inbox = queue.Queue(maxsize=broker.queue_size)
+        self._thread = None
+        self._running = False
+
+    def _matches(self, topic: str) -> bool:
+        return any(topic_matches(sub, topic) for sub in self._subscriptions)
+
+    def connect(self, host: str = "localhost", port: int = 1883, keepalive: int = 60,
+                clean_start=None, properties=None):
+        self.broker._attach(self)
+        self._connected = True
+        if self.on_connect is not None:
+            self.on_connect(self, None, {}, 0, None)
+        return 0
+
+    def reconnect_delay_set(self, min_delay: int = 1, max_delay: int = 120):
+        pass    # 프로세스 내부 브로커는 끊기지 않음
+
+    def will_set(self, topic: str, payload=None, qos: int = 0, retain: bool = False, properties=None):
+        self._will = (topic, payload, qos, retain)
+
+    def subscribe(self, topic, qos: int = 0, options=None, properties=None):
+        topics = [topic] if isinstance(topic, str) else [t[0] if isinstance(t, tuple) else t for t in topic]
+        for t in topics:
+            if t.startswith("$share/"):
+                _, group, subscription = t.split("/", 2)
+                self._shared.append((group, subscription))
+                continue    # 공유 구독에는 retained 메시지를 보내지 않음 (MQTT v5)
+            self._subscriptions.append(t)
+            for retained_topic, payload, retained_qos in self.broker.retained(t):
+                self._inbox.put(FakeMessage(retained_topic, payload, retained_qos, True))
+        return 0, 1
+
+    def unsubscribe(self, topic: str, properties=None):
+        if topic.startswith("$share/"):
+            _, group, subscription = topic.split("/", 2)
+            if (group, subscription) in self._shared:
+                self._shared.remove((group, subscription))
+        elif topic in self._subscriptions:
+            self._subscriptions.remove(topic)
+        if self.on_unsubscribe is not None:
+            self.on_unsubscribe(self, None, 1, [], None)
+        return 0, 1
+
+    def publish(self, topic: str, payload=None, qos: int = 0, retain: bool = False, properties=None):
+        if not self._connected:
+            return      # 끊긴 뒤에는 보내지 않음 (paho는 재연결 후 보내려고 쌓아 둠)
+        self.broker.publish(topic, payload if payload is not None else b"", qos, retain)
+
+    def _deliver(self, timeout: float = 0.1) -> bool:
+        try:
+            msg = self._inbox.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        if self.on_message is not None:
+            self.on_message(self, None, msg)
+        return True
+
+    def loop_start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name=f"fake-mqtt-{self.client_id}", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while self._running or not self._inbox.empty():
+            self._deliver()
+
+    def loop_stop(self):
+        """받은 메시지를 모두 전달한 뒤 전달 스레드를 멈춥니다."""
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def loop_forever(self):
+        self._running = True
+        self._loop()
+
+    def pending(self) -> int:
+        return self._inbox.qsize()
+
+    def disconnect(self, reasoncode=None, properties=None):
+        """정상 종료 (LWT를 보내지 않음)."""
+        self.broker._detach(self)
+        self._connected = False
+        self._running = False
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, None, {}, 0, None)
+
+    def drop(self):
+        """네트워크 끊김 / 프로세스 비정상 종료 흉내: 브로커가 LWT를 대신 발행합니다."""
+        self.broker._detach(self)
+        self._connected = False
+        self._running = False
+        if self._will is not None:
+            self.broker.publish(*self._will)
+        if self.on_disconnect is not None:
+            self.on_disconnect(self, None, {}, 7, None)     # 7: MQTT_ERR_CONN_LOST
+
+
+# ============================================================
+# Kafka
+# ============================================================
+
+class RecordMetadata:
+    __slots__ = ("topic", "partition", "offset", "timestamp")
+
+    def __init__(self, topic: str, partition: int, offset: int, timestamp: int):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.timestamp = timestamp
+
+
+class FakeFuture:
+    """kafka-python FutureRecordMetadata 대역."""
+
+    __slots__ = ("_callbacks", "_errbacks", "_done", "value", "exception")
+    _lock = threading.Lock()        # 콜백 등록과 완료가 다른 스레드에서 겹칠 때 콜백이 빠지지 않도록
+
+    def __init__(self):
+        self._callbacks = []
+        self._errbacks = []
+        self._done = False
+        self.value = None
+        self.exception = None
+
+    def add_callback(self, fn, *args, **kwargs):
+        with self._lock:
+            if not self._done:
+                self._callbacks.append((fn, args, kwargs))
+                return self
+        if self.exception is None:
+            fn(*args, self.value, **kwargs)
+        return self
+
+    def add_errback(self, fn, *args, **kwargs):
+        with self._lock:
+            if not self._done:
+                self._errbacks.append((fn, args, kwargs))
+                return self
+        if self.exception is not None:
+            fn(*args, self.exception, **kwargs)
+        return self
+
+    def _finish(self, value, exception):
+        with self._lock:
+            self.value = value
+            self.exception = exception
+            self._done = True
+        callbacks = self._callbacks if exception is None else self._errbacks
+        result = value if exception is None else exception
+        for fn, args, kwargs in callbacks:
+            fn(*args, result, **kwargs)
+
+    def success(self, value):
+        self._finish(value, None)
+
+    def failure(self, exception):
+        self._finish(None, exception)
+
+    def get(self, timeout: float = None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._done:
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError("ack 대기 시간 초과")
+            time.sleep(0.0005)
+        if self.exception is not None:
+            raise self.exception
+        return self.value
+
+
+class FakeKafkaProducer:
+    """kafka-python KafkaProducer 대역.
+
+    send()는 메시지를 대기열에 넣고 future를 돌려주며, 백그라운드 스레드가 linger_ms마다 한꺼번에 ack합니다.
+    keep=True면 토픽별로 성공한 (key, value)를 보관합니다. (검증용, 벤치마크에서는 끔)
+    fail_every=N이면 N번째 메시지마다 전송 실패를 흉내 냅니다.
+    down=True로 바꾸면 그동안 보낸 메시지는 모두 실패합니다. (브로커 장애 흉내)
+    partitions는 모든 토픽의 파티션 수이고, 파티션을 주지 않은 메시지는 키 해시로 정합니다.
+    """
+
+    def __init__(self, linger_ms: float = 5, value_serializer=None, key_serializer=None,
+                 keep: bool = False, fail_every: int = 0, partitions: int = 1, **_ignored):
+        self.linger = linger_ms / 1000
+        self.value_serializer = value_serializer
+        self.key_serializer = key_serializer
+        self.keep = keep
+        self.fail_every = fail_every
+        self.down = False
+        self.partitions = partitions
+        self.messages = {}          # topic → [(key, value), ...] (keep=True일 때)
+        self.partition_messages = {}    # (topic, partition) → [(key, value), ...] (keep=True일 때)
+        self.sent = 0
+        self.bytes = 0
+        self._offsets = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="fake-kafka-producer", daemon=True)
+        self._thread.start()
+
+    def send(self, topic: str, value=None, key=None, partition: int = None, timestamp_ms: int = None):
+        if self.value_serializer is not None and value is not None:
+            value = self.value_serializer(value)
+        if self.key_serializer is not None and key is not None:
+            key = self.key_serializer(key)
+        future = FakeFuture()
+        with self._lock:
+            self.sent += 1
+            self.bytes += len(value) if value else 0
+            failed = self.down or (self.fail_every and self.sent % self.fail_every == 0)
+            if partition is None:
+                partition = zlib.crc32(key) % self.partitions if key else 0
+            elif not 0 <= partition < self.partitions:
+                raise ValueError(f"{topic}: 없는 파티션 {partition}")
+            offset = self._offsets.get((topic, partition), 0)
+            self._offsets[(topic, partition)] = offset + 1
+            self._pending.append((future, topic, partition, offset, timestamp_ms, failed, key, value))
+        return future
+
+    def _complete(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        now = int(time.time() * 1000)
+        for future, topic, partition, offset, timestamp_ms, failed, key, value in pending:
+            if failed:
+                future.failure(RuntimeError("FakeKafkaProducer: 전송 실패"))
+                continue
+            if self.keep:
+                self.messages.setdefault(topic, []).append((key, value))
+                self.partition_messages.setdefault((topic, partition), []).append((key, value))
+            future.success(RecordMetadata(topic, partition, offset, timestamp_ms or now))
+
+    def _run(self):
+        while not self._closed:
+            time.sleep(self.linger)
+            self._complete()
+
+    def partitions_for(self, topic: str) -> set:
+        return set(range(self.partitions))
+
+    def flush(self, timeout: float = None):
+        self._complete()
+
+    def close(self, timeout: float = None):
+        self._closed = True
+        self._complete()
@@ -5,9 +5,18 @@ main.py(Publisher)가 MQTT 브로커로 보낸 데이터를
 이 스크립트(Subscriber)가 받아서 화면에 출력합니다.
 
 흐름: main.py → MQTT 브로커(Mosquitto) → subscriber.py
+
+실행: python simulator/subscriber.py  (또는 python -m simulator subscriber)
 """
-import json
-import paho.mqtt.client as mqtt
+import argparse
+
+from config import MQTT_CONFIG
+
+# run()에서 채움 (numpy를 끌고 오는 batch / wire / metrics는 실제로 실행할 때만 불러오기 위해)
+stage = None
+schema = None
+ReadingBatch = None
+STATUS_NAMES = None
 
 
 # ============================================================
@@ -21,7 +30,7 @@ def on_connect(client, userdata, flags, rc, properties):
     
     매개변수 (paho가 자동으로 넣어줌, signal_handler의 sig, frame과 같은 원리):
       - client:     mqtt.Client 인스턴스 (자기 자신)
-      - userdata:   사용자 정의 데이터 (거의 안 씀)
+      - userdata:   사용자 정의 데이터 (여기서는 구독할 토픽 필터, run()에서 user_data_set으로 지정)
       - flags:      브로커 응답 플래그
       - rc:         연결 결과 코드 (0이면 성공)
       - properties: MQTT v5 속성
@@ -32,7 +41,7 @@ def on_connect(client, userdata, flags, rc, properties):
       connect() 직후에 subscribe하면 재연결 시 구독이 사라짐
     """
     print("MQTT 연결 성공!")
-    client.subscribe("factory/#")
+    client.subscribe(userdata or "factory/#")   # userdata: run()에서 넘긴 토픽 필터
     # "factory/#" 의미:
     #   factory/CNC-001/sensors  ← 매칭 ✅
     #   factory/PRS-001/sensors  ← 매칭 ✅
@@ -51,31 +60,75 @@ def on_message(client, userdata, msg):
       - userdata: 사용자 정의 데이터
       - msg:      수신된 메시지 객체
                   - msg.topic:   토픽 (예: "factory/CNC-001/sensors")
-                  - msg.payload: 메시지 내용 (bytes → json.loads로 딕셔너리 변환)
+                  - msg.payload: 메시지 내용 (bytes → ReadingBatch 변환, batch.py)
+                                 JSON 메시지면 1건, 바이너리 프레임(wire.py)이면 여러 건
     """
-    data = json.loads(msg.payload)
-    print(f"[{msg.topic}] {data['machine_id']} - {data['status']}")
+    try:
+        batch = ReadingBatch.from_payload(msg.payload, schema)
+    except ValueError as e:
+        # 깨진 JSON, 스키마에 없는 설비 (발행기의 --copies와 다르면) → 알리고 다음 메시지로
+        # 여기서 예외가 나가면 paho가 콜백 예외를 loop_forever 밖으로 던져서 수신이 멈춤!
+        print(f"[{msg.topic}] 읽을 수 없는 메시지: {e}")
+        return
+    stage.observe_batch(batch)
+    machine_ids = batch.schema.machine_ids
+    for m, status in zip(batch.machine.tolist(), batch.status.tolist()):
+        print(f"[{msg.topic}] {machine_ids[m]} - {STATUS_NAMES[status]}")
 
 
 # ============================================================
 # 실행 코드 (위에서 아래로 순서대로 실행)
+# import만 해서는 아무 일도 일어나지 않도록 함수 안에 둠 → main()이 호출
 # ============================================================
 
-# 1. 클라이언트 생성
-client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+def run(host: str = "localhost", port: int = 1883, topic: str = "factory/#", copies: int = 1):
+    global stage, schema, ReadingBatch, STATUS_NAMES
+
+    # paho / numpy는 실제로 실행할 때만 불러옴 (--help나 import가 빨라짐)
+    import paho.mqtt.client as mqtt
+    from batch import ReadingBatch
+    from wire import STATUS_NAMES, WireSchema
+    from metrics import start_metrics, StageMetrics
+    from config import MACHINES
+    from fleet import expand_machines
+
+    # 메시지를 읽을 설비 구성 (발행기를 --copies N으로 띄웠으면 같은 N)
+    schema = WireSchema(expand_machines(MACHINES, copies) if copies > 1 else MACHINES)
+
+    # 계측 (지연 / seq / 처리량) → http://127.0.0.1:9205/metrics
+    metrics = start_metrics("subscriber")
+    stage = StageMetrics(metrics, "subscriber", schema)
+
+    # 1. 클라이언트 생성
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+
+    # 2. "이 이벤트가 발생하면 이 함수를 실행해라" 등록 (아직 실행 안 됨!)
+    #    signal.signal(signal.SIGINT, signal_handler)와 같은 원리
+    client.on_connect = on_connect   # 연결되면 → on_connect 실행
+    client.on_message = on_message   # 메시지 오면 → on_message 실행
+    client.user_data_set(topic)      # on_connect에서 구독할 토픽
+
+    # 3. 브로커에 연결 요청 (Docker의 Mosquitto, 포트 1883)
+    client.connect(host, port)
+
+    # 4. 시작 알림
+    print("MQTT Subscriber 시작! 대기 중...")
+
+    # 5. 무한 대기 루프 (메시지가 올 때마다 on_message 자동 호출)
+    #    main.py의 while 루프와 비슷하지만, paho가 알아서 관리해줌
+    #    Ctrl+C로 종료
+    client.loop_forever()
 
-# 2. "이 이벤트가 발생하면 이 함수를 실행해라" 등록 (아직 실행 안 됨!)
-#    signal.signal(signal.SIGINT, signal_handler)와 같은 원리
-client.on_connect = on_connect   # 연결되면 → on_connect 실행
-client.on_message = on_message   # 메시지 오면 → on_message 실행
 
-# 3. 브로커에 연결 요청 (Docker의 Mosquitto, 포트 1883)
-client.connect("localhost", 1883)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MQTT Subscriber - 센서 데이터 수신기")
+    parser.add_argument("--host", default=MQTT_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=MQTT_CONFIG["port"])
+    parser.add_argument("--topic", default=MQTT_CONFIG["topic"], help="구독할 토픽 필터")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    args = parser.parse_args(argv)
+    run(args.host, args.port, args.topic, args.copies)
 
-# 4. 시작 알림
-print("MQTT Subscriber 시작! 대기 중...")
 
-# 5. 무한 대기 루프 (메시지가 올 때마다 on_message 자동 호출)
-#    main.py의 while 루프와 비슷하지만, paho가 알아서 관리해줌
-#    Ctrl+C로 종료
-client.loop_forever()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Kafka 토픽 구성과 파티션 배정.
+
+sensor-raw는 machine_id를 키로 보내고, 파티션은 브릿지가 직접 정합니다.
+같은 설비의 데이터는 항상 같은 파티션으로 가므로 파티션 안에서 설비별 순서가 보장되고,
+컨슈머를 파티션 수만큼 늘려도(consumer_group.py) 다시 정렬할 필요가 없습니다.
+
+파티션 배정 전략 (KAFKA_CONFIG["partitioner"]):
+  - hash:     crc32(machine_id) % 파티션 수 → 설비별로 고르게 분산 (설비 추가/삭제에도 다른 설비는 그대로)
+  - location: config의 location(라인) 단위로 묶음 → 같은 라인은 같은 파티션 (라인 단위 처리에 유리)
+              라인 수보다 파티션이 많으면 남는 파티션은 쓰지 않음
+
+주의: 파티션 수를 늘리면 설비 → 파티션 배정이 바뀝니다. 늘린 직후에는 잠깐 설비별 순서가 섞일 수 있습니다.
+
+실행: python simulator/topics.py              # 없는 토픽 생성 (있으면 그대로)
+      python simulator/topics.py --describe   # 토픽별 파티션 수와 설비 배정 확인
+      python simulator/topics.py --grow       # 설정보다 파티션이 적은 토픽은 늘림
+
+소비자가 풀 수 없거나 처리할 수 없는 메시지는 DeadLetters로 dead-letter 토픽에 원본 그대로 보내고 건너뜁니다.
+(같은 메시지에서 계속 죽고 재시작하면 다시 그 메시지부터 읽는 일을 막음)
+"""
+import argparse
+import json
+import threading
+import zlib
+
+from lazy import np
+
+from config import KAFKA_CONFIG
+from wire import WireSchema, default_schema
+
+PARTITIONERS = ("hash", "location")
+
+
+def hash_partition(machine_id: str, num_partitions: int) -> int:
+    return zlib.crc32(machine_id.encode("utf-8")) % num_partitions
+
+
+class Partitioner:
+    """설비 → 파티션 배정표. 스키마의 설비 번호 순서로 배열도 만들어 둡니다. (프레임 분할용)"""
+
+    def __init__(self, num_partitions: int, strategy: str = None, schema: WireSchema = None):
+        self.num_partitions = max(1, num_partitions)
+        self.strategy = strategy or KAFKA_CONFIG["partitioner"]
+        if self.strategy not in PARTITIONERS:
+            raise ValueError(f"알 수 없는 partitioner: {self.strategy}")
+        self.schema = schema or default_schema()
+
+        ids = self.schema.machine_ids
+        if self.strategy == "location":
+            lines = sorted(set(self.schema.locations))
+            line_index = {line: n for n, line in enumerate(lines)}
+            assigned = [line_index[loc] % self.num_partitions for loc in self.schema.locations]
+        else:
+            assigned = [hash_partition(m, self.num_partitions) for m in ids]
+        self.by_index = np.array(assigned, dtype=np.int32)     # 설비 번호 → 파티션
+        self._by_id = dict(zip(ids, assigned))
+
+    def partition(self, machine_id: str) -> int:
+        """설비의 파티션. 스키마에 없는 설비는 hash 전략으로 정합니다."""
+        partition = self._by_id.get(machine_id)
+        if partition is None:
+            return hash_partition(machine_id or "", self.num_partitions)
+        return partition
+
+    def split_frame(self, payload: bytes) -> list:
+        """바이너리 프레임을 파티션별 프레임으로 나눕니다. 반환: [(파티션, 키, 프레임)].
+        설비가 하나뿐인 프레임은 machine_id를 키로, 여러 설비가 섞인 프레임은 키 없이 보냅니다."""
+        if self.num_partitions == 1:
+            return [(0, None, payload)]
+        parts = []
+        for partition, machines, frame in self.schema.split_frame(payload, self.by_index):
+            key = None
+            if len(machines) and machines.min() == machines.max():
+                key = self.schema.machine_ids[int(machines[0])].encode("utf-8")
+            parts.append((partition, key, frame))
+        return parts
+
+    def assignment(self) -> dict:
+        """파티션 → 설비 ID 목록."""
+        table = {p: [] for p in range(self.num_partitions)}
+        for machine_id, partition in self._by_id.items():
+            table[partition].append(machine_id)
+        return table
+
+
+def partition_count(producer, topic: str) -> int:
+    """토픽의 실제 파티션 수. 메타데이터를 못 가져오면 설정값을 씁니다."""
+    try:
+        partitions = producer.partitions_for(topic)
+        if partitions:
+            return len(partitions)
+    except Exception as e:
+        print(f"[WARN] {topic} 파티션 정보를 가져오지 못했습니다 ({e}), 설정값 사용")
+    return KAFKA_CONFIG["partitions"].get(topic, 1)
+
+
+class DeadLetters:
+    """처리할 수 없는 메시지를 건너뛰면서 dead-letter 토픽에 원본과 사유(header)를 남깁니다.
+
+    topic이 ""이면 보내지 않고 로그만 남깁니다. 로그는 처음 몇 건과 그 뒤 log_every건마다만 출력합니다.
+    여러 스레드(consumer_group 파티션 워커)에서 같이 써도 됩니다.
+    """
+
+    def __init__(self, stage: str, topic: str = None, producer=None, log_first: int = 10, log_every: int = 1000):
+        self.stage = stage
+        self.topic = KAFKA_CONFIG["dead_letter_topic"] if topic is None else topic
+        self.count = 0
+        self.reasons = {}       # 예외 타입 이름 → 건수
+        self._producer = producer
+        self._log_first, self._log_every = log_first, log_every
+        self._lock = threading.Lock()
+
+    def add(self, payload, error: Exception, key: bytes = None):
+        """payload: 원본 bytes (이미 푼 dict면 JSON으로 바꿔 보냄)."""
+        reason = type(error).__name__
+        with self._lock:
+            self.count += 1
+            count = self.count
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        if count <= self._log_first or count % self._log_every == 0:
+            print(f"[WARN] {self.stage}: 처리할 수 없는 메시지 건너뜀 ({reason}: {error}) - 누적 {count:,}건")
+        if not self.topic:
+            return
+        if not isinstance(payload, (bytes, bytearray)):
+            payload = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+        headers = [("stage", self.stage.encode("utf-8")), ("error", f"{reason}: {error}"[:500].encode("utf-8"))]
+        try:
+            self._get_producer().send(self.topic, bytes(payload), key=key, headers=headers)
+        except Exception as e:
+            print(f"[WARN] {self.stage}: dead-letter 토픽 {self.topic}에 보내지 못했습니다 ({e})")
+
+    def _get_producer(self):
+        with self._lock:
+            if self._producer is None:
+                from kafka import KafkaProducer
+                self._producer = KafkaProducer(bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+                                               api_version=KAFKA_CONFIG["api_version"])
+            return self._producer
+
+    def flush(self):
+        if self._producer is not None:
+            self._producer.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"dead_letters": self.count, "reasons": dict(self.reasons)}
+
+
+# ============================================================
+# 토픽 생성
+# ============================================================
+
+def ensure_topics(admin=None, grow: bool = False) -> dict:
+    """설정의 토픽이 없으면 만들고, grow면 파티션이 모자란 토픽을 늘립니다. 반환: 토픽 → 파티션 수."""
+    from kafka.admin import KafkaAdminClient, NewPartitions, NewTopic
+
+    admin = admin or KafkaAdminClient(bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+                                      api_version=KAFKA_CONFIG["api_version"])
+    wanted = KAFKA_CONFIG["partitions"]
+    existing = describe_topics(admin, list(wanted))
+
+    missing = [NewTopic(name, n, KAFKA_CONFIG["replication_factor"])
+               for name, n in wanted.items() if name not in existing]
+    if missing:
+        admin.create_topics(missing)
+        for topic in missing:
+            print(f"[생성] {topic.name}: 파티션 {topic.num_partitions}개")
+
+    short = {name: NewPartitions(n) for name, n in wanted.items()
+             if name in existing and existing[name] < n}
+    for name in short:
+        if grow:
+            print(f"[변경] {name}: 파티션 {existing[name]} → {wanted[name]}개 (설비 → 파티션 배정이 바뀜)")
+        else:
+            print(f"[WARN] {name}: 파티션 {existing[name]}개 < 설정 {wanted[name]}개 (--grow로 늘릴 수 있음)")
+    if grow and short:
+        admin.create_partitions(short)
+    return describe_topics(admin, list(wanted))
+
+
+def describe_topics(admin, topics: list) -> dict:
+    """토픽 → 파티션 수 (없는 토픽은 빠짐)."""
+    result = {}
+    for info in admin.describe_topics(topics):
+        if info.get("error_code", 0) == 0 and info.get("partitions"):
+            result[info["topic"]] = len(info["partitions"])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="sensor-raw / sensor-alert / dead-letter 토픽 생성과 파티션 배정 확인")
+    parser.add_argument("--describe", action="store_true", help="만들지 않고 현재 상태와 설비 배정만 출력")
+    parser.add_argument("--grow", action="store_true", help="설정보다 파티션이 적으면 늘림")
+    parser.add_argument("--strategy", choices=PARTITIONERS, default=KAFKA_CONFIG["partitioner"])
+    args = parser.parse_args(argv)
+
+    from kafka.admin import KafkaAdminClient
+    admin = KafkaAdminClient(bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+                             api_version=KAFKA_CONFIG["api_version"])
+    if args.describe:
+        counts = describe_topics(admin, list(KAFKA_CONFIG["partitions"]))
+    else:
+        counts = ensure_topics(admin, grow=args.grow)
+
+    for topic, count in counts.items():
+        print(f"{topic}: 파티션 {count}개")
+    raw = counts.get(KAFKA_CONFIG["raw_topic"], KAFKA_CONFIG["partitions"][KAFKA_CONFIG["raw_topic"]])
+    print(f"\n{KAFKA_CONFIG['raw_topic']} 설비 배정 (strategy={args.strategy})")
+    for partition, machines in Partitioner(raw, args.strategy).assignment().items():
+        print(f"  {partition:>3}: {', '.join(machines) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,29 @@
 센서 시뮬레이터 실시간 시각화.
 matplotlib로 센서 데이터를 실시간 그래프로 표시합니다.
 
+데이터 소스:
+  - local: 이 프로세스 안에서 Machine을 직접 돌림 (기존 동작)
+  - mqtt:  MQTT(factory/#)를 구독해 실제 파이프라인 데이터를 표시
+  - kafka: Kafka sensor-raw를 구독
+
+설비마다 미리 할당한 NumPy 링 버퍼(ringbuffer.py)에 저장하고, blitting으로 선만 다시 그립니다.
+축 범위는 데이터가 현재 범위를 벗어날 때만 바꾸고, 그때만 전체를 다시 그립니다.
+
 실행: python simulator/visualize.py
+      python simulator/visualize.py --source mqtt --machines CNC-001 CNC-002 --sensors spindle_temp vibration_x
+      python simulator/visualize.py --source mqtt --machines all --copies 200 --sensors vibration
 """
+import argparse
+import threading
 import warnings
+from datetime import datetime
 warnings.filterwarnings("ignore", category=UserWarning)
 
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-from collections import deque
+from lazy import np
 
-from config import MACHINES
-from machine import Machine
+from config import MACHINES, MQTT_CONFIG, KAFKA_CONFIG
+from deadband import StateReconstructor
+from ringbuffer import RingBuffer
 
 # === 설정 ===
 HISTORY_SIZE = 120      # 최근 120초(2분) 데이터 보여줌
@@ -22,100 +34,255 @@ UPDATE_INTERVAL = 1000  # 1초마다 업데이트 (ms)
 # 보고 싶은 센서 (최대 4개 추천)
 TARGET_SENSORS = ["spindle_temp", "vibration_x", "spindle_rpm", "power_consumption"]
 
+# 오른쪽 여백 비율: 데이터가 오른쪽 끝에 닿으면 이만큼 여유를 두고 x축을 옮김
+X_HEADROOM = 0.25
+Y_MARGIN = 0.2
+
+STATUS_RANK = {"RUNNING": 0, "ANOMALY": 1, "WARNING": 2}
+
+
+class FleetHistory:
+    """수신 스레드가 채우고 그리기 스레드가 읽는 설비별 링 버퍼 모음."""
+
+    def __init__(self, machines: dict, history_seconds: float, rate: float):
+        capacity = max(2, int(history_seconds * rate))
+        self.sensors = {m: list(cfg["sensors"]) for m, cfg in machines.items()}
+        self.buffers = {m: RingBuffer(capacity, len(names)) for m, names in self.sensors.items()}
+        self.status = {m: "RUNNING" for m in machines}
+        self.state = StateReconstructor(machines)   # 변화 보고 모드(partial) 레코드 → 전체 스냅샷
+        self.lock = threading.Lock()
+        self.t0 = None
+
+    def add(self, record: dict):
+        buffer = self.buffers.get(record["machine_id"])
+        if buffer is None:
+            return
+        t = datetime.fromisoformat(record["timestamp"]).timestamp()
+        values = self.state.apply(record)["sensors"]
+        row = [values.get(name, np.nan) for name in self.sensors[record["machine_id"]]]
+        with self.lock:
+            if self.t0 is None:
+                self.t0 = t
+            buffer.append(t - self.t0, row)
+            self.status[record["machine_id"]] = record["status"]
+
+
+def start_mqtt(history: FleetHistory, schema=None):
+    import paho.mqtt.client as mqtt
+    from topics import DeadLetters
+    from wire import decode_payload
+
+    skipped = DeadLetters("visualize", topic="")
+
+    def on_connect(client, userdata, flags, rc, properties):
+        client.subscribe(MQTT_CONFIG["topic"])
+
+    def on_message(client, userdata, msg):
+        try:
+            records = decode_payload(msg.payload, schema)
+        except ValueError as e:     # 스키마에 없는 설비 / 깨진 JSON → 건너뜀 (예외가 나가면 수신이 멈춤)
+            skipped.add(msg.payload, e)
+            return
+        for record in records:
+            history.add(record)
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(MQTT_CONFIG["host"], MQTT_CONFIG["port"])
+    client.loop_start()
+    return client
+
+
+def start_kafka(history: FleetHistory, schema=None):
+    from kafka import KafkaConsumer
+    from topics import DeadLetters
+    from wire import decode_payload
+
+    skipped = DeadLetters("visualize", topic="")
+
+    consumer = KafkaConsumer(
+        KAFKA_CONFIG["raw_topic"],
+        bootstrap_servers=KAFKA_CONFIG["bootstrap_servers"],
+        api_version=KAFKA_CONFIG["api_version"],
+        auto_offset_reset="latest",
+    )
 
-def main():
-    # 설비 생성
-    machine_config = MACHINES[TARGET_MACHINE]
-    machine = Machine(TARGET_MACHINE, machine_config)
+    def run():
+        for msg in consumer:
+            try:
+                records = decode_payload(msg.value, schema)
+            except ValueError as e:
+                skipped.add(msg.value, e, msg.key)
+                continue
+            for record in records:
+                history.add(record)
 
-    # 데이터 저장소 (센서별 deque)
-    history = {}
-    alert_lines = {}
-    for sensor_name in TARGET_SENSORS:
-        history[sensor_name] = deque(maxlen=HISTORY_SIZE)
-        alert_lines[sensor_name] = machine_config["sensors"][sensor_name]["alert"]
+    threading.Thread(target=run, name="kafka-dashboard", daemon=True).start()
+    return consumer
 
-    time_ticks = deque(maxlen=HISTORY_SIZE)
+
+def start_local(history: FleetHistory, machine_ids: list):
+    """파이프라인 없이 이 프로세스 안에서 설비를 돌립니다. (기존 동작)"""
+    from clock import SimClock
+    from fleet import Fleet
+
+    fleet = Fleet({m: MACHINES[m] for m in machine_ids})
+    clock = SimClock(UPDATE_INTERVAL / 1000)
+
+    def run():
+        while True:
+            fleet.step()
+            for record in fleet.records(clock.timestamp()):
+                history.add(record)
+            clock.advance()
+
+    threading.Thread(target=run, name="local-fleet", daemon=True).start()
+    return fleet
+
+
+def resolve_machines(names: list, copies: int) -> dict:
+    from fleet import expand_machines
+    machines = expand_machines(MACHINES, copies) if copies > 1 else MACHINES
+    if names == ["all"]:
+        return machines
+    return {m: machines[m] for m in names}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="실시간 센서 대시보드")
+    parser.add_argument("--source", choices=("local", "mqtt", "kafka"), default="local")
+    parser.add_argument("--machines", nargs="+", default=[TARGET_MACHINE], help="설비 ID 목록 또는 all")
+    parser.add_argument("--copies", type=int, default=1, help="발행기와 같은 config.MACHINES 복제 배수")
+    parser.add_argument("--sensors", nargs="+", default=TARGET_SENSORS)
+    parser.add_argument("--history", type=float, default=HISTORY_SIZE, help="표시할 시간 범위(초)")
+    parser.add_argument("--rate", type=float, default=1.0, help="설비당 예상 수신 속도(건/초) → 버퍼 크기")
+    parser.add_argument("--interval", type=int, default=UPDATE_INTERVAL, help="화면 갱신 주기(ms)")
+    args = parser.parse_args(argv)
+
+    import matplotlib.pyplot as plt
+    import matplotlib.animation as animation
+
+    if args.source == "local" and args.copies > 1:
+        parser.error("local 소스는 --copies를 지원하지 않습니다.")
+    machines = resolve_machines(args.machines, args.copies)
+    history = FleetHistory(machines, args.history, args.rate)
+    if args.source != "local":
+        from wire import WireSchema
+        schema = WireSchema(resolve_machines(["all"], args.copies))     # 표시하지 않는 설비도 프레임에 들어 있음
+    if args.source == "mqtt":
+        start_mqtt(history, schema)
+    elif args.source == "kafka":
+        start_kafka(history, schema)
+    else:
+        start_local(history, list(machines))
 
     # === 그래프 설정 ===
     plt.style.use('dark_background')
-    fig, axes = plt.subplots(len(TARGET_SENSORS), 1, figsize=(12, 8), sharex=True)
-    fig.suptitle(f"[LIVE] {TARGET_MACHINE} ({machine_config['type']}) - Sensor Monitor",
+    fig, axes = plt.subplots(len(args.sensors), 1, figsize=(12, 8), sharex=True, squeeze=False)
+    axes = axes[:, 0]
+    title = next(iter(machines)) if len(machines) == 1 else f"{len(machines)} machines"
+    fig.suptitle(f"[LIVE] {title} - Sensor Monitor ({args.source})",
                  fontsize=14, fontweight='bold', color='#00ff88')
 
-    # 센서별 색상
+    # 센서별 색상 (설비가 여러 대면 설비별 색상)
     colors = ['#00ccff', '#ff6b6b', '#ffd93d', '#6bff6b']
+    machine_colors = plt.cm.tab20(np.linspace(0, 1, 20))
 
-    # 라인 객체 생성
-    lines = {}
-    for i, sensor_name in enumerate(TARGET_SENSORS):
+    # 라인 객체 생성: (설비, 센서) → (라인, 버퍼의 열 번호)
+    lines = []
+    for i, sensor_name in enumerate(args.sensors):
         ax = axes[i]
-        unit = machine_config["sensors"][sensor_name]["unit"]
-        line, = ax.plot([], [], color=colors[i], linewidth=1.5, label=sensor_name)
-        lines[sensor_name] = line
+        unit, alert_val = None, None
+        for n, (machine_id, cfg) in enumerate(machines.items()):
+            if sensor_name not in cfg["sensors"]:
+                continue
+            unit = cfg["sensors"][sensor_name]["unit"]
+            alert_val = cfg["sensors"][sensor_name]["alert"]
+            color = colors[i % len(colors)] if len(machines) == 1 else machine_colors[n % 20]
+            line, = ax.plot([], [], color=color, linewidth=1.5,
+                            label=machine_id if len(machines) > 1 else sensor_name, animated=True)
+            lines.append((line, machine_id, history.sensors[machine_id].index(sensor_name), ax))
 
         # 경고 기준선
-        alert_val = alert_lines[sensor_name]
-        if alert_val > 0:
+        if alert_val is not None and alert_val > 0:
             ax.axhline(y=alert_val, color='red', linestyle='--', alpha=0.5, label=f'Alert: {alert_val}')
 
-        ax.set_ylabel(f"{sensor_name}\n({unit})", fontsize=9, color=colors[i])
-        ax.legend(loc='upper left', fontsize=8)
+        ax.set_ylabel(f"{sensor_name}\n({unit or ''})", fontsize=9, color=colors[i % len(colors)])
+        if len(machines) <= 10:
+            ax.legend(loc='upper left', fontsize=8)
         ax.grid(True, alpha=0.2)
         ax.tick_params(colors='#888888')
+        ax.set_xlim(0, args.history * (1 - X_HEADROOM))
+        ax.set_ylim(0, 1)
 
     axes[-1].set_xlabel("Time (sec)", fontsize=10)
+    data_seen = set()   # 첫 데이터가 들어온 축 (그 전에는 y축을 데이터에 맞춰 새로 설정)
 
-    # 상태 텍스트
-    status_text = fig.text(0.95, 0.95, "", fontsize=12, ha='right', va='top',
-                           fontweight='bold', fontfamily='monospace')
+    # 상태 텍스트 (blitting 대상이 되도록 figure가 아니라 첫 번째 축에 붙임)
+    status_text = axes[0].text(1.0, 1.12, "", transform=axes[0].transAxes, fontsize=12,
+                               ha='right', va='bottom', fontweight='bold', fontfamily='monospace',
+                               animated=True)
+    status_map = {
+        "RUNNING": ("[NORMAL]", "#00ff88"),
+        "WARNING": ("[WARNING]", "#ffd93d"),
+        "ANOMALY": ("[ANOMALY!]", "#ff4444")
+    }
 
-    # === 애니메이션 업데이트 함수 ===
-    tick = [0]
+    def rescale_if_needed() -> bool:
+        """데이터가 현재 축 범위를 벗어났을 때만 범위를 바꿉니다. 바꿨으면 True."""
+        changed = False
+        latest = max((b.latest()[0] for b in history.buffers.values() if b.count), default=None)
+        if latest is None:
+            return False
+        x_min, x_max = axes[0].get_xlim()
+        if latest > x_max:
+            axes[0].set_xlim(latest - args.history * (1 - X_HEADROOM), latest + args.history * X_HEADROOM)
+            changed = True
+        for ax in axes:
+            column = [line.get_ydata() for line, _, _, a in lines if a is ax]
+            data = np.concatenate(column) if column else np.array([])
+            data = data[np.isfinite(data)]
+            if data.size == 0:
+                continue
+            y_lo, y_hi = ax.get_ylim()
+            d_lo, d_hi = data.min(), data.max()
+            seen = ax in data_seen
+            if not seen or d_lo < y_lo or d_hi > y_hi:
+                margin = (d_hi - d_lo) * Y_MARGIN or 1
+                ax.set_ylim(min(d_lo - margin, y_lo) if seen else d_lo - margin,
+                            max(d_hi + margin, y_hi) if seen else d_hi + margin)
+                data_seen.add(ax)
+                changed = True
+        return changed
 
+    # === 애니메이션 업데이트 함수 ===
     def update(frame):
-        tick[0] += 1
-        time_ticks.append(tick[0])
-
-        # 센서 데이터 읽기
-        data = machine.read_all_sensors()
-
-        # 상태 업데이트
-        status_map = {
-            "RUNNING": ("[NORMAL]", "#00ff88"),
-            "WARNING": ("[WARNING]", "#ffd93d"),
-            "ANOMALY": ("[ANOMALY!]", "#ff4444")
-        }
-        status_label, status_color = status_map.get(data["status"], ("[UNKNOWN]", "white"))
+        with history.lock:
+            for line, machine_id, column, _ in lines:
+                buffer = history.buffers[machine_id]
+                # 링 버퍼 배열을 그대로 전달 (head 칸의 NaN이 선을 끊어줌)
+                line.set_data(buffer.times, buffer.values[:, column])
+            worst = max(history.status.values(), key=lambda s: STATUS_RANK.get(s, 0))
+            bad = sum(1 for s in history.status.values() if s != "RUNNING")
+
+        status_label, status_color = status_map.get(worst, ("[UNKNOWN]", "white"))
+        if len(machines) > 1:
+            status_label = f"{status_label} {bad}/{len(machines)}"
         status_text.set_text(status_label)
         status_text.set_color(status_color)
 
-        # 데이터 추가 & 그래프 업데이트
-        for sensor_name in TARGET_SENSORS:
-            value = data["sensors"][sensor_name]
-            history[sensor_name].append(value)
-
-            x_data = list(time_ticks)
-            y_data = list(history[sensor_name])
-            lines[sensor_name].set_data(x_data, y_data)
-
-            # 축 범위 자동 조정
-            ax = axes[TARGET_SENSORS.index(sensor_name)]
-            ax.set_xlim(max(0, tick[0] - HISTORY_SIZE), tick[0] + 5)
-            if y_data:
-                y_min, y_max = min(y_data), max(y_data)
-                margin = (y_max - y_min) * 0.2 or 1
-                ax.set_ylim(y_min - margin, y_max + margin)
-
-        return list(lines.values()) + [status_text]
+        if rescale_if_needed():
+            fig.canvas.draw()   # 축이 바뀐 경우만 전체 다시 그림 → 배경 캐시 갱신
+        return [line for line, _, _, _ in lines] + [status_text]
 
     # === 애니메이션 시작 ===
-    ani = animation.FuncAnimation(fig, update, interval=UPDATE_INTERVAL,
-                                  blit=False, cache_frame_data=False)
+    ani = animation.FuncAnimation(fig, update, interval=args.interval,
+                                  blit=True, cache_frame_data=False)
 
     plt.tight_layout()
-    plt.subplots_adjust(top=0.92)
-    print(f"[LIVE] {TARGET_MACHINE} monitoring started! (Close window to stop)")
+    plt.subplots_adjust(top=0.90)
+    print(f"[LIVE] {title} monitoring started! (source={args.source}, close window to stop)")
     plt.show()
 
 
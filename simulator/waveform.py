@@ -0,0 +1,270 @@
+"""
+고주파 진동 파형 + 엣지 특징 추출.
+
+vibration* 센서는 1초에 값 하나(mm/s)지만, 실제 상태 감시는 kHz 파형을 봅니다.
+파형을 그대로 MQTT / Kafka로 보내면 센서 하나에 초당 40 KB(10,240 Hz × float32)이므로
+엣지에서 특징만 뽑아 1초마다 보내고, 원시 파형은 이상 앞뒤로만 보냅니다.
+
+WaveformGenerator (시뮬레이터 쪽): Fleet의 마지막 틱에서 진동 센서마다 블록 하나(block_seconds × sample_rate)를 만듭니다.
+  - 정상: 회전 주파수 1x + 2x 고조파 + 광대역 노이즈
+  - 이상이 주입되면(Fleet.is_anomaly) 센서마다 결함 하나를 골라 모양을 바꿈
+      불균형(imbalance): 1x 성분이 severity배로 커짐
+      베어링 결함(bearing): BPFO 주기의 충격이 공진 주파수로 울렸다 사라짐 → kurtosis / crest factor 상승, 고주파 대역 에너지
+  - 블록 RMS는 Fleet의 1초 값과 같게 맞춤 → 기존 1초 데이터와 일관성 유지
+  - 회전 주파수는 spindle_rpm 센서가 있으면 그 값 / 60, 없으면 WAVEFORM_CONFIG의 타입별 값
+  - 위상을 이어서 계산하므로 블록을 이어 붙이면 끊김 없는 파형
+
+FeatureExtractor (엣지 쪽): 블록 배열 [센서, 샘플]에서 센서 전체를 한꺼번에 계산합니다.
+  RMS, peak, crest factor(peak / RMS), kurtosis, Hann 창 FFT의 대역별 RMS (bands)
+
+EdgeProcessor: 특징 레코드(설비별 JSON)를 만들고, 트리거 앞뒤의 원시 블록만 골라 냅니다.
+  - 트리거 후보: RMS > 기준 RMS × trigger_rms_ratio 또는 kurtosis > trigger_kurtosis
+    기준 RMS는 센서별 EWMA (config의 base에서 시작, 후보가 아닐 때만 갱신 → 드리프트는 따라가고 이상에는 끌려가지 않음)
+  - 후보가 trigger_blocks번 연속되면 트리거 (노이즈 한 번으로는 원시 파형을 보내지 않음)
+  - 트리거 전 pre_blocks개는 링 버퍼에 들고 있다가 트리거되면 함께 내보내고, 마지막 트리거 후 post_blocks개 더 내보냄
+
+원시 블록 payload (little endian): magic "SFV" | version u8 | sample_rate u32 | start_ms i64 | 샘플 수 u32 | float32 × 샘플 수
+
+실행: python simulator/main.py --waveform   (특징: edge/<설비>/vibration, 원시: edge/<설비>/vibration/<센서>/raw)
+벤치마크: python simulator/bench_waveform.py
+"""
+from __future__ import annotations
+
+import json
+import struct
+
+from lazy import np
+
+from config import WAVEFORM_CONFIG
+
+RAW_MAGIC = b"SFV"
+RAW_VERSION = 1
+_RAW_HEADER = struct.Struct("<3sBIqI")
+
+FAULT_NONE, FAULT_IMBALANCE, FAULT_BEARING = range(3)
+FAULT_NAMES = ("none", "imbalance", "bearing")
+
+# 난수 용도(lane) - Fleet 센서 스트림에서 쓰지 않는 번호
+LANE_PHASE, LANE_FAULT = 16, 17
+
+
+class WaveformGenerator:
+    """Fleet의 진동 센서마다 파형 블록을 만듭니다."""
+
+    def __init__(self, fleet, sample_rate: int = None, block_seconds: float = None):
+        cfg = WAVEFORM_CONFIG
+        self.sample_rate = sample_rate or cfg["sample_rate"]
+        self.block_seconds = block_seconds or cfg["block_seconds"]
+        self.samples = int(round(self.sample_rate * self.block_seconds))
+
+        index, owner, rpm_index, shaft_hz = [], [], [], []
+        self.keys = []              # (machine_id, sensor)
+        for m, (machine_id, machine_type, names) in enumerate(zip(fleet.machine_ids, fleet.machine_types,
+                                                                   fleet.sensor_names)):
+            offset = int(fleet.offsets[m])
+            rpm = offset + names.index("spindle_rpm") if "spindle_rpm" in names else -1
+            for j, name in enumerate(names):
+                if name.startswith(cfg["sensor_prefix"]):
+                    index.append(offset + j)
+                    owner.append(m)
+                    rpm_index.append(rpm)
+                    shaft_hz.append(cfg["shaft_hz"].get(machine_type, cfg["default_shaft_hz"]))
+                    self.keys.append((machine_id, name))
+        self.index = np.array(index, dtype=np.intp)         # Fleet 평탄 배열 위치
+        self.owner = np.array(owner, dtype=np.intp)         # 설비 번호
+        self.rpm_index = np.array(rpm_index, dtype=np.intp)
+        self.shaft_hz = np.array(shaft_hz)
+        self.base = fleet.base[self.index]
+
+        rng = fleet.sensor_rng
+        self.phase = 2 * np.pi * rng.uniform(0, LANE_PHASE, self.index)      # 센서마다 시작 위상
+        self.fault = np.zeros(len(self.index), dtype=np.uint8)
+        self._active = np.zeros(len(self.index), dtype=bool)
+        self._seed = fleet.seed
+        self._t = np.arange(self.samples) / self.sample_rate
+        self.bearing_order = WAVEFORM_CONFIG["bearing_order"]
+        self.resonance_hz = WAVEFORM_CONFIG["resonance_hz"]
+
+    def __len__(self):
+        return len(self.index)
+
+    def _shaft_hz(self, fleet) -> np.ndarray:
+        has_rpm = self.rpm_index >= 0
+        rpm = fleet.values[np.where(has_rpm, self.rpm_index, 0)]
+        return np.where(has_rpm & (rpm > 0), rpm / 60.0, self.shaft_hz)
+
+    def block(self, fleet) -> np.ndarray:
+        """Fleet의 마지막 틱에 해당하는 블록 [센서, 샘플] (float32, mm/s)."""
+        active = fleet.is_anomaly[self.index]
+        started = active & ~self._active
+        if started.any():
+            # 이상이 시작될 때 센서마다 결함 종류를 정함 (seed가 같으면 항상 같은 결함)
+            u = fleet.sensor_rng.uniform(fleet.tick, LANE_FAULT, self.index[started])
+            self.fault[started] = np.where(u < 0.5, FAULT_IMBALANCE, FAULT_BEARING)
+        self.fault[~active] = FAULT_NONE
+        self._active = active
+
+        f = self._shaft_hz(fleet)[:, None]
+        phase = self.phase[:, None] + 2 * np.pi * f * self._t           # 1x 위상 (블록 사이 이어짐)
+        severity = fleet.anomaly_severity[self.index][:, None]
+        fault = self.fault[:, None]
+
+        one_x = np.where(fault == FAULT_IMBALANCE, severity, 1.0)
+        wave = one_x * np.sin(phase) + 0.35 * np.sin(2 * phase + 1.0)
+        rng = np.random.default_rng((self._seed, fleet.tick))
+        wave += 0.2 * rng.standard_normal(wave.shape, dtype=np.float32)
+        bearing = np.flatnonzero(self.fault == FAULT_BEARING)
+        if bearing.size:
+            # BPFO마다 충격 → 공진 주파수로 감쇠 진동 (충격 후 경과 시간 tau로 계산)
+            cycles = phase[bearing] * self.bearing_order / (2 * np.pi)
+            tau = (cycles - np.floor(cycles)) / (f[bearing] * self.bearing_order)
+            ring = np.exp(-tau * 800.0) * np.sin(2 * np.pi * self.resonance_hz * tau)
+            wave[bearing] += 2.0 * severity[bearing] * ring
+
+        self.phase = (self.phase + 2 * np.pi * f[:, 0] * self.block_seconds) % (2 * np.pi)
+        # 블록 RMS를 Fleet의 1초 값에 맞춤
+        rms = np.sqrt(np.mean(wave * wave, axis=1, keepdims=True))
+        target = fleet.values[self.index][:, None]
+        return (wave * (target / np.maximum(rms, 1e-12))).astype(np.float32)
+
+
+class FeatureExtractor:
+    """블록 [센서, 샘플] → 특징 배열. 센서 전체를 한 번에 계산합니다."""
+
+    def __init__(self, sample_rate: int, samples: int, bands: list = None):
+        bands = WAVEFORM_CONFIG["bands"] if bands is None else bands
+        self.sample_rate = sample_rate
+        self.samples = samples
+        self.window = np.hanning(samples).astype(np.float32)
+        freqs = np.fft.rfftfreq(samples, 1 / sample_rate)
+        edges = np.searchsorted(freqs, bands[:-1])                    # 대역 시작 bin
+        self.band_edges = edges
+        self.band_names = [f"{lo:g}-{hi:g}" for lo, hi in zip(bands[:-1], bands[1:])]
+        # 한쪽 스펙트럼 |X|² → 평균 제곱 (Hann 창 에너지 보정)
+        self._scale = 2.0 / (samples * float(np.sum(self.window ** 2)))
+
+    def extract(self, blocks: np.ndarray) -> dict:
+        """반환: {"rms", "peak", "crest", "kurtosis": [센서], "bands": [센서, 대역]}."""
+        x = blocks - blocks.mean(axis=1, keepdims=True)
+        m2 = np.mean(x * x, axis=1)
+        rms = np.sqrt(m2)
+        peak = np.max(np.abs(x), axis=1)
+        safe = np.maximum(m2, 1e-12)
+        kurtosis = np.mean((x * x) ** 2, axis=1) / (safe * safe)
+        power = np.abs(np.fft.rfft(x * self.window, axis=1)) ** 2
+        bands = np.sqrt(np.add.reduceat(power, self.band_edges, axis=1) * self._scale)
+        return {"rms": rms, "peak": peak, "crest": peak / np.maximum(rms, 1e-12),
+                "kurtosis": kurtosis, "bands": bands}
+
+
+def encode_raw(block: np.ndarray, start_ms: int, sample_rate: int) -> bytes:
+    samples = np.ascontiguousarray(block, dtype="<f4")
+    return _RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, sample_rate, start_ms, len(samples)) + samples.tobytes()
+
+
+def decode_raw(payload: bytes):
+    """반환: (start_ms, sample_rate, 샘플 배열)."""
+    magic, version, sample_rate, start_ms, count = _RAW_HEADER.unpack_from(payload)
+    if magic != RAW_MAGIC or version != RAW_VERSION:
+        raise ValueError(f"원시 파형 payload가 아닙니다: {magic!r} v{version}")
+    return start_ms, sample_rate, np.frombuffer(payload, dtype="<f4", count=count, offset=_RAW_HEADER.size)
+
+
+class EdgeProcessor:
+    """블록 → 설비별 특징 레코드 + 트리거 앞뒤의 원시 블록."""
+
+    def __init__(self, generator: WaveformGenerator, pre_blocks: int = None, post_blocks: int = None,
+                 trigger_rms_ratio: float = None, trigger_kurtosis: float = None, trigger_blocks: int = None,
+                 bands: list = None):
+        cfg = WAVEFORM_CONFIG
+        self.keys = generator.keys
+        self.owner = generator.owner
+        self.sample_rate = generator.sample_rate
+        self.block_ms = round(generator.block_seconds * 1000)
+        self.extractor = FeatureExtractor(generator.sample_rate, generator.samples, bands)
+        self.rms_ratio = cfg["trigger_rms_ratio"] if trigger_rms_ratio is None else trigger_rms_ratio
+        self.kurtosis_limit = cfg["trigger_kurtosis"] if trigger_kurtosis is None else trigger_kurtosis
+        self.trigger_blocks = cfg["trigger_blocks"] if trigger_blocks is None else trigger_blocks
+        self.baseline_alpha = cfg["baseline_alpha"]
+        self.baseline = generator.base.astype(np.float64)      # 센서별 기준 RMS
+        self.pre_blocks = cfg["pre_blocks"] if pre_blocks is None else pre_blocks
+        self.post_blocks = cfg["post_blocks"] if post_blocks is None else post_blocks
+
+        n = len(self.keys)
+        self._history = np.zeros((self.pre_blocks, n, generator.samples), dtype=np.float32)
+        self._history_ms = np.zeros(self.pre_blocks, dtype=np.int64)
+        self._kept = 0                  # 링 버퍼에 든 블록 수
+        self._next = 0
+        self.streak = np.zeros(n, dtype=np.int64)   # 트리거 후보 연속 횟수
+        self.hold = np.zeros(n, dtype=np.int64)     # 앞으로 더 내보낼 블록 수
+        self.blocks = 0
+        self.raw_blocks = 0
+        self.triggers = 0
+
+    def process(self, blocks: np.ndarray, start_ms: int):
+        """반환: (특징 배열 dict, 트리거 여부[센서], 원시 블록 목록 [(센서 번호, start_ms, 블록)])."""
+        features = self.extractor.extract(blocks)
+        rms = features["rms"]
+        candidate = (rms > self.baseline * self.rms_ratio) | (features["kurtosis"] > self.kurtosis_limit)
+        self.baseline = np.where(candidate, self.baseline, self.baseline + self.baseline_alpha * (rms - self.baseline))
+        self.streak = np.where(candidate, self.streak + 1, 0)
+        triggered = self.streak >= self.trigger_blocks
+        starting = triggered & (self.hold == 0)
+
+        raw = []
+        # 새로 트리거된 센서: 링 버퍼의 이전 블록부터 (오래된 순서)
+        for i in np.flatnonzero(starting).tolist():
+            for back in range(self._kept, 0, -1):
+                slot = (self._next - back) % self.pre_blocks
+                raw.append((i, int(self._history_ms[slot]), self._history[slot, i].copy()))
+        self.hold = np.where(triggered, self.post_blocks + 1, self.hold)
+        for i in np.flatnonzero(self.hold > 0).tolist():
+            raw.append((i, start_ms, blocks[i]))
+        self.hold = np.maximum(self.hold - 1, 0)
+
+        if self.pre_blocks:
+            self._history[self._next] = blocks
+            self._history_ms[self._next] = start_ms
+            self._next = (self._next + 1) % self.pre_blocks
+            self._kept = min(self._kept + 1, self.pre_blocks)
+        self.blocks += len(blocks)
+        self.raw_blocks += len(raw)
+        self.triggers += int(np.count_nonzero(starting))
+        return features, triggered, raw
+
+    def records(self, features: dict, triggered: np.ndarray, timestamp: str) -> list:
+        """설비별 특징 레코드 목록."""
+        rms, peak, crest, kurtosis = (np.round(features[k], 4).tolist() for k in ("rms", "peak", "crest", "kurtosis"))
+        bands = np.round(features["bands"], 4).tolist()
+        flags = triggered.tolist()
+        records = {}
+        for i, (machine_id, sensor) in enumerate(self.keys):
+            record = records.get(machine_id)
+            if record is None:
+                record = records[machine_id] = {"timestamp": timestamp, "machine_id": machine_id,
+                                                "sample_rate": self.sample_rate,
+                                                "bands": self.extractor.band_names, "sensors": {}}
+            record["sensors"][sensor] = {"rms": rms[i], "peak": peak[i], "crest": crest[i],
+                                         "kurtosis": kurtosis[i], "bands": bands[i], "triggered": flags[i]}
+        return list(records.values())
+
+    def stats(self) -> dict:
+        return {"blocks": self.blocks, "raw_blocks": self.raw_blocks, "triggers": self.triggers,
+                "raw_ratio": self.raw_blocks / self.blocks if self.blocks else 0.0}
+
+
+def publish(client, edge: EdgeProcessor, blocks: np.ndarray, start_ms: int, timestamp: str) -> int:
+    """특징과 원시 블록을 MQTT로 발행합니다. 반환: 보낸 바이트 수."""
+    cfg = WAVEFORM_CONFIG
+    features, triggered, raw = edge.process(blocks, start_ms)
+    sent = 0
+    for record in edge.records(features, triggered, timestamp):
+        payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+        client.publish(cfg["topic"].format(machine_id=record["machine_id"]), payload)
+        sent += len(payload)
+    for i, block_ms, block in raw:
+        machine_id, sensor = edge.keys[i]
+        payload = encode_raw(block, block_ms, edge.sample_rate)
+        client.publish(cfg["raw_topic"].format(machine_id=machine_id, sensor=sensor), payload)
+        sent += len(payload)
+    return sent
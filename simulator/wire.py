@@ -0,0 +1,379 @@
+"""
+센서 데이터용 바이너리 전송 포맷 (JSON과 병행 사용).
+
+JSON은 메시지마다 machine_type, location, 센서 이름, ISO timestamp 문자열을 반복합니다.
+바이너리 포맷은 config.MACHINES에서 만든 스키마를 양쪽이 공유하므로 값만 보냅니다.
+
+프레임 구조 (little endian, 패딩 없음):
+  헤더    magic "SFW" | version u8 | schema fingerprint u32 | frame flags u8 | base_ts i64(ms)
+          | created_ms i64 | 섹션 수 u8
+  섹션    machine type 번호 u8 | 레코드 수 u16
+  레코드  machine 번호 u16 | flags u8 | dt i32(base_ts 기준 ms) | seq u32 | 센서값 float32 × (해당 타입 센서 수)
+
+  - 센서 순서는 설비 타입별로 고정 (config.MACHINES에 적힌 순서)
+  - 한 프레임에 여러 설비, 여러 틱의 데이터를 담을 수 있음
+  - 섹션 안의 레코드는 고정 길이라 np.frombuffer로 복사 없이 읽을 수 있음
+  - created_ms(프레임을 만든 실제 시각)와 seq(설비별 일련번호)는 계측용 (metrics.py), 0이면 없음
+
+버전 기록: v1 → v2 created_ms, seq 추가
+
+레코드 flags: bit0~1 상태(0 RUNNING, 1 WARNING, 2 ANOMALY) | bit2 has_anomaly | bit3 has_alert
+              | bit4 partial (변화 보고 모드, deadband.py: 바뀐 센서만 값이 있고 나머지는 NaN)
+프레임 flags: bit0 WARNING/ANOMALY 레코드 포함 → 브릿지는 이 비트만 보고 디코딩 여부를 결정
+"""
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from lazy import np
+
+from config import MACHINES
+
+MAGIC = b"SFW"
+WIRE_VERSION = 2
+
+STATUS_NAMES = ("RUNNING", "WARNING", "ANOMALY")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+FLAG_STATUS_MASK = 0x03
+FLAG_HAS_ANOMALY = 0x04
+FLAG_HAS_ALERT = 0x08
+FLAG_PARTIAL = 0x10
+FRAME_HAS_ALERTS = 0x01
+
+_HEADER = struct.Struct("<3sBIBqqB")
+_SECTION = struct.Struct("<BH")
+MAX_SECTION_RECORDS = 0xFFFF
+
+
+class WireFormatError(ValueError):
+    """프레임이 깨졌거나 스키마가 맞지 않을 때 발생합니다."""
+
+
+def is_frame(payload: bytes) -> bool:
+    return payload[:3] == MAGIC
+
+
+def epoch_ms(timestamp: str) -> int:
+    """ISO timestamp 문자열 → epoch 밀리초."""
+    return round(datetime.fromisoformat(timestamp).timestamp() * 1000)
+
+
+@lru_cache(maxsize=4096)
+def iso_timestamp(ms: int) -> str:
+    """epoch 밀리초 → ISO timestamp 문자열 (UTC)."""
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat()
+
+
+def record_flags(status: str, has_anomaly: bool, has_alert: bool, partial: bool = False) -> int:
+    return (STATUS_CODES[status]
+            | (FLAG_HAS_ANOMALY if has_anomaly else 0)
+            | (FLAG_HAS_ALERT if has_alert else 0)
+            | (FLAG_PARTIAL if partial else 0))
+
+
+class WireSchema:
+    """config.MACHINES에서 만든 설비 번호 / 타입별 센서 순서 / 레코드 dtype."""
+
+    def __init__(self, machines: dict = None):
+        machines = MACHINES if machines is None else machines
+        self.machine_ids = list(machines)
+        self.machine_index = {machine_id: i for i, machine_id in enumerate(self.machine_ids)}
+        self.locations = [config["location"] for config in machines.values()]
+        if len(self.machine_ids) > 0xFFFF:
+            raise ValueError("설비가 65535대를 넘으면 u16 설비 번호를 쓸 수 없습니다.")
+
+        self.types = []                 # 타입 번호 → 타입 이름
+        self.type_sensors = []          # 타입 번호 → 센서 이름 목록 (고정 순서)
+        type_index = {}
+        machine_type = []
+        for machine_id, config in machines.items():
+            sensors = list(config["sensors"])
+            t = type_index.get(config["type"])
+            if t is None:
+                t = type_index[config["type"]] = len(self.types)
+                self.types.append(config["type"])
+                self.type_sensors.append(sensors)
+            elif self.type_sensors[t] != sensors:
+                raise ValueError(f"{machine_id}: 같은 타입({config['type']})인데 센서 구성이 다릅니다.")
+            machine_type.append(t)
+        self.machine_type = np.array(machine_type, dtype=np.uint8)
+
+        # 센서 배치 (batch.ReadingBatch): 설비 m의 센서 j → 평탄 센서 키 offsets[m] + j
+        self.positions = [{name: j for j, name in enumerate(sensors)} for sensors in self.type_sensors]
+        self.counts = np.array([len(self.type_sensors[t]) for t in machine_type], dtype=np.intp)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        self.width = max(len(sensors) for sensors in self.type_sensors)
+        self._sensor_keys = None
+
+        self.dtypes = [np.dtype([("machine", "<u2"), ("flags", "u1"), ("dt", "<i4"), ("seq", "<u4"),
+                                 ("values", "<f4", (len(sensors),))])
+                       for sensors in self.type_sensors]
+        # 레코드 1건짜리 프레임용 struct (NumPy 배열을 만들지 않는 빠른 경로)
+        self._single = [struct.Struct(f"<BHHBiI{len(sensors)}f") for sensors in self.type_sensors]
+
+        layout = [(m, self.types[t], self.type_sensors[t])
+                  for m, t in zip(self.machine_ids, machine_type)]
+        self.fingerprint = zlib.crc32(json.dumps(layout, ensure_ascii=False).encode("utf-8"))
+
+    @property
+    def sensor_keys(self) -> list:
+        """평탄 센서 키 → (machine_id, 센서 이름)."""
+        if self._sensor_keys is None:
+            self._sensor_keys = [(machine_id, name) for machine_id, t in zip(self.machine_ids, self.machine_type.tolist())
+                                 for name in self.type_sensors[t]]
+        return self._sensor_keys
+
+    # ------------------------------------------------------------
+    # 인코딩
+    # ------------------------------------------------------------
+    def encode_records(self, records: list) -> bytes:
+        """기존 JSON 형태(dict) 레코드 목록을 프레임 하나로 묶습니다."""
+        if not records:
+            raise ValueError("빈 프레임은 만들 수 없습니다.")
+        if len(records) == 1:
+            return self._encode_single(records[0])
+        stamps = [epoch_ms(r["timestamp"]) for r in records]
+        base_ts = min(stamps)
+        created_ms = min((r.get("created_ms", 0) for r in records), default=0)
+
+        grouped = {}
+        for record, ts in zip(records, stamps):
+            m = self.machine_index[record["machine_id"]]
+            grouped.setdefault(int(self.machine_type[m]), []).append((m, record, ts))
+
+        sections = []
+        for t, items in grouped.items():
+            sensors = self.type_sensors[t]
+            rows = np.zeros(len(items), dtype=self.dtypes[t])
+            for row, (m, record, ts) in zip(rows, items):
+                values = record["sensors"]
+                row["machine"] = m
+                row["flags"] = record_flags(record["status"], record["has_anomaly"], record["has_alert"],
+                                            record.get("partial", False))
+                row["dt"] = ts - base_ts
+                row["seq"] = record.get("seq", 0)
+                row["values"] = [values.get(name, np.nan) for name in sensors]
+            sections.append((t, rows))
+        return self._pack(base_ts, sections, created_ms)
+
+    def _encode_single(self, record: dict) -> bytes:
+        m = self.machine_index[record["machine_id"]]
+        t = int(self.machine_type[m])
+        flags = record_flags(record["status"], record["has_anomaly"], record["has_alert"],
+                             record.get("partial", False))
+        values = record["sensors"]
+        frame_flags = FRAME_HAS_ALERTS if flags & FLAG_STATUS_MASK else 0
+        header = _HEADER.pack(MAGIC, WIRE_VERSION, self.fingerprint, frame_flags,
+                              epoch_ms(record["timestamp"]), record.get("created_ms", 0), 1)
+        return header + self._single[t].pack(
+            t, 1, m, flags, 0, record.get("seq", 0), *[values.get(name, np.nan) for name in self.type_sensors[t]])
+
+    def encode_arrays(self, base_ts: int, machine: np.ndarray, flags: np.ndarray,
+                      values_by_type: dict, dt: np.ndarray = None, seq=0, created_ms: int = 0) -> bytes:
+        """배열에서 바로 프레임을 만듭니다. values_by_type: 타입 번호 → (행 선택 인덱스, 2차원 값 배열).
+        seq는 설비별 배열 또는 전체 공통 값 하나."""
+        sections = []
+        for t, (rows_idx, values) in values_by_type.items():
+            rows = np.empty(len(rows_idx), dtype=self.dtypes[t])
+            rows["machine"] = machine[rows_idx]
+            rows["flags"] = flags[rows_idx]
+            rows["dt"] = 0 if dt is None else dt[rows_idx]
+            rows["seq"] = seq[rows_idx] if isinstance(seq, np.ndarray) else seq
+            rows["values"] = values
+            sections.append((t, rows))
+        return self._pack(base_ts, sections, created_ms)
+
+    def split_frame(self, payload: bytes, group_of: np.ndarray) -> list:
+        """프레임을 설비 그룹별 프레임으로 나눕니다. group_of: 설비 번호 → 그룹 번호 배열.
+        반환: [(그룹 번호, 그 그룹의 설비 번호 배열, 프레임)] (그룹 번호 순). 그룹이 하나뿐이면 원본 payload를 그대로 씁니다."""
+        base_ts, sections = self.decode_arrays(payload)
+        groups = {}
+        for t, rows in sections:
+            machine = rows["machine"]
+            group = group_of[machine]
+            if len(group) and group.min() == group.max():
+                groups.setdefault(int(group[0]), []).append((t, rows))
+                continue
+            order = np.argsort(group, kind="stable")     # 그룹 안에서는 원래 순서 유지
+            rows, group = rows[order], group[order]
+            bounds = np.flatnonzero(np.diff(group)) + 1
+            for start, end in zip(np.r_[0, bounds], np.r_[bounds, len(rows)]):
+                groups.setdefault(int(group[start]), []).append((t, rows[start:end]))
+        if len(groups) == 1:
+            g, parts = next(iter(groups.items()))
+            return [(g, np.concatenate([rows["machine"] for _, rows in parts]), payload)]
+        created_ms = peek_created_ms(payload)
+        return [(g, np.concatenate([rows["machine"] for _, rows in parts]),
+                 self._pack(base_ts, parts, created_ms))
+                for g, parts in sorted(groups.items())]
+
+    def _pack(self, base_ts: int, sections: list, created_ms: int = 0) -> bytes:
+        frame_flags = 0
+        chunks = []
+        count = 0
+        for t, rows in sections:
+            for start in range(0, len(rows), MAX_SECTION_RECORDS):
+                part = rows[start:start + MAX_SECTION_RECORDS]
+                chunks.append(_SECTION.pack(t, len(part)))
+                chunks.append(part.tobytes())
+                count += 1
+            if np.any(rows["flags"] & FLAG_STATUS_MASK):
+                frame_flags |= FRAME_HAS_ALERTS
+        if count > 0xFF:
+            raise ValueError("섹션이 너무 많습니다. 프레임을 나눠서 보내세요.")
+        header = _HEADER.pack(MAGIC, WIRE_VERSION, self.fingerprint, frame_flags, base_ts, created_ms, count)
+        return b"".join([header] + chunks)
+
+    # ------------------------------------------------------------
+    # 디코딩
+    # ------------------------------------------------------------
+    def decode_arrays(self, payload: bytes):
+        """프레임을 (base_ts, [(타입 번호, 레코드 배열), ...])로 읽습니다. 레코드 배열은 payload를 복사 없이 참조합니다."""
+        if len(payload) < _HEADER.size:
+            raise WireFormatError("프레임 헤더가 잘렸습니다.")
+        magic, version, fingerprint, _flags, base_ts, _created_ms, count = _HEADER.unpack_from(payload)
+        if magic != MAGIC:
+            raise WireFormatError("바이너리 프레임이 아닙니다.")
+        if version != WIRE_VERSION:
+            raise WireFormatError(f"지원하지 않는 버전: {version}")
+        if fingerprint != self.fingerprint:
+            raise WireFormatError("스키마가 다릅니다. (config.MACHINES가 송신 측과 같은지 확인)")
+
+        offset = _HEADER.size
+        sections = []
+        for _ in range(count):
+            t, n = _SECTION.unpack_from(payload, offset)
+            offset += _SECTION.size
+            if t >= len(self.dtypes):
+                raise WireFormatError(f"알 수 없는 설비 타입 번호: {t}")
+            rows = np.frombuffer(payload, dtype=self.dtypes[t], count=n, offset=offset)
+            offset += rows.nbytes
+            sections.append((t, rows))
+        if offset != len(payload):
+            raise WireFormatError("프레임 길이가 맞지 않습니다.")
+        return base_ts, sections
+
+    def decode(self, payload: bytes) -> list:
+        """프레임을 기존 JSON 형태(dict) 레코드 목록으로 변환합니다."""
+        base_ts, sections = self.decode_arrays(payload)
+        created_ms = peek_created_ms(payload)
+        records = []
+        for t, rows in sections:
+            machine_type = self.types[t]
+            sensors = self.type_sensors[t]
+            values = np.round(rows["values"].astype(np.float64), 2).tolist()
+            for m, flags, dt, seq, row in zip(rows["machine"].tolist(), rows["flags"].tolist(),
+                                              rows["dt"].tolist(), rows["seq"].tolist(), values):
+                record = {
+                    "timestamp": iso_timestamp(base_ts + dt),
+                    "machine_id": self.machine_ids[m],
+                    "machine_type": machine_type,
+                    "location": self.locations[m],
+                    "sensors": {name: v for name, v in zip(sensors, row) if v == v},  # NaN(값 없음) 제외
+                    "status": STATUS_NAMES[flags & FLAG_STATUS_MASK],
+                    "has_anomaly": bool(flags & FLAG_HAS_ANOMALY),
+                    "has_alert": bool(flags & FLAG_HAS_ALERT),
+                }
+                if flags & FLAG_PARTIAL:
+                    record["partial"] = True
+                if seq:
+                    record["seq"] = seq
+                if created_ms:
+                    record["created_ms"] = created_ms
+                records.append(record)
+        return records
+
+
+def peek_flags(payload: bytes) -> int:
+    """프레임 전체를 디코딩하지 않고 헤더의 frame flags만 읽습니다."""
+    return _HEADER.unpack_from(payload)[3]
+
+
+def peek_created_ms(payload: bytes) -> int:
+    """헤더의 created_ms (프레임을 만든 실제 시각, 없으면 0)."""
+    return _HEADER.unpack_from(payload)[5]
+
+
+class FleetEncoder:
+    """Fleet의 마지막 틱을 프레임으로 인코딩합니다. (dict를 만들지 않음)"""
+
+    def __init__(self, fleet, schema: WireSchema = None):
+        self.schema = schema or fleet_schema(fleet)
+        machine = np.array([self.schema.machine_index[m] for m in fleet.machine_ids], dtype=np.uint16)
+        self._machine = machine
+        # 타입별로 (설비 행 인덱스, fleet.values에서 값을 모으는 2차원 인덱스)를 미리 계산
+        self._gather = {}
+        machine_type = self.schema.machine_type[machine]
+        for t in np.unique(machine_type).tolist():
+            rows = np.flatnonzero(machine_type == t)
+            n = len(self.schema.type_sensors[t])
+            for m in rows.tolist():
+                if fleet.sensor_names[m] != self.schema.type_sensors[t]:
+                    raise ValueError(f"{fleet.machine_ids[m]}: 스키마와 센서 순서가 다릅니다.")
+            self._gather[t] = (rows, fleet.offsets[rows][:, None] + np.arange(n))
+
+    def encode(self, fleet, base_ts: int, created_ms: int = 0, mask: np.ndarray = None,
+               seq: np.ndarray = None):
+        """mask(센서별 bool, deadband.py)를 주면 mask에 든 센서가 있는 설비만, 나머지 센서는 NaN으로 담습니다.
+        보낼 설비가 없으면 None. seq(설비별 배열)를 주면 틱 번호 대신 씁니다."""
+        flags = (fleet.status.astype(np.uint8)
+                 | (fleet.has_anomaly * FLAG_HAS_ANOMALY).astype(np.uint8)
+                 | (fleet.has_alert * FLAG_HAS_ALERT).astype(np.uint8))
+        seq = fleet.tick if seq is None else seq
+        if mask is None:
+            values = {t: (rows, fleet.values[idx]) for t, (rows, idx) in self._gather.items()}
+            return self.schema.encode_arrays(base_ts, self._machine, flags, values,
+                                             seq=seq, created_ms=created_ms)
+
+        values = {}
+        for t, (rows, idx) in self._gather.items():
+            keep = mask[idx]
+            emit = keep.any(axis=1)
+            if not emit.any():
+                continue
+            keep = keep[emit]
+            rows = rows[emit]
+            values[t] = (rows, np.where(keep, fleet.values[idx[emit]], np.nan))
+            flags[rows[~keep.all(axis=1)]] |= FLAG_PARTIAL
+        if not values:
+            return None
+        return self.schema.encode_arrays(base_ts, self._machine, flags, values,
+                                         seq=seq, created_ms=created_ms)
+
+
+def fleet_schema(fleet) -> WireSchema:
+    """Fleet의 설비 구성으로 만든 스키마 (설비 번호 = Fleet 인덱스)."""
+    return WireSchema(dict(zip(fleet.machine_ids, _fleet_configs(fleet))))
+
+
+def _fleet_configs(fleet):
+    """Fleet 정보로 스키마용 설비 구성을 다시 만듭니다. (센서 값 파라미터는 필요 없음)"""
+    for m in range(len(fleet)):
+        yield {
+            "type": fleet.machine_types[m],
+            "location": fleet.locations[m],
+            "sensors": {name: None for name in fleet.sensor_names[m]},
+        }
+
+
+_default_schema = None
+
+
+def default_schema() -> WireSchema:
+    """config.MACHINES 기준 스키마 (한 번만 만듦)."""
+    global _default_schema
+    if _default_schema is None:
+        _default_schema = WireSchema()
+    return _default_schema
+
+
+def decode_payload(payload: bytes, schema: WireSchema = None) -> list:
+    """JSON 메시지든 바이너리 프레임이든 dict 레코드 목록으로 변환합니다."""
+    if is_frame(payload):
+        return (schema or default_schema()).decode(payload)
+    return [json.loads(payload)]
@@ -21,5 +21,247 @@ INSERT INTO factory.machines (machine_id, machine_type, location, install_date)
     ('CLR-001', 'COOLER', 'B동 유틸리티', '2023-11-05'),
     ('PWR-001', 'POWER_MONITOR', 'A동 전력실', '2022-01-01');
 
+-- ============================================================
+-- 센서 데이터 (Kafka sensor-raw → simulator/pg_sink.py가 적재)
+--
+-- 저장 구조 (대시보드 조회 패턴: "설비 X의 최근 N분", "일주일 시간별 평균")
+--   - 시간(ts) 기준 일 단위 RANGE 파티션 → 기간 조회는 해당 일 파티션만 읽고, 보존 기간이 지나면 파티션째 DROP
+--   - 센서 값은 JSON 대신 설비 타입별 고정 순서의 REAL[] (순서는 factory.machine_types.sensors)
+--     → 행 크기가 JSONB의 약 1/3, 센서 이름을 행마다 반복하지 않음
+--   - 상태는 wire.py 레코드 flags 그대로 (bit0~1 상태, bit2 has_anomaly, bit3 has_alert, bit4 partial)
+--   - BRIN(ts): 시간 순서로 쌓이므로 아주 작은 인덱스로 시간 범위를 거름
+--     btree(machine_id, ts): 설비 하나의 시간 범위 조회
+--   - 1분 / 1시간 rollup 테이블은 refresh_rollups()가 증분 갱신 (pg_sink.py가 주기적으로 호출)
+--
+-- 기존 볼륨(JSONB sensors 컬럼)에는 이 파일이 다시 실행되지 않습니다.
+-- 기존 데이터가 필요 없으면 docker compose down -v 후 다시 시작하세요.
+-- ============================================================
+
+-- 설비 타입별 센서 순서 (sensor_readings.vals의 n번째 값 = sensors[n])
+-- 새 타입은 적재기가 config.MACHINES 기준으로 등록합니다.
+CREATE TABLE factory.machine_types (
+    type_id      SMALLINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+    machine_type VARCHAR(50) NOT NULL UNIQUE,
+    sensors      TEXT[] NOT NULL,
+    units        TEXT[] NOT NULL
+);
+
+INSERT INTO factory.machine_types (machine_type, sensors, units) VALUES
+    ('CNC_LATHE', '{spindle_temp,vibration_x,vibration_y,spindle_rpm,power_consumption,coolant_temp}',
+                  '{°C,mm/s,mm/s,RPM,kW,°C}'),
+    ('PRESS', '{hydraulic_pressure,oil_temp,vibration,cycle_count,power_consumption}',
+              '{bar,°C,mm/s,회,kW}'),
+    ('CONVEYOR', '{belt_speed,motor_temp,motor_current,vibration}',
+                 '{m/min,°C,A,mm/s}'),
+    ('COOLER', '{inlet_temp,outlet_temp,compressor_pressure,refrigerant_level,power_consumption}',
+               '{°C,°C,bar,%,kW}'),
+    ('POWER_MONITOR', '{total_power,power_factor,voltage_r,voltage_s,voltage_t,frequency}',
+                      '{kW,"",V,V,V,Hz}');
+
+-- 원본 데이터 (partial 레코드에서 빠진 센서는 NULL)
+CREATE TABLE factory.sensor_readings (
+    ts          TIMESTAMPTZ NOT NULL,
+    type_id     SMALLINT NOT NULL,
+    flags       SMALLINT NOT NULL,
+    machine_id  VARCHAR(20) NOT NULL,
+    vals        REAL[] NOT NULL
+) PARTITION BY RANGE (ts);
+
+-- 인덱스는 파티션마다 자동 생성됨
+CREATE INDEX sensor_readings_ts_brin ON factory.sensor_readings USING brin (ts) WITH (pages_per_range = 32);
+CREATE INDEX sensor_readings_machine_ts ON factory.sensor_readings (machine_id, ts);
+
+-- 사람이 보기 쉬운 형태 (기존 JSON 레코드와 같은 컬럼)
+CREATE VIEW factory.sensor_readings_v AS
+SELECT r.ts,
+       r.machine_id,
+       t.machine_type,
+       (ARRAY['RUNNING', 'WARNING', 'ANOMALY'])[(r.flags & 3) + 1] AS status,
+       (r.flags & 4) <> 0 AS has_anomaly,
+       (r.flags & 8) <> 0 AS has_alert,
+       (SELECT jsonb_object_agg(s.name, s.val)
+          FROM unnest(t.sensors, r.vals) AS s(name, val)
+         WHERE s.val IS NOT NULL) AS sensors
+  FROM factory.sensor_readings r
+  JOIN factory.machine_types t USING (type_id);
+
+-- 일 파티션 생성 (UTC 기준 하루). 이미 있으면 건너뜀. 반환: 새로 만든 파티션 수
+CREATE FUNCTION factory.create_reading_partitions(first_day DATE, days INT DEFAULT 1)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    d DATE;
+    part TEXT;
+    created INT := 0;
+BEGIN
+    FOR i IN 0 .. days - 1 LOOP
+        d := first_day + i;
+        part := 'sensor_readings_' || to_char(d, 'YYYYMMDD');
+        IF to_regclass('factory.' || part) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS factory.%I PARTITION OF factory.sensor_readings '
+                'FOR VALUES FROM (%L) TO (%L)',
+                part, d::timestamp AT TIME ZONE 'UTC', (d + 1)::timestamp AT TIME ZONE 'UTC');
+            created := created + 1;
+        END IF;
+    END LOOP;
+    RETURN created;
+END $$;
+
+-- ------------------------------------------------------------
+-- rollup: 설비별 1분 / 1시간 집계. 센서별 값은 vals와 같은 순서의 배열
+--   counts: 센서별 값 개수 (partial 레코드 때문에 센서마다 다를 수 있음)
+--   1시간 평균은 1분 평균을 counts로 가중 평균 → 원본으로 계산한 값과 같음
+-- ------------------------------------------------------------
+CREATE TABLE factory.sensor_rollup_1m (
+    bucket      TIMESTAMPTZ NOT NULL,
+    type_id     SMALLINT NOT NULL,
+    machine_id  VARCHAR(20) NOT NULL,
+    samples     INT NOT NULL,
+    alerts      INT NOT NULL,
+    anomalies   INT NOT NULL,
+    counts      INT[] NOT NULL,
+    avg_vals    REAL[] NOT NULL,
+    min_vals    REAL[] NOT NULL,
+    max_vals    REAL[] NOT NULL,
+    PRIMARY KEY (machine_id, bucket)
+);
+CREATE INDEX sensor_rollup_1m_bucket_brin ON factory.sensor_rollup_1m USING brin (bucket);
+
+CREATE TABLE factory.sensor_rollup_1h (LIKE factory.sensor_rollup_1m INCLUDING ALL);
+
+-- 증분 갱신 위치 (이 시각 이전의 분은 집계 완료)
+CREATE TABLE factory.rollup_state (
+    name        TEXT PRIMARY KEY,
+    done_until  TIMESTAMPTZ NOT NULL
+);
+
+-- [from_ts, to_ts) 구간의 1분 rollup을 원본에서 다시 계산 (멱등). 반환: 쓴 행 수
+CREATE FUNCTION factory.rollup_minutes(from_ts TIMESTAMPTZ, to_ts TIMESTAMPTZ)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    n INT;
+BEGIN
+    from_ts := date_trunc('minute', from_ts);
+    to_ts := date_trunc('minute', to_ts);
+    DELETE FROM factory.sensor_rollup_1m WHERE bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO factory.sensor_rollup_1m
+        (bucket, type_id, machine_id, samples, alerts, anomalies, counts, avg_vals, min_vals, max_vals)
+    SELECT s.bucket, s.type_id, s.machine_id, r.samples, r.alerts, r.anomalies,
+           array_agg(s.cnt ORDER BY s.pos), array_agg(s.avg_v ORDER BY s.pos),
+           array_agg(s.min_v ORDER BY s.pos), array_agg(s.max_v ORDER BY s.pos)
+      FROM (SELECT date_trunc('minute', t.ts) AS bucket, t.type_id, t.machine_id, v.pos,
+                   count(v.val)::int AS cnt, avg(v.val)::real AS avg_v,
+                   min(v.val) AS min_v, max(v.val) AS max_v
+              FROM factory.sensor_readings t
+             CROSS JOIN LATERAL unnest(t.vals) WITH ORDINALITY AS v(val, pos)
+             WHERE t.ts >= from_ts AND t.ts < to_ts
+             GROUP BY 1, 2, 3, 4) s
+      JOIN (SELECT date_trunc('minute', ts) AS bucket, machine_id,
+                   count(*)::int AS samples,
+                   (count(*) FILTER (WHERE flags & 8 <> 0))::int AS alerts,
+                   (count(*) FILTER (WHERE flags & 4 <> 0))::int AS anomalies
+              FROM factory.sensor_readings
+             WHERE ts >= from_ts AND ts < to_ts
+             GROUP BY 1, 2) r
+        ON r.bucket = s.bucket AND r.machine_id = s.machine_id
+     GROUP BY s.bucket, s.type_id, s.machine_id, r.samples, r.alerts, r.anomalies;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END $$;
+
+-- [from_ts, to_ts)를 덮는 완료된 시간(UTC)의 1시간 rollup을 1분 rollup에서 다시 계산 (멱등)
+CREATE FUNCTION factory.rollup_hours(from_ts TIMESTAMPTZ, to_ts TIMESTAMPTZ)
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    n INT;
+BEGIN
+    from_ts := date_trunc('hour', from_ts, 'UTC');
+    to_ts := date_trunc('hour', to_ts, 'UTC');
+    DELETE FROM factory.sensor_rollup_1h WHERE bucket >= from_ts AND bucket < to_ts;
+
+    INSERT INTO factory.sensor_rollup_1h
+        (bucket, type_id, machine_id, samples, alerts, anomalies, counts, avg_vals, min_vals, max_vals)
+    SELECT s.bucket, s.type_id, s.machine_id, r.samples, r.alerts, r.anomalies,
+           array_agg(s.cnt ORDER BY s.pos), array_agg(s.avg_v ORDER BY s.pos),
+           array_agg(s.min_v ORDER BY s.pos), array_agg(s.max_v ORDER BY s.pos)
+      FROM (SELECT date_trunc('hour', m.bucket, 'UTC') AS bucket, m.type_id, m.machine_id, v.pos,
+                   sum(v.cnt)::int AS cnt,
+                   (sum(v.avg_v::float8 * v.cnt) / nullif(sum(v.cnt), 0))::real AS avg_v,
+                   min(v.min_v) AS min_v, max(v.max_v) AS max_v
+              FROM factory.sensor_rollup_1m m
+             CROSS JOIN LATERAL unnest(m.counts, m.avg_vals, m.min_vals, m.max_vals)
+                   WITH ORDINALITY AS v(cnt, avg_v, min_v, max_v, pos)
+             WHERE m.bucket >= from_ts AND m.bucket < to_ts
+             GROUP BY 1, 2, 3, 4) s
+      JOIN (SELECT date_trunc('hour', bucket, 'UTC') AS bucket, machine_id,
+                   sum(samples)::int AS samples, sum(alerts)::int AS alerts, sum(anomalies)::int AS anomalies
+              FROM factory.sensor_rollup_1m
+             WHERE bucket >= from_ts AND bucket < to_ts
+             GROUP BY 1, 2) r
+        ON r.bucket = s.bucket AND r.machine_id = s.machine_id
+     GROUP BY s.bucket, s.type_id, s.machine_id, r.samples, r.alerts, r.anomalies;
+    GET DIAGNOSTICS n = ROW_COUNT;
+    RETURN n;
+END $$;
+
+-- 증분 갱신: 지난번 위치 - lateness부터 upto(보통 적재한 데이터의 가장 늦은 ts)까지 다시 계산
+--   lateness: 늦게 도착한 데이터를 반영하기 위해 다시 계산하는 구간
+CREATE FUNCTION factory.refresh_rollups(upto TIMESTAMPTZ, lateness INTERVAL DEFAULT '2 minutes')
+RETURNS TIMESTAMPTZ LANGUAGE plpgsql AS $$
+DECLARE
+    done TIMESTAMPTZ;
+    stop_ts TIMESTAMPTZ := date_trunc('minute', upto);
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM factory.rollup_state WHERE name = 'sensor_rollup') THEN
+        -- 처음: 원본의 가장 이른 시각부터
+        INSERT INTO factory.rollup_state (name, done_until)
+        SELECT 'sensor_rollup', min(ts) FROM factory.sensor_readings
+        HAVING min(ts) IS NOT NULL
+        ON CONFLICT (name) DO NOTHING;
+    END IF;
+    -- 동시에 여러 적재기가 불러도 한 번에 하나씩
+    SELECT done_until INTO done FROM factory.rollup_state WHERE name = 'sensor_rollup' FOR UPDATE;
+    IF done IS NULL OR stop_ts <= done - lateness THEN
+        RETURN done;
+    END IF;
+
+    PERFORM factory.rollup_minutes(done - lateness, stop_ts);
+    PERFORM factory.rollup_hours(done - lateness, stop_ts);
+    UPDATE factory.rollup_state SET done_until = greatest(done, stop_ts) WHERE name = 'sensor_rollup';
+    RETURN greatest(done, stop_ts);
+END $$;
+
+-- 보존 기간: 원본은 일 파티션째 DROP, rollup은 오래된 행 삭제. as_of는 기준 시각 (재현 데이터는 데이터 시각)
+--   pg_sink.py는 as_of로 적재한 가장 늦은 ts를 넘김 → as_of가 든 날의 파티션은 지우지 않음
+CREATE FUNCTION factory.apply_retention(raw_keep INTERVAL, minute_keep INTERVAL, hour_keep INTERVAL,
+                                        as_of TIMESTAMPTZ DEFAULT now())
+RETURNS INT LANGUAGE plpgsql AS $$
+DECLARE
+    part RECORD;
+    cutoff DATE := ((as_of - raw_keep) AT TIME ZONE 'UTC')::date;
+    dropped INT := 0;
+BEGIN
+    IF raw_keep < interval '0' OR minute_keep < interval '0' OR hour_keep < interval '0' THEN
+        RAISE EXCEPTION 'apply_retention: 보존 기간은 0 이상이어야 합니다 (%, %, %)', raw_keep, minute_keep, hour_keep;
+    END IF;
+    FOR part IN
+        SELECT c.relname
+          FROM pg_inherits i
+          JOIN pg_class c ON c.oid = i.inhrelid
+         WHERE i.inhparent = 'factory.sensor_readings'::regclass
+           AND c.relname ~ '^sensor_readings_[0-9]{8}$'
+    LOOP
+        -- 파티션 전체가 cutoff보다 이전일 때만
+        IF to_date(right(part.relname, 8), 'YYYYMMDD') + 1 <= cutoff THEN
+            EXECUTE format('DROP TABLE factory.%I', part.relname);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    DELETE FROM factory.sensor_rollup_1m WHERE bucket < as_of - minute_keep;
+    DELETE FROM factory.sensor_rollup_1h WHERE bucket < as_of - hour_keep;
+    RETURN dropped;
+END $$;
+
 -- 확인용
 SELECT '✅ 초기화 완료: ' || count(*) || '개 설비 등록됨' FROM factory.machines;